@@ -41,6 +41,7 @@ import re
 import threading
 import time
 import warnings
+import weakref
 from contextlib import contextmanager
 from hashlib import md5
 from types import MethodType
@@ -51,9 +52,10 @@ from OPSI.Exceptions import *  # this is needed for dynamic loading
 from OPSI.Types import *  # this is needed for dynamic loading
 from OPSI.Object import *  # this is needed for dynamic loading
 from OPSI.Util import (
-	blowfishEncrypt, blowfishDecrypt, compareVersions,
+	blowfishEncrypt, blowfishDecrypt, chunk,
 	getfqdn, getPublicKey, removeUnit, timestamp)
 from OPSI.Util.File import ConfigFile
+from OPSI.Util.Filter import compileFilter
 import OPSI.SharedAlgorithm
 
 if os.name == 'posix':
@@ -68,9 +70,10 @@ if os.name == 'posix':
 
 __all__ = (
 	'describeInterface', 'getArgAndCallString', 'temporaryBackendOptions',
-	'DeferredCall', 'Backend', 'ExtendedBackend', 'ConfigDataBackend',
-	'ExtendedConfigDataBackend',
-	'ModificationTrackingBackend', 'BackendModificationListener'
+	'backendTransaction', 'DeferredCall', 'Backend', 'ExtendedBackend',
+	'ConfigDataBackend', 'ExtendedConfigDataBackend',
+	'ModificationTrackingBackend', 'BackendModificationListener',
+	'ClientToDepotIndex', 'ProductDependencyGraph'
 )
 
 OPSI_MODULES_FILE = u'/etc/opsi/modules'
@@ -84,6 +87,8 @@ LOG_TYPES = {  # key = logtype, value = requires objectId for read
 	'userlogin': True,
 	'winpe': True,
 }
+# Number of objects whose existence is checked with a single query
+BULK_QUERY_SIZE = 500
 
 logger = Logger()
 
@@ -191,6 +196,31 @@ def temporaryBackendOptions(backend, **options):
 		backend.backend_setOptions(oldOptions)
 
 
+@contextmanager
+def backendTransaction(backend):
+	"""
+	Make the changes done through `backend` by the current thread
+	inside of the block take effect together.
+
+	If the block raises an exception the backends supporting
+	transactions discard the changes made inside of the block.
+	Transactions can be nested. Backends without support for
+	transactions write their changes immediately.
+
+	Transactions are not part of the backend interface and therefore
+	can not be used through JSON-RPC.
+	"""
+	try:
+		transaction = backend._transaction
+	except AttributeError:
+		logger.debug(u"{0!r} does not support transactions", backend)
+		yield
+		return
+
+	with transaction():
+		yield
+
+
 class DeferredCall(object):
 	def __init__(self, callback=None):
 		self.error = None
@@ -264,6 +294,16 @@ This defaults to ``self``.
 	def __exit__(self, exc_type, exc_value, traceback):
 		self.backend_exit()
 
+	@contextmanager
+	def _transaction(self):
+		"""
+		Context for changes that should take effect together.
+
+		Backends supporting transactions should overwrite this.
+		Use :py:func:`backendTransaction` instead of calling this.
+		"""
+		yield
+
 	def _setContext(self, context):
 		"""Setting the context backend."""
 		self._context = context
@@ -276,79 +316,12 @@ This defaults to ``self``.
 		"""
 		Checks if the opsi object hash matches the filter.
 
+		When checking multiple hashes against the same filter use
+		:py:func:`OPSI.Util.Filter.compileFilter` instead.
+
 		:rtype: bool
 		"""
-		for attribute, value in objHash.iteritems():
-			if not filter.get(attribute):
-				continue
-			matched = False
-
-			try:
-				logger.debug(
-					u"Testing match of filter {0!r} of attribute {1!r} with "
-					u"value {2!r}", filter[attribute], attribute, value
-				)
-				filterValues = forceUnicodeList(filter[attribute])
-				if forceUnicodeList(value) == filterValues or forceUnicode(value) in filterValues:
-					matched = True
-				else:
-					for filterValue in filterValues:
-						if attribute == 'type':
-							match = False
-							Class = eval(filterValue)
-							for subClass in Class.subClasses:
-								if subClass == value:
-									matched = True
-									break
-
-							continue
-
-						if isinstance(value, list):
-							if filterValue in value:
-								matched = True
-								break
-
-							continue
-						elif value is None or isinstance(value, bool):
-							continue
-						elif isinstance(value, (float, long, int)) or re.search('^\s*([>=<]+)\s*([\d\.]+)', forceUnicode(filterValue)):
-							operator = '=='
-							v = forceUnicode(filterValue)
-							match = re.search(r'^\s*([>=<]+)\s*([\d.]+)', filterValue)
-							if match:
-								operator = match.group(1)  # pylint: disable=maybe-no-member
-								v = match.group(2)  # pylint: disable=maybe-no-member
-
-							try:
-								matched = compareVersions(value, operator, v)
-								if matched:
-									break
-							except Exception:
-								pass
-
-							continue
-
-						if '*' in filterValue and re.search(r'^%s$' % filterValue.replace('*', '.*'), value):
-							matched = True
-							break
-
-				if matched:
-					logger.debug(
-						u"Value {0!r} matched filter {1!r}, attribute {2!r}",
-						value, filter[attribute], attribute
-					)
-				else:
-					# No match, we can stop further checks.
-					return False
-			except Exception as err:
-				raise BackendError(
-					u"Testing match of filter {0!r} of attribute {1!r} with "
-					u"value {2!r} failed: {error}".format(
-						filter[attribute], attribute, value, error=err
-					)
-				)
-
-		return True
+		return compileFilter(filter)(objHash)
 
 	def backend_setOptions(self, options):
 		"""
@@ -471,6 +444,15 @@ This defaults to ``self``.
 		"""
 		pass
 
+	def _getStorageKey(self):
+		"""
+		Get a key identifying the data of the backend.
+
+		Backends with the same key share the indexes of their data in
+		a process. `None` means that the data can not be identified.
+		"""
+		return None
+
 	def __repr__(self):
 		if self._name:
 			return u'<{0}(name={1!r})>'.format(self.__class__.__name__, self._name)
@@ -522,6 +504,14 @@ class ExtendedBackend(Backend):
 		meth = getattr(self._backend, methodName)
 		return meth(**kwargs)
 
+	@contextmanager
+	def _transaction(self):
+		with backendTransaction(self._backend):
+			yield
+
+	def _getStorageKey(self):
+		return self._backend._getStorageKey()
+
 	def backend_info(self):
 		if self._backend:
 			return self._backend.backend_info()
@@ -559,6 +549,11 @@ class ConfigDataBackend(Backend):
 	Base class for backends holding data.
 
 	These backends should keep data integrity intact but not alter the data.
+
+	The methods `*_insertObjects` and `*_updateObjects` store multiple
+	objects at once. By default they process every object on its own
+	through `*_insertObject` and `*_updateObject`. Backends that are
+	able to store objects in bulk should overwrite them.
 	"""
 
 	def __init__(self, **kwargs):
@@ -893,6 +888,14 @@ depot where the method is.
 	def host_updateObject(self, host):
 		host = forceObjectClass(host, Host)
 
+	def host_insertObjects(self, hosts):
+		for host in forceObjectClassList(hosts, Host):
+			self.host_insertObject(host)
+
+	def host_updateObjects(self, hosts):
+		for host in forceObjectClassList(hosts, Host):
+			self.host_updateObject(host)
+
 	def host_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.host_getObjects(attributes, **filter)]
 
@@ -901,59 +904,63 @@ depot where the method is.
 		return []
 
 	def host_deleteObjects(self, hosts):
-		for host in forceObjectClassList(hosts, Host):
-			# Remove from groups
-			self._context.objectToGroup_deleteObjects(  # pylint: disable=maybe-no-member
-				self._context.objectToGroup_getObjects(  # pylint: disable=maybe-no-member
-					groupType='HostGroup',
-					objectId=host.id
-				)
-			)
-
-			if isinstance(host, OpsiClient):
-				# Remove product states
-				self._context.productOnClient_deleteObjects(  # pylint: disable=maybe-no-member
-					self._context.productOnClient_getObjects(clientId=host.id)  # pylint: disable=maybe-no-member
-				)
-			elif isinstance(host, OpsiDepotserver):
-				# This is also true for OpsiConfigservers
-				# Remove products
-				self._context.productOnDepot_deleteObjects(  # pylint: disable=maybe-no-member
-					self._context.productOnDepot_getObjects(depotId=host.id)  # pylint: disable=maybe-no-member
-				)
-			# Remove product property states
-			self._context.productPropertyState_deleteObjects(  # pylint: disable=maybe-no-member
-				self._context.productPropertyState_getObjects(objectId=host.id)  # pylint: disable=maybe-no-member
-			)
-			# Remove config states
-			self._context.configState_deleteObjects(  # pylint: disable=maybe-no-member
-				self._context.configState_getObjects(objectId=host.id)  # pylint: disable=maybe-no-member
-			)
+		# The objects depending on the hosts are deleted through the
+		# context to let all backends take note of the deletions.
+		for hostChunk in chunk(forceObjectClassList(hosts, Host), BULK_QUERY_SIZE):
+			self._deleteObjectsOfHosts(hostChunk, self._getObjectsOfHosts(hostChunk))
 
-			if isinstance(host, OpsiClient):
-				# Remove audit softwares
-				self._context.auditSoftwareOnClient_deleteObjects(  # pylint: disable=maybe-no-member
-					self._context.auditSoftwareOnClient_getObjects(  # pylint: disable=maybe-no-member
-						clientId=host.id
-					)
-				)
+	def _getObjectsOfHosts(self, hosts):
+		"""
+		Read the objects depending on `hosts` through the context.
 
-			# Remove audit hardwares
-			self._context.auditHardwareOnHost_deleteObjects(  # pylint: disable=maybe-no-member
-				self._context.auditHardwareOnHost_getObjects(hostId=host.id)  # pylint: disable=maybe-no-member
-			)
+		:returns: Pairs of the prefix of the backend methods for the \
+objects and the objects.
+		:rtype: [(str, list), ]
+		"""
+		hostIds = [host.id for host in hosts]
+		clientIds = [host.id for host in hosts if isinstance(host, OpsiClient)]
+		# This is also true for OpsiConfigservers
+		depotIds = [host.id for host in hosts if isinstance(host, OpsiDepotserver)]
+
+		# Group memberships, product states, products, product property
+		# states, config states, audit data and licenses
+		filters = [('objectToGroup', {'groupType': 'HostGroup', 'objectId': hostIds})]
+		if clientIds:
+			filters.append(('productOnClient', {'clientId': clientIds}))
+		if depotIds:
+			filters.append(('productOnDepot', {'depotId': depotIds}))
+		filters.append(('productPropertyState', {'objectId': hostIds}))
+		filters.append(('configState', {'objectId': hostIds}))
+		if clientIds:
+			filters.append(('auditSoftwareOnClient', {'clientId': clientIds}))
+		filters.append(('auditHardwareOnHost', {'hostId': hostIds}))
+		if clientIds:
+			filters.append(('licenseOnClient', {'clientId': clientIds}))
+
+		return [
+			(prefix, getattr(self._context, prefix + '_getObjects')(**filter))
+			for prefix, filter in filters
+		]
 
-			if isinstance(host, OpsiClient):
-				# Free software licenses
-				self._context.licenseOnClient_deleteObjects(  # pylint: disable=maybe-no-member
-					self._context.licenseOnClient_getObjects(clientId=host.id)  # pylint: disable=maybe-no-member
-				)
+	def _deleteObjectsOfHosts(self, hosts, objectsOfHosts):
+		"""
+		Delete the objects depending on `hosts` through the context.
 
-				softwareLicenses = self._context.softwareLicense_getObjects(boundToHost=host.id)  # pylint: disable=maybe-no-member
-				softwareLicenses = softwareLicenses or []
-				for softwareLicense in softwareLicenses:
-					softwareLicense.boundToHost = None
-					self._context.softwareLicense_insertObject(softwareLicense)  # pylint: disable=maybe-no-member
+		:param objectsOfHosts: The objects as returned by \
+`_getObjectsOfHosts`.
+		"""
+		for prefix, objects in objectsOfHosts:
+			if objects:
+				getattr(self._context, prefix + '_deleteObjects')(objects)
+
+		clientIds = [host.id for host in hosts if isinstance(host, OpsiClient)]
+		if clientIds:
+			# Free software licenses
+			softwareLicenses = self._context.softwareLicense_getObjects(boundToHost=clientIds)  # pylint: disable=maybe-no-member
+			softwareLicenses = softwareLicenses or []
+			for softwareLicense in softwareLicenses:
+				softwareLicense.boundToHost = None
+				self._context.softwareLicense_insertObject(softwareLicense)  # pylint: disable=maybe-no-member
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Configs                                                                                   -
@@ -965,6 +972,14 @@ depot where the method is.
 	def config_updateObject(self, config):
 		config = forceObjectClass(config, Config)
 
+	def config_insertObjects(self, configs):
+		for config in forceObjectClassList(configs, Config):
+			self.config_insertObject(config)
+
+	def config_updateObjects(self, configs):
+		for config in forceObjectClassList(configs, Config):
+			self.config_updateObject(config)
+
 	def config_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.config_getObjects(attributes, **filter)]
 
@@ -991,14 +1006,26 @@ depot where the method is.
 		configState.setDefaults()  # pylint: disable=maybe-no-member
 
 		if self._options['additionalReferentialIntegrityChecks']:
-			configIds = [config.id for config in self._context.config_getObjects(attributes=['id'])]  # pylint: disable=maybe-no-member
+			self._configState_checkReferentialIntegrity([configState])
+
+	def _configState_checkReferentialIntegrity(self, configStates):
+		configIds = set(config.id for config in self._context.config_getObjects(attributes=['id']))  # pylint: disable=maybe-no-member
 
-			if configState.configId not in configIds:  # pylint: disable=maybe-no-member
-				raise BackendReferentialIntegrityError(u"Config with id '%s' not found" % configState.configId)  # pylint: disable=maybe-no-member
+		for configState in configStates:
+			if configState.configId not in configIds:
+				raise BackendReferentialIntegrityError(u"Config with id '%s' not found" % configState.configId)
 
 	def configState_updateObject(self, configState):
 		configState = forceObjectClass(configState, ConfigState)
 
+	def configState_insertObjects(self, configStates):
+		for configState in forceObjectClassList(configStates, ConfigState):
+			self.configState_insertObject(configState)
+
+	def configState_updateObjects(self, configStates):
+		for configState in forceObjectClassList(configStates, ConfigState):
+			self.configState_updateObject(configState)
+
 	def configState_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.configState_getObjects(attributes, **filter)]
 
@@ -1019,6 +1046,14 @@ depot where the method is.
 	def product_updateObject(self, product):
 		product = forceObjectClass(product, Product)
 
+	def product_insertObjects(self, products):
+		for product in forceObjectClassList(products, Product):
+			self.product_insertObject(product)
+
+	def product_updateObjects(self, products):
+		for product in forceObjectClassList(products, Product):
+			self.product_updateObject(product)
+
 	def product_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.product_getObjects(attributes, **filter)]
 
@@ -1103,6 +1138,14 @@ depot where the method is.
 	def productProperty_updateObject(self, productProperty):
 		productProperty = forceObjectClass(productProperty, ProductProperty)
 
+	def productProperty_insertObjects(self, productProperties):
+		for productProperty in forceObjectClassList(productProperties, ProductProperty):
+			self.productProperty_insertObject(productProperty)
+
+	def productProperty_updateObjects(self, productProperties):
+		for productProperty in forceObjectClassList(productProperties, ProductProperty):
+			self.productProperty_updateObject(productProperty)
+
 	def productProperty_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.productProperty_getObjects(attributes, **filter)]
 
@@ -1140,6 +1183,14 @@ depot where the method is.
 	def productDependency_updateObject(self, productDependency):
 		productDependency = forceObjectClass(productDependency, ProductDependency)
 
+	def productDependency_insertObjects(self, productDependencies):
+		for productDependency in forceObjectClassList(productDependencies, ProductDependency):
+			self.productDependency_insertObject(productDependency)
+
+	def productDependency_updateObjects(self, productDependencies):
+		for productDependency in forceObjectClassList(productDependencies, ProductDependency):
+			self.productDependency_updateObject(productDependency)
+
 	def productDependency_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.productDependency_getObjects(attributes, **filter)]
 
@@ -1158,18 +1209,28 @@ depot where the method is.
 		productOnDepot.setDefaults()  # pylint: disable=maybe-no-member
 
 		if self._options['additionalReferentialIntegrityChecks']:
-			if not self._context.product_getObjects(  # pylint: disable=maybe-no-member
-				attributes=['id', 'productVersion', 'packageVersion'],
-				id=productOnDepot.productId,  # pylint: disable=maybe-no-member
-				productVersion=productOnDepot.productVersion,  # pylint: disable=maybe-no-member
-				packageVersion=productOnDepot.packageVersion):  # pylint: disable=maybe-no-member
+			self._productOnDepot_checkReferentialIntegrity([productOnDepot])
 
+	def _productOnDepot_checkReferentialIntegrity(self, productOnDepots):
+		def getKey(productId, productVersion, packageVersion):
+			return tuple(forceUnicodeLower(value) for value in (productId, productVersion, packageVersion))
+
+		productIds = set(productOnDepot.productId for productOnDepot in productOnDepots)
+		products = set()
+		for productIdChunk in chunk(productIds, BULK_QUERY_SIZE):
+			for product in self._context.product_getObjects(  # pylint: disable=maybe-no-member
+					attributes=['id', 'productVersion', 'packageVersion'],
+					id=list(productIdChunk)):
+				products.add(getKey(product.id, product.productVersion, product.packageVersion))
+
+		for productOnDepot in productOnDepots:
+			if getKey(productOnDepot.productId, productOnDepot.productVersion, productOnDepot.packageVersion) not in products:
 				raise BackendReferentialIntegrityError(
 					u"Product with id '{0}', productVersion '{1}', "
 					u"packageVersion '{2}' not found".format(
-						productOnDepot.productId,  # pylint: disable=maybe-no-member
-						productOnDepot.productVersion,  # pylint: disable=maybe-no-member
-						productOnDepot.packageVersion  # pylint: disable=maybe-no-member
+						productOnDepot.productId,
+						productOnDepot.productVersion,
+						productOnDepot.packageVersion
 					)
 				)
 
@@ -1177,20 +1238,15 @@ depot where the method is.
 		productOnDepot = forceObjectClass(productOnDepot, ProductOnDepot)
 
 		if self._options['additionalReferentialIntegrityChecks']:
-			if not self._context.product_getObjects(  # pylint: disable=maybe-no-member
-				attributes=['id', 'productVersion', 'packageVersion'],
-				id=productOnDepot.productId,  # pylint: disable=maybe-no-member
-				productVersion=productOnDepot.productVersion,  # pylint: disable=maybe-no-member
-				packageVersion=productOnDepot.packageVersion):  # pylint: disable=maybe-no-member
+			self._productOnDepot_checkReferentialIntegrity([productOnDepot])
 
-				raise BackendReferentialIntegrityError(
-					u"Product with id '{0}', productVersion '{1}', "
-					u"packageVersion '{2}' not found".format(
-						productOnDepot.productId,  # pylint: disable=maybe-no-member
-						productOnDepot.productVersion,  # pylint: disable=maybe-no-member
-						productOnDepot.packageVersion  # pylint: disable=maybe-no-member
-					)
-				)
+	def productOnDepot_insertObjects(self, productOnDepots):
+		for productOnDepot in forceObjectClassList(productOnDepots, ProductOnDepot):
+			self.productOnDepot_insertObject(productOnDepot)
+
+	def productOnDepot_updateObjects(self, productOnDepots):
+		for productOnDepot in forceObjectClassList(productOnDepots, ProductOnDepot):
+			self.productOnDepot_updateObject(productOnDepot)
 
 	def productOnDepot_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.productOnDepot_getObjects(attributes, **filter)]
@@ -1220,6 +1276,14 @@ depot where the method is.
 	def productOnClient_updateObject(self, productOnClient):
 		productOnClient = forceObjectClass(productOnClient, ProductOnClient)
 
+	def productOnClient_insertObjects(self, productOnClients):
+		for productOnClient in forceObjectClassList(productOnClients, ProductOnClient):
+			self.productOnClient_insertObject(productOnClient)
+
+	def productOnClient_updateObjects(self, productOnClients):
+		for productOnClient in forceObjectClassList(productOnClients, ProductOnClient):
+			self.productOnClient_updateObject(productOnClient)
+
 	def productOnClient_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.productOnClient_getObjects(attributes, **filter)]
 
@@ -1238,17 +1302,33 @@ depot where the method is.
 		productPropertyState.setDefaults()  # pylint: disable=maybe-no-member
 
 		if self._options['additionalReferentialIntegrityChecks']:
-			if not self._context.productProperty_getObjects(  # pylint: disable=maybe-no-member
-				attributes=['productId', 'propertyId'],
-				productId=productPropertyState.productId,  # pylint: disable=maybe-no-member
-				propertyId=productPropertyState.propertyId):  # pylint: disable=maybe-no-member
+			self._productPropertyState_checkReferentialIntegrity([productPropertyState])
+
+	def _productPropertyState_checkReferentialIntegrity(self, productPropertyStates):
+		productIds = set(productPropertyState.productId for productPropertyState in productPropertyStates)
+		productProperties = set()
+		for productIdChunk in chunk(productIds, BULK_QUERY_SIZE):
+			for productProperty in self._context.productProperty_getObjects(  # pylint: disable=maybe-no-member
+					attributes=['productId', 'propertyId'],
+					productId=list(productIdChunk)):
+				productProperties.add((productProperty.productId, productProperty.propertyId))
 
+		for productPropertyState in productPropertyStates:
+			if (productPropertyState.productId, productPropertyState.propertyId) not in productProperties:
 				raise BackendReferentialIntegrityError(u"ProductProperty with id '%s' for product '%s' not found"
-					% (productPropertyState.propertyId, productPropertyState.productId))  # pylint: disable=maybe-no-member
+					% (productPropertyState.propertyId, productPropertyState.productId))
 
 	def productPropertyState_updateObject(self, productPropertyState):
 		productPropertyState = forceObjectClass(productPropertyState, ProductPropertyState)
 
+	def productPropertyState_insertObjects(self, productPropertyStates):
+		for productPropertyState in forceObjectClassList(productPropertyStates, ProductPropertyState):
+			self.productPropertyState_insertObject(productPropertyState)
+
+	def productPropertyState_updateObjects(self, productPropertyStates):
+		for productPropertyState in forceObjectClassList(productPropertyStates, ProductPropertyState):
+			self.productPropertyState_updateObject(productPropertyState)
+
 	def productPropertyState_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.productPropertyState_getObjects(attributes, **filter)]
 
@@ -1273,6 +1353,14 @@ depot where the method is.
 	def group_updateObject(self, group):
 		group = forceObjectClass(group, Group)
 
+	def group_insertObjects(self, groups):
+		for group in forceObjectClassList(groups, Group):
+			self.group_insertObject(group)
+
+	def group_updateObjects(self, groups):
+		for group in forceObjectClassList(groups, Group):
+			self.group_updateObject(group)
+
 	def group_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.group_getObjects(attributes, **filter)]
 
@@ -1298,6 +1386,14 @@ depot where the method is.
 	def objectToGroup_updateObject(self, objectToGroup):
 		objectToGroup = forceObjectClass(objectToGroup, ObjectToGroup)
 
+	def objectToGroup_insertObjects(self, objectToGroups):
+		for objectToGroup in forceObjectClassList(objectToGroups, ObjectToGroup):
+			self.objectToGroup_insertObject(objectToGroup)
+
+	def objectToGroup_updateObjects(self, objectToGroups):
+		for objectToGroup in forceObjectClassList(objectToGroups, ObjectToGroup):
+			self.objectToGroup_updateObject(objectToGroup)
+
 	def objectToGroup_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.objectToGroup_getObjects(attributes, **filter)]
 
@@ -1318,6 +1414,14 @@ depot where the method is.
 	def licenseContract_updateObject(self, licenseContract):
 		licenseContract = forceObjectClass(licenseContract, LicenseContract)
 
+	def licenseContract_insertObjects(self, licenseContracts):
+		for licenseContract in forceObjectClassList(licenseContracts, LicenseContract):
+			self.licenseContract_insertObject(licenseContract)
+
+	def licenseContract_updateObjects(self, licenseContracts):
+		for licenseContract in forceObjectClassList(licenseContracts, LicenseContract):
+			self.licenseContract_updateObject(licenseContract)
+
 	def licenseContract_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.licenseContract_getObjects(attributes, **filter)]
 
@@ -1344,6 +1448,14 @@ depot where the method is.
 	def softwareLicense_updateObject(self, softwareLicense):
 		softwareLicense = forceObjectClass(softwareLicense, SoftwareLicense)
 
+	def softwareLicense_insertObjects(self, softwareLicenses):
+		for softwareLicense in forceObjectClassList(softwareLicenses, SoftwareLicense):
+			self.softwareLicense_insertObject(softwareLicense)
+
+	def softwareLicense_updateObjects(self, softwareLicenses):
+		for softwareLicense in forceObjectClassList(softwareLicenses, SoftwareLicense):
+			self.softwareLicense_updateObject(softwareLicense)
+
 	def softwareLicense_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.softwareLicense_getObjects(attributes, **filter)]
 
@@ -1370,6 +1482,14 @@ depot where the method is.
 	def licensePool_updateObject(self, licensePool):
 		licensePool = forceObjectClass(licensePool, LicensePool)
 
+	def licensePool_insertObjects(self, licensePools):
+		for licensePool in forceObjectClassList(licensePools, LicensePool):
+			self.licensePool_insertObject(licensePool)
+
+	def licensePool_updateObjects(self, licensePools):
+		for licensePool in forceObjectClassList(licensePools, LicensePool):
+			self.licensePool_updateObject(licensePool)
+
 	def licensePool_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.licensePool_getObjects(attributes, **filter)]
 
@@ -1413,6 +1533,14 @@ depot where the method is.
 	def softwareLicenseToLicensePool_updateObject(self, softwareLicenseToLicensePool):
 		softwareLicenseToLicensePool = forceObjectClass(softwareLicenseToLicensePool, SoftwareLicenseToLicensePool)
 
+	def softwareLicenseToLicensePool_insertObjects(self, softwareLicenseToLicensePools):
+		for softwareLicenseToLicensePool in forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool):
+			self.softwareLicenseToLicensePool_insertObject(softwareLicenseToLicensePool)
+
+	def softwareLicenseToLicensePool_updateObjects(self, softwareLicenseToLicensePools):
+		for softwareLicenseToLicensePool in forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool):
+			self.softwareLicenseToLicensePool_updateObject(softwareLicenseToLicensePool)
+
 	def softwareLicenseToLicensePool_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.softwareLicenseToLicensePool_getObjects(attributes, **filter)]
 
@@ -1439,6 +1567,14 @@ depot where the method is.
 	def licenseOnClient_updateObject(self, licenseOnClient):
 		licenseOnClient = forceObjectClass(licenseOnClient, LicenseOnClient)
 
+	def licenseOnClient_insertObjects(self, licenseOnClients):
+		for licenseOnClient in forceObjectClassList(licenseOnClients, LicenseOnClient):
+			self.licenseOnClient_insertObject(licenseOnClient)
+
+	def licenseOnClient_updateObjects(self, licenseOnClients):
+		for licenseOnClient in forceObjectClassList(licenseOnClients, LicenseOnClient):
+			self.licenseOnClient_updateObject(licenseOnClient)
+
 	def licenseOnClient_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.licenseOnClient_getObjects(attributes, **filter)]
 
@@ -1459,6 +1595,14 @@ depot where the method is.
 	def auditSoftware_updateObject(self, auditSoftware):
 		auditSoftware = forceObjectClass(auditSoftware, AuditSoftware)
 
+	def auditSoftware_insertObjects(self, auditSoftwares):
+		for auditSoftware in forceObjectClassList(auditSoftwares, AuditSoftware):
+			self.auditSoftware_insertObject(auditSoftware)
+
+	def auditSoftware_updateObjects(self, auditSoftwares):
+		for auditSoftware in forceObjectClassList(auditSoftwares, AuditSoftware):
+			self.auditSoftware_updateObject(auditSoftware)
+
 	def auditSoftware_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.auditSoftware_getObjects(attributes, **filter)]
 
@@ -1479,6 +1623,14 @@ depot where the method is.
 	def auditSoftwareToLicensePool_updateObject(self, auditSoftwareToLicensePool):
 		auditSoftwareToLicensePool = forceObjectClass(auditSoftwareToLicensePool, AuditSoftwareToLicensePool)
 
+	def auditSoftwareToLicensePool_insertObjects(self, auditSoftwareToLicensePools):
+		for auditSoftwareToLicensePool in forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool):
+			self.auditSoftwareToLicensePool_insertObject(auditSoftwareToLicensePool)
+
+	def auditSoftwareToLicensePool_updateObjects(self, auditSoftwareToLicensePools):
+		for auditSoftwareToLicensePool in forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool):
+			self.auditSoftwareToLicensePool_updateObject(auditSoftwareToLicensePool)
+
 	def auditSoftwareToLicensePool_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.auditSoftwareToLicensePool_getObjects(attributes, **filter)]
 
@@ -1499,6 +1651,14 @@ depot where the method is.
 	def auditSoftwareOnClient_updateObject(self, auditSoftwareOnClient):
 		auditSoftwareOnClient = forceObjectClass(auditSoftwareOnClient, AuditSoftwareOnClient)
 
+	def auditSoftwareOnClient_insertObjects(self, auditSoftwareOnClients):
+		for auditSoftwareOnClient in forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient):
+			self.auditSoftwareOnClient_insertObject(auditSoftwareOnClient)
+
+	def auditSoftwareOnClient_updateObjects(self, auditSoftwareOnClients):
+		for auditSoftwareOnClient in forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient):
+			self.auditSoftwareOnClient_updateObject(auditSoftwareOnClient)
+
 	def auditSoftwareOnClient_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.auditSoftwareOnClient_getObjects(attributes, **filter)]
 
@@ -1519,6 +1679,14 @@ depot where the method is.
 	def auditHardware_updateObject(self, auditHardware):
 		auditHardware = forceObjectClass(auditHardware, AuditHardware)
 
+	def auditHardware_insertObjects(self, auditHardwares):
+		for auditHardware in forceObjectClassList(auditHardwares, AuditHardware):
+			self.auditHardware_insertObject(auditHardware)
+
+	def auditHardware_updateObjects(self, auditHardwares):
+		for auditHardware in forceObjectClassList(auditHardwares, AuditHardware):
+			self.auditHardware_updateObject(auditHardware)
+
 	def auditHardware_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.auditHardware_getObjects(attributes, **filter)]
 
@@ -1642,6 +1810,14 @@ depot where the method is.
 	def auditHardwareOnHost_updateObject(self, auditHardwareOnHost):
 		auditHardwareOnHost = forceObjectClass(auditHardwareOnHost, AuditHardwareOnHost)
 
+	def auditHardwareOnHost_insertObjects(self, auditHardwareOnHosts):
+		for auditHardwareOnHost in forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost):
+			self.auditHardwareOnHost_insertObject(auditHardwareOnHost)
+
+	def auditHardwareOnHost_updateObjects(self, auditHardwareOnHosts):
+		for auditHardwareOnHost in forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost):
+			self.auditHardwareOnHost_updateObject(auditHardwareOnHost)
+
 	def auditHardwareOnHost_getHashes(self, attributes=[], **filter):
 		return [obj.toHash() for obj in self.auditHardwareOnHost_getObjects(attributes, **filter)]
 
@@ -1651,6 +1827,91 @@ depot where the method is.
 	def auditHardwareOnHost_deleteObjects(self, auditHardwareOnHosts):
 		pass
 
+	def auditHardwareOnHost_updateInventory(self, hostId, auditHardwareOnHosts, complete=True):
+		"""
+		Replace the hardware inventory of the host `hostId`.
+
+		The result is the same as calling `auditHardwareOnHost_setObsolete` \
+followed by `auditHardwareOnHost_updateObjects`: hardware that was \
+seen before gets its `lastseen` updated and `state` set to 1, new \
+hardware is inserted and hardware that is not part of the inventory \
+anymore gets `state` 0.
+		Only the hardware that was added or vanished is written \
+individually.
+
+		:param auditHardwareOnHosts: The inventory of the host.
+		:param complete: `True` if `auditHardwareOnHosts` is the complete \
+inventory. Otherwise hardware missing from it is left as it is.
+		:type complete: bool
+		:raises BackendBadValueError: If hardware of another host is given.
+		"""
+		hostId, auditHardwareOnHosts = self._checkHardwareInventory(hostId, auditHardwareOnHosts)
+		complete = forceBool(complete)
+		now = timestamp()
+
+		storedObjects = {}
+		for auditHardwareOnHost in self.auditHardwareOnHost_getObjects(hostId=hostId):
+			key = self._getHardwareInventoryKey(auditHardwareOnHost.toHash())
+			storedObjects.setdefault(key, []).append(auditHardwareOnHost)
+
+		newObjects = []
+		changedObjects = []
+		handledKeys = set()
+		for auditHardwareOnHost in auditHardwareOnHosts:
+			key = self._getHardwareInventoryKey(auditHardwareOnHost.toHash())
+			if key in handledKeys:
+				continue
+			handledKeys.add(key)
+
+			if key not in storedObjects:
+				newObjects.append(auditHardwareOnHost)
+				continue
+
+			for storedObject in storedObjects.pop(key):
+				storedObject.setLastseen(now)
+				storedObject.setState(1)
+				changedObjects.append(storedObject)
+
+		if complete:
+			for vanishedObjects in storedObjects.values():
+				for vanishedObject in vanishedObjects:
+					if vanishedObject.getState() == 1:
+						vanishedObject.setState(0)
+						changedObjects.append(vanishedObject)
+
+		if newObjects:
+			self.auditHardwareOnHost_insertObjects(newObjects)
+		if changedObjects:
+			self.auditHardwareOnHost_updateObjects(changedObjects)
+
+	@staticmethod
+	def _checkHardwareInventory(hostId, auditHardwareOnHosts):
+		hostId = forceHostId(hostId)
+		auditHardwareOnHosts = forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost)
+		for auditHardwareOnHost in auditHardwareOnHosts:
+			if auditHardwareOnHost.getHostId() != hostId:
+				raise BackendBadValueError(
+					u"Hardware {0} does not belong to host {1!r}".format(auditHardwareOnHost, hostId)
+				)
+
+		return hostId, auditHardwareOnHosts
+
+	@staticmethod
+	def _getHardwareInventoryKey(auditHardwareOnHostHash):
+		"""
+		Get what identifies hardware on a host in an inventory.
+
+		These are all attributes except the ones describing when and \
+if the hardware was seen. Empty values are left out because \
+backends may return them as empty strings.
+		"""
+		return tuple(sorted(
+			(attribute, value)
+			for attribute, value in auditHardwareOnHostHash.items()
+			if attribute not in ('firstseen', 'lastseen', 'state', 'type')
+			and value not in (None, u'')
+		))
+
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   direct access                                                                            -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -1675,6 +1936,8 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 			'processProductOnClientSequence': False
 		}
 		self._auditHardwareConfig = {}
+		self._clientToDepotIndex = ClientToDepotIndex.getIndex(self._backend)
+		self._productDependencyGraph = ProductDependencyGraph.getIndex(self._backend)
 
 		if hasattr(self._backend, 'auditHardware_getConfig'):
 			ahwconf = self._backend.auditHardware_getConfig()
@@ -1692,6 +1955,38 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 	def __repr__(self):
 		return u"<{0}(configDataBackend={1!r})>".format(self.__class__.__name__, self._backend)
 
+	def _executeMethod(self, methodName, **kwargs):
+		try:
+			return ExtendedBackend._executeMethod(self, methodName, **kwargs)
+		finally:
+			# Keep the indexes up to date with changes made by methods
+			# that are passed through to the backend.
+			action = methodName.split('_', 1)[-1]
+			if action in ('insertObject', 'updateObject'):
+				self._invalidateIndexes(kwargs.values())
+			elif action in ('insertObjects', 'updateObjects'):
+				self._invalidateIndexes(forceList(kwargs.values()[0]))
+			elif action == 'deleteObjects':
+				self._invalidateIndexes(forceList(kwargs.values()[0]), deleted=True)
+			elif methodName in ('backend_createBase', 'backend_deleteBase'):
+				self._clientToDepotIndex.clear()
+				self._productDependencyGraph.clear()
+
+	def _invalidateIndexes(self, objs, deleted=False):
+		for index in (self._clientToDepotIndex, self._productDependencyGraph):
+			index.invalidateObjects(objs, deleted=deleted)
+
+	@contextmanager
+	def _transaction(self):
+		try:
+			with backendTransaction(self._backend):
+				yield
+		except Exception:
+			# The indexes may have read changes that were rolled back.
+			for index in (self._clientToDepotIndex, self._productDependencyGraph):
+				index.clear()
+			raise
+
 	def backend_searchIdents(self, filter):
 		logger.warning("The method 'backend_searchIdents' has been deprecated and will be removed in the future.")
 		logger.info(u"=== Starting search, filter: %s" % filter)
@@ -2059,6 +2354,117 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 		return [auditHardwareOnHost.getIdent(returnType) for auditHardwareOnHost
 				in self.auditHardwareOnHost_getObjects(**filter)]
 
+	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+	# -   Bulk processing                                                                           -
+	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+	@staticmethod
+	def _getBulkKey(obj, attributes):
+		"""
+		Returns a key to compare `obj` with other objects by `attributes`.
+
+		The values are compared case-insensitive because some backends
+		match filters that way.
+		"""
+		def getValue(attribute):
+			value = getattr(obj, attribute)
+			if value is None:
+				return u''
+			return forceUnicodeLower(value)
+
+		return tuple(getValue(attribute) for attribute in attributes)
+
+	@staticmethod
+	def _getBulkFilter(objects, attributes):
+		"""
+		Creates a filter matching all `objects` by the given `attributes`.
+
+		Attributes that are unset for one of the objects are left out.
+		The resulting filter therefore may match more objects than given.
+		"""
+		filter = {}
+		for attribute in attributes:
+			values = set(getattr(obj, attribute) for obj in objects)
+			if None in values:
+				continue
+			filter[attribute] = list(values)
+
+		return filter
+
+	def _getExistingAndNewObjects(self, objects, getObjects, attributes):
+		"""
+		Splits `objects` into the objects that exist and the new ones.
+
+		Objects are considered equal if they match in `attributes`.
+		The existence is checked by calling `getObjects` once for up to
+		`BULK_QUERY_SIZE` objects.
+		If an object is given multiple times only the first occurrence
+		of a new object is treated as new.
+
+		:returns: The existing and the new objects.
+		:rtype: ([object, ], [object, ])
+		"""
+		knownKeys = set()
+		for objectChunk in chunk(objects, BULK_QUERY_SIZE):
+			filter = self._getBulkFilter(objectChunk, attributes)
+			for obj in getObjects(attributes=list(attributes), **filter):
+				knownKeys.add(self._getBulkKey(obj, attributes))
+
+		existingObjects = []
+		newObjects = []
+		for obj in objects:
+			key = self._getBulkKey(obj, attributes)
+			if key in knownKeys:
+				existingObjects.append(obj)
+			else:
+				knownKeys.add(key)
+				newObjects.append(obj)
+
+		return existingObjects, newObjects
+
+	def _getObjectsInBulk(self, objects, getObjects, attributes):
+		"""
+		Get the objects matching `objects` in `attributes` from `getObjects`.
+
+		Instead of one call per object `getObjects` is called once for
+		up to `BULK_QUERY_SIZE` objects.
+		"""
+		wantedKeys = set(self._getBulkKey(obj, attributes) for obj in objects)
+
+		result = []
+		knownIdents = set()
+		for objectChunk in chunk(objects, BULK_QUERY_SIZE):
+			for obj in getObjects(**self._getBulkFilter(objectChunk, attributes)):
+				if self._getBulkKey(obj, attributes) not in wantedKeys:
+					continue
+
+				ident = obj.getIdent()
+				if ident not in knownIdents:
+					knownIdents.add(ident)
+					result.append(obj)
+
+		return result
+
+	def _updateOrInsertObjects(self, objects, getObjects, attributes, updateObjects, insertObjects):
+		"""
+		Updates the existing objects and inserts the new ones.
+
+		:param getObjects: Method to check the existence of objects.
+		:param attributes: The attributes identifying an object.
+		:param updateObjects: Method to update multiple existing objects.
+		:param insertObjects: Method to insert multiple new objects.
+		"""
+		existingObjects, newObjects = self._getExistingAndNewObjects(objects, getObjects, attributes)
+
+		if newObjects:
+			for obj in newObjects:
+				logger.info(u"{0} does not exist, creating", obj)
+			insertObjects(newObjects)
+
+		if existingObjects:
+			for obj in existingObjects:
+				logger.info(u"Updating {0}", obj)
+			updateObjects(existingObjects)
+
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Hosts                                                                                     -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -2066,7 +2472,8 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 		forcedHosts = forceObjectClassList(hosts, Host)
 		for host in forcedHosts:
 			logger.info(u"Creating host '%s'" % host)
-			self._backend.host_insertObject(host)
+		self._backend.host_insertObjects(forcedHosts)
+		self._invalidateIndexes(forcedHosts)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.host_getObjects(id=[host.id for host in forcedHosts])
@@ -2074,17 +2481,12 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 			return []
 
 	def host_updateObjects(self, hosts):
-		def updateOrInsert(host):
-			logger.info(u"Updating host '%s'" % host)
-			if self.host_getIdents(id=host.id):
-				self._backend.host_updateObject(host)
-			else:
-				logger.info(u"Host %s does not exist, creating" % host)
-				self._backend.host_insertObject(host)
-
 		hostList = forceObjectClassList(hosts, Host)
-		for host in hostList:
-			updateOrInsert(host)
+		self._updateOrInsertObjects(
+			hostList, self.host_getObjects, ('id', ),
+			self._backend.host_updateObjects, self._backend.host_insertObjects
+		)
+		self._invalidateIndexes(hostList)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.host_getObjects(id=[host.id for host in hostList])
@@ -2156,6 +2558,7 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 
 		logger.debug(u"Deleting client {0!r}", client)
 		self._backend.host_deleteObjects([client])
+		self._invalidateIndexes([client], deleted=True)
 
 		logger.info(u"Updating client {0}...", client.id)
 		client.setId(newId)
@@ -2281,6 +2684,7 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 
 		logger.info(u"Deleting depot {0}", depot)
 		self._backend.host_deleteObjects([depot])
+		self._invalidateIndexes([depot], deleted=True)
 
 		def changeAddress(value):
 			newValue = value.replace(oldId, newId)
@@ -2396,7 +2800,10 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 	def host_delete(self, id):
 		if id is None:
 			id = []
-		return self._backend.host_deleteObjects(self._backend.host_getObjects(id=id))
+		hosts = self._backend.host_getObjects(id=id)
+		result = self._backend.host_deleteObjects(hosts)
+		self._invalidateIndexes(hosts, deleted=True)
+		return result
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Configs                                                                                   -
@@ -2405,7 +2812,8 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 		forcedConfigs = forceObjectClassList(configs, Config)
 		for config in forcedConfigs:
 			logger.info(u"Creating config '%s'" % config)
-			self._backend.config_insertObject(config)
+		self._backend.config_insertObjects(forcedConfigs)
+		self._invalidateIndexes(forcedConfigs)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.config_getObjects(id=[config.id for config in forcedConfigs])
@@ -2414,13 +2822,11 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 
 	def config_updateObjects(self, configs):
 		forcedConfigs = forceObjectClassList(configs, Config)
-		for config in forcedConfigs:
-			logger.info(u"Updating config %s" % config)
-			if self.config_getIdents(id=config.id):
-				self._backend.config_updateObject(config)
-			else:
-				logger.info(u"Config %s does not exist, creating" % config)
-				self._backend.config_insertObject(config)
+		self._updateOrInsertObjects(
+			forcedConfigs, self.config_getObjects, ('id', ),
+			self._backend.config_updateObjects, self._backend.config_insertObjects
+		)
+		self._invalidateIndexes(forcedConfigs)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.config_getObjects(id=[config.id for config in forcedConfigs])
@@ -2445,7 +2851,10 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 	def config_delete(self, id):
 		if id is None:
 			id = []
-		return self._backend.config_deleteObjects(self.config_getObjects(id=id))
+		configs = self.config_getObjects(id=id)
+		result = self._backend.config_deleteObjects(configs)
+		self._invalidateIndexes(configs, deleted=True)
+		return result
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ConfigStates                                                                              -
@@ -2511,65 +2920,79 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 				raise ValueError(u"Depot '%s' does not exist or is not a master depot" % depotId)
 
 	def configState_insertObject(self, configState):
-		if self._options['deleteConfigStateIfDefault'] and self._configStateMatchesDefault(configState):
-			# Do not insert configStates which match the default
-			logger.debug(u"Not inserting configState {0!r}, because it does not differ from defaults", configState)
-			return
-
-		configState = forceObjectClass(configState, ConfigState)
-		self._configState_checkValid(configState)
-		self._backend.configState_insertObject(configState)
+		self._configState_insertObjects([configState])
 
 	def configState_updateObject(self, configState):
-		if self._options['deleteConfigStateIfDefault'] and self._configStateMatchesDefault(configState):
-			# Do not update configStates which match the default
-			logger.debug(u"Deleting configState {0!r}, because it does not differ from defaults", configState)
-			return self._backend.configState_deleteObjects(configState)
+		return self._configState_updateObjects([configState])
 
-		configState = forceObjectClass(configState, ConfigState)
-		self._configState_checkValid(configState)
-		self._backend.configState_updateObject(configState)
+	def _configState_insertObjects(self, configStates):
+		deleteIfDefault = self._options['deleteConfigStateIfDefault']
 
-	def configState_createObjects(self, configStates):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
+		validConfigStates = []
+		for configState in configStates:
+			if deleteIfDefault and self._configStateMatchesDefault(configState):
+				# Do not insert configStates which match the default
+				logger.debug(u"Not inserting configState {0!r}, because it does not differ from defaults", configState)
+				continue
 
-		result = []
-		for configState in forceObjectClassList(configStates, ConfigState):
+			configState = forceObjectClass(configState, ConfigState)
+			self._configState_checkValid(configState)
+			validConfigStates.append(configState)
+
+		if validConfigStates:
+			self._backend.configState_insertObjects(validConfigStates)
+			self._invalidateIndexes(validConfigStates)
+
+	def _configState_updateObjects(self, configStates):
+		deleteIfDefault = self._options['deleteConfigStateIfDefault']
+
+		defaultConfigStates = []
+		validConfigStates = []
+		for configState in configStates:
+			if deleteIfDefault and self._configStateMatchesDefault(configState):
+				# Do not update configStates which match the default
+				logger.debug(u"Deleting configState {0!r}, because it does not differ from defaults", configState)
+				defaultConfigStates.append(configState)
+				continue
+
+			configState = forceObjectClass(configState, ConfigState)
+			self._configState_checkValid(configState)
+			validConfigStates.append(configState)
+
+		if validConfigStates:
+			self._backend.configState_updateObjects(validConfigStates)
+			self._invalidateIndexes(validConfigStates)
+		if defaultConfigStates:
+			result = self._backend.configState_deleteObjects(defaultConfigStates)
+			self._invalidateIndexes(defaultConfigStates, deleted=True)
+			return result
+
+	def configState_createObjects(self, configStates):
+		configStates = forceObjectClassList(configStates, ConfigState)
+		for configState in configStates:
 			logger.info(u"Creating configState '%s'" % configState)
-			self.configState_insertObject(configState)
-			if returnObjects:
-				result.extend(
-					self._backend.configState_getObjects(
-						configId=configState.configId,
-						objectId=configState.objectId
-					)
-				)
+		self._configState_insertObjects(configStates)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				configStates, self._backend.configState_getObjects,
+				('configId', 'objectId')
+			)
+		return []
 
 	def configState_updateObjects(self, configStates):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for configState in forceObjectClassList(configStates, ConfigState):
-			logger.info(u"Updating configState %s" % configState)
-			if self.configState_getIdents(
-					configId=configState.configId,
-					objectId=configState.objectId):
-				self.configState_updateObject(configState)
-			else:
-				logger.info(u"ConfigState %s does not exist, creating" % configState)
-				self.configState_insertObject(configState)
-
-			if returnObjects:
-				result.extend(
-					self._backend.configState_getObjects(
-						configId=configState.configId,
-						objectId=configState.objectId
-					)
-				)
+		configStates = forceObjectClassList(configStates, ConfigState)
+		self._updateOrInsertObjects(
+			configStates, self.configState_getObjects, ('configId', 'objectId'),
+			self._configState_updateObjects, self._configState_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				configStates, self._backend.configState_getObjects,
+				('configId', 'objectId')
+			)
+		return []
 
 	def configState_create(self, configId, objectId, values=None):
 		hash = locals()
@@ -2582,17 +3005,22 @@ class ExtendedConfigDataBackend(ExtendedBackend):
 		if objectId is None:
 			objectId = []
 
-		return self._backend.configState_deleteObjects(
-			self._backend.configState_getObjects(
-				configId=configId,
-				objectId=objectId
-			)
+		configStates = self._backend.configState_getObjects(
+			configId=configId,
+			objectId=objectId
 		)
+		result = self._backend.configState_deleteObjects(configStates)
+		self._invalidateIndexes(configStates, deleted=True)
+		return result
 
 	def configState_getClientToDepotserver(self, depotIds=[], clientIds=[], masterOnly=True, productIds=[]):
 		"""
 		Get a mapping of client and depots.
 
+		The mapping is read from an index shared by the backends using
+		the same data in this process. It is kept up to date with the
+		changes made through these backends.
+
 		:param depotIds: Limit the search to the specified depot ids. \
 If nothing is given all depots are taken into account.
 		:type depotIds: [str, ]
@@ -2611,119 +3039,46 @@ into the IDs of these depots are to be found in the list behind \
 `alternativeDepotIds`. The key does always exist but may be empty.
 		:rtype: [{"depotId": str, "alternativeDepotIds": [str, ], "clientId": str},]
 		"""
-		depotIds = forceHostIdList(depotIds)
-		productIds = forceProductIdList(productIds)
-
-		depotIds = self.host_getIdents(type='OpsiDepotserver', id=depotIds)
-		if not depotIds:
-			return []
-		depotIds = set(depotIds)
-
-		clientIds = forceHostIdList(clientIds)
-		clientIds = self.host_getIdents(type='OpsiClient', id=clientIds)
-		if not clientIds:
-			return []
-
-		usedDepotIds = set()
-		result = []
-		with temporaryBackendOptions(self, addConfigStateDefaults=True):
-			for configState in self.configState_getObjects(configId=u'clientconfig.depot.id', objectId=clientIds):
-				try:
-					depotId = configState.values[0]
-					if not depotId:
-						raise IndexError("Missing value")
-				except IndexError:
-					logger.error(u"No depot server configured for client {0!r}", configState.objectId)
-					continue
-
-				if depotId not in depotIds:
-					continue
-				usedDepotIds.add(depotId)
-
-				result.append(
-					{
-						'depotId': depotId,
-						'clientId': configState.objectId,
-						'alternativeDepotIds': []
-					}
-				)
-
-		if forceBool(masterOnly):
-			return result
-
-		productOnDepotsByDepotIdAndProductId = {}
-		for pod in self.productOnDepot_getObjects(productId=productIds):
-			try:
-				productOnDepotsByDepotIdAndProductId[pod.depotId][pod.productId] = pod
-			except KeyError:
-				productOnDepotsByDepotIdAndProductId[pod.depotId] = {pod.productId: pod}
-
-		pHash = {}
-		for (depotId, productOnDepotsByProductId) in productOnDepotsByDepotIdAndProductId.items():
-			productString = [u'|{0};{1};{2}'.format(
-				productId,
-				productOnDepotsByProductId[productId].productVersion,
-				productOnDepotsByProductId[productId].packageVersion)
-				for productId in sorted(productOnDepotsByProductId.keys())]
-
-			pHash[depotId] = u''.join(productString)
-
-		for usedDepotId in usedDepotIds:
-			pString = pHash.get(usedDepotId, u'')
-			alternativeDepotIds = [depotId for (depotId, ps) in pHash.items() if depotId != usedDepotId and pString == ps]
-
-			for i, element in enumerate(result):
-				if element['depotId'] == usedDepotId:
-					result[i]['alternativeDepotIds'] = alternativeDepotIds
-
-		return result
+		return self._clientToDepotIndex.getClientToDepotserver(
+			self._backend,
+			depotIds=forceHostIdList(depotIds),
+			clientIds=forceHostIdList(clientIds),
+			masterOnly=forceBool(masterOnly),
+			productIds=forceProductIdList(productIds)
+		)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Products                                                                                  -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def product_createObjects(self, products):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for product in forceObjectClassList(products, Product):
+		products = forceObjectClassList(products, Product)
+		for product in products:
 			logger.info(u"Creating product %s" % product)
-			self._backend.product_insertObject(product)
-			if returnObjects:
-				result.extend(
-					self._backend.product_getObjects(
-						id=product.id,
-						productVersion=product.productVersion,
-						packageVersion=product.packageVersion
-					)
-				)
+		self._backend.product_insertObjects(products)
+		self._invalidateIndexes(products)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				products, self._backend.product_getObjects,
+				('id', 'productVersion', 'packageVersion')
+			)
+		return []
 
 	def product_updateObjects(self, products):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for product in forceObjectClassList(products, Product):
-			logger.info(u"Updating product %s" % product)
-			if self.product_getIdents(
-					id=product.id,
-					productVersion=product.productVersion,
-					packageVersion=product.packageVersion):
-				self._backend.product_updateObject(product)
-			else:
-				logger.info(u"Product %s does not exist, creating" % product)
-				self._backend.product_insertObject(product)
-
-			if returnObjects:
-				result.extend(
-					self._backend.product_getObjects(
-						id=product.id,
-						productVersion=product.productVersion,
-						packageVersion=product.packageVersion
-					)
-				)
+		products = forceObjectClassList(products, Product)
+		self._updateOrInsertObjects(
+			products, self.product_getObjects,
+			('id', 'productVersion', 'packageVersion'),
+			self._backend.product_updateObjects, self._backend.product_insertObjects
+		)
+		self._invalidateIndexes(products)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				products, self._backend.product_getObjects,
+				('id', 'productVersion', 'packageVersion')
+			)
+		return []
 
 	def product_createLocalboot(self, id, productVersion, packageVersion, name=None, licenseRequired=None,
 					setupScript=None, uninstallScript=None, updateScript=None, alwaysScript=None, onceScript=None,
@@ -2748,13 +3103,14 @@ into the IDs of these depots are to be found in the list behind \
 		if packageVersion is None:
 			packageVersion = []
 
-		return self._backend.product_deleteObjects(
-			self._backend.product_getObjects(
-				id=productId,
-				productVersion=productVersion,
-				packageVersion=packageVersion
-			)
+		products = self._backend.product_getObjects(
+			id=productId,
+			productVersion=productVersion,
+			packageVersion=packageVersion
 		)
+		result = self._backend.product_deleteObjects(products)
+		self._invalidateIndexes(products, deleted=True)
+		return result
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductProperties                                                                         -
@@ -2842,52 +3198,33 @@ into the IDs of these depots are to be found in the list behind \
 			self.productPropertyState_updateObjects(updateProductPropertyStates)
 
 	def productProperty_createObjects(self, productProperties):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for productProperty in forceObjectClassList(productProperties, ProductProperty):
+		productProperties = forceObjectClassList(productProperties, ProductProperty)
+		for productProperty in productProperties:
 			logger.info(u"Creating productProperty %s" % productProperty)
-			self._backend.productProperty_insertObject(productProperty)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productProperty_getObjects(
-						productId=productProperty.productId,
-						productVersion=productProperty.productVersion,
-						packageVersion=productProperty.packageVersion,
-						propertyId=productProperty.propertyId
-					)
-				)
+		self._backend.productProperty_insertObjects(productProperties)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productProperties, self._backend.productProperty_getObjects,
+				('productId', 'productVersion', 'packageVersion', 'propertyId')
+			)
+		return []
 
 	def productProperty_updateObjects(self, productProperties):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for productProperty in forceObjectClassList(productProperties, ProductProperty):
-			logger.info(u"Creating productProperty %s" % productProperty)
-			if self.productProperty_getIdents(
-					productId=productProperty.productId,
-					productVersion=productProperty.productVersion,
-					packageVersion=productProperty.packageVersion,
-					propertyId=productProperty.propertyId):
-				self._backend.productProperty_updateObject(productProperty)
-			else:
-				logger.info(u"ProductProperty %s does not exist, creating" % productProperty)
-				self._backend.productProperty_insertObject(productProperty)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productProperty_getObjects(
-						productId=productProperty.productId,
-						productVersion=productProperty.productVersion,
-						packageVersion=productProperty.packageVersion,
-						propertyId=productProperty.propertyId
-					)
-				)
+		productProperties = forceObjectClassList(productProperties, ProductProperty)
+		self._updateOrInsertObjects(
+			productProperties, self.productProperty_getObjects,
+			('productId', 'productVersion', 'packageVersion', 'propertyId'),
+			self._backend.productProperty_updateObjects,
+			self._backend.productProperty_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productProperties, self._backend.productProperty_getObjects,
+				('productId', 'productVersion', 'packageVersion', 'propertyId')
+			)
+		return []
 
 	def productProperty_create(self, productId, productVersion, packageVersion, propertyId, description=None, possibleValues=None, defaultValues=None, editable=None, multiValue=None):
 		hash = locals()
@@ -2927,56 +3264,35 @@ into the IDs of these depots are to be found in the list behind \
 	# -   ProductDependencies                                                                       -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def productDependency_createObjects(self, productDependencies):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for productDependency in forceObjectClassList(productDependencies, ProductDependency):
+		productDependencies = forceObjectClassList(productDependencies, ProductDependency)
+		for productDependency in productDependencies:
 			logger.info(u"Creating productDependency %s" % productDependency)
-			self._backend.productDependency_insertObject(productDependency)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productDependency_getObjects(
-						productId=productDependency.productId,
-						productVersion=productDependency.productVersion,
-						packageVersion=productDependency.packageVersion,
-						productAction=productDependency.productAction,
-						requiredProductId=productDependency.requiredProductId
-					)
-				)
+		self._backend.productDependency_insertObjects(productDependencies)
+		self._invalidateIndexes(productDependencies)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productDependencies, self._backend.productDependency_getObjects,
+				('productId', 'productVersion', 'packageVersion', 'productAction', 'requiredProductId')
+			)
+		return []
 
 	def productDependency_updateObjects(self, productDependencies):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for productDependency in forceObjectClassList(productDependencies, ProductDependency):
-			logger.info(u"Updating productDependency %s" % productDependency)
-			if self.productDependency_getIdents(
-					productId=productDependency.productId,
-					productVersion=productDependency.productVersion,
-					packageVersion=productDependency.packageVersion,
-					productAction=productDependency.productAction,
-					requiredProductId=productDependency.requiredProductId):
-
-				self._backend.productDependency_updateObject(productDependency)
-			else:
-				logger.info(u"ProductDependency %s does not exist, creating" % productDependency)
-				self._backend.productDependency_insertObject(productDependency)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productDependency_getObjects(
-						productId=productDependency.productId,
-						productVersion=productDependency.productVersion,
-						packageVersion=productDependency.packageVersion,
-						productAction=productDependency.productAction,
-						requiredProductId=productDependency.requiredProductId
-					)
-				)
+		productDependencies = forceObjectClassList(productDependencies, ProductDependency)
+		self._updateOrInsertObjects(
+			productDependencies, self.productDependency_getObjects,
+			('productId', 'productVersion', 'packageVersion', 'productAction', 'requiredProductId'),
+			self._backend.productDependency_updateObjects,
+			self._backend.productDependency_insertObjects
+		)
+		self._invalidateIndexes(productDependencies)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productDependencies, self._backend.productDependency_getObjects,
+				('productId', 'productVersion', 'packageVersion', 'productAction', 'requiredProductId')
+			)
+		return []
 
 	def productDependency_create(self, productId, productVersion, packageVersion, productAction, requiredProductId, requiredProductVersion=None, requiredPackageVersion=None, requiredAction=None, requiredInstallationStatus=None, requirementType=None):
 		hash = locals()
@@ -2995,15 +3311,16 @@ into the IDs of these depots are to be found in the list behind \
 		if requiredProductId is None:
 			requiredProductId = []
 
-		return self._backend.productDependency_deleteObjects(
-			self._backend.productDependency_getObjects(
-				productId=productId,
-				productVersion=productVersion,
-				packageVersion=packageVersion,
-				productAction=productAction,
-				requiredProductId=requiredProductId
-			)
+		productDependencies = self._backend.productDependency_getObjects(
+			productId=productId,
+			productVersion=productVersion,
+			packageVersion=packageVersion,
+			productAction=productAction,
+			requiredProductId=requiredProductId
 		)
+		result = self._backend.productDependency_deleteObjects(productDependencies)
+		self._invalidateIndexes(productDependencies, deleted=True)
+		return result
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductOnDepots                                                                           -
@@ -3013,64 +3330,62 @@ into the IDs of these depots are to be found in the list behind \
 		If productOnDepot exits (same productId, same depotId, different version)
 		then update existing productOnDepot instead of creating a new one
 		'''
-		currentProductOnDepots = self._backend.productOnDepot_getObjects(
-			productId=productOnDepot.productId,
-			depotId=productOnDepot.depotId
-		)
+		self._productOnDepot_insertObjects([forceObjectClass(productOnDepot, ProductOnDepot)])
 
-		if currentProductOnDepots:
-			currentProductOnDepot = currentProductOnDepots[0]
-			logger.info(u"Updating productOnDepot %s instead of creating a new one" % currentProductOnDepot)
-			currentProductOnDepot.update(productOnDepot)
-			self._backend.productOnDepot_insertObject(currentProductOnDepot)
-		else:
-			self._backend.productOnDepot_insertObject(productOnDepot)
+	def _productOnDepot_insertObjects(self, productOnDepots):
+		currentProductOnDepots = {}
+		for currentProductOnDepot in self._getObjectsInBulk(
+				productOnDepots, self._backend.productOnDepot_getObjects,
+				('productId', 'depotId')):
+			key = self._getBulkKey(currentProductOnDepot, ('productId', 'depotId'))
+			currentProductOnDepots.setdefault(key, currentProductOnDepot)
 
-	def productOnDepot_createObjects(self, productOnDepots):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
+		productOnDepotsToInsert = []
+		for productOnDepot in productOnDepots:
+			key = self._getBulkKey(productOnDepot, ('productId', 'depotId'))
+			if key in currentProductOnDepots:
+				currentProductOnDepot = currentProductOnDepots[key]
+				logger.info(u"Updating productOnDepot %s instead of creating a new one" % currentProductOnDepot)
+				currentProductOnDepot.update(productOnDepot)
+				productOnDepot = currentProductOnDepot
+			else:
+				currentProductOnDepots[key] = productOnDepot
 
-		result = []
-		for productOnDepot in forceObjectClassList(productOnDepots, ProductOnDepot):
-			logger.info(u"Creating productOnDepot %s" % productOnDepot.toHash())
-			self.productOnDepot_insertObject(productOnDepot)
+			productOnDepotsToInsert.append(productOnDepot)
 
-			if returnObjects:
-				result.extend(
-					self._backend.productOnDepot_getObjects(
-						productId=productOnDepot.productId,
-						depotId=productOnDepot.depotId
-					)
-				)
+		if productOnDepotsToInsert:
+			self._backend.productOnDepot_insertObjects(productOnDepotsToInsert)
+			self._invalidateIndexes(productOnDepotsToInsert)
 
-		return result
+	def productOnDepot_createObjects(self, productOnDepots):
+		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
+		for productOnDepot in productOnDepots:
+			logger.info(u"Creating productOnDepot %s" % productOnDepot.toHash())
+		self._productOnDepot_insertObjects(productOnDepots)
 
-	def productOnDepot_updateObjects(self, productOnDepots):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productOnDepots, self._backend.productOnDepot_getObjects,
+				('productId', 'depotId')
+			)
+		return []
 
-		result = []
+	def productOnDepot_updateObjects(self, productOnDepots):
 		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
-		for productOnDepot in productOnDepots:
-			logger.info(u"Updating productOnDepot '%s'" % productOnDepot)
-			if self.productOnDepot_getIdents(
-					productId=productOnDepot.productId,
-					productType=productOnDepot.productType,
-					productVersion=productOnDepot.productVersion,
-					packageVersion=productOnDepot.packageVersion,
-					depotId=productOnDepot.depotId):
-				self._backend.productOnDepot_updateObject(productOnDepot)
-			else:
-				logger.info(u"ProductOnDepot %s does not exist, creating" % productOnDepot)
-				self.productOnDepot_insertObject(productOnDepot)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productOnDepot_getObjects(
-						productId=productOnDepot.productId,
-						depotId=productOnDepot.depotId
-					)
-				)
+		self._updateOrInsertObjects(
+			productOnDepots, self.productOnDepot_getObjects,
+			('productId', 'productType', 'productVersion', 'packageVersion', 'depotId'),
+			self._backend.productOnDepot_updateObjects,
+			self._productOnDepot_insertObjects
+		)
+		self._invalidateIndexes(productOnDepots)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productOnDepots, self._backend.productOnDepot_getObjects,
+				('productId', 'depotId')
+			)
+		return []
 
 	def productOnDepot_create(self, productId, productType, productVersion, packageVersion, depotId, locked=None):
 		hash = locals()
@@ -3089,6 +3404,7 @@ into the IDs of these depots are to be found in the list behind \
 				products[productOnDepot.productId][productOnDepot.productVersion].append(productOnDepot.packageVersion)
 
 		ret = self._backend.productOnDepot_deleteObjects(productOnDepots)
+		self._invalidateIndexes(productOnDepots, deleted=True)
 
 		if products:
 			for (productId, versions) in products.items():
@@ -3119,98 +3435,46 @@ into the IDs of these depots are to be found in the list behind \
 			packageVersion = []
 		if depotId is None:
 			depotId = []
-		return self._backend.productOnDepot_deleteObjects(
-			self._backend.productOnDepot_getObjects(
-				productId=productId,
-				productVersion=productVersion,
-				packageVersion=packageVersion,
-				depotId=depotId
-			)
+		productOnDepots = self._backend.productOnDepot_getObjects(
+			productId=productId,
+			productVersion=productVersion,
+			packageVersion=packageVersion,
+			depotId=depotId
 		)
+		result = self._backend.productOnDepot_deleteObjects(productOnDepots)
+		self._invalidateIndexes(productOnDepots, deleted=True)
+		return result
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductOnClients                                                                          -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def _productOnClient_processWithFunction(self, productOnClients, function):
-		productOnClientsByClient = {}
+		"""
+		Process the productOnClients of every client with `function`.
+
+		`function` is called with the productOnClients of a client,
+		the depot of the client and the ids of the products of all
+		given productOnClients.
+		"""
+		productOnClientsByClient = collections.defaultdict(list)
 		productIds = set()
 		for poc in productOnClients:
-			try:
-				productOnClientsByClient[poc.getClientId()].append(poc)
-			except KeyError:
-				productOnClientsByClient[poc.getClientId()] = [poc]
-
+			productOnClientsByClient[poc.getClientId()].append(poc)
 			productIds.add(poc.productId)
 
-		depotToClients = {}
-		for clientToDepot in self.configState_getClientToDepotserver(clientIds=productOnClientsByClient.keys()):
-			try:
-				depotToClients[clientToDepot['depotId']].append(clientToDepot['clientId'])
-			except KeyError:
-				depotToClients[clientToDepot['depotId']] = [clientToDepot['clientId']]
-
-		productByProductIdAndVersion = collections.defaultdict(lambda: collections.defaultdict(dict))
-		for product in self._backend.product_getObjects(id=productIds):
-			productByProductIdAndVersion[product.id][product.productVersion][product.packageVersion] = product
-
-		additionalProductIds = []
-		productDependenciesByProductIdAndVersion = collections.defaultdict(lambda: collections.defaultdict(lambda: collections.defaultdict(list)))
-
-		def addDependencies(additionalProductIds, productDependency, productDependenciesByProductIdAndVersion):
-			productDependenciesByProductIdAndVersion[productDependency.productId][productDependency.productVersion][productDependency.packageVersion].append(productDependency)
-
-			if productDependency.requiredProductId not in productIds and productDependency.requiredProductId not in additionalProductIds:
-				additionalProductIds.append(productDependency.requiredProductId)
-				for productDependency in self._backend.productDependency_getObjects(productId=productDependency.requiredProductId):
-					addDependencies(additionalProductIds, productDependency, productDependenciesByProductIdAndVersion)
-
-		for productDependency in self._backend.productDependency_getObjects(productId=productIds):
-			addDependencies(additionalProductIds, productDependency, productDependenciesByProductIdAndVersion)
-
-		if additionalProductIds:
-			for product in self._backend.product_getObjects(id=additionalProductIds):
-				productByProductIdAndVersion[product.id][product.productVersion][product.packageVersion] = product
-
-			productIds = productIds.union(additionalProductIds)
-
 		productOnClients = []
-		for (depotId, clientIds) in depotToClients.items():
-			products = set()
-			productDependencies = set()
-
-			for productOnDepot in self._backend.productOnDepot_getObjects(depotId=depotId, productId=productIds):
-				product = productByProductIdAndVersion[productOnDepot.productId][productOnDepot.productVersion][productOnDepot.packageVersion]
-				if product is None:
-					raise BackendMissingDataError(u"Product '%s', productVersion '%s', packageVersion '%s' not found"
-						% (productOnDepot.productId, productOnDepot.productVersion, productOnDepot.packageVersion))
-				products.add(product)
-
-				def addDependencies(product, products, productDependencies, productByProductIdAndVersion, productDependenciesByProductIdAndVersion):
-					dependencies = productDependenciesByProductIdAndVersion[product.id][product.productVersion][product.packageVersion]
-					for dep in dependencies:
-						product = productByProductIdAndVersion[dep.productId][dep.productVersion][dep.packageVersion]
-						if product:
-							products.add(product)
-
-							if dep not in productDependencies:
-								productDependencies.add(dep)
-								addDependencies(product, products, productDependencies, productByProductIdAndVersion, productDependenciesByProductIdAndVersion)
-
-				addDependencies(product, products, productDependencies, productByProductIdAndVersion, productDependenciesByProductIdAndVersion)
-
-			for clientId in clientIds:
-				try:
-					productOnClientsByClient[clientId]
-				except KeyError:
-					continue
+		for clientToDepot in self.configState_getClientToDepotserver(clientIds=productOnClientsByClient.keys()):
+			clientId = clientToDepot['clientId']
+			if clientId not in productOnClientsByClient:
+				continue
 
-				productOnClients.extend(
-					function(
-						productOnClients=productOnClientsByClient[clientId],
-						availableProducts=products,
-						productDependencies=productDependencies
-					)
+			productOnClients.extend(
+				function(
+					productOnClients=productOnClientsByClient[clientId],
+					depotId=clientToDepot['depotId'],
+					productIds=productIds
 				)
+			)
 
 		return productOnClients
 
@@ -3223,15 +3487,23 @@ into the IDs of these depots are to be found in the list behind \
 
 		if "algorithm2" in defaults:
 			logger.info("Generating productOnClient sequence with algorithm 2")
-			generateProductOnClientSequence = OPSI.SharedAlgorithm.generateProductOnClientSequence_algorithm2
+			generateProductSequence = OPSI.SharedAlgorithm.generateProductSequenceFromRequPairs_algorithm2
 		else:
 			logger.info("Generating productOnClient sequence with algorithm 1")
-			generateProductOnClientSequence = OPSI.SharedAlgorithm.generateProductOnClientSequence_algorithm1
+			generateProductSequence = OPSI.SharedAlgorithm.generateProductSequenceFromRequPairs_algorithm1
+
+		def generateSequence(productOnClients, depotId, productIds):
+			sortedList = self._productDependencyGraph.getProductSequence(self._backend, depotId, productIds, generateProductSequence)
+			return OPSI.SharedAlgorithm.generateProductOnClientSequence(productOnClients, sortedList)
 
-		return self._productOnClient_processWithFunction(productOnClients, generateProductOnClientSequence)
+		return self._productOnClient_processWithFunction(productOnClients, generateSequence)
 
 	def productOnClient_addDependencies(self, productOnClients):
-		return self._productOnClient_processWithFunction(productOnClients, OPSI.SharedAlgorithm.addDependentProductOnClients)
+		def addDependencies(productOnClients, depotId, productIds):
+			productsById, dependenciesByProductId = self._productDependencyGraph.getProducts(self._backend, depotId, productIds)
+			return OPSI.SharedAlgorithm.addDependentProductOnClientsWithMapping(productOnClients, productsById, dependenciesByProductId)
+
+		return self._productOnClient_processWithFunction(productOnClients, addDependencies)
 
 	def productOnClient_getObjects(self, attributes=[], **filter):
 		'''
@@ -3310,179 +3582,221 @@ into the IDs of these depots are to be found in the list behind \
 
 		logger.debug(u"Need to adjust productOnClients")
 
-		# Create missing product states if addProductOnClientDefaults is set
-		if self._options['addProductOnClientDefaults']:
-			# Get all client ids which match the filter
-			clientIds = self.host_getIdents(id=pocFilter.get('clientId'), returnType='unicode')
-			logger.debug(u"   * got clientIds")
-
-			# Get depot to client assignment
-			depotToClients = {}
-			for clientToDepot in self.configState_getClientToDepotserver(clientIds=clientIds):
-				if clientToDepot['depotId'] not in depotToClients:
-					depotToClients[clientToDepot['depotId']] = []
-				depotToClients[clientToDepot['depotId']].append(clientToDepot['clientId'])
-			logger.debug(u"   * got depotToClients")
-
-			productOnDepots = {}
-			# Get product on depots which match the filter
-			for depotId in depotToClients:
-				productOnDepots[depotId] = self._backend.productOnDepot_getObjects(
-					depotId=depotId,
-					productId=pocFilter.get('productId'),
-					productType=pocFilter.get('productType'),
-					productVersion=pocFilter.get('productVersion'),
-					packageVersion=pocFilter.get('packageVersion')
-				)
+		matchesFilter = compileFilter(filter)
+		existingProductOnClients = set(
+			(productOnClient.clientId, productOnClient.productId)
+			for productOnClient in productOnClients
+		)
+		if self._options['processProductOnClientSequence']:
+			# The sequence depends on all products of a client.
+			# Defaults have to be filtered after creating the sequence.
+			if self._options['addProductOnClientDefaults']:
+				productOnClients.extend(self._getDefaultProductOnClients(existingProductOnClients, pocFilter))
+
+			logger.debug(u"   * generating productOnClient sequence")
+			productOnClients = self.productOnClient_generateSequence(productOnClients)
+			return [productOnClient for productOnClient in productOnClients if
+					matchesFilter(productOnClient.toHash())]
+
+		defaultProductOnClients = self._getDefaultProductOnClients(existingProductOnClients, pocFilter)
+		productOnClients = [productOnClient for productOnClient in productOnClients if
+							matchesFilter(productOnClient.toHash())]
+
+		# All defaults have the same values except for the product and
+		# the client which are already restricted by the queries.
+		# Checking the first default is therefore enough.
+		matchesDefault = compileFilter({
+			key: value for (key, value) in filter.items()
+			if key not in ('productId', 'productType', 'clientId')
+		})
+		firstDefault = next(defaultProductOnClients, None)
+		if firstDefault is not None and matchesDefault(firstDefault.toHash()):
+			productOnClients.append(firstDefault)
+			productOnClients.extend(defaultProductOnClients)
 
-			logger.debug(u"   * got productOnDepots")
+		return productOnClients
 
-			# Create data structure for product states to find missing ones
-			pocByClientIdAndProductId = {}
-			for clientId in clientIds:
-				pocByClientIdAndProductId[clientId] = {}
-			for poc in productOnClients:
-				pocByClientIdAndProductId[poc.clientId][poc.productId] = poc
+	def _getDefaultProductOnClients(self, existingProductOnClients, filter):
+		"""
+		Create the missing productOnClients for the products available \
+on the depots of the clients.
+
+		`existingProductOnClients` is a set of (clientId, productId)
+		tuples for which no defaults are created.
+		Only the keys `clientId`, `productId` and `productType` of
+		`filter` are taken into account.
+		"""
+		if filter.get('clientId'):
+			clientIds = self.host_getIdents(type='OpsiClient', id=filter['clientId'], returnType='unicode')
+			if not clientIds:
+				return
+		else:
+			clientIds = []
+		logger.debug(u"   * got clientIds")
 
-			logger.debug(u"   * created pocByClientIdAndProductId")
-			# for (clientId, pocs) in pocByClientIdAndProductId.items():
-			# 	for (productId, poc) in pocs.items():
-			# 		logger.debug2(u"      [%s] %s: %s" % (clientId, productId, poc.toHash()))
+		clientIdsByDepotId = collections.defaultdict(list)
+		for clientToDepot in self.configState_getClientToDepotserver(clientIds=clientIds):
+			clientIdsByDepotId[clientToDepot['depotId']].append(clientToDepot['clientId'])
+		logger.debug(u"   * got depotToClients")
 
-			for (depotId, depotClientIds) in depotToClients.items():
+		if not clientIdsByDepotId:
+			return
+
+		productOnDepotsByDepotId = collections.defaultdict(list)
+		for productOnDepot in self._backend.productOnDepot_getObjects(
+				depotId=list(clientIdsByDepotId),
+				productId=filter.get('productId'),
+				productType=filter.get('productType')):
+			productOnDepotsByDepotId[productOnDepot.depotId].append(productOnDepot)
+		logger.debug(u"   * got productOnDepots")
+
+		for (depotId, depotClientIds) in clientIdsByDepotId.items():
+			for productOnDepot in productOnDepotsByDepotId.get(depotId, []):
+				defaultProductOnClient = None
 				for clientId in depotClientIds:
-					for pod in productOnDepots[depotId]:
-						if pod.productId not in pocByClientIdAndProductId[clientId]:
-							logger.debug(u"      - creating default productOnClient for clientId '%s', productId '%s'" % (clientId, pod.productId))
-							poc = ProductOnClient(
-									productId=pod.productId,
-									productType=pod.productType,
-									clientId=clientId,
-									installationStatus=u'not_installed',
-									actionRequest=u'none',
-							)
-							poc.setGeneratedDefault(True)
-							productOnClients.append(poc)
+					if (clientId, productOnDepot.productId) in existingProductOnClients:
+						continue
 
-			logger.debug(u"   * created productOnClient defaults")
-			# for (clientId, pocs) in pocByClientIdAndProductId.items():
-			# 	for (productId, poc) in pocs.items():
-			# 		logger.debug2(u"      [%s] %s: %s" % (clientId, productId, poc.toHash()))
+					logger.debug2(u"      - creating default productOnClient for clientId '%s', productId '%s'" % (clientId, productOnDepot.productId))
+					if defaultProductOnClient is None:
+						defaultProductOnClient = ProductOnClient(
+							productId=productOnDepot.productId,
+							productType=productOnDepot.productType,
+							clientId=clientId,
+							installationStatus=u'not_installed',
+							actionRequest=u'none',
+						)
+						defaultProductOnClient.setGeneratedDefault(True)
+						productOnClient = defaultProductOnClient
+					else:
+						# Copying is faster than creating a new object
+						# and the client id is already valid.
+						productOnClient = pycopy.copy(defaultProductOnClient)
+						productOnClient.clientId = clientId
 
-		if not self._options['addProductOnClientDefaults'] and not self._options['processProductOnClientSequence']:
-			return productOnClients
+					yield productOnClient
 
-		if self._options['processProductOnClientSequence']:
-			logger.debug(u"   * generating productOnClient sequence")
-			productOnClients = self.productOnClient_generateSequence(productOnClients)
+		logger.debug(u"   * created productOnClient defaults")
 
-		return [productOnClient for productOnClient in productOnClients if
-				self._objectHashMatches(productOnClient.toHash(), **filter)]
+	def _productOnClientUpdateOrCreate(self, productOnClients, update=False):
+		currentProductOnClients = {}
+		for currentProductOnClient in self._getObjectsInBulk(
+				productOnClients, self._backend.productOnClient_getObjects,
+				('productId', 'clientId')):
+			key = self._getBulkKey(currentProductOnClient, ('productId', 'clientId'))
+			currentProductOnClients.setdefault(key, currentProductOnClient)
 
-	def _productOnClientUpdateOrCreate(self, productOnClient, update=False):
-		nextProductOnClient = None
-		currentProductOnClients = self._backend.productOnClient_getObjects(
-			productId=productOnClient.productId,
-			clientId=productOnClient.clientId
-		)
-		if currentProductOnClients:
-			# If productOnClient exists
-			# (same productId, same clientId, different version)
-			# then update the existing instead of creating a new one
-			nextProductOnClient = currentProductOnClients[0].clone()
-			if update:
-				nextProductOnClient.update(productOnClient, updateWithNoneValues=False)
-			else:
-				logger.info(u"Updating productOnClient %s instead of creating a new one" % nextProductOnClient)
-				nextProductOnClient.update(productOnClient, updateWithNoneValues=True)
-		else:
-			nextProductOnClient = productOnClient.clone()
-
-		if nextProductOnClient.installationStatus:
-			if nextProductOnClient.installationStatus == 'installed':
-				# TODO: Check if product exists?
-				if not nextProductOnClient.productVersion or not nextProductOnClient.packageVersion:
-					clientToDepots = self.configState_getClientToDepotserver(clientIds=[nextProductOnClient.clientId])
-					if not clientToDepots:
-						raise BackendError(u"Cannot set productInstallationStatus 'installed' for product '%s' on client '%s': product/package version not set and depot for client not found" \
-									% (nextProductOnClient.productId, nextProductOnClient.clientId))
-
-					productOnDepots = self._backend.productOnDepot_getObjects(
-						depotId=clientToDepots[0]['depotId'],
-						productId=nextProductOnClient.productId
-					)
-					if not productOnDepots:
-						raise BackendError(u"Cannot set productInstallationStatus 'installed' for product '%s' on client '%s': product/package version not set and product not found on depot '%s'" \
-									% (nextProductOnClient.productId, nextProductOnClient.clientId, clientToDepots[0]['depotId']))
-					nextProductOnClient.setProductVersion(productOnDepots[0].productVersion)
-					nextProductOnClient.setPackageVersion(productOnDepots[0].packageVersion)
+		nextProductOnClients = []
+		for productOnClient in productOnClients:
+			key = self._getBulkKey(productOnClient, ('productId', 'clientId'))
+			if key in currentProductOnClients:
+				# If productOnClient exists
+				# (same productId, same clientId, different version)
+				# then update the existing instead of creating a new one
+				nextProductOnClient = currentProductOnClients[key].clone()
+				if update:
+					nextProductOnClient.update(productOnClient, updateWithNoneValues=False)
+				else:
+					logger.info(u"Updating productOnClient %s instead of creating a new one" % nextProductOnClient)
+					nextProductOnClient.update(productOnClient, updateWithNoneValues=True)
 			else:
+				nextProductOnClient = productOnClient.clone()
+
+			if nextProductOnClient.installationStatus and nextProductOnClient.installationStatus != 'installed':
 				nextProductOnClient.productVersion = None
 				nextProductOnClient.packageVersion = None
 
-		nextProductOnClient.setModificationTime(timestamp())
+			nextProductOnClient.setModificationTime(timestamp())
+			currentProductOnClients[key] = nextProductOnClient
+			nextProductOnClients.append(nextProductOnClient)
+
+		# TODO: Check if product exists?
+		self._setProductOnClientVersionsFromDepot([
+			productOnClient for productOnClient in nextProductOnClients
+			if productOnClient.installationStatus == 'installed'
+			and (not productOnClient.productVersion or not productOnClient.packageVersion)
+		])
+
+		if nextProductOnClients:
+			return self._backend.productOnClient_insertObjects(nextProductOnClients)
+
+	def _setProductOnClientVersionsFromDepot(self, productOnClients):
+		"""
+		Sets the versions of the products installed on the depots of the clients.
+		"""
+		if not productOnClients:
+			return
+
+		depotIdsByClientId = {}
+		for clientToDepot in self.configState_getClientToDepotserver(
+				clientIds=list(set(poc.clientId for poc in productOnClients))):
+			depotIdsByClientId[clientToDepot['clientId']] = clientToDepot['depotId']
+
+		productOnDepots = {}
+		if depotIdsByClientId:
+			for productOnDepot in self._backend.productOnDepot_getObjects(
+					depotId=list(set(depotIdsByClientId.values())),
+					productId=list(set(poc.productId for poc in productOnClients))):
+				productOnDepots.setdefault((productOnDepot.depotId, productOnDepot.productId), productOnDepot)
+
+		for productOnClient in productOnClients:
+			try:
+				depotId = depotIdsByClientId[productOnClient.clientId]
+			except KeyError:
+				raise BackendError(u"Cannot set productInstallationStatus 'installed' for product '%s' on client '%s': product/package version not set and depot for client not found" \
+							% (productOnClient.productId, productOnClient.clientId))
+
+			try:
+				productOnDepot = productOnDepots[(depotId, productOnClient.productId)]
+			except KeyError:
+				raise BackendError(u"Cannot set productInstallationStatus 'installed' for product '%s' on client '%s': product/package version not set and product not found on depot '%s'" \
+							% (productOnClient.productId, productOnClient.clientId, depotId))
 
-		return self._backend.productOnClient_insertObject(nextProductOnClient)
+			productOnClient.setProductVersion(productOnDepot.productVersion)
+			productOnClient.setPackageVersion(productOnDepot.packageVersion)
 
 	def productOnClient_insertObject(self, productOnClient):
 		productOnClient = forceObjectClass(productOnClient, ProductOnClient)
-		return self._productOnClientUpdateOrCreate(productOnClient, update=False)
+		return self._productOnClientUpdateOrCreate([productOnClient], update=False)
 
 	def productOnClient_updateObject(self, productOnClient):
 		productOnClient = forceObjectClass(productOnClient, ProductOnClient)
-		return self._productOnClientUpdateOrCreate(productOnClient, update=True)
+		return self._productOnClientUpdateOrCreate([productOnClient], update=True)
 
 	def productOnClient_createObjects(self, productOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-		result = []
-
 		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
 		if self._options['addDependentProductOnClients']:
 			productOnClients = self.productOnClient_addDependencies(productOnClients)
 
 		for productOnClient in productOnClients:
 			logger.info(u"Creating productOnClient %s" % productOnClient)
-			self.productOnClient_insertObject(productOnClient)
+		self._productOnClientUpdateOrCreate(productOnClients, update=False)
 
-			if returnObjects:
-				result.extend(
-					self._backend.productOnClient_getObjects(
-						productId=productOnClient.productId,
-						clientId=productOnClient.clientId
-					)
-				)
-
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productOnClients, self._backend.productOnClient_getObjects,
+				('productId', 'clientId')
+			)
+		return []
 
 	def productOnClient_updateObjects(self, productOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-		result = []
-
 		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
 		if self._options['addDependentProductOnClients']:
 			productOnClients = self.productOnClient_addDependencies(productOnClients)
 
-		for productOnClient in productOnClients:
-			logger.info(u"Updating productOnClient {0!r}".format(productOnClient))
-			if self.productOnClient_getIdents(
-					productId=productOnClient.productId,
-					productType=productOnClient.productType,
-					clientId=productOnClient.clientId):
-				logger.info(u"ProductOnClient %s exists, updating" % productOnClient)
-				self.productOnClient_updateObject(productOnClient)
-			else:
-				logger.info(u"ProductOnClient %s does not exist, creating" % productOnClient)
-				self.productOnClient_insertObject(productOnClient)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productOnClient_getObjects(
-						productId=productOnClient.productId,
-						clientId=productOnClient.clientId
-					)
-				)
+		self._updateOrInsertObjects(
+			productOnClients, self.productOnClient_getObjects,
+			('productId', 'productType', 'clientId'),
+			lambda existing: self._productOnClientUpdateOrCreate(existing, update=True),
+			lambda new: self._productOnClientUpdateOrCreate(new, update=False)
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productOnClients, self._backend.productOnClient_getObjects,
+				('productId', 'clientId')
+			)
+		return []
 
 	def productOnClient_create(self, productId, productType, clientId, installationStatus=None, actionRequest=None, lastAction=None, actionProgress=None, actionResult=None, productVersion=None, packageVersion=None, modificationTime=None):
 		hash = locals()
@@ -3550,49 +3864,33 @@ into the IDs of these depots are to be found in the list behind \
 		return productPropertyStates
 
 	def productPropertyState_createObjects(self, productPropertyStates):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-		result = []
-		for productPropertyState in forceObjectClassList(productPropertyStates, ProductPropertyState):
-			logger.info(u"Updating productPropertyState %s" % productPropertyState)
-			self._backend.productPropertyState_insertObject(productPropertyState)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productPropertyState_getObjects(
-						productId=productPropertyState.productId,
-						objectId=productPropertyState.objectId,
-						propertyId=productPropertyState.propertyId
-					)
-				)
+		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
+		for productPropertyState in productPropertyStates:
+			logger.info(u"Creating productPropertyState %s" % productPropertyState)
+		self._backend.productPropertyState_insertObjects(productPropertyStates)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productPropertyStates, self._backend.productPropertyState_getObjects,
+				('productId', 'objectId', 'propertyId')
+			)
+		return []
 
 	def productPropertyState_updateObjects(self, productPropertyStates):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-		result = []
 		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
-		for productPropertyState in productPropertyStates:
-			logger.info(u"Updating productPropertyState '%s'" % productPropertyState)
-			if self.productPropertyState_getIdents(
-						productId=productPropertyState.productId,
-						objectId=productPropertyState.objectId,
-						propertyId=productPropertyState.propertyId):
-
-				self._backend.productPropertyState_updateObject(productPropertyState)
-			else:
-				logger.info(u"ProductPropertyState %s does not exist, creating" % productPropertyState)
-				self._backend.productPropertyState_insertObject(productPropertyState)
-
-			if returnObjects:
-				result.extend(
-					self._backend.productPropertyState_getObjects(
-						productId=productPropertyState.productId,
-						objectId=productPropertyState.objectId,
-						propertyId=productPropertyState.propertyId
-					)
-				)
+		self._updateOrInsertObjects(
+			productPropertyStates, self.productPropertyState_getObjects,
+			('productId', 'objectId', 'propertyId'),
+			self._backend.productPropertyState_updateObjects,
+			self._backend.productPropertyState_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				productPropertyStates, self._backend.productPropertyState_getObjects,
+				('productId', 'objectId', 'propertyId')
+			)
+		return []
 
 	def productPropertyState_create(self, productId, propertyId, objectId, values=None):
 		hash = locals()
@@ -3621,28 +3919,25 @@ into the IDs of these depots are to be found in the list behind \
 	def group_createObjects(self, groups):
 		groups = forceObjectClassList(groups, Group)
 		for group in groups:
-			logger.info(u"Creating group '%s'" % group)
-			self._backend.group_insertObject(group)
+			logger.info(u"Creating group %s" % group)
+		self._backend.group_insertObjects(groups)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.group_getObjects(id=[group.id for group in groups])
-		else:
-			return []
+		return []
 
 	def group_updateObjects(self, groups):
 		groups = forceObjectClassList(groups, Group)
-		for group in groups:
-			logger.info(u"Updating group '%s'" % group)
-			if self.group_getIdents(id=group.id):
-				self._backend.group_updateObject(group)
-			else:
-				logger.info(u"Group %s does not exist, creating" % group)
-				self._backend.group_insertObject(group)
+		self._updateOrInsertObjects(
+			groups, self.group_getObjects,
+			('id', ),
+			self._backend.group_updateObjects,
+			self._backend.group_insertObjects
+		)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.group_getObjects(id=[group.id for group in groups])
-		else:
-			return []
+		return []
 
 	def group_createHostGroup(self, id, description=None, notes=None, parentGroupId=None):
 		hash = locals()
@@ -3666,48 +3961,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   ObjectToGroups                                                                            -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def objectToGroup_createObjects(self, objectToGroups):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for objectToGroup in forceObjectClassList(objectToGroups, ObjectToGroup):
+		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
+		for objectToGroup in objectToGroups:
 			logger.info(u"Creating objectToGroup %s" % objectToGroup)
-			self._backend.objectToGroup_insertObject(objectToGroup)
-
-			if returnObjects:
-				result.extend(
-					self._backend.objectToGroup_getObjects(
-						groupType=objectToGroup.groupType,
-						groupId=objectToGroup.groupId,
-						objectId=objectToGroup.objectId
-					)
-				)
-		return result
+		self._backend.objectToGroup_insertObjects(objectToGroups)
+
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				objectToGroups, self._backend.objectToGroup_getObjects,
+				('groupType', 'groupId', 'objectId')
+			)
+		return []
 
 	def objectToGroup_updateObjects(self, objectToGroups):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-		result = []
 		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
-		for objectToGroup in objectToGroups:
-			logger.info(u"Updating objectToGroup %s" % objectToGroup)
-			if self.objectToGroup_getIdents(
-					groupType=objectToGroup.groupType,
-					groupId=objectToGroup.groupId,
-					objectId=objectToGroup.objectId):
-				self._backend.objectToGroup_updateObject(objectToGroup)
-			else:
-				logger.info(u"ObjectToGroup %s does not exist, creating" % objectToGroup)
-				self._backend.objectToGroup_insertObject(objectToGroup)
-
-			if returnObjects:
-				result.extend(
-					self._backend.objectToGroup_getObjects(
-						groupType=objectToGroup.groupType,
-						groupId=objectToGroup.groupId,
-						objectId=objectToGroup.objectId
-					)
-				)
+		self._updateOrInsertObjects(
+			objectToGroups, self.objectToGroup_getObjects,
+			('groupType', 'groupId', 'objectId'),
+			self._backend.objectToGroup_updateObjects,
+			self._backend.objectToGroup_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				objectToGroups, self._backend.objectToGroup_getObjects,
+				('groupType', 'groupId', 'objectId')
+			)
+		return []
 
 	def objectToGroup_create(self, groupType, groupId, objectId):
 		hash = locals()
@@ -3737,27 +4017,24 @@ into the IDs of these depots are to be found in the list behind \
 		licenseContracts = forceObjectClassList(licenseContracts, LicenseContract)
 		for licenseContract in licenseContracts:
 			logger.info(u"Creating licenseContract %s" % licenseContract)
-			self._backend.licenseContract_insertObject(licenseContract)
+		self._backend.licenseContract_insertObjects(licenseContracts)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.licenseContract_getObjects(id=[licenseContract.id for licenseContract in licenseContracts])
-		else:
-			return []
+		return []
 
 	def licenseContract_updateObjects(self, licenseContracts):
 		licenseContracts = forceObjectClassList(licenseContracts, LicenseContract)
-		for licenseContract in licenseContracts:
-			logger.info(u"Updating licenseContract '%s'" % licenseContract)
-			if self.licenseContract_getIdents(id=licenseContract.id):
-				self._backend.licenseContract_updateObject(licenseContract)
-			else:
-				logger.info(u"LicenseContract %s does not exist, creating" % licenseContract)
-				self._backend.licenseContract_insertObject(licenseContract)
+		self._updateOrInsertObjects(
+			licenseContracts, self.licenseContract_getObjects,
+			('id', ),
+			self._backend.licenseContract_updateObjects,
+			self._backend.licenseContract_insertObjects
+		)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.licenseContract_getObjects(id=[licenseContract.id for licenseContract in licenseContracts])
-		else:
-			return []
+		return []
 
 	def licenseContract_create(self, id, description=None, notes=None, partner=None, conclusionDate=None, notificationDate=None, expirationDate=None):
 		hash = locals()
@@ -3778,28 +4055,25 @@ into the IDs of these depots are to be found in the list behind \
 	def softwareLicense_createObjects(self, softwareLicenses):
 		softwareLicenses = forceObjectClassList(softwareLicenses, SoftwareLicense)
 		for softwareLicense in softwareLicenses:
-			logger.info(u"Creating softwareLicense '%s'" % softwareLicense)
-			self._backend.softwareLicense_insertObject(softwareLicense)
+			logger.info(u"Creating softwareLicense %s" % softwareLicense)
+		self._backend.softwareLicense_insertObjects(softwareLicenses)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.softwareLicense_getObjects(id=[softwareLicense.id for softwareLicense in softwareLicenses])
-		else:
-			return []
+		return []
 
 	def softwareLicense_updateObjects(self, softwareLicenses):
 		softwareLicenses = forceObjectClassList(softwareLicenses, SoftwareLicense)
-		for softwareLicense in softwareLicenses:
-			logger.info(u"Updating softwareLicense '%s'" % softwareLicense)
-			if self.softwareLicense_getIdents(id=softwareLicense.id):
-				self._backend.softwareLicense_updateObject(softwareLicense)
-			else:
-				logger.info(u"ProducSoftwareLicenset %s does not exist, creating" % softwareLicense)
-				self._backend.softwareLicense_insertObject(softwareLicense)
+		self._updateOrInsertObjects(
+			softwareLicenses, self.softwareLicense_getObjects,
+			('id', ),
+			self._backend.softwareLicense_updateObjects,
+			self._backend.softwareLicense_insertObjects
+		)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.softwareLicense_getObjects(id=[softwareLicense.id for softwareLicense in softwareLicenses])
-		else:
-			return []
+		return []
 
 	def softwareLicense_createRetail(self, id, licenseContractId, maxInstallations=None, boundToHost=None, expirationDate=None):
 		hash = locals()
@@ -3835,28 +4109,25 @@ into the IDs of these depots are to be found in the list behind \
 	def licensePool_createObjects(self, licensePools):
 		licensePools = forceObjectClassList(licensePools, LicensePool)
 		for licensePool in licensePools:
-			logger.info(u"Creating licensePool '%s'" % licensePool)
-			self._backend.licensePool_insertObject(licensePool)
+			logger.info(u"Creating licensePool %s" % licensePool)
+		self._backend.licensePool_insertObjects(licensePools)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.licensePool_getObjects(id=[licensePool.id for licensePool in licensePools])
-		else:
-			return []
+		return []
 
 	def licensePool_updateObjects(self, licensePools):
 		licensePools = forceObjectClassList(licensePools, LicensePool)
-		for licensePool in licensePools:
-			logger.info(u"Updating licensePool '%s'" % licensePool)
-			if self.licensePool_getIdents(id=licensePool.id):
-				self._backend.licensePool_updateObject(licensePool)
-			else:
-				logger.info(u"LicensePool %s does not exist, creating" % licensePool)
-				self._backend.licensePool_insertObject(licensePool)
+		self._updateOrInsertObjects(
+			licensePools, self.licensePool_getObjects,
+			('id', ),
+			self._backend.licensePool_updateObjects,
+			self._backend.licensePool_insertObjects
+		)
 
 		if self._options['returnObjectsOnUpdateAndCreate']:
 			return self._backend.licensePool_getObjects(id=[licensePool.id for licensePool in licensePools])
-		else:
-			return []
+		return []
 
 	def licensePool_create(self, id, description=None, productIds=None):
 		hash = locals()
@@ -3875,47 +4146,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   SoftwareLicenseToLicensePools                                                             -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def softwareLicenseToLicensePool_createObjects(self, softwareLicenseToLicensePools):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for softwareLicenseToLicensePool in forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool):
+		softwareLicenseToLicensePools = forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool)
+		for softwareLicenseToLicensePool in softwareLicenseToLicensePools:
 			logger.info(u"Creating softwareLicenseToLicensePool %s" % softwareLicenseToLicensePool)
-			self._backend.softwareLicenseToLicensePool_insertObject(softwareLicenseToLicensePool)
+		self._backend.softwareLicenseToLicensePool_insertObjects(softwareLicenseToLicensePools)
 
-			if returnObjects:
-				result.extend(
-					self._backend.softwareLicenseToLicensePool_getObjects(
-						softwareLicenseId=softwareLicenseToLicensePool.softwareLicenseId,
-						licensePoolId=softwareLicenseToLicensePool.licensePoolId
-					)
-				)
-
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				softwareLicenseToLicensePools, self._backend.softwareLicenseToLicensePool_getObjects,
+				('softwareLicenseId', 'licensePoolId')
+			)
+		return []
 
 	def softwareLicenseToLicensePool_updateObjects(self, softwareLicenseToLicensePools):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
 		softwareLicenseToLicensePools = forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool)
-		for softwareLicenseToLicensePool in softwareLicenseToLicensePools:
-			logger.info(u"Updating %s" % softwareLicenseToLicensePool)
-			if self.softwareLicenseToLicensePool_getIdents(
-					softwareLicenseId=softwareLicenseToLicensePool.softwareLicenseId,
-					licensePoolId=softwareLicenseToLicensePool.licensePoolId):
-				self._backend.softwareLicenseToLicensePool_updateObject(softwareLicenseToLicensePool)
-			else:
-				logger.info(u"SoftwareLicenseToLicensePool %s does not exist, creating" % softwareLicenseToLicensePool)
-				self._backend.softwareLicenseToLicensePool_insertObject(softwareLicenseToLicensePool)
-
-			if returnObjects:
-				result.extend(
-					self._backend.softwareLicenseToLicensePool_getObjects(
-						softwareLicenseId=softwareLicenseToLicensePool.softwareLicenseId,
-						licensePoolId=softwareLicenseToLicensePool.licensePoolId
-					)
-				)
+		self._updateOrInsertObjects(
+			softwareLicenseToLicensePools, self.softwareLicenseToLicensePool_getObjects,
+			('softwareLicenseId', 'licensePoolId'),
+			self._backend.softwareLicenseToLicensePool_updateObjects,
+			self._backend.softwareLicenseToLicensePool_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				softwareLicenseToLicensePools, self._backend.softwareLicenseToLicensePool_getObjects,
+				('softwareLicenseId', 'licensePoolId')
+			)
+		return []
 
 	def softwareLicenseToLicensePool_create(self, softwareLicenseId, licensePoolId, licenseKey=None):
 		hash = locals()
@@ -3939,50 +4196,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   LicenseOnClients                                                                          -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def licenseOnClient_createObjects(self, licenseOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for licenseOnClient in forceObjectClassList(licenseOnClients, LicenseOnClient):
+		licenseOnClients = forceObjectClassList(licenseOnClients, LicenseOnClient)
+		for licenseOnClient in licenseOnClients:
 			logger.info(u"Creating licenseOnClient %s" % licenseOnClient)
-			self._backend.licenseOnClient_insertObject(licenseOnClient)
-
-			if returnObjects:
-				result.extend(
-					self._backend.licenseOnClient_getObjects(
-						softwareLicenseId=licenseOnClient.softwareLicenseId,
-						licensePoolId=licenseOnClient.licensePoolId,
-						clientId=licenseOnClient.clientId
-					)
-				)
+		self._backend.licenseOnClient_insertObjects(licenseOnClients)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				licenseOnClients, self._backend.licenseOnClient_getObjects,
+				('softwareLicenseId', 'licensePoolId', 'clientId')
+			)
+		return []
 
 	def licenseOnClient_updateObjects(self, licenseOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
 		licenseOnClients = forceObjectClassList(licenseOnClients, LicenseOnClient)
-		for licenseOnClient in licenseOnClients:
-			logger.info(u"Updating licenseOnClient %s" % licenseOnClient)
-			if self.licenseOnClient_getIdents(
-					softwareLicenseId=licenseOnClient.softwareLicenseId,
-					licensePoolId=licenseOnClient.licensePoolId,
-					clientId=licenseOnClient.clientId):
-				self._backend.licenseOnClient_updateObject(licenseOnClient)
-			else:
-				logger.info(u"LicenseOnClient %s does not exist, creating" % licenseOnClient)
-				self._backend.licenseOnClient_insertObject(licenseOnClient)
-
-			if returnObjects:
-				result.extend(
-					self._backend.licenseOnClient_getObjects(
-						softwareLicenseId=licenseOnClient.softwareLicenseId,
-						licensePoolId=licenseOnClient.licensePoolId,
-						clientId=licenseOnClient.clientId
-					)
-				)
+		self._updateOrInsertObjects(
+			licenseOnClients, self.licenseOnClient_getObjects,
+			('softwareLicenseId', 'licensePoolId', 'clientId'),
+			self._backend.licenseOnClient_updateObjects,
+			self._backend.licenseOnClient_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				licenseOnClients, self._backend.licenseOnClient_getObjects,
+				('softwareLicenseId', 'licensePoolId', 'clientId')
+			)
+		return []
 
 	def licenseOnClient_create(self, softwareLicenseId, licensePoolId, clientId, licenseKey=None, notes=None):
 		hash = locals()
@@ -4128,57 +4368,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   AuditSoftwares                                                                            -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def auditSoftware_createObjects(self, auditSoftwares):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for auditSoftware in forceObjectClassList(auditSoftwares, AuditSoftware):
+		auditSoftwares = forceObjectClassList(auditSoftwares, AuditSoftware)
+		for auditSoftware in auditSoftwares:
 			logger.info(u"Creating auditSoftware %s" % auditSoftware)
-			self._backend.auditSoftware_insertObject(auditSoftware)
+		self._backend.auditSoftware_insertObjects(auditSoftwares)
 
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftware_getObjects(
-						name=auditSoftware.name,
-						version=auditSoftware.version,
-						subVersion=auditSoftware.subVersion,
-						language=auditSoftware.language,
-						architecture=auditSoftware.architecture
-					)
-				)
-
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwares, self._backend.auditSoftware_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture')
+			)
+		return []
 
 	def auditSoftware_updateObjects(self, auditSoftwares):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
 		auditSoftwares = forceObjectClassList(auditSoftwares, AuditSoftware)
-		for auditSoftware in auditSoftwares:
-			logger.info(u"Updating %s" % auditSoftware)
-			if self.auditSoftware_getIdents(
-					name=auditSoftware.name,
-					version=auditSoftware.version,
-					subVersion=auditSoftware.subVersion,
-					language=auditSoftware.language,
-					architecture=auditSoftware.architecture):
-
-				self._backend.auditSoftware_updateObject(auditSoftware)
-			else:
-				logger.info(u"AuditSoftware %s does not exist, creating" % auditSoftware)
-				self._backend.auditSoftware_insertObject(auditSoftware)
-
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftware_getObjects(
-						name=auditSoftware.name,
-						version=auditSoftware.version,
-						subVersion=auditSoftware.subVersion,
-						language=auditSoftware.language,
-						architecture=auditSoftware.architecture
-					)
-				)
+		self._updateOrInsertObjects(
+			auditSoftwares, self.auditSoftware_getObjects,
+			('name', 'version', 'subVersion', 'language', 'architecture'),
+			self._backend.auditSoftware_updateObjects,
+			self._backend.auditSoftware_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwares, self._backend.auditSoftware_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture')
+			)
+		return []
 
 	def auditSoftware_create(self, name, version, subVersion, language, architecture, windowsSoftwareId=None, windowsDisplayName=None, windowsDisplayVersion=None, installSize=None):
 		hash = locals()
@@ -4211,57 +4427,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   AuditSoftwareToLicensePools                                                               -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def auditSoftwareToLicensePool_createObjects(self, auditSoftwareToLicensePools):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for auditSoftwareToLicensePool in forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool):
-			logger.info(u"Creating %s" % auditSoftwareToLicensePool)
-			self._backend.auditSoftwareToLicensePool_insertObject(auditSoftwareToLicensePool)
-
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftwareToLicensePool_getObjects(
-						name=auditSoftwareToLicensePool.name,
-						version=auditSoftwareToLicensePool.version,
-						subVersion=auditSoftwareToLicensePool.subVersion,
-						language=auditSoftwareToLicensePool.language,
-						architecture=auditSoftwareToLicensePool.architecture
-					)
-				)
+		auditSoftwareToLicensePools = forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool)
+		for auditSoftwareToLicensePool in auditSoftwareToLicensePools:
+			logger.info(u"Creating auditSoftwareToLicensePool %s" % auditSoftwareToLicensePool)
+		self._backend.auditSoftwareToLicensePool_insertObjects(auditSoftwareToLicensePools)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwareToLicensePools, self._backend.auditSoftwareToLicensePool_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture')
+			)
+		return []
 
 	def auditSoftwareToLicensePool_updateObjects(self, auditSoftwareToLicensePools):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
 		auditSoftwareToLicensePools = forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool)
-		for auditSoftwareToLicensePool in auditSoftwareToLicensePools:
-			logger.info(u"Creating %s" % auditSoftwareToLicensePool)
-			if self.auditSoftwareToLicensePool_getIdents(
-					name=auditSoftwareToLicensePool.name,
-					version=auditSoftwareToLicensePool.version,
-					subVersion=auditSoftwareToLicensePool.subVersion,
-					language=auditSoftwareToLicensePool.language,
-					architecture=auditSoftwareToLicensePool.architecture):
-
-				self._backend.auditSoftwareToLicensePool_updateObject(auditSoftwareToLicensePool)
-			else:
-				logger.info(u"AuditSoftwareToLicensePool %s does not exist, creating" % auditSoftwareToLicensePool)
-				self._backend.auditSoftwareToLicensePool_insertObject(auditSoftwareToLicensePool)
-
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftwareToLicensePool_getObjects(
-						name=auditSoftwareToLicensePool.name,
-						version=auditSoftwareToLicensePool.version,
-						subVersion=auditSoftwareToLicensePool.subVersion,
-						language=auditSoftwareToLicensePool.language,
-						architecture=auditSoftwareToLicensePool.architecture
-					)
-				)
+		self._updateOrInsertObjects(
+			auditSoftwareToLicensePools, self.auditSoftwareToLicensePool_getObjects,
+			('name', 'version', 'subVersion', 'language', 'architecture'),
+			self._backend.auditSoftwareToLicensePool_updateObjects,
+			self._backend.auditSoftwareToLicensePool_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwareToLicensePools, self._backend.auditSoftwareToLicensePool_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture')
+			)
+		return []
 
 	def auditSoftwareToLicensePool_create(self, name, version, subVersion, language, architecture, licensePoolId):
 		hash = locals()
@@ -4297,59 +4489,33 @@ into the IDs of these depots are to be found in the list behind \
 	# -   AuditSoftwareOnClients                                                                    -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def auditSoftwareOnClient_createObjects(self, auditSoftwareOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
-		for auditSoftwareOnClient in forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient):
+		auditSoftwareOnClients = forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient)
+		for auditSoftwareOnClient in auditSoftwareOnClients:
 			logger.info(u"Creating auditSoftwareOnClient %s" % auditSoftwareOnClient)
-			self._backend.auditSoftwareOnClient_insertObject(auditSoftwareOnClient)
-
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftwareOnClient_getObjects(
-						name=auditSoftwareOnClient.name,
-						version=auditSoftwareOnClient.version,
-						subVersion=auditSoftwareOnClient.subVersion,
-						language=auditSoftwareOnClient.language,
-						architecture=auditSoftwareOnClient.architecture,
-						clientId=auditSoftwareOnClient.clientId
-					)
-				)
+		self._backend.auditSoftwareOnClient_insertObjects(auditSoftwareOnClients)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwareOnClients, self._backend.auditSoftwareOnClient_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture', 'clientId')
+			)
+		return []
 
 	def auditSoftwareOnClient_updateObjects(self, auditSoftwareOnClients):
-		returnObjects = self._options['returnObjectsOnUpdateAndCreate']
-
-		result = []
 		auditSoftwareOnClients = forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient)
-		for auditSoftwareOnClient in auditSoftwareOnClients:
-			logger.info(u"Updating auditSoftwareOnClient %s" % auditSoftwareOnClient)
-			if self.auditSoftwareOnClient_getIdents(
-					name=auditSoftwareOnClient.name,
-					version=auditSoftwareOnClient.version,
-					subVersion=auditSoftwareOnClient.subVersion,
-					language=auditSoftwareOnClient.language,
-					architecture=auditSoftwareOnClient.architecture,
-					clientId=auditSoftwareOnClient.clientId):
-				self._backend.auditSoftwareOnClient_updateObject(auditSoftwareOnClient)
-			else:
-				logger.info(u"AuditSoftwareOnClient %s does not exist, creating" % auditSoftwareOnClient)
-				self._backend.auditSoftwareOnClient_insertObject(auditSoftwareOnClient)
-
-			if returnObjects:
-				result.extend(
-					self._backend.auditSoftwareOnClient_getObjects(
-						name=auditSoftwareOnClient.name,
-						version=auditSoftwareOnClient.version,
-						subVersion=auditSoftwareOnClient.subVersion,
-						language=auditSoftwareOnClient.language,
-						architecture=auditSoftwareOnClient.architecture,
-						clientId=auditSoftwareOnClient.clientId
-					)
-				)
+		self._updateOrInsertObjects(
+			auditSoftwareOnClients, self.auditSoftwareOnClient_getObjects,
+			('name', 'version', 'subVersion', 'language', 'architecture', 'clientId'),
+			self._backend.auditSoftwareOnClient_updateObjects,
+			self._backend.auditSoftwareOnClient_insertObjects
+		)
 
-		return result
+		if self._options['returnObjectsOnUpdateAndCreate']:
+			return self._getObjectsInBulk(
+				auditSoftwareOnClients, self._backend.auditSoftwareOnClient_getObjects,
+				('name', 'version', 'subVersion', 'language', 'architecture', 'clientId')
+			)
+		return []
 
 	def auditSoftwareOnClient_create(self, name, version, subVersion, language, architecture, clientId, uninstallString=None, binaryName=None, firstseen=None, lastseen=None, state=None, usageFrequency=None, lastUsed=None, licenseKey=None):
 		hash = locals()
@@ -4393,16 +4559,18 @@ into the IDs of these depots are to be found in the list behind \
 	# -   AuditHardwares                                                                            -
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	def auditHardware_createObjects(self, auditHardwares):
-		for auditHardware in forceObjectClassList(auditHardwares, AuditHardware):
+		auditHardwares = forceObjectClassList(auditHardwares, AuditHardware)
+		for auditHardware in auditHardwares:
 			logger.info(u"Creating auditHardware %s" % auditHardware)
-			self.auditHardware_insertObject(auditHardware)
+		self._backend.auditHardware_insertObjects(auditHardwares)
 		return []
 
 	def auditHardware_updateObjects(self, auditHardwares):
-		for auditHardware in forceObjectClassList(auditHardwares, AuditHardware):
+		auditHardwares = forceObjectClassList(auditHardwares, AuditHardware)
+		for auditHardware in auditHardwares:
 			logger.info(u"Updating auditHardware %s" % auditHardware)
-			# You can't update auditHardwares, because the ident contains all attributes
-			self.auditHardware_insertObject(auditHardware)
+		# You can't update auditHardwares, because the ident contains all attributes
+		self._backend.auditHardware_insertObjects(auditHardwares)
 		return []
 
 	def auditHardware_create(self, hardwareClass, **kwargs):
@@ -4438,32 +4606,31 @@ into the IDs of these depots are to be found in the list behind \
 		self._backend.auditHardwareOnHost_updateObject(auditHardwareOnHost)
 
 	def auditHardwareOnHost_createObjects(self, auditHardwareOnHosts):
-		for auditHardwareOnHost in forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost):
+		auditHardwareOnHosts = forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost)
+		for auditHardwareOnHost in auditHardwareOnHosts:
 			logger.info(u"Creating auditHardwareOnHost %s" % auditHardwareOnHost)
-			self._backend.auditHardwareOnHost_insertObject(auditHardwareOnHost)
+		self._backend.auditHardwareOnHost_insertObjects(auditHardwareOnHosts)
 
 		return []
 
 	def auditHardwareOnHost_updateObjects(self, auditHardwareOnHosts):
-		def getNoneAsListOrValue(value):
-			if value is None:
-				return [None]
-			else:
-				return value
+		"""
+		Update auditHardwareOnHost objects.
 
+		Existing hardware gets `lastseen` set to now and `state` set \
+to 1, other hardware is created. The hardware of each host is \
+compared with the stored hardware of the host at once through \
+`auditHardwareOnHost_updateInventory`.
+		"""
+		auditHardwareOnHostsByHostId = collections.OrderedDict()
 		for auditHardwareOnHost in forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost):
-			filter = {
-				attribute: getNoneAsListOrValue(value)
-				for (attribute, value) in auditHardwareOnHost.toHash().items()
-				if attribute not in ('firstseen', 'lastseen', 'state')
-			}
+			auditHardwareOnHostsByHostId.setdefault(auditHardwareOnHost.getHostId(), []).append(auditHardwareOnHost)
 
-			if self.auditHardwareOnHost_getObjects(attributes=['hostId'], **filter):
-				logger.debug2(u"Updating existing AuditHardwareOnHost {0!r}", auditHardwareOnHost)
-				self.auditHardwareOnHost_updateObject(auditHardwareOnHost)
-			else:
-				logger.info(u"AuditHardwareOnHost %s does not exist, creating" % auditHardwareOnHost)
-				self._backend.auditHardwareOnHost_insertObject(auditHardwareOnHost)
+		for hostId, hostAuditHardwareOnHosts in auditHardwareOnHostsByHostId.items():
+			logger.debug(u"Updating {0} auditHardwareOnHosts of {1}", len(hostAuditHardwareOnHosts), hostId)
+			self._backend.auditHardwareOnHost_updateInventory(
+				hostId=hostId, auditHardwareOnHosts=hostAuditHardwareOnHosts, complete=False
+			)
 
 		return []
 
@@ -4504,6 +4671,13 @@ into the IDs of these depots are to be found in the list behind \
 			hostId = []
 
 		hostId = forceHostIdList(hostId)
+		if hostId:
+			# Marking all hardware of a host as obsolete is the
+			# same as setting an empty inventory.
+			for singleHostId in hostId:
+				self._backend.auditHardwareOnHost_updateInventory(hostId=singleHostId, auditHardwareOnHosts=[])
+			return
+
 		for ahoh in self.auditHardwareOnHost_getObjects(hostId=hostId, state=1):
 			ahoh.setState(0)
 			self._backend.auditHardwareOnHost_updateObject(ahoh)
@@ -4545,11 +4719,17 @@ class ModificationTrackingBackend(ExtendedBackend):
 			# split failed
 			return result
 
-		if action in ('insertObject', 'updateObject', 'deleteObjects'):
+		if action in ('insertObject', 'updateObject', 'insertObjects', 'updateObjects', 'deleteObjects'):
 			if action == 'insertObject':
 				self._fireEvent('objectInserted', kwargs.values()[0])
 			elif action == 'updateObject':
 				self._fireEvent('objectUpdated', kwargs.values()[0])
+			elif action == 'insertObjects':
+				for obj in forceList(kwargs.values()[0]):
+					self._fireEvent('objectInserted', obj)
+			elif action == 'updateObjects':
+				for obj in forceList(kwargs.values()[0]):
+					self._fireEvent('objectUpdated', obj)
 			elif action == 'deleteObjects':
 				self._fireEvent('objectsDeleted', kwargs.values()[0])
 			self._fireEvent('backendModified')
@@ -4573,3 +4753,609 @@ class BackendModificationListener(object):
 	def backendModified(self, backend):
 		# Should return immediately!
 		pass
+
+
+class _BackendIndex(BackendModificationListener):
+	"""
+	Base for indexes of data read from a backend.
+
+	The data is read when it is needed. Afterwards only the parts
+	affected by reported changes are read again. Changes not reported
+	to the index, e.g. those made by other processes, are noticed after
+	`MAX_AGE` seconds at the latest when all data is read again.
+
+	Use `getIndex` to get the index shared in the process by all users
+	of the same data. The backend to read from is given on every call
+	because the users of a shared index may have backends of their own.
+	"""
+
+	# Seconds after which all data is read again.
+	MAX_AGE = 60
+
+	_indexes = {}
+	_indexesByBackend = weakref.WeakKeyDictionary()
+	_indexesLock = threading.Lock()
+
+	def __init__(self):
+		self._lock = threading.RLock()
+		self.clear()
+
+	@classmethod
+	def getIndex(cls, backend):
+		"""
+		Get the index of the data of `backend`.
+
+		Backends with the same storage key share one index. The index
+		of a backend without a storage key is shared by the users of
+		the backend instance.
+		"""
+		key = backend._getStorageKey()
+		with _BackendIndex._indexesLock:
+			if key is None:
+				indexes = _BackendIndex._indexesByBackend.setdefault(backend, {})
+			else:
+				indexes = _BackendIndex._indexes.setdefault(key, {})
+
+			try:
+				return indexes[cls]
+			except KeyError:
+				index = indexes[cls] = cls()
+				return index
+
+	def clear(self):
+		"Drop all data. It will be read again on next use."
+		with self._lock:
+			self._loaded = False
+			self._loadedAt = None
+			self._clear()
+
+	def _clear(self):
+		pass
+
+	def invalidateObjects(self, objs, deleted=False):
+		"""
+		Mark the data affected by changes of `objs` as outdated.
+
+		:param deleted: `True` if the objects have been deleted.
+		:type deleted: bool
+		"""
+		with self._lock:
+			for obj in objs:
+				if isinstance(obj, dict):
+					logger.debug(u"Clearing {0} because of {1!r}", self.__class__.__name__, obj)
+					self.clear()
+				else:
+					self._invalidateObject(obj, deleted)
+
+	def _invalidateObject(self, obj, deleted):
+		"Mark the data affected by a change of `obj` as outdated."
+		pass
+
+	def objectInserted(self, backend, obj):
+		self.invalidateObjects([obj])
+
+	def objectUpdated(self, backend, obj):
+		self.invalidateObjects([obj])
+
+	def objectsDeleted(self, backend, objs):
+		self.invalidateObjects(forceList(objs), deleted=True)
+
+	def _update(self, backend):
+		"Bring the data up to date. Has to be called with the lock held."
+		if not self._isCurrent():
+			logger.debug(u"Reading {0}", self.__class__.__name__)
+			self.clear()
+			self._load(backend)
+			self._loaded = True
+			self._loadedAt = time.time()
+		else:
+			self._refresh(backend)
+
+	def _isCurrent(self):
+		"Check if all data has been read and has not expired yet."
+		return self._loaded and time.time() - self._loadedAt <= self.MAX_AGE
+
+	def _load(self, backend):
+		"Read all data."
+		pass
+
+	def _refresh(self, backend):
+		"Read the outdated parts of the data again."
+		pass
+
+
+class ClientToDepotIndex(_BackendIndex):
+	"""
+	Index of the depots used by clients.
+
+	The depot of a client is set through the config
+	``clientconfig.depot.id`` and its config states. Depots providing
+	the same products are grouped so that the alternative depots of a
+	depot can be found without comparing all depots with each other.
+
+	After the first read only the parts affected by reported changes of
+	hosts, the config, its config states and products on depots are
+	read again. The depots of a few clients are read directly from the
+	backend as long as the index has not been read or has expired.
+	"""
+
+	CONFIG_ID = u'clientconfig.depot.id'
+	# Maximum number of clients to read the depots of directly.
+	DIRECT_READ_LIMIT = 10
+
+	def __init__(self):
+		self._clientIds = set()
+		self._depotIds = set()
+		self._depotValuesByClientId = {}
+		self._defaultDepotValues = None
+		self._productsByDepotId = {}
+		self._depotIdsByProducts = {}
+		self._productGroupsByProductIds = {}
+		_BackendIndex.__init__(self)
+
+	def _clear(self):
+		self._dirtyHostIds = set()
+		self._dirtyClientIds = set()
+		self._dirtyDepotIds = set()
+		self._configDirty = False
+		self._allConfigStatesDirty = False
+		self._allProductOnDepotsDirty = False
+
+	def _invalidateObject(self, obj, deleted):
+		if isinstance(obj, Host):
+			self._dirtyHostIds.add(obj.id)
+			if deleted:
+				# Deleting a host deletes its config states and
+				# products on depot aswell.
+				self._dirtyClientIds.add(obj.id)
+				self._dirtyDepotIds.add(obj.id)
+		elif isinstance(obj, ConfigState):
+			if obj.configId == self.CONFIG_ID:
+				self._dirtyClientIds.add(obj.objectId)
+		elif isinstance(obj, ProductOnDepot):
+			self._dirtyDepotIds.add(obj.depotId)
+		elif isinstance(obj, Config):
+			if obj.id == self.CONFIG_ID:
+				self._configDirty = True
+				self._allConfigStatesDirty = self._allConfigStatesDirty or deleted
+		elif isinstance(obj, Product) and deleted:
+			self._allProductOnDepotsDirty = True
+
+	def _refresh(self, backend):
+		if self._dirtyHostIds:
+			self._loadHosts(backend, self._dirtyHostIds)
+			self._dirtyHostIds = set()
+
+		if self._configDirty:
+			self._loadConfig(backend)
+			self._configDirty = False
+
+		if self._allConfigStatesDirty:
+			self._loadConfigStates(backend)
+			self._allConfigStatesDirty = False
+			self._dirtyClientIds = set()
+		elif self._dirtyClientIds:
+			self._loadConfigStates(backend, self._dirtyClientIds)
+			self._dirtyClientIds = set()
+
+		if self._allProductOnDepotsDirty:
+			self._loadProductOnDepots(backend)
+			self._allProductOnDepotsDirty = False
+			self._dirtyDepotIds = set()
+		elif self._dirtyDepotIds:
+			self._loadProductOnDepots(backend, self._dirtyDepotIds)
+			self._dirtyDepotIds = set()
+
+	def _load(self, backend):
+		self._loadHosts(backend)
+		self._loadConfig(backend)
+		self._loadConfigStates(backend)
+		self._loadProductOnDepots(backend)
+
+	def _loadHosts(self, backend, hostIds=None):
+		if hostIds is None:
+			self._clientIds = set()
+			self._depotIds = set()
+			hosts = backend.host_getObjects(attributes=['id'])
+		else:
+			self._clientIds.difference_update(hostIds)
+			self._depotIds.difference_update(hostIds)
+			hosts = []
+			for ids in chunk(hostIds, BULK_QUERY_SIZE):
+				hosts.extend(backend.host_getObjects(attributes=['id'], id=list(ids)))
+
+		for host in hosts:
+			if isinstance(host, OpsiClient):
+				self._clientIds.add(host.id)
+			elif isinstance(host, OpsiDepotserver):
+				self._depotIds.add(host.id)
+
+	def _loadConfig(self, backend):
+		self._defaultDepotValues = self._readDefaultDepotValues(backend)
+
+	def _readDefaultDepotValues(self, backend):
+		for config in backend.config_getObjects(id=self.CONFIG_ID):
+			return config.defaultValues or []
+
+		return None
+
+	def _loadConfigStates(self, backend, clientIds=None):
+		if clientIds is None:
+			self._depotValuesByClientId = {}
+			configStates = backend.configState_getObjects(configId=self.CONFIG_ID)
+		else:
+			configStates = []
+			for ids in chunk(clientIds, BULK_QUERY_SIZE):
+				for clientId in ids:
+					self._depotValuesByClientId.pop(clientId, None)
+				configStates.extend(backend.configState_getObjects(configId=self.CONFIG_ID, objectId=list(ids)))
+
+		for configState in configStates:
+			self._depotValuesByClientId[configState.objectId] = configState.values or []
+
+	def _loadProductOnDepots(self, backend, depotIds=None):
+		if depotIds is None:
+			self._productsByDepotId = {}
+			self._depotIdsByProducts = {}
+			productOnDepots = backend.productOnDepot_getObjects()
+		else:
+			depotIds = set(depotIds)
+			productOnDepots = []
+			for ids in chunk(depotIds, BULK_QUERY_SIZE):
+				productOnDepots.extend(backend.productOnDepot_getObjects(depotId=list(ids)))
+
+		productsByDepotId = collections.defaultdict(set)
+		for pod in productOnDepots:
+			productsByDepotId[pod.depotId].add((pod.productId, pod.productVersion, pod.packageVersion))
+
+		for depotId in (depotIds or productsByDepotId):
+			self._setProducts(depotId, frozenset(productsByDepotId.get(depotId, ())))
+
+		self._productGroupsByProductIds = {}
+
+	def _setProducts(self, depotId, products):
+		oldProducts = self._productsByDepotId.pop(depotId, None)
+		if oldProducts is not None:
+			depotIds = self._depotIdsByProducts[oldProducts]
+			depotIds.discard(depotId)
+			if not depotIds:
+				del self._depotIdsByProducts[oldProducts]
+
+		if products:
+			self._productsByDepotId[depotId] = products
+			self._depotIdsByProducts.setdefault(products, set()).add(depotId)
+
+	def _getProductGroups(self, productIds):
+		"""
+		Get the products of each depot and the depots grouped by \
+their products considering only the products in `productIds`.
+		"""
+		if not productIds:
+			return self._productsByDepotId, self._depotIdsByProducts
+
+		key = frozenset(productIds)
+		try:
+			return self._productGroupsByProductIds[key]
+		except KeyError:
+			pass
+
+		productsByDepotId = {}
+		depotIdsByProducts = {}
+		for depotId, products in self._productsByDepotId.iteritems():
+			products = frozenset(product for product in products if product[0] in key)
+			if products:
+				productsByDepotId[depotId] = products
+				depotIdsByProducts.setdefault(products, set()).add(depotId)
+
+		if len(self._productGroupsByProductIds) >= 32:
+			self._productGroupsByProductIds = {}
+		self._productGroupsByProductIds[key] = (productsByDepotId, depotIdsByProducts)
+		return productsByDepotId, depotIdsByProducts
+
+	def getClientToDepotserver(self, backend, depotIds=None, clientIds=None, masterOnly=True, productIds=None):
+		"""
+		Get a mapping of clients and their depots.
+
+		See `ExtendedConfigDataBackend.configState_getClientToDepotserver` \
+for the parameters and the result.
+
+		:param backend: The backend to read the data from.
+		"""
+		if clientIds:
+			clientIds = list(collections.OrderedDict.fromkeys(clientIds))
+
+		if masterOnly and clientIds and len(clientIds) <= self.DIRECT_READ_LIMIT and not self._isCurrent():
+			return self._readClientToDepotserver(backend, depotIds, clientIds)
+
+		with self._lock:
+			self._update(backend)
+
+			if depotIds:
+				depotIds = self._depotIds.intersection(depotIds)
+			else:
+				depotIds = self._depotIds
+			if not depotIds:
+				return []
+
+			if clientIds:
+				clientIds = [clientId for clientId in clientIds if clientId in self._clientIds]
+			else:
+				clientIds = sorted(self._clientIds)
+
+			result = [
+				{
+					'depotId': depotId,
+					'clientId': clientId,
+					'alternativeDepotIds': []
+				}
+				for clientId, depotId in self._getDepotIds(clientIds, self._depotValuesByClientId, self._defaultDepotValues)
+				if depotId in depotIds
+			]
+
+			if masterOnly:
+				return result
+
+			productsByDepotId, depotIdsByProducts = self._getProductGroups(productIds)
+			alternativeDepotIds = {}
+			for clientToDepot in result:
+				depotId = clientToDepot['depotId']
+				try:
+					alternatives = alternativeDepotIds[depotId]
+				except KeyError:
+					products = productsByDepotId.get(depotId)
+					if products:
+						alternatives = sorted(depotIdsByProducts[products] - set([depotId]))
+					else:
+						alternatives = []
+					alternativeDepotIds[depotId] = alternatives
+
+				clientToDepot['alternativeDepotIds'] = list(alternatives)
+
+			return result
+
+	def _readClientToDepotserver(self, backend, depotIds, clientIds):
+		"""
+		Get the master depots of `clientIds` reading only the data of \
+these clients and their depots from `backend`.
+		"""
+		existingClientIds = set(
+			host.id for host in backend.host_getObjects(attributes=['id'], id=clientIds)
+			if isinstance(host, OpsiClient)
+		)
+		clientIds = [clientId for clientId in clientIds if clientId in existingClientIds]
+		if not clientIds:
+			return []
+
+		depotValuesByClientId = {
+			configState.objectId: configState.values or []
+			for configState in backend.configState_getObjects(configId=self.CONFIG_ID, objectId=clientIds)
+		}
+		clientToDepotIds = list(self._getDepotIds(clientIds, depotValuesByClientId, self._readDefaultDepotValues(backend)))
+
+		configuredDepotIds = set(depotId for (_, depotId) in clientToDepotIds)
+		if depotIds:
+			configuredDepotIds.intersection_update(depotIds)
+		if not configuredDepotIds:
+			return []
+
+		existingDepotIds = set(
+			host.id for host in backend.host_getObjects(attributes=['id'], id=list(configuredDepotIds))
+			if isinstance(host, OpsiDepotserver)
+		)
+
+		return [
+			{
+				'depotId': depotId,
+				'clientId': clientId,
+				'alternativeDepotIds': []
+			}
+			for clientId, depotId in clientToDepotIds
+			if depotId in existingDepotIds
+		]
+
+	@staticmethod
+	def _getDepotIds(clientIds, depotValuesByClientId, defaultDepotValues):
+		"""
+		Get the depots configured for `clientIds`.
+
+		:returns: Pairs of client id and depot id.
+		"""
+		for clientId in clientIds:
+			values = depotValuesByClientId.get(clientId, defaultDepotValues)
+			if values is None:
+				continue
+
+			try:
+				depotId = values[0]
+				if not depotId:
+					raise IndexError("Missing value")
+			except IndexError:
+				logger.error(u"No depot server configured for client {0!r}", clientId)
+				continue
+
+			yield clientId, depotId
+
+
+class ProductDependencyGraph(_BackendIndex):
+	"""
+	Graph of the products on depots and their dependencies.
+
+	The products on a depot are kept together with the dependencies
+	of their versions. The products required by a set of products and
+	the order in which they have to be processed are computed once per
+	depot and set of products.
+
+	The graph is shared by the backends using the same data in the
+	process. All data is read again after reported changes of
+	products and after `MAX_AGE` seconds. Changes of product
+	dependencies and products on depots only drop the affected parts.
+	If a product on a depot refers to a product unknown to the graph
+	all data is read again once before the product is reported as
+	missing.
+	"""
+
+	def _clear(self):
+		self._products = None
+		self._dependencies = None
+		self._requiredProductIds = None
+		self._productIdentsByDepotId = {}
+		self._selections = {}
+		self._sequences = {}
+
+	def _invalidateObject(self, obj, deleted):
+		if isinstance(obj, Product):
+			# Deleting a product also deletes its dependencies and
+			# products on depot.
+			self._clear()
+		elif isinstance(obj, ProductDependency):
+			self._dependencies = None
+			self._requiredProductIds = None
+			self._selections = {}
+			self._sequences = {}
+		elif isinstance(obj, ProductOnDepot) or (deleted and isinstance(obj, OpsiDepotserver)):
+			depotId = obj.depotId if isinstance(obj, ProductOnDepot) else obj.id
+			self._productIdentsByDepotId.pop(depotId, None)
+			self._selections = {}
+			self._sequences = {}
+
+	def _getProducts(self, backend):
+		if self._products is None:
+			self._products = {
+				(product.id, product.productVersion, product.packageVersion): product
+				for product in backend.product_getObjects()
+			}
+		return self._products
+
+	def _getDependencies(self, backend):
+		if self._dependencies is None:
+			self._dependencies = collections.defaultdict(list)
+			self._requiredProductIds = collections.defaultdict(set)
+			for dependency in backend.productDependency_getObjects():
+				ident = (dependency.productId, dependency.productVersion, dependency.packageVersion)
+				self._dependencies[ident].append(dependency)
+				self._requiredProductIds[dependency.productId].add(dependency.requiredProductId)
+		return self._dependencies
+
+	def _getProductIdents(self, backend, depotId):
+		try:
+			return self._productIdentsByDepotId[depotId]
+		except KeyError:
+			idents = {
+				productOnDepot.productId: (productOnDepot.productId, productOnDepot.productVersion, productOnDepot.packageVersion)
+				for productOnDepot in backend.productOnDepot_getObjects(depotId=depotId)
+			}
+			self._productIdentsByDepotId[depotId] = idents
+			return idents
+
+	def _getRequiredProductIds(self, backend, productIds):
+		"""
+		Get `productIds` and the ids of all products they require \
+in any version.
+		"""
+		self._getDependencies(backend)
+		result = set(productIds)
+		unprocessed = list(result)
+		while unprocessed:
+			for requiredProductId in self._requiredProductIds.get(unprocessed.pop(), ()):
+				if requiredProductId not in result:
+					result.add(requiredProductId)
+					unprocessed.append(requiredProductId)
+		return result
+
+	def getProducts(self, backend, depotId, productIds):
+		"""
+		Get the products on depot `depotId` that are needed to process \
+the products in `productIds`.
+
+		Products required by the given products are included aswell.
+
+		:param backend: The backend to read the data from.
+		:returns: A dict with the products by their id and a dict with \
+the dependencies of these products by product id. Both are shared \
+between calls and must not be altered.
+		:rtype: (dict, dict)
+		"""
+		key = (depotId, frozenset(productIds))
+		with self._lock:
+			self._update(backend)
+			try:
+				return self._selections[key]
+			except KeyError:
+				pass
+
+			try:
+				selection = self._selectProducts(backend, depotId, productIds)
+			except BackendMissingDataError as error:
+				# The products may have been changed without reporting
+				# it to the graph, e.g. by another process.
+				logger.debug(u"Reading {0} again: {1}", self.__class__.__name__, error)
+				self.clear()
+				self._update(backend)
+				selection = self._selectProducts(backend, depotId, productIds)
+
+			if len(self._selections) >= 100:
+				self._selections = {}
+			self._selections[key] = selection
+			return selection
+
+	def _selectProducts(self, backend, depotId, productIds):
+		"""
+		Collect the products and dependencies returned by `getProducts`.
+
+		:raises BackendMissingDataError: If a product on the depot is \
+unknown.
+		"""
+		products = self._getProducts(backend)
+		dependencies = self._getDependencies(backend)
+		productIdents = self._getProductIdents(backend, depotId)
+
+		productsById = {}
+		dependenciesByProductId = {}
+		for productId in self._getRequiredProductIds(backend, productIds):
+			try:
+				ident = productIdents[productId]
+			except KeyError:
+				continue
+
+			try:
+				productsById[productId] = products[ident]
+			except KeyError:
+				raise BackendMissingDataError(
+					u"Product '%s', productVersion '%s', packageVersion '%s' not found" % ident
+				)
+
+			if ident in dependencies:
+				dependenciesByProductId[productId] = list(dependencies[ident])
+
+		return productsById, dependenciesByProductId
+
+	def getProductSequence(self, backend, depotId, productIds, generateSequence):
+		"""
+		Get the ids of the products returned by `getProducts` in \
+the order they have to be processed.
+
+		:param backend: The backend to read the data from.
+		:param generateSequence: The function creating the sequence \
+from the products and their setup requirements.
+		:rtype: [str, ]
+		"""
+		key = (depotId, frozenset(productIds), generateSequence)
+		with self._lock:
+			productsById, dependenciesByProductId = self.getProducts(backend, depotId, productIds)
+			try:
+				return list(self._sequences[key])
+			except KeyError:
+				pass
+
+			products = [productsById[productId] for productId in sorted(productsById)]
+			dependencies = [
+				dependency
+				for productId in sorted(dependenciesByProductId)
+				for dependency in dependenciesByProductId[productId]
+			]
+			sequence = generateSequence(products, OPSI.SharedAlgorithm.getSetupRequirements(dependencies))
+
+			if len(self._sequences) >= 100:
+				self._sequences = {}
+			self._sequences[key] = sequence
+			return list(sequence)
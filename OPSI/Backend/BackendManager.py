@@ -35,11 +35,12 @@ import re
 import socket
 import sys
 import types
-from contextlib import closing
+from contextlib import closing, contextmanager
 
 from OPSI.Backend.Backend import (
 	Backend, ConfigDataBackend, ExtendedBackend, ExtendedConfigDataBackend,
-	getArgAndCallString)
+	backendTransaction, getArgAndCallString)
+from OPSI.Backend.Cache import ObjectCacheBackend
 from OPSI.Backend.Depotserver import DepotserverBackend
 from OPSI.Backend.HostControl import HostControlBackend
 from OPSI.Backend.HostControlSafe import HostControlSafeBackend
@@ -146,6 +147,11 @@ class BackendManager(ExtendedBackend):
 		:type acl: [[str, ]]
 		:param aclfile: Load the ACL from this file.
 		:type aclfile: str
+		:param objectcache: Cache the results of reading methods of \
+the backend holding the data?
+		:type objectcache: bool
+		:param objectcachesize: Maximum size of the cached results in bytes.
+		:type objectcachesize: int
 		"""
 		self._backend = None
 		self._backendConfigDir = None
@@ -167,6 +173,8 @@ class BackendManager(ExtendedBackend):
 		hostControlSafeBackend = False
 		startReactor = True
 		loadBackend = None
+		objectCache = False
+		objectCacheSize = 64 * 1024 * 1024
 
 		if not kwargs:
 			kwargs = {
@@ -213,6 +221,10 @@ class BackendManager(ExtendedBackend):
 				accessControl = True
 			elif option == 'startreactor' and value is False:
 				startReactor = False
+			elif option == 'objectcache':
+				objectCache = forceBool(value)
+			elif option == 'objectcachesize':
+				objectCacheSize = forceInt(value)
 
 		if loadBackend:
 			logger.info(u"* BackendManager is loading backend '%s'" % loadBackend)
@@ -227,6 +239,10 @@ class BackendManager(ExtendedBackend):
 			self._backend = BackendDispatcher(context=self, **kwargs)
 			# self._backend is now a BackendDispatcher which is a ConfigDataBackend
 
+		if objectCache:
+			logger.info(u"* BackendManager is creating ObjectCacheBackend")
+			self._backend = ObjectCacheBackend(self._backend, maxSize=objectCacheSize)
+
 		if extend or depotBackend:
 			logger.info(u"* BackendManager is creating ExtendedConfigDataBackend")
 			# DepotserverBackend/BackendExtender need ExtendedConfigDataBackend backend
@@ -451,6 +467,40 @@ class BackendDispatcher(Backend):
 		logger.debug2(u"Finished dispatching method {0!r}", methodName)
 		return result
 
+	@contextmanager
+	def _transaction(self):
+		"""
+		Start a transaction on every backend dispatched to.
+
+		The transactions of the backends are committed one after
+		another so a failing commit does not undo the commits of the
+		backends before.
+		"""
+		with self._backendTransactions(sorted(self._backends)):
+			yield
+
+	@contextmanager
+	def _backendTransactions(self, backendNames):
+		if not backendNames:
+			yield
+			return
+
+		with backendTransaction(self._backends[backendNames[0]]["instance"]):
+			with self._backendTransactions(backendNames[1:]):
+				yield
+
+	def _getStorageKey(self):
+		"""
+		Dispatchers loading the same backend configurations and using
+		the same dispatch config access the same data.
+		"""
+		return (
+			self.__class__.__name__,
+			os.path.abspath(self._backendConfigDir),
+			repr(self._dispatchConfig),
+			tuple(sorted(self._backends))
+		)
+
 	def backend_setOptions(self, options):
 		Backend.backend_setOptions(self, options)
 		for be in self._backends.values():
@@ -833,6 +883,11 @@ class BackendAccessControl(object):
 		meth = getattr(self._backend, methodName)
 		return meth(**kwargs)
 
+	@contextmanager
+	def _transaction(self):
+		with backendTransaction(self._backend):
+			yield
+
 	def _executeMethodProtected(self, methodName, **kwargs):
 		granted = False
 		newKwargs = {}
@@ -924,6 +979,9 @@ class BackendAccessControl(object):
 		return params
 
 	def _filterResult(self, result, acls):
+		if isinstance(result, types.GeneratorType):
+			return self._filterGeneratedObjects(result, acls)
+
 		if result:
 			resultList = forceList(result)
 			if issubclass(resultList[0].__class__, BaseObject) or isinstance(resultList[0], dict):
@@ -937,6 +995,11 @@ class BackendAccessControl(object):
 						return None
 		return result
 
+	def _filterGeneratedObjects(self, objects, acls):
+		for obj in objects:
+			for allowedObject in self._filterObjects([obj], acls, exceptionOnTruncate=False, exceptionIfAllRemoved=False):
+				yield allowedObject
+
 	def _filterObjects(self, objects, acls, exceptionOnTruncate=True, exceptionIfAllRemoved=True):
 		logger.info(u"Filtering objects by acls")
 		newObjects = []
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Caching the results of reading methods of a backend.
+
+The cache sits between an `ExtendedConfigDataBackend` and the backend
+holding the data. Results of the `*_getObjects`, `*_getHashes` and
+`*_getIdents` methods are kept until an object of the same kind is
+changed through the backend.
+
+:license: GNU Affero General Public License version 3
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import OPSI.Object
+from OPSI.Backend.Backend import (
+	BackendModificationListener, ModificationTrackingBackend,
+	backendTransaction)
+from OPSI.Logger import Logger
+from OPSI.Types import forceInt, forceList
+
+try:
+	import cPickle as pickle
+except ImportError:
+	import pickle
+
+__all__ = ('ObjectCache', 'ObjectCacheBackend')
+
+logger = Logger()
+
+_CACHED_ACTIONS = frozenset(('getObjects', 'getHashes', 'getIdents'))
+_MODIFYING_ACTIONS = frozenset((
+	'insertObject', 'updateObject', 'insertObjects', 'updateObjects',
+	'deleteObjects'
+))
+
+# Deleting objects of a kind may delete or change objects of other
+# kinds in the backend without these changes going through the cache.
+_DEPENDENT_PREFIXES = {
+	'host': (
+		'objectToGroup', 'productOnClient', 'productOnDepot',
+		'productPropertyState', 'configState', 'auditSoftwareOnClient',
+		'auditHardwareOnHost', 'licenseOnClient', 'softwareLicense'
+	),
+	'config': ('configState', ),
+	'product': (
+		'productProperty', 'productDependency', 'productOnDepot',
+		'objectToGroup', 'productOnClient', 'productPropertyState'
+	),
+	'productProperty': ('productPropertyState', ),
+	'group': ('objectToGroup', ),
+	'licenseContract': ('softwareLicense', ),
+	'softwareLicense': ('softwareLicenseToLicensePool', ),
+	'licensePool': (
+		'softwareLicenseToLicensePool', 'auditSoftwareToLicensePool'
+	),
+	'softwareLicenseToLicensePool': ('licenseOnClient', ),
+	'auditSoftware': ('auditSoftwareToLicensePool', 'auditSoftwareOnClient'),
+	'auditHardware': ('auditHardwareOnHost', ),
+}
+
+
+def _getAffectedPrefixes(prefix):
+	affected = set()
+	unprocessed = [prefix]
+	while unprocessed:
+		current = unprocessed.pop()
+		if current in affected:
+			continue
+
+		affected.add(current)
+		unprocessed.extend(_DEPENDENT_PREFIXES.get(current, ()))
+
+	return affected
+
+
+class ObjectCache(BackendModificationListener):
+	"""
+	Cache for the results of reading backend methods.
+
+	Results are kept serialized so that every read gets its own copy
+	without copying the cached result. The size of the cache is limited
+	by the size of the serialized results. If this limit is reached the
+	entries that were not used for the longest time are removed.
+
+	As a `BackendModificationListener` the cache can be added to a
+	`ModificationTrackingBackend` to remove outdated entries.
+	"""
+
+	def __init__(self, maxSize=64 * 1024 * 1024):
+		"""
+		:param maxSize: The maximum size of the serialized results \
+to keep in bytes.
+		:type maxSize: int
+		"""
+		self._maxSize = forceInt(maxSize)
+		self._entries = OrderedDict()
+		self._entriesByPrefix = {}
+		self._generations = {}
+		self._clearings = 0
+		self._size = 0
+		self._lock = threading.RLock()
+
+		self._hits = 0
+		self._misses = 0
+		self._evictions = 0
+		self._invalidations = 0
+
+	@staticmethod
+	def _getKey(methodName, kwargs):
+		try:
+			return methodName + json.dumps(kwargs, sort_keys=True)
+		except (TypeError, ValueError):
+			return None
+
+	def _getGeneration(self, prefix):
+		return self._clearings, self._generations.get(prefix, 0)
+
+	def getResult(self, prefix, methodName, kwargs, function):
+		"""
+		Get the result of `function` from the cache.
+
+		If there is no cached result `function` will be called
+		without arguments and its result will be cached.
+		Every call returns a result of its own so that it can be
+		altered without changing the cached result.
+		"""
+		key = self._getKey(methodName, kwargs)
+		if key is None:
+			return function()
+
+		with self._lock:
+			try:
+				data = self._entries.pop(key)
+				self._entries[key] = data  # mark as recently used
+				self._hits += 1
+			except KeyError:
+				data = None
+				self._misses += 1
+				generation = self._getGeneration(prefix)
+
+		if data is not None:
+			return pickle.loads(data)
+
+		result = function()
+		self._add(prefix, key, generation, result)
+		return result
+
+	def _add(self, prefix, key, generation, result):
+		try:
+			data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+		except Exception as error:
+			logger.debug(u"Not caching result of {0}: {1!r}", key, error)
+			return
+
+		if len(data) > self._maxSize:
+			return
+
+		with self._lock:
+			if generation != self._getGeneration(prefix):
+				# Objects changed while reading the result.
+				return
+			if key in self._entries:
+				return
+
+			self._entries[key] = data
+			self._entriesByPrefix.setdefault(prefix, set()).add(key)
+			self._size += len(data)
+
+			while self._size > self._maxSize:
+				self._removeEntry(next(iter(self._entries)))
+				self._evictions += 1
+
+	def _removeEntry(self, key):
+		data = self._entries.pop(key)
+		self._size -= len(data)
+		prefix = key.split('_', 1)[0]
+		try:
+			self._entriesByPrefix[prefix].discard(key)
+		except KeyError:
+			pass
+
+	def invalidate(self, prefix):
+		"""
+		Remove all entries for the objects with `prefix`.
+
+		Entries of objects that may have been changed by the backend
+		as a consequence are removed aswell.
+		"""
+		with self._lock:
+			for affectedPrefix in _getAffectedPrefixes(prefix):
+				self._generations[affectedPrefix] = self._generations.get(affectedPrefix, 0) + 1
+				keys = self._entriesByPrefix.pop(affectedPrefix, set())
+				for key in keys:
+					if key in self._entries:
+						self._removeEntry(key)
+				self._invalidations += len(keys)
+
+	def clear(self):
+		"Remove all entries from the cache."
+		with self._lock:
+			self._clearings += 1
+			self._invalidations += len(self._entries)
+			self._entries.clear()
+			self._entriesByPrefix.clear()
+			self._size = 0
+
+	def getStatistics(self):
+		"""
+		Get statistics about the usage of the cache.
+
+		:rtype: dict
+		"""
+		with self._lock:
+			return {
+				'hits': self._hits,
+				'misses': self._misses,
+				'evictions': self._evictions,
+				'invalidations': self._invalidations,
+				'entries': len(self._entries),
+				'size': self._size,
+				'maxSize': self._maxSize,
+			}
+
+	def _invalidateObjects(self, objs):
+		prefixes = set()
+		for obj in objs:
+			try:
+				if isinstance(obj, dict):
+					prefixes.add(getattr(OPSI.Object, obj['type']).backendMethodPrefix)
+				else:
+					prefixes.add(obj.getBackendMethodPrefix())
+			except Exception as error:
+				logger.debug(u"Failed to get kind of {0!r}: {1}", obj, error)
+				self.clear()
+				return
+
+		for prefix in prefixes:
+			logger.debug(u"Invalidating cached {0} objects", prefix)
+			self.invalidate(prefix)
+
+	def objectInserted(self, backend, obj):
+		self._invalidateObjects([obj])
+
+	def objectUpdated(self, backend, obj):
+		self._invalidateObjects([obj])
+
+	def objectsDeleted(self, backend, objs):
+		self._invalidateObjects(forceList(objs))
+
+
+class ObjectCacheBackend(ModificationTrackingBackend):
+	"""
+	Backend caching the results of reading methods.
+
+	Results of `*_getObjects`, `*_getHashes` and `*_getIdents` are
+	cached per method and arguments. Cached results are dropped
+	if an object of the same kind is inserted, updated or deleted
+	through this backend.
+	Methods with an unknown effect drop the whole cache.
+
+	If the data of the wrapped backend is also changed through other
+	ways the cache can be added as a listener to the
+	`ModificationTrackingBackend` used for that:
+	`tracker.addBackendChangeListener(cacheBackend.objectCache)`.
+	"""
+
+	def __init__(self, backend, overwrite=True, maxSize=64 * 1024 * 1024):
+		"""
+		:param backend: The backend whose results will be cached.
+		:param maxSize: The maximum size of the cached results in bytes.
+		:type maxSize: int
+		"""
+		ModificationTrackingBackend.__init__(self, backend, overwrite=overwrite)
+		self.objectCache = ObjectCache(maxSize=maxSize)
+		self.addBackendChangeListener(self.objectCache)
+
+	def _executeMethod(self, methodName, **kwargs):
+		try:
+			prefix, action = methodName.split('_', 1)
+		except ValueError:
+			prefix, action = methodName, ''
+
+		if action in _CACHED_ACTIONS:
+			meth = getattr(self._backend, methodName)
+			return self.objectCache.getResult(prefix, methodName, kwargs, lambda: meth(**kwargs))
+		elif action in _MODIFYING_ACTIONS:
+			return ModificationTrackingBackend._executeMethod(self, methodName, **kwargs)
+
+		try:
+			return getattr(self._backend, methodName)(**kwargs)
+		finally:
+			if not self._isReadingMethod(prefix, action):
+				logger.debug(u"Clearing object cache after call of {0!r}", methodName)
+				self.objectCache.clear()
+
+	@contextmanager
+	def _transaction(self):
+		try:
+			with backendTransaction(self._backend):
+				yield
+		except Exception:
+			# Results read inside of the transaction may contain
+			# changes that were rolled back.
+			self.objectCache.clear()
+			raise
+
+	@staticmethod
+	def _isReadingMethod(prefix, action):
+		if action.startswith(('get', 'iter')) or prefix in ('log', 'user'):
+			return True
+
+		return prefix == 'backend' and action in ('info', 'getInterface', 'getOptions', 'setOptions', 'exit')
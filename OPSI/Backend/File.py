@@ -26,11 +26,18 @@ This backend stores all it's data in plaintext files.
 :license: GNU Affero General Public License version 3
 """
 
+import errno
 import grp
+import json
 import os
 import pwd
 import re
 import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from OPSI.Backend.Backend import ConfigDataBackend
 from OPSI.Config import OPSICONFD_USER, FILE_ADMIN_GROUP
@@ -43,13 +50,331 @@ from OPSI.Types import (
 	forceObjectClassList, forceProductId, forceUnicode, forceUnicodeList)
 from OPSI.Util import toJson, fromJson, getfqdn
 from OPSI.Util.File import IniFile, LockableFile
-from OPSI.Util.File.Opsi import HostKeyFile, PackageControlFile
-from OPSI.Object import *  # needed for calls to "eval"
+from OPSI.Util.File.Opsi import IndexedHostKeyFile, PackageControlFile
+from OPSI.Util.Filter import compileFilter
+from OPSI.Object import *
 
 __all__ = ('FileBackend', )
 
 logger = Logger()
 
+# Changes within the resolution of the modification time of a file
+# can not be noticed. Recently changed files are therefore read again.
+_RECENT_CHANGE_SECONDS = 2
+
+
+def _getFileSignature(path):
+	"""
+	Get what identifies the current version of the file at `path`.
+
+	:returns: Modification time, size and inode of the file or `None` \
+if the file does not exist.
+	"""
+	try:
+		stat = os.stat(path)
+	except OSError as error:
+		if error.errno != errno.ENOENT:
+			raise
+
+		return None
+
+	return [stat.st_mtime, stat.st_size, stat.st_ino]
+
+
+def _isRecentlyChanged(signature):
+	return signature[0] > time.time() - _RECENT_CHANGE_SECONDS
+
+
+class _FileTransaction(object):
+	"""
+	Changes of files made by a thread within a transaction.
+
+	The content of a file is kept before the file is changed for the
+	first time so that all changes can be undone.
+	"""
+
+	def __init__(self):
+		self._originals = OrderedDict()
+
+	def __len__(self):
+		return len(self._originals)
+
+	def keepOriginal(self, filename):
+		if filename in self._originals:
+			return
+
+		try:
+			with open(filename, 'rb') as originalFile:
+				self._originals[filename] = originalFile.read()
+		except IOError as error:
+			if error.errno != errno.ENOENT:
+				raise
+
+			self._originals[filename] = None
+
+	def merge(self, transaction):
+		"Take over the changes of a nested `transaction`."
+		for (filename, content) in transaction._originals.items():
+			if filename not in self._originals:
+				self._originals[filename] = content
+
+	def rollback(self, replaceFile):
+		"""
+		Restore the original files.
+
+		:param replaceFile: Function to replace a file with a file \
+written by the function given to it.
+		"""
+		for (filename, content) in reversed(self._originals.items()):
+			if content is None:
+				if os.path.exists(filename):
+					os.unlink(filename)
+				continue
+
+			def writeOriginal(temporaryFilename):
+				with open(temporaryFilename, 'wb') as originalFile:
+					originalFile.write(content)
+
+			replaceFile(filename, writeOriginal)
+
+
+class _IdentIndex(object):
+	"""
+	Index of the idents found in the files of the backend.
+
+	The idents are kept per file and kind of object together with the
+	modification time, size and inode of the file. They are read from
+	the file again if one of these changed. Listings of directories
+	are kept until the modification time of the directory changes.
+
+	Recently changed files and directories are not indexed because
+	a change within the resolution of the modification time would go
+	unnoticed.
+
+	The indexed idents can be saved to a file to be used by later
+	instances of the backend.
+	"""
+
+	VERSION = 1
+
+	def __init__(self, filename=None):
+		self._filename = filename
+		self._files = {}
+		self._directories = {}
+		self._changed = False
+		self._loaded = filename is None
+		self._lock = threading.RLock()
+
+	@staticmethod
+	def _pack(idents):
+		if not idents:
+			return [[], []]
+
+		keys = sorted(idents[0])
+		return [keys, [[ident[key] for key in keys] for ident in idents]]
+
+	@staticmethod
+	def _unpack(packedIdents):
+		(keys, rows) = packedIdents
+		return [dict(zip(keys, row)) for row in rows]
+
+	def _load(self):
+		if self._loaded:
+			return
+
+		self._loaded = True
+		try:
+			with open(self._filename) as indexFile:
+				data = json.load(indexFile)
+		except IOError as error:
+			if error.errno != errno.ENOENT:
+				logger.warning(u"Failed to read ident index {0!r}: {1}", self._filename, error)
+			return
+		except ValueError as error:
+			logger.warning(u"Ignoring damaged ident index {0!r}: {1}", self._filename, error)
+			return
+
+		if not isinstance(data, dict) or data.get('version') != self.VERSION:
+			logger.info(u"Ignoring ident index {0!r} of other version", self._filename)
+			return
+
+		self._files = data['files']
+		logger.debug(u"Read idents of {0:d} files from {1!r}", len(self._files), self._filename)
+
+	def save(self, replaceFile):
+		"""
+		Save the index if it changed.
+
+		:param replaceFile: Function to replace a file with a file \
+written by the function given to it.
+		"""
+		if self._filename is None:
+			return
+
+		with self._lock:
+			if not self._changed:
+				return
+
+			data = json.dumps({'version': self.VERSION, 'files': self._files})
+			self._changed = False
+
+		def write(temporaryFilename):
+			with open(temporaryFilename, 'w') as indexFile:
+				indexFile.write(data)
+
+		try:
+			replaceFile(self._filename, write)
+		except Exception as error:
+			logger.warning(u"Failed to save ident index {0!r}: {1}", self._filename, error)
+
+	def getIdents(self, filename, kind, readIdents, *args):
+		"""
+		Get the idents of objects of `kind` stored in `filename`.
+
+		If the idents are not indexed `readIdents` is called with
+		`filename` and `args` to read them from the file.
+		Missing files contain no idents.
+
+		:returntype: [dict, ]
+		"""
+		signature = _getFileSignature(filename)
+		if signature is None:
+			return []
+
+		with self._lock:
+			self._load()
+			try:
+				(indexedSignature, packedIdents) = self._files[filename]
+				if indexedSignature == signature:
+					return self._unpack(packedIdents[kind])
+			except KeyError:
+				pass
+
+		idents = readIdents(filename, *args)
+		if _isRecentlyChanged(signature):
+			return idents
+
+		with self._lock:
+			entry = self._files.get(filename)
+			if entry is None or entry[0] != signature:
+				entry = self._files[filename] = [signature, {}]
+			entry[1][kind] = self._pack(idents)
+			self._changed = True
+
+		return [dict(ident) for ident in idents]
+
+	def listDirectory(self, path):
+		"List the entries of the directory `path`."
+		signature = _getFileSignature(path)
+		with self._lock:
+			try:
+				(mtime, entries) = self._directories[path]
+				if signature is not None and mtime == signature[0]:
+					return list(entries)
+			except KeyError:
+				pass
+
+		entries = os.listdir(path)
+		if not _isRecentlyChanged(signature):
+			with self._lock:
+				self._directories[path] = (signature[0], entries)
+
+		return list(entries)
+
+	def invalidate(self, filename):
+		"Drop what is indexed for `filename` before it is changed."
+		with self._lock:
+			if self._files.pop(filename, None) is not None:
+				self._changed = True
+			self._directories.pop(os.path.dirname(filename), None)
+
+	def clear(self):
+		with self._lock:
+			self._loaded = True
+			self._changed = False
+			self._files = {}
+			self._directories = {}
+
+
+class _ParsedFileCache(object):
+	"""
+	Cache for parsed files shared by all backends of the process.
+
+	A parsed file is used as long as the modification time, size and
+	inode of the file stay the same. Recently changed files are parsed
+	on every access. If more than `maxFiles` files are cached the file
+	that was not used for the longest time is dropped.
+
+	Parsed files are shared between threads and must not be changed.
+	"""
+
+	def __init__(self, maxFiles=2000):
+		self._maxFiles = maxFiles
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, filename, parse):
+		"""
+		Get the result of `parse(filename)`.
+
+		The file is checked before it is parsed. If another process
+		replaces the file while it is parsed the result is therefore
+		stored for the old version and is parsed again on next access.
+		"""
+		signature = _getFileSignature(filename)
+		with self._lock:
+			try:
+				entry = self._entries.pop(filename)
+				self._entries[filename] = entry  # mark as recently used
+				if entry[:2] == (signature, parse):
+					return entry[2]
+			except KeyError:
+				pass
+
+		parsed = parse(filename)
+		if signature is not None and not _isRecentlyChanged(signature):
+			with self._lock:
+				self._entries.pop(filename, None)
+				self._entries[filename] = (signature, parse, parsed)
+				while len(self._entries) > self._maxFiles:
+					self._entries.popitem(last=False)
+
+		return parsed
+
+	def invalidate(self, filename):
+		"Drop the parsed version of `filename`."
+		with self._lock:
+			self._entries.pop(filename, None)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+
+def _parseIniFile(filename):
+	return IniFile(filename=filename, ignoreCase=False).parse()
+
+
+def _parsePackageControlFile(filename):
+	packageControlFile = PackageControlFile(filename=filename)
+	packageControlFile.parse()
+	return packageControlFile
+
+
+_parsedFiles = _ParsedFileCache()
+_hostKeyFiles = {}
+_hostKeyFilesLock = threading.Lock()
+
+
+def _getHostKeyFile(filename):
+	"Get the `IndexedHostKeyFile` for `filename` shared by all backends."
+	with _hostKeyFilesLock:
+		try:
+			return _hostKeyFiles[filename]
+		except KeyError:
+			hostKeyFile = _hostKeyFiles[filename] = IndexedHostKeyFile(filename)
+			return hostKeyFile
+
 
 class FileBackend(ConfigDataBackend):
 	PRODUCT_FILENAME_REGEX = re.compile(r'^([a-zA-Z0-9_.-]+)_([\w.]+)-([\w.]+)\.(local|net)boot$')
@@ -60,6 +385,7 @@ class FileBackend(ConfigDataBackend):
 
 		ConfigDataBackend.__init__(self, **kwargs)
 
+		self._transactions = threading.local()
 		self.__baseDir = u'/var/lib/opsi/config'
 		self.__hostKeyFile = u'/etc/opsi/pckeys'
 
@@ -105,6 +431,8 @@ class FileBackend(ConfigDataBackend):
 		self.__productGroupsFile = os.path.join(self.__baseDir, u'productgroups.ini')
 		self.__clientTemplateDir = os.path.join(self.__baseDir, u'templates')
 
+		self._identIndex = _IdentIndex(os.path.join(self.__baseDir, u'.identindex.json'))
+
 		self.__defaultClientTemplateName = u'pcproto'
 		self.__defaultClientTemplatePath = os.path.join(self.__clientTemplateDir, u'{0}.ini'.format(self.__defaultClientTemplateName))
 
@@ -224,7 +552,7 @@ class FileBackend(ConfigDataBackend):
 		self._mappings['NetbootProduct'].extend(self._mappings['Product'])
 
 	def backend_exit(self):
-		pass
+		self._identIndex.save(self._replaceFile)
 
 	def backend_createBase(self):
 		logger.notice(u"Creating base path: '%s'" % (self.__baseDir))
@@ -259,6 +587,7 @@ class FileBackend(ConfigDataBackend):
 			os.unlink(self.__clientGroupsFile)
 		if os.path.exists(self.__productGroupsFile):
 			os.unlink(self.__productGroupsFile)
+		self._identIndex.clear()
 
 	def _setRights(self, path):
 		logger.debug(u"Setting rights for path '{0}'".format(path))
@@ -288,12 +617,99 @@ class FileBackend(ConfigDataBackend):
 	def _touch(self, filename):
 		logger.debug(u"Creating file: '%s'" % (filename))
 		if not os.path.exists(filename):
+			self._prepareChange(filename)
 			f = LockableFile(filename)
 			f.create()
 		else:
 			logger.debug(u"Cannot create existing file, only setting rights.")
 		self._setRights(filename)
 
+	@contextmanager
+	def _transaction(self):
+		"""
+		Make the changes of files by the current thread undoable.
+
+		Within a transaction files are written to temporary files that
+		replace the original files by renaming them. The original
+		content of every changed file is kept and restored if the block
+		raises an exception.
+		Other readers see the changes before the block is left.
+		"""
+		outerTransaction = getattr(self._transactions, 'current', None)
+		transaction = _FileTransaction()
+		self._transactions.current = transaction
+		try:
+			yield
+		except Exception:
+			logger.info(u"Restoring {0:d} files changed within failed transaction", len(transaction))
+			transaction.rollback(self._replaceFile)
+			raise
+		else:
+			if outerTransaction is not None:
+				outerTransaction.merge(transaction)
+		finally:
+			self._transactions.current = outerTransaction
+
+	def _prepareChange(self, filename):
+		"Called before `filename` is created, changed or deleted."
+		self._identIndex.invalidate(filename)
+		_parsedFiles.invalidate(filename)
+
+		transaction = getattr(self._transactions, 'current', None)
+		if transaction is not None:
+			transaction.keepOriginal(filename)
+
+	def _generateFile(self, configFile, *args):
+		"""
+		Write `configFile` through its `generate` method.
+
+		The file is written to a temporary file that replaces the
+		original file at once. Within a transaction the original file
+		is kept.
+		"""
+		filename = configFile.getFilename()
+		self._prepareChange(filename)
+
+		def generate(temporaryFilename):
+			configFile.setFilename(temporaryFilename)
+			try:
+				configFile.generate(*args)
+			finally:
+				configFile.setFilename(filename)
+
+		self._replaceFile(filename, generate)
+
+	def _replaceFile(self, filename, write):
+		"""
+		Replace `filename` with the file written by `write`.
+
+		`write` is called with the name of a temporary file in the
+		same directory which is renamed to `filename` afterwards.
+		Readers therefore see either the old or the new file.
+		If no file can be created in the directory `filename` is
+		written directly.
+		"""
+		(directory, basename) = os.path.split(filename)
+		try:
+			(handle, temporaryFilename) = tempfile.mkstemp(prefix=u'.{0}.'.format(basename), suffix=u'.tmp', dir=directory)
+		except OSError as error:
+			if error.errno not in (errno.EACCES, errno.EPERM):
+				raise
+
+			logger.debug(u"Writing {0!r} directly: {1}", filename, error)
+			write(filename)
+			return
+
+		os.close(handle)
+		try:
+			write(temporaryFilename)
+			self._setRights(temporaryFilename)
+			os.rename(temporaryFilename, filename)
+		except Exception:
+			if os.path.exists(temporaryFilename):
+				os.unlink(temporaryFilename)
+			raise
+
 	@staticmethod
 	def __escape(string):
 		string = forceUnicode(string)
@@ -398,11 +814,7 @@ class FileBackend(ConfigDataBackend):
 
 		if objType in ('Config', 'UnicodeConfig', 'BoolConfig'):
 			filename = self._getConfigFile(objType, {}, 'ini')
-			if os.path.isfile(filename):
-				iniFile = IniFile(filename=filename, ignoreCase=False)
-				cp = iniFile.parse()
-				for section in cp.sections():
-					objIdents.append({'id': section})
+			objIdents.extend(self._identIndex.getIdents(filename, 'Config', self._readConfigIdents))
 
 		elif objType in ('OpsiClient', 'ProductOnClient'):
 			if objType == 'OpsiClient' and filter.get('id'):
@@ -411,8 +823,9 @@ class FileBackend(ConfigDataBackend):
 				idFilter = {'id': filter['clientId']}
 			else:
 				idFilter = {}
+			matchesIdFilter = compileFilter(idFilter)
 
-			for entry in os.listdir(self.__clientConfigDir):
+			for entry in self._identIndex.listDirectory(self.__clientConfigDir):
 				if not entry.lower().endswith('.ini'):
 					logger.debug2(u"Ignoring invalid client file '%s'" % (entry))
 					continue
@@ -423,21 +836,12 @@ class FileBackend(ConfigDataBackend):
 					logger.warning(u"Ignoring invalid client file '%s'" % (entry))
 					continue
 
-				if idFilter and not self._objectHashMatches({'id': hostId}, **idFilter):
+				if idFilter and not matchesIdFilter({'id': hostId}):
 					continue
 
 				if objType == 'ProductOnClient':
 					filename = self._getConfigFile(objType, {'clientId': hostId}, 'ini')
-					iniFile = IniFile(filename=filename, ignoreCase=False)
-					cp = iniFile.parse()
-
-					for section in cp.sections():
-						if section.endswith('-state'):
-							objIdents.append({
-								'productId': section[:-6],
-								'productType': cp.get(section, 'productType'),
-								'clientId': hostId
-							})
+					objIdents.extend(self._identIndex.getIdents(filename, objType, self._readProductOnClientIdents, hostId))
 				else:
 					objIdents.append({'id': hostId})
 
@@ -448,8 +852,9 @@ class FileBackend(ConfigDataBackend):
 				idFilter = {'id': filter['depotId']}
 			else:
 				idFilter = {}
+			matchesIdFilter = compileFilter(idFilter)
 
-			for entry in os.listdir(self.__depotConfigDir):
+			for entry in self._identIndex.listDirectory(self.__depotConfigDir):
 				if not entry.lower().endswith('.ini'):
 					logger.debug2(u"Ignoring invalid depot file '%s'" % (entry))
 					continue
@@ -460,7 +865,7 @@ class FileBackend(ConfigDataBackend):
 					logger.warning(u"Ignoring invalid depot file '%s'" % (entry))
 					continue
 
-				if idFilter and not self._objectHashMatches({'id': hostId}, **idFilter):
+				if idFilter and not matchesIdFilter({'id': hostId}):
 					continue
 
 				if objType == 'OpsiConfigserver' and hostId != self.__serverId:
@@ -468,18 +873,7 @@ class FileBackend(ConfigDataBackend):
 
 				if objType == 'ProductOnDepot':
 					filename = self._getConfigFile(objType, {'depotId': hostId}, 'ini')
-					iniFile = IniFile(filename=filename, ignoreCase=False)
-					cp = iniFile.parse()
-
-					for section in cp.sections():
-						if section.endswith('-state'):
-							objIdents.append({
-								'productId': section[:-6],
-								'productType': cp.get(section, 'producttype'),
-								'productVersion': cp.get(section, 'productversion'),
-								'packageVersion': cp.get(section, 'packageversion'),
-								'depotId': hostId
-							})
+					objIdents.extend(self._identIndex.getIdents(filename, objType, self._readProductOnDepotIdents, hostId))
 				else:
 					objIdents.append({'id': hostId})
 
@@ -490,8 +884,9 @@ class FileBackend(ConfigDataBackend):
 				idFilter = {'id': filter['productId']}
 			else:
 				idFilter = {}
+			matchesIdFilter = compileFilter(idFilter)
 
-			for entry in os.listdir(self.__productDir):
+			for entry in self._identIndex.listDirectory(self.__productDir):
 				match = None
 
 				entry = entry.lower()
@@ -510,7 +905,7 @@ class FileBackend(ConfigDataBackend):
 					logger.warning(u"Ignoring invalid product file '%s'" % (entry))
 					continue
 
-				if idFilter and not self._objectHashMatches({'id': match.group(1)}, **idFilter):
+				if idFilter and not matchesIdFilter({'id': match.group(1)}):
 					continue
 
 				logger.debug2(u"Found match: id='%s', productVersion='%s', packageVersion='%s'" % (match.group(1), match.group(2), match.group(3)))
@@ -520,17 +915,15 @@ class FileBackend(ConfigDataBackend):
 
 				elif objType in ('ProductProperty', 'UnicodeProductProperty', 'BoolProductProperty', 'ProductDependency'):
 					filename = os.path.join(self.__productDir, entry)
-					packageControlFile = PackageControlFile(filename=filename)
 					if objType == 'ProductDependency':
-						for productDependency in packageControlFile.getProductDependencies():
-							objIdents.append(productDependency.getIdent(returnType='dict'))
+						objIdents.extend(self._identIndex.getIdents(filename, objType, self._readProductDependencyIdents))
 					else:
-						for productProperty in packageControlFile.getProductProperties():
-							objIdents.append(productProperty.getIdent(returnType='dict'))
+						objIdents.extend(self._identIndex.getIdents(filename, 'ProductProperty', self._readProductPropertyIdents))
 
 		elif objType in ('ConfigState', 'ProductPropertyState'):
+			matchesFilter = compileFilter(filter)
 			for path in (self.__depotConfigDir, self.__clientConfigDir):
-				for entry in os.listdir(path):
+				for entry in self._identIndex.listDirectory(path):
 					filename = os.path.join(path, entry)
 
 					if not entry.lower().endswith('.ini'):
@@ -543,31 +936,13 @@ class FileBackend(ConfigDataBackend):
 						logger.warning(u"Ignoring invalid file '%s': %s" % filename, forceUnicode(e))
 						continue
 
-					if not self._objectHashMatches({'objectId': objectId}, **filter):
+					if not matchesFilter({'objectId': objectId}):
 						continue
 
-					iniFile = IniFile(filename=filename, ignoreCase=False)
-					cp = iniFile.parse()
-
-					if objType == 'ConfigState' and cp.has_section('generalconfig'):
-						for option in cp.options('generalconfig'):
-							objIdents.append({
-								'configId': option,
-								'objectId': objectId
-							})
-					elif objType == 'ProductPropertyState':
-						for section in cp.sections():
-							if not section.endswith('-install'):
-								continue
-
-							for option in cp.options(section):
-								objIdents.append(
-									{
-										'productId': section[:-8],
-										'propertyId': option,
-										'objectId': objectId
-									}
-								)
+					if objType == 'ConfigState':
+						objIdents.extend(self._identIndex.getIdents(filename, objType, self._readConfigStateIdents, objectId))
+					else:
+						objIdents.extend(self._identIndex.getIdents(filename, objType, self._readProductPropertyStateIdents, objectId))
 
 		elif objType in ('Group', 'HostGroup', 'ProductGroup', 'ObjectToGroup'):
 			if objType == 'ObjectToGroup':
@@ -639,8 +1014,9 @@ class FileBackend(ConfigDataBackend):
 					idFilter = {'id': filter['clientId']}
 				elif objType == 'AuditHardwareOnHost' and filter.get('hostId'):
 					idFilter = {'id': filter['hostId']}
+				matchesIdFilter = compileFilter(idFilter)
 
-				for entry in os.listdir(self.__auditDir):
+				for entry in self._identIndex.listDirectory(self.__auditDir):
 					entry = entry.lower()
 					filename = None
 
@@ -650,7 +1026,7 @@ class FileBackend(ConfigDataBackend):
 						logger.debug2(u"Ignoring invalid file '%s'" % (entry))
 
 					try:
-						if idFilter and not self._objectHashMatches({'id': forceHostId(entry[:-3])}, **idFilter):
+						if idFilter and not matchesIdFilter({'id': forceHostId(entry[:-3])}):
 							continue
 					except Exception:
 						logger.warning(u"Ignoring invalid file '%s'" % (entry))
@@ -707,10 +1083,77 @@ class FileBackend(ConfigDataBackend):
 			logger.debug2(u"Returning idents without filter.")
 			return objIdents
 
+		matchesFilter = compileFilter(filter)
+		return [ident for ident in objIdents if matchesFilter(ident)]
+
+	@staticmethod
+	def _readConfigIdents(filename):
+		cp = _parsedFiles.get(filename, _parseIniFile)
+		return [{'id': section} for section in cp.sections()]
+
+	@staticmethod
+	def _readProductOnClientIdents(filename, clientId):
+		cp = _parsedFiles.get(filename, _parseIniFile)
+		return [
+			{
+				'productId': section[:-6],
+				'productType': cp.get(section, 'productType'),
+				'clientId': clientId
+			}
+			for section in cp.sections()
+			if section.endswith('-state')
+		]
+
+	@staticmethod
+	def _readProductOnDepotIdents(filename, depotId):
+		cp = _parsedFiles.get(filename, _parseIniFile)
+		return [
+			{
+				'productId': section[:-6],
+				'productType': cp.get(section, 'producttype'),
+				'productVersion': cp.get(section, 'productversion'),
+				'packageVersion': cp.get(section, 'packageversion'),
+				'depotId': depotId
+			}
+			for section in cp.sections()
+			if section.endswith('-state')
+		]
+
+	@staticmethod
+	def _readConfigStateIdents(filename, objectId):
+		cp = _parsedFiles.get(filename, _parseIniFile)
+		if not cp.has_section('generalconfig'):
+			return []
+
+		return [
+			{'configId': option, 'objectId': objectId}
+			for option in cp.options('generalconfig')
+		]
+
+	@staticmethod
+	def _readProductPropertyStateIdents(filename, objectId):
+		cp = _parsedFiles.get(filename, _parseIniFile)
+		return [
+			{'productId': section[:-8], 'propertyId': option, 'objectId': objectId}
+			for section in cp.sections()
+			if section.endswith('-install')
+			for option in cp.options(section)
+		]
+
+	@staticmethod
+	def _readProductPropertyIdents(filename):
+		packageControlFile = _parsedFiles.get(filename, _parsePackageControlFile)
+		return [
+			productProperty.getIdent(returnType='dict')
+			for productProperty in packageControlFile.getProductProperties()
+		]
+
+	@staticmethod
+	def _readProductDependencyIdents(filename):
+		packageControlFile = _parsedFiles.get(filename, _parsePackageControlFile)
 		return [
-			ident
-			for ident in objIdents
-			if self._objectHashMatches(ident, **filter)
+			productDependency.getIdent(returnType='dict')
+			for productDependency in packageControlFile.getProductDependencies()
 		]
 
 	@staticmethod
@@ -732,12 +1175,12 @@ class FileBackend(ConfigDataBackend):
 				if objectType == objType:
 					match = True
 					break
-				Class = eval(objectType)
+				Class = getObjectClass(objectType)
 				for subClass in Class.subClasses:
 					if subClass == objType:
 						match = True
 						break
-				Class = eval(objType)
+				Class = getObjectClass(objType)
 				for subClass in Class.subClasses:
 					if subClass == objectType:
 						match = True
@@ -770,6 +1213,7 @@ class FileBackend(ConfigDataBackend):
 		iniFileCache = {}
 		hostKeys = None
 
+		matchesFilter = compileFilter(filter)
 		objects = []
 		for ident in self._getIdents(objType, **filter):
 			objHash = dict(ident)
@@ -781,21 +1225,21 @@ class FileBackend(ConfigDataBackend):
 					raise BackendIOError(u"Directory '%s' not found" % os.path.dirname(filename))
 
 				if fileType == 'key':
-					if not hostKeys:
-						hostKeys = HostKeyFile(filename=filename)
-						hostKeys.parse()
+					if hostKeys is None:
+						hostKeys = _getHostKeyFile(filename).getOpsiHostKeys()
 
 					for m in mapping:
-						objHash[m['attribute']] = hostKeys.getOpsiHostKey(ident['id'])
+						objHash[m['attribute']] = hostKeys.get(ident['id'])
 
 				elif fileType == 'ini':
 					try:
 						cp = iniFileCache[filename]
 					except KeyError:
-						iniFile = IniFile(filename=filename, ignoreCase=False)
-						cp = iniFileCache[filename] = iniFile.parse()
+						cp = iniFileCache[filename] = _parsedFiles.get(filename, _parseIniFile)
 
 					if cp.has_section('LocalbootProduct_product_states') or cp.has_section('NetbootProduct_product_states'):
+						# Shared parsed files must not be changed.
+						cp = iniFileCache[filename] = _parseIniFile(filename)
 						if cp.has_section('LocalbootProduct_product_states'):
 							if not cp.has_section('localboot_product_states'):
 								cp.add_section('localboot_product_states')
@@ -812,7 +1256,7 @@ class FileBackend(ConfigDataBackend):
 								cp.set('netboot_product_states', k, v)
 
 							cp.remove_section('NetbootProduct_product_states')
-						IniFile(filename=filename, ignoreCase=False).generate(cp)
+						self._generateFile(IniFile(filename=filename, ignoreCase=False), cp)
 
 					for m in mapping:
 						attribute = m['attribute']
@@ -859,9 +1303,7 @@ class FileBackend(ConfigDataBackend):
 					try:
 						packageControlFile = packageControlFileCache[filename]
 					except KeyError:
-						packageControlFileCache[filename] = PackageControlFile(filename=filename)
-						packageControlFileCache[filename].parse()
-						packageControlFile = packageControlFileCache[filename]
+						packageControlFile = packageControlFileCache[filename] = _parsedFiles.get(filename, _parsePackageControlFile)
 
 					if objType in ('Product', 'LocalbootProduct', 'NetbootProduct'):
 						objHash = packageControlFile.getProduct().toHash()
@@ -884,8 +1326,8 @@ class FileBackend(ConfigDataBackend):
 								objHash = obj.toHash()
 								break
 
-			Class = eval(objType)
-			if self._objectHashMatches(Class.fromHash(objHash).toHash(), **filter):
+			Class = getObjectClass(objType)
+			if matchesFilter(Class.fromHash(objHash).toHash()):
 				objHash = self._adaptObjectHashAttributes(objHash, ident, attributes)
 				objects.append(Class.fromHash(objHash))
 
@@ -895,175 +1337,225 @@ class FileBackend(ConfigDataBackend):
 		return objects
 
 	def _write(self, obj, mode='create'):
-		objType = obj.getType()
+		self._writeObjects([obj], mode)
 
-		if objType == 'OpsiConfigserver':
-			if self.__serverId != obj.getId():
-				raise BackendUnaccomplishableError(u"Filebackend can only handle this config server '%s', not '%s'" % (self.__serverId, obj.getId()))
+	def _writeObjects(self, objs, mode='create'):
+		"""
+		Write `objs` to the files they are stored in.
 
-		if objType not in self._mappings:
-			raise BackendUnaccomplishableError(u"Mapping not found for object type '%s'" % objType)
+		The objects are grouped by the files they are stored in. Every
+		file is read once, changed for all objects of the group and
+		written once by replacing it with a temporary file.
+		"""
+		mappingsByType = {}
+		changes = OrderedDict()
+		for obj in objs:
+			objType = obj.getType()
 
-		mappings = {}
-		for mapping in self._mappings[objType]:
-			if mapping['fileType'] not in mappings:
-				mappings[mapping['fileType']] = {}
-			mappings[mapping['fileType']][mapping['attribute']] = mapping
+			if objType == 'OpsiConfigserver':
+				if self.__serverId != obj.getId():
+					raise BackendUnaccomplishableError(u"Filebackend can only handle this config server '%s', not '%s'" % (self.__serverId, obj.getId()))
 
-		for (fileType, mapping) in mappings.items():
-			filename = self._getConfigFile(objType, obj.getIdent(returnType='dict'), fileType)
+			if objType not in self._mappings:
+				raise BackendUnaccomplishableError(u"Mapping not found for object type '%s'" % objType)
 
-			if fileType == 'key':
-				if mode == 'create' or (mode == 'update' and obj.getOpsiHostKey()):
-					if not os.path.exists(filename):
-						self._touch(filename)
+			try:
+				mappings = mappingsByType[objType]
+			except KeyError:
+				mappings = mappingsByType[objType] = {}
+				for mapping in self._mappings[objType]:
+					if mapping['fileType'] not in mappings:
+						mappings[mapping['fileType']] = {}
+					mappings[mapping['fileType']][mapping['attribute']] = mapping
 
-					hostKeys = HostKeyFile(filename=filename)
-					hostKeys.setOpsiHostKey(obj.getId(), obj.getOpsiHostKey())
-					hostKeys.generate()
+			ident = obj.getIdent(returnType='dict')
+			for (fileType, mapping) in mappings.items():
+				filename = self._getConfigFile(objType, ident, fileType)
+				changes.setdefault((fileType, filename), []).append((obj, mapping))
 
+		for ((fileType, filename), objMappings) in changes.items():
+			logger.debug(u"Writing {0:d} objects to {1!r}", len(objMappings), filename)
+			if fileType == 'key':
+				self._writeHostKeys(filename, [obj for (obj, _) in objMappings], mode)
 			elif fileType == 'ini':
-				iniFile = IniFile(filename=filename, ignoreCase=False)
-				if mode == 'create':
-					if objType == 'OpsiClient' and not iniFile.exists():
-						proto = os.path.join(self.__clientTemplateDir, os.path.basename(filename))
-						if not os.path.isfile(proto):
-							proto = self.__defaultClientTemplatePath
-						shutil.copyfile(proto, filename)
+				self._writeIniFile(filename, objMappings, mode)
+			elif fileType == 'pro':
+				self._writePackageControlFile(filename, [obj for (obj, _) in objMappings], mode)
 
-					self._touch(filename)
+	def _writeHostKeys(self, filename, hosts, mode):
+		if mode != 'create':
+			hosts = [host for host in hosts if host.getOpsiHostKey()]
+			if not hosts:
+				return
 
-				cp = iniFile.parse()
+		if not os.path.exists(filename):
+			self._touch(filename)
 
-				if mode == 'create':
-					removeSections = []
-					removeOptions = {}
-					if objType in ('OpsiClient', 'OpsiDepotserver', 'OpsiConfigserver'):
-						removeSections = ['info', 'depotserver', 'depotshare', 'repository']
-					elif objType in ('Config', 'UnicodeConfig', 'BoolConfig'):
-						removeSections = [obj.getId()]
-					elif objType in ('Group', 'HostGroup', 'ProductGroup'):
-						removeOptions[obj.getId()] = []
-						for m in mapping.values():
-							removeOptions[obj.getId()].append(m['option'])
-					elif objType in ('ProductOnDepot', 'ProductOnClient'):
-						removeSections = [obj.getProductId() + u'-state']
-
-					for section in removeSections:
-						if cp.has_section(section):
-							cp.remove_section(section)
+		self._prepareChange(filename)
+		_getHostKeyFile(filename).setOpsiHostKeys(
+			dict((host.getId(), host.getOpsiHostKey()) for host in hosts)
+		)
+
+	def _writeIniFile(self, filename, objMappings, mode):
+		iniFile = IniFile(filename=filename, ignoreCase=False)
+		if mode == 'create':
+			if not iniFile.exists() and any(obj.getType() == 'OpsiClient' for (obj, _) in objMappings):
+				proto = os.path.join(self.__clientTemplateDir, os.path.basename(filename))
+				if not os.path.isfile(proto):
+					proto = self.__defaultClientTemplatePath
+				self._prepareChange(filename)
+				shutil.copyfile(proto, filename)
 
-					for (section, options) in removeOptions.items():
-						if cp.has_section(section):
-							for option in options:
-								if cp.has_option(section, option):
-									cp.remove_option(section, option)
+			self._touch(filename)
 
-				objHash = obj.toHash()
+		cp = iniFile.parse()
+		for (obj, mapping) in objMappings:
+			self._setIniValues(cp, obj, mapping, mode)
 
-				for (attribute, value) in objHash.items():
-					if value is None and mode == 'update':
-						continue
+		iniFile.setSectionSequence(['info', 'generalconfig', 'localboot_product_states', 'netboot_product_states'])
+		self._generateFile(iniFile, cp)
 
-					attributeMapping = mapping.get(attribute, mapping.get('*'))
+	def _setIniValues(self, cp, obj, mapping, mode):
+		objType = obj.getType()
 
-					if attributeMapping is not None:
-						section = attributeMapping['section']
-						option = attributeMapping['option']
+		if mode == 'create':
+			removeSections = []
+			removeOptions = {}
+			if objType in ('OpsiClient', 'OpsiDepotserver', 'OpsiConfigserver'):
+				removeSections = ['info', 'depotserver', 'depotshare', 'repository']
+			elif objType in ('Config', 'UnicodeConfig', 'BoolConfig'):
+				removeSections = [obj.getId()]
+			elif objType in ('Group', 'HostGroup', 'ProductGroup'):
+				removeOptions[obj.getId()] = []
+				for m in mapping.values():
+					removeOptions[obj.getId()].append(m['option'])
+			elif objType in ('ProductOnDepot', 'ProductOnClient'):
+				removeSections = [obj.getProductId() + u'-state']
 
-						match = self.PLACEHOLDER_REGEX.search(section)
-						if match:
-							section = u'%s%s%s' % (match.group(1), objHash[match.group(2)], match.group(3))
-							if objType == 'ProductOnClient':
-								section = section.replace('LocalbootProduct', 'localboot').replace('NetbootProduct', 'netboot')
+			for section in removeSections:
+				if cp.has_section(section):
+					cp.remove_section(section)
 
-						match = self.PLACEHOLDER_REGEX.search(option)
-						if match:
-							option = u'%s%s%s' % (match.group(1), objHash[match.group(2)], match.group(3))
+			for (section, options) in removeOptions.items():
+				if cp.has_section(section):
+					for option in options:
+						if cp.has_option(section, option):
+							cp.remove_option(section, option)
 
-						if not cp.has_section(section):
-							cp.add_section(section)
+		objHash = obj.toHash()
 
-						if objType == 'ProductOnClient':
-							if attribute in ('installationStatus', 'actionRequest'):
-								(installationStatus, actionRequest) = (u'not_installed', u'none')
+		for (attribute, value) in objHash.items():
+			if value is None and mode == 'update':
+				continue
 
-								if cp.has_option(section, option):
-									combined = cp.get(section, option)
-								else:
-									combined = u''
+			attributeMapping = mapping.get(attribute, mapping.get('*'))
 
-								if u':' in combined:
-									(installationStatus, actionRequest) = combined.split(u':', 1)
-								elif combined:
-									installationStatus = combined
+			if attributeMapping is not None:
+				section = attributeMapping['section']
+				option = attributeMapping['option']
 
-								if value is not None:
-									if attribute == 'installationStatus':
-										installationStatus = value
-									elif attribute == 'actionRequest':
-										actionRequest = value
-								value = installationStatus + u':' + actionRequest
-						elif objType == 'ObjectToGroup':
-							value = 1
+				match = self.PLACEHOLDER_REGEX.search(section)
+				if match:
+					section = u'%s%s%s' % (match.group(1), objHash[match.group(2)], match.group(3))
+					if objType == 'ProductOnClient':
+						section = section.replace('LocalbootProduct', 'localboot').replace('NetbootProduct', 'netboot')
+
+				match = self.PLACEHOLDER_REGEX.search(option)
+				if match:
+					option = u'%s%s%s' % (match.group(1), objHash[match.group(2)], match.group(3))
+
+				if not cp.has_section(section):
+					cp.add_section(section)
+
+				if objType == 'ProductOnClient':
+					if attribute in ('installationStatus', 'actionRequest'):
+						(installationStatus, actionRequest) = (u'not_installed', u'none')
+
+						if cp.has_option(section, option):
+							combined = cp.get(section, option)
+						else:
+							combined = u''
+
+						if u':' in combined:
+							(installationStatus, actionRequest) = combined.split(u':', 1)
+						elif combined:
+							installationStatus = combined
 
 						if value is not None:
-							if attributeMapping.get('json'):
-								value = toJson(value)
-							elif isinstance(value, (str, unicode)):
-								value = self.__escape(value)
+							if attribute == 'installationStatus':
+								installationStatus = value
+							elif attribute == 'actionRequest':
+								actionRequest = value
+						value = installationStatus + u':' + actionRequest
+				elif objType == 'ObjectToGroup':
+					value = 1
+
+				if value is not None:
+					if attributeMapping.get('json'):
+						value = toJson(value)
+					elif isinstance(value, (str, unicode)):
+						value = self.__escape(value)
+
+					cp.set(section, option, value)
+
+	def _writePackageControlFile(self, filename, objs, mode):
+		if not os.path.exists(filename):
+			self._touch(filename)
+		packageControlFile = PackageControlFile(filename=filename)
 
-							cp.set(section, option, value)
+		for obj in objs:
+			objType = obj.getType()
 
-				iniFile.setSectionSequence(['info', 'generalconfig', 'localboot_product_states', 'netboot_product_states'])
-				iniFile.generate(cp)
+			if objType in ('Product', 'LocalbootProduct', 'NetbootProduct'):
+				if mode == 'create':
+					packageControlFile.setProduct(obj)
+				else:
+					productHash = packageControlFile.getProduct().toHash()
+					for (attribute, value) in obj.toHash().items():
+						if value is None:
+							continue
+						productHash[attribute] = value
+					packageControlFile.setProduct(Product.fromHash(productHash))
+			elif objType in ('ProductProperty', 'UnicodeProductProperty', 'BoolProductProperty', 'ProductDependency'):
+				if objType == 'ProductDependency':
+					currentObjects = packageControlFile.getProductDependencies()
+				else:
+					currentObjects = packageControlFile.getProductProperties()
 
-			elif fileType == 'pro':
-				if not os.path.exists(filename):
-					self._touch(filename)
-				packageControlFile = PackageControlFile(filename=filename)
+				found = False
+				for i, currentObj in enumerate(currentObjects):
+					if currentObj.getIdent(returnType='unicode') == obj.getIdent(returnType='unicode'):
+						if mode == 'create':
+							currentObjects[i] = obj
+						else:
+							newHash = currentObj.toHash()
+							for (attribute, value) in obj.toHash().items():
+								if value is not None:
+									newHash[attribute] = value
 
-				if objType in ('Product', 'LocalbootProduct', 'NetbootProduct'):
-					if mode == 'create':
-						packageControlFile.setProduct(obj)
-					else:
-						productHash = packageControlFile.getProduct().toHash()
-						for (attribute, value) in obj.toHash().items():
-							if value is None:
-								continue
-							productHash[attribute] = value
-						packageControlFile.setProduct(Product.fromHash(productHash))
-				elif objType in ('ProductProperty', 'UnicodeProductProperty', 'BoolProductProperty', 'ProductDependency'):
-					if objType == 'ProductDependency':
-						currentObjects = packageControlFile.getProductDependencies()
-					else:
-						currentObjects = packageControlFile.getProductProperties()
+							Class = getObjectClass(objType)
+							currentObjects[i] = Class.fromHash(newHash)
+						found = True
+						break
 
-					found = False
-					for i, currentObj in enumerate(currentObjects):
-						if currentObj.getIdent(returnType='unicode') == obj.getIdent(returnType='unicode'):
-							if mode == 'create':
-								currentObjects[i] = obj
-							else:
-								newHash = currentObj.toHash()
-								for (attribute, value) in obj.toHash().items():
-									if value is not None:
-										newHash[attribute] = value
-
-								Class = eval(objType)
-								currentObjects[i] = Class.fromHash(newHash)
-							found = True
-							break
+				if not found:
+					currentObjects.append(obj)
 
-					if not found:
-						currentObjects.append(obj)
+				if objType == 'ProductDependency':
+					packageControlFile.setProductDependencies(currentObjects)
+				else:
+					packageControlFile.setProductProperties(currentObjects)
 
-					if objType == 'ProductDependency':
-						packageControlFile.setProductDependencies(currentObjects)
-					else:
-						packageControlFile.setProductProperties(currentObjects)
+		self._generateFile(packageControlFile)
+
+	def _groupByFile(self, objs, fileType):
+		"Group `objs` by the files of `fileType` they are stored in."
+		objsByFile = OrderedDict()
+		for obj in objs:
+			filename = self._getConfigFile(obj.getType(), obj.getIdent(returnType='dict'), fileType)
+			objsByFile.setdefault(filename, []).append(obj)
 
-				packageControlFile.generate()
+		return objsByFile
 
 	def _delete(self, objList):
 		if not objList:
@@ -1074,20 +1566,24 @@ class FileBackend(ConfigDataBackend):
 		objType = objList[0].getType()
 
 		if objType in ('OpsiClient', 'OpsiConfigserver', 'OpsiDepotserver'):
-			hostKeyFile = HostKeyFile(self._getConfigFile('', {}, 'key'))
+			hostIds = []
 			for obj in objList:
 				if obj.getId() == self.__serverId:
 					logger.warning(u"Cannot delete %s '%s', ignored." % (obj.getType(), obj.getId()))
 					continue
 
 				logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
-				hostKeyFile.deleteOpsiHostKey(obj.getId())
+				hostIds.append(obj.getId())
 
 				filename = self._getConfigFile(
 					obj.getType(), obj.getIdent(returnType='dict'), 'ini')
 				if os.path.isfile(filename):
+					self._prepareChange(filename)
 					os.unlink(filename)
-			hostKeyFile.generate()
+
+			hostKeyFilename = self._getConfigFile('', {}, 'key')
+			self._prepareChange(hostKeyFilename)
+			_getHostKeyFile(hostKeyFilename).deleteOpsiHostKeys(hostIds)
 
 		elif objType in ('Config', 'UnicodeConfig', 'BoolConfig'):
 			filename = self._getConfigFile(objType, {}, 'ini')
@@ -1098,24 +1594,19 @@ class FileBackend(ConfigDataBackend):
 				if cp.has_section(obj.getId()):
 					cp.remove_section(obj.getId())
 					logger.debug2(u"Removed section '%s'" % obj.getId())
-			iniFile.generate(cp)
+			self._generateFile(iniFile, cp)
 
 		elif objType == 'ConfigState':
-			filenames = set(self._getConfigFile(obj.getType(), obj.getIdent(returnType='dict'), 'ini') for obj in objList)
-
-			for filename in filenames:
+			for (filename, objs) in self._groupByFile(objList, 'ini').items():
 				iniFile = IniFile(filename=filename, ignoreCase=False)
 				cp = iniFile.parse()
-				for obj in objList:
-					if obj.getObjectId() != os.path.basename(filename)[:-4]:
-						continue
-
+				for obj in objs:
 					logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
 					if cp.has_option('generalconfig', obj.getConfigId()):
 						cp.remove_option('generalconfig', obj.getConfigId())
 						logger.debug2(u"Removed option in generalconfig '%s'" % obj.getConfigId())
 
-				iniFile.generate(cp)
+				self._generateFile(iniFile, cp)
 
 		elif objType in ('Product', 'LocalbootProduct', 'NetbootProduct'):
 			for obj in objList:
@@ -1123,13 +1614,12 @@ class FileBackend(ConfigDataBackend):
 					obj.getType(), obj.getIdent(returnType='dict'), 'pro')
 				logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
 				if os.path.isfile(filename):
+					self._prepareChange(filename)
 					os.unlink(filename)
 					logger.debug2(u"Removed file '%s'" % filename)
 
 		elif objType in ('ProductProperty', 'UnicodeProductProperty', 'BoolProductProperty', 'ProductDependency'):
-			filenames = set(self._getConfigFile(obj.getType(), obj.getIdent(returnType='dict'), 'pro') for obj in objList)
-
-			for filename in filenames:
+			for (filename, objs) in self._groupByFile(objList, 'pro').items():
 				packageControlFile = PackageControlFile(filename=filename)
 
 				if objType == 'ProductDependency':
@@ -1137,15 +1627,11 @@ class FileBackend(ConfigDataBackend):
 				else:
 					oldList = packageControlFile.getProductProperties()
 
+				deletedIdents = set(obj.getIdent(returnType='unicode') for obj in objs)
 				newList = []
 				for oldItem in oldList:
-					delete = False
-					for obj in objList:
-						if oldItem.getIdent(returnType='unicode') == obj.getIdent(returnType='unicode'):
-							delete = True
-							break
-					if delete:
-						logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
+					if oldItem.getIdent(returnType='unicode') in deletedIdents:
+						logger.debug(u"Deleting %s: '%s'" % (oldItem.getType(), oldItem.getIdent()))
 					else:
 						newList.append(oldItem)
 
@@ -1154,43 +1640,40 @@ class FileBackend(ConfigDataBackend):
 				else:
 					packageControlFile.setProductProperties(newList)
 
-				packageControlFile.generate()
+				self._generateFile(packageControlFile)
 
 		elif objType in ('ProductOnDepot', 'ProductOnClient'):
-			filenames = set(self._getConfigFile(obj.getType(), obj.getIdent(returnType='dict'), 'ini') for obj in objList)
-
-			for filename in filenames:
+			for (filename, objs) in self._groupByFile(objList, 'ini').items():
 				iniFile = IniFile(filename=filename, ignoreCase=False)
 				cp = iniFile.parse()
 
-				for obj in objList:
+				for obj in objs:
 					logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
 					if cp.has_section(obj.getProductId() + '-state'):
 						cp.remove_section(obj.getProductId() + '-state')
 						logger.debug2(u"Removed section '%s'" % obj.getProductId() + '-state')
 
-				iniFile.generate(cp)
+				self._generateFile(iniFile, cp)
 
 		elif objType == 'ProductPropertyState':
-			for obj in objList:
-				logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
-				filename = self._getConfigFile(
-					obj.getType(), obj.getIdent(returnType='dict'), 'ini')
+			for (filename, objs) in self._groupByFile(objList, 'ini').items():
 				iniFile = IniFile(filename=filename, ignoreCase=False)
 				cp = iniFile.parse()
 
-				section = obj.getProductId() + '-install'
-				option = obj.getPropertyId()
+				for obj in objs:
+					logger.debug(u"Deleting %s: '%s'" % (obj.getType(), obj.getIdent()))
+					section = obj.getProductId() + '-install'
+					option = obj.getPropertyId()
 
-				if cp.has_option(section, option):
-					cp.remove_option(section, option)
-					logger.debug2(u"Removed option '%s' in section '%s'" % (option, section))
+					if cp.has_option(section, option):
+						cp.remove_option(section, option)
+						logger.debug2(u"Removed option '%s' in section '%s'" % (option, section))
 
-				if cp.has_section(section) and len(cp.options(section)) == 0:
-					cp.remove_section(section)
-					logger.debug2(u"Removed empty section '%s'" % section)
+					if cp.has_section(section) and len(cp.options(section)) == 0:
+						cp.remove_section(section)
+						logger.debug2(u"Removed empty section '%s'" % section)
 
-				iniFile.generate(cp)
+				self._generateFile(iniFile, cp)
 
 		elif objType in ('Group', 'HostGroup', 'ProductGroup', 'ObjectToGroup'):
 			passes = [
@@ -1225,7 +1708,7 @@ class FileBackend(ConfigDataBackend):
 							cp.remove_section(section)
 							logger.debug2(u"Removed section '%s'" % section)
 
-				iniFile.generate(cp)
+				self._generateFile(iniFile, cp)
 		else:
 			logger.warning(u"_delete(): unhandled objType: '%s' object: %s" % (objType, objList[0]))
 
@@ -1250,6 +1733,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating host: '%s'" % host.getIdent())  # pylint: disable=maybe-no-member
 		self._write(host, mode='update')
 
+	def host_insertObjects(self, hosts):
+		hosts = forceObjectClassList(hosts, Host)
+		for host in hosts:
+			ConfigDataBackend.host_insertObject(self, host)
+
+		logger.debug(u"Inserting {0:d} hosts", len(hosts))
+		self._writeObjects(hosts, mode='create')
+
+	def host_updateObjects(self, hosts):
+		hosts = forceObjectClassList(hosts, Host)
+		for host in hosts:
+			ConfigDataBackend.host_updateObject(self, host)
+
+		logger.debug(u"Updating {0:d} hosts", len(hosts))
+		self._writeObjects(hosts, mode='update')
+
 	def host_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.host_getObjects(self, attributes, **filter)
 
@@ -1292,6 +1791,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating config: '%s'" % config.getIdent())  # pylint: disable=maybe-no-member
 		self._write(config, mode='update')
 
+	def config_insertObjects(self, configs):
+		configs = forceObjectClassList(configs, Config)
+		for config in configs:
+			ConfigDataBackend.config_insertObject(self, config)
+
+		logger.debug(u"Inserting {0:d} configs", len(configs))
+		self._writeObjects(configs, mode='create')
+
+	def config_updateObjects(self, configs):
+		configs = forceObjectClassList(configs, Config)
+		for config in configs:
+			ConfigDataBackend.config_updateObject(self, config)
+
+		logger.debug(u"Updating {0:d} configs", len(configs))
+		self._writeObjects(configs, mode='update')
+
 	def config_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.config_getObjects(self, attributes, **filter)
 
@@ -1319,6 +1834,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating configState: '%s'" % configState.getIdent())  # pylint: disable=maybe-no-member
 		self._write(configState, mode='update')
 
+	def configState_insertObjects(self, configStates):
+		configStates = forceObjectClassList(configStates, ConfigState)
+		for configState in configStates:
+			ConfigDataBackend.configState_insertObject(self, configState)
+
+		logger.debug(u"Inserting {0:d} configStates", len(configStates))
+		self._writeObjects(configStates, mode='create')
+
+	def configState_updateObjects(self, configStates):
+		configStates = forceObjectClassList(configStates, ConfigState)
+		for configState in configStates:
+			ConfigDataBackend.configState_updateObject(self, configState)
+
+		logger.debug(u"Updating {0:d} configStates", len(configStates))
+		self._writeObjects(configStates, mode='update')
+
 	def configState_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.configState_getObjects(self, attributes, **filter)
 
@@ -1346,6 +1877,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating product: '%s'" % product.getIdent())  # pylint: disable=maybe-no-member
 		self._write(product, mode='update')
 
+	def product_insertObjects(self, products):
+		products = forceObjectClassList(products, Product)
+		for product in products:
+			ConfigDataBackend.product_insertObject(self, product)
+
+		logger.debug(u"Inserting {0:d} products", len(products))
+		self._writeObjects(products, mode='create')
+
+	def product_updateObjects(self, products):
+		products = forceObjectClassList(products, Product)
+		for product in products:
+			ConfigDataBackend.product_updateObject(self, product)
+
+		logger.debug(u"Updating {0:d} products", len(products))
+		self._writeObjects(products, mode='update')
+
 	def product_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.product_getObjects(self, attributes, **filter)
 
@@ -1376,6 +1923,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating productProperty: '%s'" % productProperty.getIdent())  # pylint: disable=maybe-no-member
 		self._write(productProperty, mode='update')
 
+	def productProperty_insertObjects(self, productProperties):
+		productProperties = forceObjectClassList(productProperties, ProductProperty)
+		for productProperty in productProperties:
+			ConfigDataBackend.productProperty_insertObject(self, productProperty)
+
+		logger.debug(u"Inserting {0:d} productProperties", len(productProperties))
+		self._writeObjects(productProperties, mode='create')
+
+	def productProperty_updateObjects(self, productProperties):
+		productProperties = forceObjectClassList(productProperties, ProductProperty)
+		for productProperty in productProperties:
+			ConfigDataBackend.productProperty_updateObject(self, productProperty)
+
+		logger.debug(u"Updating {0:d} productProperties", len(productProperties))
+		self._writeObjects(productProperties, mode='update')
+
 	def productProperty_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.productProperty_getObjects(self, attributes, **filter)
 
@@ -1403,6 +1966,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating productDependency: '%s'" % productDependency.getIdent())  # pylint: disable=maybe-no-member
 		self._write(productDependency, mode='update')
 
+	def productDependency_insertObjects(self, productDependencies):
+		productDependencies = forceObjectClassList(productDependencies, ProductDependency)
+		for productDependency in productDependencies:
+			ConfigDataBackend.productDependency_insertObject(self, productDependency)
+
+		logger.debug(u"Inserting {0:d} productDependencies", len(productDependencies))
+		self._writeObjects(productDependencies, mode='create')
+
+	def productDependency_updateObjects(self, productDependencies):
+		productDependencies = forceObjectClassList(productDependencies, ProductDependency)
+		for productDependency in productDependencies:
+			ConfigDataBackend.productDependency_updateObject(self, productDependency)
+
+		logger.debug(u"Updating {0:d} productDependencies", len(productDependencies))
+		self._writeObjects(productDependencies, mode='update')
+
 	def productDependency_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.productDependency_getObjects(self, attributes=[], **filter)
 
@@ -1430,6 +2009,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating productOnDepot: '%s'" % productOnDepot.getIdent())  # pylint: disable=maybe-no-member
 		self._write(productOnDepot, mode='update')
 
+	def productOnDepot_insertObjects(self, productOnDepots):
+		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
+		for productOnDepot in productOnDepots:
+			ConfigDataBackend.productOnDepot_insertObject(self, productOnDepot)
+
+		logger.debug(u"Inserting {0:d} productOnDepots", len(productOnDepots))
+		self._writeObjects(productOnDepots, mode='create')
+
+	def productOnDepot_updateObjects(self, productOnDepots):
+		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
+		for productOnDepot in productOnDepots:
+			ConfigDataBackend.productOnDepot_updateObject(self, productOnDepot)
+
+		logger.debug(u"Updating {0:d} productOnDepots", len(productOnDepots))
+		self._writeObjects(productOnDepots, mode='update')
+
 	def productOnDepot_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.productOnDepot_getObjects(self, attributes=[], **filter)
 
@@ -1457,6 +2052,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating productOnClient: '%s'" % productOnClient.getIdent())  # pylint: disable=maybe-no-member
 		self._write(productOnClient, mode='update')
 
+	def productOnClient_insertObjects(self, productOnClients):
+		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
+		for productOnClient in productOnClients:
+			ConfigDataBackend.productOnClient_insertObject(self, productOnClient)
+
+		logger.debug(u"Inserting {0:d} productOnClients", len(productOnClients))
+		self._writeObjects(productOnClients, mode='create')
+
+	def productOnClient_updateObjects(self, productOnClients):
+		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
+		for productOnClient in productOnClients:
+			ConfigDataBackend.productOnClient_updateObject(self, productOnClient)
+
+		logger.debug(u"Updating {0:d} productOnClients", len(productOnClients))
+		self._writeObjects(productOnClients, mode='update')
+
 	def productOnClient_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.productOnClient_getObjects(self, attributes=[], **filter)
 
@@ -1484,6 +2095,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating productPropertyState: '%s'" % productPropertyState.getIdent())  # pylint: disable=maybe-no-member
 		self._write(productPropertyState, mode='update')
 
+	def productPropertyState_insertObjects(self, productPropertyStates):
+		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
+		for productPropertyState in productPropertyStates:
+			ConfigDataBackend.productPropertyState_insertObject(self, productPropertyState)
+
+		logger.debug(u"Inserting {0:d} productPropertyStates", len(productPropertyStates))
+		self._writeObjects(productPropertyStates, mode='create')
+
+	def productPropertyState_updateObjects(self, productPropertyStates):
+		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
+		for productPropertyState in productPropertyStates:
+			ConfigDataBackend.productPropertyState_updateObject(self, productPropertyState)
+
+		logger.debug(u"Updating {0:d} productPropertyStates", len(productPropertyStates))
+		self._writeObjects(productPropertyStates, mode='update')
+
 	def productPropertyState_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.productPropertyState_getObjects(self, attributes=[], **filter)
 
@@ -1538,6 +2165,22 @@ class FileBackend(ConfigDataBackend):
 		logger.debug(u"Updating objectToGroup: '%s'" % objectToGroup.getIdent())  # pylint: disable=maybe-no-member
 		self._write(objectToGroup, mode='update')
 
+	def objectToGroup_insertObjects(self, objectToGroups):
+		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
+		for objectToGroup in objectToGroups:
+			ConfigDataBackend.objectToGroup_insertObject(self, objectToGroup)
+
+		logger.debug(u"Inserting {0:d} objectToGroups", len(objectToGroups))
+		self._writeObjects(objectToGroups, mode='create')
+
+	def objectToGroup_updateObjects(self, objectToGroups):
+		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
+		for objectToGroup in objectToGroups:
+			ConfigDataBackend.objectToGroup_updateObject(self, objectToGroup)
+
+		logger.debug(u"Updating {0:d} objectToGroups", len(objectToGroups))
+		self._writeObjects(objectToGroups, mode='update')
+
 	def objectToGroup_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.objectToGroup_getObjects(self, attributes=[], **filter)
 
@@ -1604,7 +2247,7 @@ class FileBackend(ConfigDataBackend):
 			if value is None or attribute == 'type':
 				continue
 			ini.set(section, attribute, value)
-		iniFile.generate(ini)
+		self._generateFile(iniFile, ini)
 
 	def auditSoftware_updateObject(self, auditSoftware):
 		auditSoftware = forceObjectClass(auditSoftware, AuditSoftware)
@@ -1628,7 +2271,7 @@ class FileBackend(ConfigDataBackend):
 					if value is None:
 						continue
 					ini.set(section, key, self.__escape(value))
-				iniFile.generate(ini)
+				self._generateFile(iniFile, ini)
 				return
 
 		raise BackendMissingDataError(u"AuditSoftware %s not found" % auditSoftware)
@@ -1652,6 +2295,7 @@ class FileBackend(ConfigDataBackend):
 					if len(value) == 1 and value[0].find('*') == -1:
 						fastFilter[attribute] = value[0]
 
+		matchesFilter = compileFilter(filter)
 		result = []
 		for section in ini.sections():
 			objHash = {
@@ -1675,7 +2319,7 @@ class FileBackend(ConfigDataBackend):
 					objHash[key] = value
 				except Exception:
 					pass
-			if not fastFiltered and self._objectHashMatches(objHash, **filter):
+			if not fastFiltered and matchesFilter(objHash):
 				# TODO: adaptObjHash?
 				result.append(AuditSoftware.fromHash(objHash))
 
@@ -1710,7 +2354,7 @@ class FileBackend(ConfigDataBackend):
 		if removeSections:
 			for section in removeSections:
 				ini.remove_section(section)
-			iniFile.generate(ini)
+			self._generateFile(iniFile, ini)
 
 	# AuditSoftwareOnClients
 	def auditSoftwareOnClient_insertObject(self, auditSoftwareOnClient):
@@ -1765,7 +2409,7 @@ class FileBackend(ConfigDataBackend):
 			if value is None:
 				continue
 			ini.set(section, attribute, value)
-		iniFile.generate(ini)
+		self._generateFile(iniFile, ini)
 
 	def auditSoftwareOnClient_updateObject(self, auditSoftwareOnClient):
 		auditSoftwareOnClient = forceObjectClass(auditSoftwareOnClient, AuditSoftwareOnClient)
@@ -1789,7 +2433,7 @@ class FileBackend(ConfigDataBackend):
 					if value is None:
 						continue
 					ini.set(section, key, self.__escape(value))
-				iniFile.generate(ini)
+				self._generateFile(iniFile, ini)
 				return
 
 		raise BackendMissingDataError(u"auditSoftwareOnClient %s not found" % auditSoftwareOnClient)
@@ -1803,6 +2447,7 @@ class FileBackend(ConfigDataBackend):
 			if ident['clientId'] not in filenames:
 				filenames[ident['clientId']] = self._getConfigFile('AuditSoftwareOnClient', ident, 'sw')
 
+		matchesFilter = compileFilter(filter)
 		result = []
 		for (clientId, filename) in filenames.items():
 			if not os.path.exists(filename):
@@ -1832,7 +2477,7 @@ class FileBackend(ConfigDataBackend):
 					except Exception:
 						pass
 
-				if self._objectHashMatches(objHash, **filter):
+				if matchesFilter(objHash):
 					result.append(AuditSoftwareOnClient.fromHash(objHash))
 
 		return result
@@ -1870,7 +2515,7 @@ class FileBackend(ConfigDataBackend):
 			if removeSections:
 				for section in removeSections:
 					ini.remove_section(section)
-				iniFile.generate(ini)
+				self._generateFile(iniFile, ini)
 
 	# AuditHardwares
 	def auditHardware_insertObject(self, auditHardware):
@@ -1895,6 +2540,7 @@ class FileBackend(ConfigDataBackend):
 		if not os.path.exists(filename):
 			return []
 
+		matchesFilter = compileFilter(filter)
 		result = []
 		iniFile = IniFile(filename=filename)
 		ini = iniFile.parse()
@@ -1907,7 +2553,7 @@ class FileBackend(ConfigDataBackend):
 					objHash[str(option)] = self.__unescape(ini.get(section, option))
 
 			auditHardware = AuditHardware.fromHash(objHash)
-			if self._objectHashMatches(auditHardware.toHash(), **filter):
+			if matchesFilter(auditHardware.toHash()):
 				result.append(auditHardware)
 
 		return result
@@ -1944,6 +2590,7 @@ class FileBackend(ConfigDataBackend):
 			if ident['hostId'] not in filenames:
 				filenames[ident['hostId']] = self._getConfigFile('AuditHardwareOnHost', ident, 'hw')
 
+		matchesFilter = compileFilter(filter)
 		result = []
 		for (hostId, filename) in filenames.items():
 			if not os.path.exists(filename):
@@ -1962,7 +2609,7 @@ class FileBackend(ConfigDataBackend):
 						objHash[str(option)] = self.__unescape(ini.get(section, option))
 
 				auditHardwareOnHost = AuditHardwareOnHost.fromHash(objHash)
-				if self._objectHashMatches(auditHardwareOnHost.toHash(), **filter):
+				if matchesFilter(auditHardwareOnHost.toHash()):
 					result.append(auditHardwareOnHost)
 
 		return result
@@ -2043,4 +2690,4 @@ class FileBackend(ConfigDataBackend):
 			for (attribute, value) in objHash.items():
 				ini.set(sectionFound, attribute, self.__escape(value))
 
-		iniFile.generate(ini)
+		self._generateFile(iniFile, ini)
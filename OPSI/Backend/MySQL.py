@@ -31,6 +31,7 @@ import base64
 import warnings
 import time
 import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from hashlib import md5
 
@@ -57,6 +58,8 @@ logger = Logger()
 
 MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE = 2006
 # 2006: 'MySQL server has gone away'
+MYSQL_LOST_CONNECTION_ERROR_CODE = 2013
+# 2013: 'Lost connection to MySQL server during query'
 DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE = 1213
 # 1213: 'Deadlock found when trying to get lock; try restarting transaction'
 
@@ -86,9 +89,74 @@ def disableAutoCommit(sqlInstance):
 		logger.debug2(u'autoCommit set to true')
 
 
+def _isConnectionLost(error):
+	"""
+	Check if `error` was caused by losing the connection to the server.
+	"""
+	try:
+		return error.args[0] in (MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE, MYSQL_LOST_CONNECTION_ERROR_CODE)
+	except (AttributeError, IndexError):
+		return False
+
+
+class _ConnectionPoolStatistics(object):
+	"Counters about the usage of a `ConnectionPool`."
+
+	def __init__(self, capacity):
+		"""
+		:param capacity: The maximum number of connections or `None` \
+if there is no limit.
+		"""
+		self.capacity = capacity
+		self._lock = threading.Lock()
+		self._counters = {
+			'checkouts': 0,
+			'waits': 0,
+			'waitTime': 0.0,
+			'maxWaitTime': 0.0,
+			'timeouts': 0,
+			'reconnects': 0,
+			'retries': 0,
+		}
+
+	def isExhausted(self, checkedOut):
+		return self.capacity is not None and checkedOut >= self.capacity
+
+	def count(self, counter):
+		with self._lock:
+			self._counters[counter] += 1
+
+	def addWait(self, duration):
+		with self._lock:
+			self._counters['waits'] += 1
+			self._counters['waitTime'] += duration
+			self._counters['maxWaitTime'] = max(self._counters['maxWaitTime'], duration)
+
+	def toDict(self):
+		with self._lock:
+			return dict(self._counters)
+
+
 class ConnectionPool(object):
+	"""
+	Process wide pool of connections to the MySQL server.
+
+	Connections that were idle for a while are checked when they are
+	taken from the pool and replaced if the server closed them.
+	Connections older than the `recycle` seconds are replaced by the
+	pool aswell.
+	The usage of the pool is counted and can be read through
+	`getStatistics`.
+	"""
+
+	# Number of connections tried when checking out a connection
+	CHECKOUT_ATTEMPTS = 3
+	# Seconds after the last checkout until a connection is checked
+	PING_AFTER_IDLE = 30
+
 	# Storage for the instance reference
 	__instance = None
+	__statistics = None
 
 	def __init__(self, **kwargs):
 		""" Create singleton instance """
@@ -107,17 +175,123 @@ class ConnectionPool(object):
 			def getConnection():
 				return MySQLdb.connect(**kwargs)
 
+			# The defaults of the QueuePool are used if no values are given.
+			maxOverflow = poolArgs.get('max_overflow', 10)
+			capacity = None if maxOverflow < 0 else poolArgs.get('pool_size', 5) + maxOverflow
+
 			ConnectionPool.__instance = pool.QueuePool(getConnection, **poolArgs)
+			ConnectionPool.__statistics = _ConnectionPoolStatistics(capacity)
 			con = ConnectionPool.__instance.connect()
 			con.autocommit(False)
 			con.close()
 
 		# Store instance reference as the only member in the handle
 		self.__dict__['_ConnectionPool__instance'] = ConnectionPool.__instance
+		self.__dict__['_ConnectionPool__statistics'] = ConnectionPool.__statistics
 
 	def destroy(self):
 		logger.debug(u"Destroying ConnectionPool instance")
 		ConnectionPool.__instance = None
+		ConnectionPool.__statistics = None
+
+	def checkout(self):
+		"""
+		Get a working connection from the pool.
+
+		Connections that were not checked out within the last
+		`PING_AFTER_IDLE` seconds are checked with a ping before they
+		are returned. Connections that were closed by the server are
+		discarded and replaced by new ones.
+		Connections in frequent use are returned without a check.
+		If one of them was lost, the failing statement has to
+		`invalidate` it.
+
+		:raises BackendUnableToConnectError: If no working connection \
+could be found.
+		"""
+		lastError = None
+		for _ in range(self.CHECKOUT_ATTEMPTS):
+			mustWait = self.__statistics.isExhausted(self.__instance.checkedout())
+			start = time.time()
+			try:
+				conn = self.__instance.connect()
+			except Exception:
+				if mustWait:
+					self.__statistics.count('timeouts')
+				raise
+			finally:
+				if mustWait:
+					self.__statistics.addWait(time.time() - start)
+
+			self.__statistics.count('checkouts')
+			now = time.time()
+			lastCheckout = conn.info.get('lastCheckout')
+			conn.info['lastCheckout'] = now
+			if lastCheckout is not None and now - lastCheckout < self.PING_AFTER_IDLE:
+				return conn
+
+			try:
+				conn.ping()
+				return conn
+			except Exception as error:
+				logger.info(u"Replacing broken connection to MySQL server: {0!r}", error)
+				lastError = error
+				self.discard(conn)
+
+		raise BackendUnableToConnectError(u"No working connection to MySQL server: {0}".format(lastError))
+
+	def discard(self, conn):
+		"""
+		Close `conn` and remove it from the pool.
+
+		The pool will create a new connection instead.
+		"""
+		try:
+			conn.invalidate()
+			conn.close()
+		except Exception as error:
+			logger.debug(u"Failed to discard connection: {0!r}", error)
+
+		self.__statistics.count('reconnects')
+
+	def invalidate(self, conn):
+		"""
+		Mark the checked out `conn` as lost.
+
+		The connection can still be closed as usual. The pool will
+		connect again before handing it out the next time.
+		"""
+		try:
+			conn.invalidate(soft=True)
+		except Exception as error:
+			logger.debug(u"Failed to invalidate connection: {0!r}", error)
+
+		self.__statistics.count('reconnects')
+
+	def countRetry(self):
+		"Count a statement that was executed again after losing the connection."
+		self.__statistics.count('retries')
+
+	def getStatistics(self):
+		"""
+		Get counters about the usage of the pool.
+
+		Besides the current state of the pool this contains the numbers
+		of checkouts, checkouts that had to wait for a free connection,
+		the time spent waiting, checkouts that failed after waiting,
+		connections that were replaced and statements that were retried.
+
+		:rtype: dict
+		"""
+		statistics = self.__statistics.toDict()
+		statistics.update({
+			'size': self.__instance.size(),
+			'capacity': self.__statistics.capacity,
+			'checkedOut': self.__instance.checkedout(),
+			'checkedIn': self.__instance.checkedin(),
+			'overflow': self.__instance.overflow(),
+		})
+		return statistics
 
 	def __getattr__(self, attr):
 		""" Delegate access to implementation """
@@ -135,10 +309,16 @@ class MySQL(SQL):
 	ESCAPED_BACKSLASH = "\\\\"
 	ESCAPED_APOSTROPHE = "\\\'"
 	ESCAPED_ASTERISK = "\\*"
+	PARAMETER = u'%s'
+	MAX_PARAMETERS = 65535
+	ITER_SET_CHUNK_SIZE = 1000
+	# Bytes of max_allowed_packet not used for the values of a statement
+	PACKET_RESERVE = 4096
 
 	_POOL_LOCK = threading.Lock()
 
 	def __init__(self, **kwargs):
+		SQL.__init__(self, **kwargs)
 		self._address = u'localhost'
 		self._username = u'opsi'
 		self._password = u'opsi'
@@ -147,7 +327,9 @@ class MySQL(SQL):
 		self._connectionPoolSize = 20
 		self._connectionPoolMaxOverflow = 10
 		self._connectionPoolTimeout = 30
-		self._connectionPoolRecyclingSeconds = -1
+		# Replace connections before the server closes idle ones.
+		self._connectionPoolRecyclingSeconds = 3600
+		self._socket = None
 		self.autoCommit = True
 
 		# Parse arguments
@@ -171,9 +353,13 @@ class MySQL(SQL):
 				self._connectionPoolTimeout = forceInt(value)
 			elif option == 'connectionpoolrecycling':
 				self._connectionPoolRecyclingSeconds = forceInt(value)
+			elif option == 'socket':
+				self._socket = forceUnicode(value)
 
 		self._transactionLock = threading.Lock()
 		self._pool = None
+		self._uniqueKeys = {}
+		self._maxAllowedPacket = None
 		self._createConnectionPool()
 		logger.debug(u'MySQL created: %s' % self)
 
@@ -200,6 +386,10 @@ class MySQL(SQL):
 			conv[FIELD_TYPE.DATETIME] = str
 			conv[FIELD_TYPE.TIMESTAMP] = str
 
+			connectionArgs = {}
+			if self._socket:
+				connectionArgs['unix_socket'] = self._socket
+
 			for tryNumber in (1, 2):
 				try:
 					self._pool = ConnectionPool(
@@ -214,6 +404,7 @@ class MySQL(SQL):
 						timeout=self._connectionPoolTimeout,
 						conv=conv,
 						recycle=self._connectionPoolRecyclingSeconds,
+						**connectionArgs
 					)
 					logger.debug2("Created connection pool {0}", self._pool)
 					break
@@ -253,6 +444,10 @@ Defaults to :py:class:MySQLdb.cursors.DictCursor:.
 
 		cursorType = cursorType or MySQLdb.cursors.DictCursor
 
+		transactionConnection = getattr(self._transactions, 'connection', None)
+		if transactionConnection is not None:
+			return (transactionConnection, transactionConnection.cursor(cursorType))
+
 		# We create an connection pool in any case.
 		# If a pool exists the function will return very fast.
 		self._createConnectionPool()
@@ -262,7 +457,7 @@ Defaults to :py:class:MySQLdb.cursors.DictCursor:.
 				logger.debug2(u"Connecting to connection pool")
 				self._transactionLock.acquire()
 				logger.debug2(u"Connection pool status: {0}", self._pool.status())
-				conn = self._pool.connect()
+				conn = self._pool.checkout()
 				conn.autocommit(False)
 				cursor = conn.cursor(cursorType)
 				break
@@ -292,215 +487,319 @@ Defaults to :py:class:MySQLdb.cursors.DictCursor:.
 		return (conn, cursor)
 
 	def close(self, conn, cursor):
+		if conn is getattr(self._transactions, 'connection', None):
+			# The connection is kept until the transaction ends.
+			cursor.close()
+			return
+
 		try:
 			cursor.close()
 			conn.close()
 		finally:
 			self._transactionLock.release()
 
-	def getSet(self, query):
+	def getConnectionPoolStatistics(self):
+		"""
+		Get counters about the usage of the connection pool.
+
+		:rtype: dict
+		"""
+		self._createConnectionPool()
+		return self._pool.getStatistics()
+
+	def getSet(self, query, parameters=None):
 		logger.debug2(u"getSet: {0}", query)
-		(conn, cursor) = self.connect()
+		valueSet = self._executeQuery(query, parameters, getResult=lambda cursor: cursor.fetchall())
+		return valueSet or []
 
-		try:
+	def iterSet(self, query, parameters=None):
+		"""
+		Iterate over the rows returned by `query`.
+
+		The rows are fetched in chunks of `ITER_SET_CHUNK_SIZE` rows
+		through a server-side cursor on a connection of its own.
+		Inside of a transaction the rows are read at once through the
+		connection of the transaction.
+		If the connection to the server is lost before the first row
+		was read the query is executed again on a new connection.
+		"""
+		logger.debug2(u"iterSet: {0}", query)
+		if self._inTransaction():
+			for row in self.getSet(query, parameters):
+				yield row
+			return
+
+		self._createConnectionPool()
+
+		query = forceUnicode(query)
+		for tryNumber in (1, 2):
+			rowsRead = False
+			conn = self._pool.checkout()
 			try:
-				self.execute(query, conn, cursor)
-			except Exception as e:
-				logger.debug(u"Execute error: {!r}", e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
-					raise
+				cursor = conn.cursor(MySQLdb.cursors.SSDictCursor)
+				try:
+					if parameters is None:
+						cursor.execute(query)
+					else:
+						cursor.execute(query, tuple(parameters))
 
-				self.close(conn, cursor)
-				(conn, cursor) = self.connect()
-				self.execute(query, conn, cursor)
+					while True:
+						rows = cursor.fetchmany(self.ITER_SET_CHUNK_SIZE)
+						if not rows:
+							break
 
-			valueSet = cursor.fetchall()
-		finally:
-			self.close(conn, cursor)
+						rowsRead = True
+						for row in rows:
+							yield row
+				finally:
+					cursor.close()
+				return
+			except Exception as error:
+				logger.debug(u"Execute error: {0!r}", error)
+				if not _isConnectionLost(error):
+					raise
 
-		return valueSet or []
+				self._pool.invalidate(conn)
+				if tryNumber > 1 or rowsRead:
+					raise
+
+				logger.notice(u"Lost connection to MySQL server - executing query again")
+				self._pool.countRetry()
+			finally:
+				conn.close()
 
 	def getRows(self, query):
 		logger.debug2(u"getRows: {0}", query)
 		onlyAllowSelect(query)
 
-		(conn, cursor) = self.connect(cursorType=MySQLdb.cursors.Cursor)
-		valueSet = []
-		try:
-			try:
-				self.execute(query, conn, cursor)
-			except Exception as e:
-				logger.debug(u"Execute error: %s" % e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
-					raise
-
-				self.close(conn, cursor)
-				(conn, cursor) = self.connect(cursorType=MySQLdb.cursors.Cursor)
-				self.execute(query, conn, cursor)
-
-			valueSet = cursor.fetchall()
-			if not valueSet:
-				logger.debug(u"No result for query {0!r}", query)
-				valueSet = []
-		finally:
-			self.close(conn, cursor)
+		valueSet = self._executeQuery(
+			query, cursorType=MySQLdb.cursors.Cursor,
+			getResult=lambda cursor: cursor.fetchall()
+		)
+		if not valueSet:
+			logger.debug(u"No result for query {0!r}", query)
+			valueSet = []
 
 		return valueSet
 
-	def getRow(self, query, conn=None, cursor=None):
+	def getRow(self, query, conn=None, cursor=None, parameters=None):
 		logger.debug2(u"getRow: {0}", query)
-		closeConnection = True
-		if conn and cursor:
-			logger.debug(u"TRANSACTION: conn and cursor given, so we should not close the connection.")
-			closeConnection = False
+		row = self._executeQuery(
+			query, parameters, conn, cursor,
+			getResult=lambda cursor: cursor.fetchone()
+		)
+		if not row:
+			logger.debug(u"No result for query {0!r}", query)
+			row = {}
 		else:
-			(conn, cursor) = self.connect()
-
-		row = {}
-		try:
-			try:
-				self.execute(query, conn, cursor)
-			except Exception as e:
-				logger.debug(u"Execute error: {0!r}", e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
-					raise
-
-				self.close(conn, cursor)
-				(conn, cursor) = self.connect()
-				self.execute(query, conn, cursor)
+			logger.debug2(u"Result: {0!r}", row)
 
-			row = cursor.fetchone()
-			if not row:
-				logger.debug(u"No result for query {0!r}", query)
-				row = {}
-			else:
-				logger.debug2(u"Result: {0!r}", row)
-		finally:
-			if closeConnection:
-				self.close(conn, cursor)
 		return row
 
 	def insert(self, table, valueHash, conn=None, cursor=None):
-		closeConnection = True
+		query, parameters = self.getInsertStatement(table, valueHash)
+		logger.debug2(u"insert: {0}", query)
+		return self._executeQuery(
+			query, parameters, conn, cursor, idempotent=False,
+			getResult=lambda cursor: cursor.lastrowid
+		)
+
+	def _executeQuery(self, query, parameters=None, conn=None, cursor=None, cursorType=None, idempotent=True, getResult=None):
+		"""
+		Execute `query` and return what `getResult` returns for the cursor.
+
+		If `conn` and `cursor` are given these are used and the query
+		is not retried.
+		Otherwise a connection from the pool is used. If the connection
+		to the server is lost during the query it is executed again on
+		a new connection if the query is `idempotent`. Statements that
+		are not idempotent are not retried because the server may have
+		executed them already. Queries inside of a transaction are
+		not retried because the transaction is lost with the connection.
+		"""
 		if conn and cursor:
 			logger.debug(u"TRANSACTION: conn and cursor given, so we should not close the connection.")
-			closeConnection = False
-		else:
-			(conn, cursor) = self.connect()
+			self.execute(query, conn, cursor, parameters)
+			return getResult(cursor) if getResult else None
 
-		result = -1
-		try:
-			colNames = []
-			values = []
-			for (key, value) in valueHash.items():
-				colNames.append(u"`{0}`".format(key))
-				if value is None:
-					values.append(u"NULL")
-				elif isinstance(value, bool):
-					if value:
-						values.append(u"1")
-					else:
-						values.append(u"0")
-				elif isinstance(value, (float, long, int)):
-					values.append(u"{0}".format(value))
-				elif isinstance(value, str):
-					values.append(u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value.decode("utf-8")))))
-				else:
-					values.append(u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value))))
-
-			query = u'INSERT INTO `{0}` ({1}) VALUES ({2});'.format(table, ', '.join(colNames), ', '.join(values))
-			logger.debug2(u"insert: {0}", query)
+		for tryNumber in (1, 2):
+			(conn, cursor) = self.connect(cursorType)
 			try:
-				self.execute(query, conn, cursor)
-			except Exception as e:
-				logger.debug(u"Execute error: {0!r}", e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
+				self.execute(query, conn, cursor, parameters)
+				return getResult(cursor) if getResult else None
+			except Exception as error:
+				logger.debug(u"Execute error: {0!r}", error)
+				if self._inTransaction() or not _isConnectionLost(error):
+					# A lost connection of a transaction is invalidated
+					# when the transaction fails.
 					raise
 
+				self._pool.invalidate(conn)
+				if tryNumber > 1 or not idempotent:
+					raise
+
+				logger.notice(u"Lost connection to MySQL server - executing query again")
+				self._pool.countRetry()
+			finally:
 				self.close(conn, cursor)
-				(conn, cursor) = self.connect()
-				self.execute(query, conn, cursor)
-			result = cursor.lastrowid
-		finally:
-			if closeConnection:
-				self.close(conn, cursor)
-		return result
 
-	def update(self, table, where, valueHash, updateWhereNone=False):
-		(conn, cursor) = self.connect()
-		result = 0
-		try:
-			if not valueHash:
-				raise BackendBadValueError(u"No values given")
-			query = []
-			for (key, value) in valueHash.items():
-				if value is None:
-					if not updateWhereNone:
-						continue
+	def insertMany(self, table, valueHashes):
+		"""
+		Insert multiple rows into `table` within one transaction.
 
-					value = u"NULL"
-				elif isinstance(value, bool):
-					if value:
-						value = u"1"
-					else:
-						value = u"0"
-				elif isinstance(value, (float, long, int)):
-					value = u"%s" % value
-				elif isinstance(value, str):
-					value = u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value.decode("utf-8"))))
-				else:
-					value = u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value)))
+		Rows with the same columns are inserted with multi-row
+		statements that stay below the `max_allowed_packet` of the
+		server.
+		If inserting a row fails none of the rows will be inserted.
+		"""
+		self._executeMany(table, valueHashes, 'insert', self._createInsertStatement)
+
+	def upsertMany(self, table, valueHashes):
+		"""
+		Insert multiple rows into `table` or update the existing rows
+		with the same primary key within one transaction.
+		Rows are updated if they conflict with any unique key of
+		`table`, see `getUpsertKey`.
+
+		This uses multi-row `INSERT ... ON DUPLICATE KEY UPDATE`
+		statements that stay below the `max_allowed_packet` of the
+		server.
+		"""
+		self._executeMany(table, valueHashes, 'upsert', self._createUpsertStatement)
+
+	def _createUpsertStatement(self, table, columns):
+		return u'{insert} ON DUPLICATE KEY UPDATE {values};'.format(
+			insert=self._createInsertStatement(table, columns).rstrip(u';'),
+			values=u', '.join(
+				u'`{0}` = VALUES(`{0}`)'.format(column) for column in columns
+			)
+		)
+
+	def _executeMany(self, table, valueHashes, kind, createStatement):
+		rowsByColumns = OrderedDict()
+		for valueHash in valueHashes:
+			columns = tuple(sorted(valueHash))
+			rowsByColumns.setdefault(columns, []).append(
+				[self.toParameter(valueHash[column]) for column in columns]
+			)
+
+		if not rowsByColumns:
+			return
 
-				query.append(u"`{0}` = {1}".format(key, value))
+		statements = []
+		for columns, rows in rowsByColumns.items():
+			statement = self.getStatement(
+				(kind, table, columns),
+				lambda: createStatement(table, columns)
+			)
+			statements.append((statement, rows))
 
-			query = u"UPDATE `{0}` SET {1} WHERE {2};".format(table, ', '.join(query), where)
-			logger.debug2(u"update: {0}", query)
+		for tryNumber in (1, 2):
 			try:
-				self.execute(query, conn, cursor)
+				self._executeManyInTransaction(statements)
+				break
 			except Exception as e:
 				logger.debug(u"Execute error: {0!r}", e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
+				# Only upserting leads to the same rows if repeated.
+				if tryNumber > 1 or kind != 'upsert' or self._inTransaction() or not _isConnectionLost(e):
 					raise
 
-				self.close(conn, cursor)
-				(conn, cursor) = self.connect()
-				self.execute(query, conn, cursor)
-			result = cursor.rowcount
-		finally:
-			self.close(conn, cursor)
-		return result
+				logger.notice(u"Lost connection to MySQL server - executing {0} again", kind)
+				self._pool.countRetry()
 
-	def delete(self, table, where, conn=None, cursor=None):
-		if conn and cursor:
-			logger.debug(u"TRANSACTION: conn and cursor given, so we should not close the connection.")
-			closeConnection = False
-		else:
-			closeConnection = True
-			(conn, cursor) = self.connect()
+	def _executeManyInTransaction(self, statements):
+		with self.transaction():
+			with closingConnectionAndCursor(self) as (conn, cursor):
+				maxBatchSize = self._getMaxAllowedPacket(cursor) - self.PACKET_RESERVE
+				for statement, rows in statements:
+					for batch in self._splitIntoBatches(rows, maxBatchSize - len(statement)):
+						logger.debug2(u"{0} (with {1} rows)", statement, len(batch))
+						cursor.executemany(statement, batch)
+
+	def _getMaxAllowedPacket(self, cursor):
+		if self._maxAllowedPacket is None:
+			cursor.execute(u'SELECT @@max_allowed_packet AS `maxAllowedPacket`;')
+			self._maxAllowedPacket = forceInt(cursor.fetchone()['maxAllowedPacket'])
+
+		return self._maxAllowedPacket
+
+	@staticmethod
+	def _splitIntoBatches(rows, maxBatchSize):
+		"""
+		Split `rows` into batches whose statement stays below `maxBatchSize` bytes.
+
+		The size of a row is estimated pessimistically assuming that
+		every character of a string needs escaping and four bytes.
+		"""
+		batch = []
+		batchSize = 0
+		for row in rows:
+			rowSize = 4
+			for value in row:
+				if isinstance(value, basestring):
+					rowSize += 8 * len(value) + 4
+				else:
+					rowSize += 32
+
+			if batch and batchSize + rowSize > maxBatchSize:
+				yield batch
+				batch = []
+				batchSize = 0
+
+			batch.append(row)
+			batchSize += rowSize
+
+		if batch:
+			yield batch
 
-		result = 0
+	def _getUniqueKeys(self, table):
+		"Get the columns of the unique keys of `table` by the name of the key."
 		try:
-			query = u"DELETE FROM `%s` WHERE %s;" % (table, where)
-			logger.debug2(u"delete: {0}", query)
-			try:
-				self.execute(query, conn, cursor)
-			except Exception as e:
-				logger.debug(u"Execute error: {0}", e)
-				if e[0] != MYSQL_SERVER_HAS_GONE_AWAY_ERROR_CODE:
-					raise
+			return self._uniqueKeys[table]
+		except KeyError:
+			pass
 
-				self.close(conn, cursor)
-				conn, cursor = self.connect()
-				self.execute(query, conn, cursor)
+		uniqueKeys = {}
+		rows = self.getSet(u"SHOW KEYS FROM `{0}` WHERE `Non_unique` = 0;".format(table))
+		for row in sorted(rows, key=lambda row: row['Seq_in_index']):
+			uniqueKeys[row['Key_name']] = uniqueKeys.get(row['Key_name'], ()) + (row['Column_name'], )
+		self._uniqueKeys[table] = uniqueKeys
+		return uniqueKeys
 
-			result = cursor.rowcount
-		finally:
-			if closeConnection:
-				self.close(conn, cursor)
+	def getPrimaryKey(self, table):
+		return self._getUniqueKeys(table).get('PRIMARY', ())
+
+	def getUpsertKey(self, table):
+		"""
+		Get the primary key of `table` if it is the only unique key.
+
+		`ON DUPLICATE KEY UPDATE` updates the row that conflicts with
+		any unique key. Only with a single unique key this is the row
+		identified by the values of that key.
+		"""
+		uniqueKeys = self._getUniqueKeys(table)
+		if list(uniqueKeys) == ['PRIMARY']:
+			return uniqueKeys['PRIMARY']
 
-		return result
+		return ()
 
-	def execute(self, query, conn=None, cursor=None):
+	def update(self, table, where, valueHash, updateWhereNone=False, whereParameters=None):
+		if not valueHash:
+			raise BackendBadValueError(u"No values given")
+
+		query, parameters = self.getUpdateStatement(table, where, valueHash, updateWhereNone, whereParameters)
+		logger.debug2(u"update: {0}", query)
+		return self._executeQuery(query, parameters, getResult=lambda cursor: cursor.rowcount)
+
+	def delete(self, table, where, conn=None, cursor=None, parameters=None):
+		query = u"DELETE FROM `%s` WHERE %s;" % (table, where)
+		logger.debug2(u"delete: {0}", query)
+		return self._executeQuery(
+			query, parameters, conn, cursor,
+			getResult=lambda cursor: cursor.rowcount
+		)
+
+	def execute(self, query, conn=None, cursor=None, parameters=None):
 		if conn and cursor:
 			needClose = False
 		else:
@@ -511,14 +810,87 @@ Defaults to :py:class:MySQLdb.cursors.DictCursor:.
 		try:
 			query = forceUnicode(query)
 			logger.debug2(u"SQL query: {0}", query)
-			res = cursor.execute(query)
-			if self.autoCommit:
+			if parameters is None:
+				res = cursor.execute(query)
+			else:
+				res = cursor.execute(query, tuple(parameters))
+			if self.autoCommit and not self._inTransaction():
 				conn.commit()
 		finally:
 			if needClose:
 				self.close(conn, cursor)
 		return res
 
+	def executeInTransaction(self, statements):
+		"""
+		Execute multiple statements within one transaction.
+
+		If a statement fails none of the statements take effect.
+		The transaction is not retried if the connection to the server
+		is lost because it may have been committed already.
+
+		:param statements: Pairs of a query and the values for its \
+placeholders or `None`.
+		"""
+		statements = [
+			(forceUnicode(query), None if parameters is None else tuple(parameters))
+			for query, parameters in statements
+		]
+		if not statements:
+			return
+
+		with self.transaction():
+			with closingConnectionAndCursor(self) as (conn, cursor):
+				for query, parameters in statements:
+					logger.debug2(u"SQL query: {0}", query)
+					cursor.execute(query, parameters)
+
+	@contextmanager
+	def transaction(self):
+		"""
+		Execute the statements of the current thread inside of the
+		block within one transaction.
+
+		The statements use the same connection from the pool until the
+		block is left. If the block raises an exception none of the
+		statements take effect. Nested transactions use savepoints.
+		Changes of tables using the MyISAM engine are not part of
+		transactions and can not be rolled back.
+		"""
+		depth = getattr(self._transactions, 'depth', 0)
+		(conn, cursor) = self.connect()
+		if depth:
+			(begin, commit, rollback) = self._getSavepointStatements(depth)
+		else:
+			self._transactions.connection = conn
+			(begin, commit, rollback) = ([], [u'COMMIT;'], [u'ROLLBACK;'])
+
+		try:
+			for query in begin:
+				cursor.execute(query)
+
+			self._transactions.depth = depth + 1
+			try:
+				yield
+				for query in commit:
+					cursor.execute(query)
+			except Exception as error:
+				if not depth and _isConnectionLost(error):
+					self._pool.invalidate(conn)
+				for query in rollback:
+					cursor.execute(query)
+				raise
+			finally:
+				self._transactions.depth = depth
+		finally:
+			if not depth:
+				self._transactions.connection = None
+			self.close(conn, cursor)
+
+	def escapeCondition(self, condition):
+		# MySQLdb uses the Python string formatting for the placeholders.
+		return condition.replace(u'%', u'%%')
+
 	def getTables(self):
 		"""
 		Get what tables are present in the database.
@@ -610,6 +982,15 @@ class MySQLBackend(SQLBackend):
 
 		logger.debug(u'MySQLBackend created: %s' % self)
 
+	def backend_getConnectionPoolStatistics(self):
+		"""
+		Get counters about the usage of the pool of connections to the
+		MySQL server.
+
+		:rtype: dict
+		"""
+		return self._sql.getConnectionPoolStatistics()
+
 	def _showwarning(self, message, category, filename, lineno, line=None, file=None):
 		# logger.warning(u"%s (file: %s, line: %s)" % (message, filename, lineno))
 		if str(message).startswith('Data truncated for column'):
@@ -656,6 +1037,60 @@ class MySQLBackend(SQLBackend):
 		self._sql.execute(table)
 		self._sql.execute('CREATE INDEX `index_host_type` on `HOST` (`type`);')
 
+	_PROPERTY_VALUE_QUERY = (
+		u"select * from PRODUCT_PROPERTY_VALUE where "
+		u"`propertyId` = %s AND `productId` = %s AND "
+		u"`productVersion` = %s AND `packageVersion` = %s AND "
+		u"`value` = %s AND `isDefault` = %s"
+	)
+
+	@staticmethod
+	def _getPropertyValueParameters(data, value, isDefault):
+		return [
+			data['propertyId'], data['productId'],
+			data['productVersion'], data['packageVersion'],
+			value, isDefault
+		]
+
+	def _executeRetryingOnDeadlock(self, description, function, retries=10):
+		"""
+		Call `function` with a connection and cursor within a
+		serializable transaction and repeat it if the transaction
+		is aborted because of a deadlock.
+
+		Inside of another transaction `function` is not repeated
+		because a deadlock aborts the outer transaction aswell.
+		"""
+		for retry in range(retries):
+			try:
+				with self._sql.transaction():
+					with closingConnectionAndCursor(self._sql) as (conn, cursor):
+						cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL SERIALIZABLE")
+						logger.debug2(u'Start Transaction: {} #{}', description, retry)
+						function(conn, cursor)
+						logger.debug2(u'End Transaction')
+				return
+			except Exception as error:
+				logger.debug(u"Execute error: {!r}", error)
+				if error.args[0] != DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE:
+					logger.error(u'Unknown DB Error: {!r}', error)
+					raise
+				elif self._sql._inTransaction():
+					raise
+
+				logger.notice(
+					u'Table locked (Code {}) - restarting Transaction',
+					DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE
+				)
+				time.sleep(0.1)
+
+		errorMessage = u'Table locked (Code {}) - giving up after {} retries'.format(
+			DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE,
+			retries
+		)
+		logger.error(errorMessage)
+		raise BackendUnaccomplishableError(errorMessage)
+
 	# Overwriting productProperty_insertObject and
 	# productProperty_updateObject to implement Transaction
 	def productProperty_insertObject(self, productProperty):
@@ -665,148 +1100,53 @@ class MySQLBackend(SQLBackend):
 		possibleValues = data.pop('possibleValues') or []
 		defaultValues = data.pop('defaultValues') or []
 
-		where = self._uniqueCondition(productProperty)
-		if self._sql.getRow('select * from `PRODUCT_PROPERTY` where %s' % where):
-			self._sql.update('PRODUCT_PROPERTY', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(productProperty)
+		if self._sql.getRow('select * from `PRODUCT_PROPERTY` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_PROPERTY', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_PROPERTY', data)
 
-		with closingConnectionAndCursor(self._sql) as (conn, cursor):
-			retries = 10
-			for retry in range(retries):
-				try:
-					# transaction
-					cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL SERIALIZABLE")
-					with disableAutoCommit(self._sql):
-						logger.debug2(u'Start Transaction: delete from ppv #{}', retry)
-						conn.begin()
-						self._sql.delete('PRODUCT_PROPERTY_VALUE', where, conn, cursor)
-						conn.commit()
-						logger.debug2(u'End Transaction')
-						break
-				except Exception as deleteError:
-					logger.debug(u"Execute error: {}", deleteError)
-					if deleteError.args[0] == DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE:
-						logger.debug(
-							u'Table locked (Code {}) - restarting Transaction',
-							DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE
-						)
-						time.sleep(0.1)
-					else:
-						logger.error(u'Unknown DB Error: {!r}', deleteError)
-						raise
-			else:
-				errorMessage = u'Table locked (Code {}) - giving up after {} retries'.format(
-					DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE,
-					retries
-				)
-				logger.error(errorMessage)
-				raise BackendUnaccomplishableError(errorMessage)
-
-		with closingConnectionAndCursor(self._sql) as (conn, cursor):
-			for value in possibleValues:
-				# transform arguments for sql
-				# from uniqueCondition
-				if value in defaultValues:
-					myPPVdefault = u"`isDefault` = 1"
-				else:
-					myPPVdefault = u"`isDefault` = 0"
+		def deleteValues(conn, cursor):
+			self._sql.delete('PRODUCT_PROPERTY_VALUE', where, conn, cursor, whereParameters)
 
-				if isinstance(value, bool):
-					if value:
-						myPPVvalue = u"`value` = 1"
-					else:
-						myPPVvalue = u"`value` = 0"
-				elif isinstance(value, (float, long, int)):
-					myPPVvalue = u"`value` = %s" % (value)
-				else:
-					myPPVvalue = u"`value` = '%s'" % (self._sql.escapeApostrophe(self._sql.escapeBackslash(value)))
-				myPPVselect = (
-					u"select * from PRODUCT_PROPERTY_VALUE where "
-					u"`propertyId` = '{0}' AND `productId` = '{1}' AND "
-					u"`productVersion` = '{2}' AND "
-					u"`packageVersion` = '{3}' AND {4} AND {5}".format(
-						data['propertyId'],
-						data['productId'],
-						str(data['productVersion']),
-						str(data['packageVersion']),
-						myPPVvalue,
-						myPPVdefault
-					)
-				)
+		self._executeRetryingOnDeadlock(u'delete from ppv', deleteValues)
 
-				retries = 10
-				for retry in range(retries):
-					try:
-						# transaction
-						cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL SERIALIZABLE")
-						with disableAutoCommit(self._sql):
-							logger.debug2(u'Start Transaction: insert to ppv #{}', retry)
-							conn.begin()
-							if not self._sql.getRow(myPPVselect, conn, cursor):
-								self._sql.insert('PRODUCT_PROPERTY_VALUE', {
-									'productId': data['productId'],
-									'productVersion': data['productVersion'],
-									'packageVersion': data['packageVersion'],
-									'propertyId': data['propertyId'],
-									'value': value,
-									'isDefault': bool(value in defaultValues)
-									}, conn, cursor)
-								conn.commit()
-							else:
-								conn.rollback()
-							logger.debug2(u'End Transaction')
-							break
-					except Exception as insertError:
-						logger.debug(u"Execute error: {!r}", insertError)
-						if insertError.args[0] == DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE:
-							# 1213: May be table locked because of concurrent access - retrying
-							logger.notice(
-								u'Table locked (Code {}) - restarting Transaction'.format(
-									DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE
-								)
-							)
-							time.sleep(0.1)
-						else:
-							logger.error(u'Unknown DB Error: {!r}', insertError)
-							raise
-				else:
-					errorMessage = u'Table locked (Code {}) - giving up after {} retries'.format(
-						DEADLOCK_FOUND_WHEN_TRYING_TO_GET_LOCK_ERROR_CODE,
-						retries
-					)
-					logger.error(errorMessage)
-					raise BackendUnaccomplishableError(errorMessage)
+		for value in possibleValues:
+			valueParameters = self._getPropertyValueParameters(data, value, value in defaultValues)
+
+			def insertValue(conn, cursor):
+				if not self._sql.getRow(self._PROPERTY_VALUE_QUERY, conn, cursor, valueParameters):
+					self._sql.insert('PRODUCT_PROPERTY_VALUE', {
+						'productId': data['productId'],
+						'productVersion': data['productVersion'],
+						'packageVersion': data['packageVersion'],
+						'propertyId': data['propertyId'],
+						'value': value,
+						'isDefault': bool(value in defaultValues)
+						}, conn, cursor)
+
+			self._executeRetryingOnDeadlock(u'insert to ppv', insertValue)
 
 	def productProperty_updateObject(self, productProperty):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productProperty_updateObject(self, productProperty)
 		data = self._objectToDatabaseHash(productProperty)
-		where = self._uniqueCondition(productProperty)
+		where, whereParameters = self._uniqueConditionWithParameters(productProperty)
 		possibleValues = data.pop('possibleValues') or []
 		defaultValues = data.pop('defaultValues') or []
 
-		self._sql.update('PRODUCT_PROPERTY', where, data)
+		self._sql.update('PRODUCT_PROPERTY', where, data, whereParameters=whereParameters)
 
 		try:
-			self._sql.delete('PRODUCT_PROPERTY_VALUE', where)
+			self._sql.delete('PRODUCT_PROPERTY_VALUE', where, parameters=whereParameters)
 		except Exception as delError:
 			logger.debug2(u"Failed to delete from PRODUCT_PROPERTY_VALUE: {}", delError)
 
 		for value in possibleValues:
 			with disableAutoCommit(self._sql):
 				valuesExist = self._sql.getRow(
-					u"select * from PRODUCT_PROPERTY_VALUE where "
-					u"`propertyId` = '{0}' AND `productId` = '{1}' AND "
-					u"`productVersion` = '{2}' AND `packageVersion` = '{3}' "
-					u"AND `value` = '{4}' AND `isDefault` = {5}".format(
-						data['propertyId'],
-						data['productId'],
-						str(data['productVersion']),
-						str(data['packageVersion']),
-						value,
-						str(value in defaultValues)
-					)
+					self._PROPERTY_VALUE_QUERY,
+					parameters=self._getPropertyValueParameters(data, value, value in defaultValues)
 				)
 
 				if not valuesExist:
@@ -211,7 +211,7 @@ class BackendReplicator(object):
 				if objClass == 'Host':
 					subClasses = ['OpsiConfigserver', 'OpsiDepotserver', 'OpsiClient']
 
-				methodPrefix = eval("%s.backendMethodPrefix" % objClass)
+				methodPrefix = getObjectClass(objClass).backendMethodPrefix
 
 				self.__overallProgressSubject.setMessage(u"Replicating %s" % objClass)
 				self.__currentProgressSubject.setTitle(u"Replicating %s" % objClass)
@@ -263,7 +263,7 @@ class BackendReplicator(object):
 					logger.notice("Replicating class '%s', filter: %s" % (objClass, filter))
 					if not subClass:
 						subClass = objClass
-					Class = eval(subClass)
+					Class = getObjectClass(subClass)
 
 					self.__currentProgressSubject.reset()
 					self.__currentProgressSubject.setMessage(u"Reading objects")
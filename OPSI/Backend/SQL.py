@@ -29,28 +29,33 @@ databases and their implementation.
 :license: GNU Affero General Public License version 3
 """
 
+import atexit
 import base64
 import json
 import re
+import threading
 import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime
 from hashlib import md5
 
-from OPSI.Exceptions import (BackendConfigurationError, BackendMissingDataError,
-	BackendModuleDisabledError, BackendReferentialIntegrityError)
+from OPSI.Exceptions import (BackendBadValueError, BackendConfigurationError,
+	BackendMissingDataError, BackendModuleDisabledError,
+	BackendReferentialIntegrityError)
 from OPSI.Logger import Logger
-from OPSI.Types import (forceBool, forceUnicodeLower, forceOpsiTimestamp,
+from OPSI.Types import (forceBool, forceFloat, forceInt, forceUnicodeLower, forceOpsiTimestamp,
 	forceList, forceUnicode, forceUnicodeList, forceDict, forceObjectClassList)
 from OPSI.Object import (AuditHardware, AuditHardwareOnHost, AuditSoftware,
 	AuditSoftwareOnClient, AuditSoftwareToLicensePool, Config, ConfigState,
 	Entity, Group, Host, HostGroup, LicenseContract, LicenseOnClient,
-	LicensePool, ObjectToGroup, Product, ProductDependency, ProductGroup,
-	ProductOnClient, ProductOnDepot, ProductProperty, ProductPropertyState,
-	Relationship, SoftwareLicense, SoftwareLicenseToLicensePool,
-	mandatoryConstructorArgs)
-from OPSI.Backend.Backend import BackendModificationListener, ConfigDataBackend
-from OPSI.Util import timestamp, getPublicKey
+	LicensePool, ObjectToGroup, OpsiClient, OpsiDepotserver, Product,
+	ProductDependency, ProductGroup, ProductOnClient, ProductOnDepot,
+	ProductProperty, ProductPropertyState, Relationship, SoftwareLicense,
+	SoftwareLicenseToLicensePool, mandatoryConstructorArgs)
+from OPSI.Backend.Backend import (
+	BULK_QUERY_SIZE, BackendModificationListener, ConfigDataBackend)
+from OPSI.Util import chunk, timestamp, getPublicKey
 
 __all__ = (
 	'timeQuery', 'onlyAllowSelect', 'SQL', 'SQLBackend',
@@ -99,9 +104,15 @@ class SQL(object):
 	ESCAPED_UNDERSCORE = "\\_"
 	ESCAPED_PERCENT = "\\%"
 	ESCAPED_ASTERISK = "\\*"
+	PARAMETER = u'%s'
+	LIKE_ESCAPE = u''
+	STATEMENT_CACHE_SIZE = 500
+	# Maximum number of placeholders in one statement
+	MAX_PARAMETERS = 999
 
 	def __init__(self, **kwargs):
-		pass
+		self._statements = {}
+		self._transactions = threading.local()
 
 	def connect(self):
 		pass
@@ -109,27 +120,109 @@ class SQL(object):
 	def close(self, conn, cursor):
 		pass
 
-	def getSet(self, query):
+	def getSet(self, query, parameters=None):
 		return []
 
-	def getRow(self, query):
+	def iterSet(self, query, parameters=None):
+		"""
+		Iterate over the rows returned by `query`.
+
+		Implementations should overwrite this if they are able to
+		fetch the rows without keeping all of them in memory.
+		Other queries may be executed while iterating.
+		"""
+		for row in self.getSet(query, parameters):
+			yield row
+
+	def getRow(self, query, parameters=None):
 		return {}
 
 	def insert(self, table, valueHash):
 		return -1
 
-	def update(self, table, where, valueHash, updateWhereNone=False):
+	def insertMany(self, table, valueHashes):
+		"""
+		Insert multiple rows into `table`.
+
+		Implementations should overwrite this if they are able to insert
+		multiple rows faster than one by one.
+		"""
+		for valueHash in valueHashes:
+			self.insert(table, valueHash)
+
+	def getUpsertKey(self, table):
+		"""
+		Get the names of the columns that identify the rows of `table`
+		when inserting or updating them through `upsertMany`.
+
+		An empty tuple is returned if rows of `table` can not be
+		upserted. Implementations returning columns for a table have
+		to provide `upsertMany(table, valueHashes)`.
+
+		:rtype: tuple
+		"""
+		return ()
+
+	def update(self, table, where, valueHash, updateWhereNone=False, whereParameters=None):
 		return 0
 
-	def delete(self, table, where):
+	def delete(self, table, where, parameters=None):
 		return 0
 
 	def getTables(self):
 		return {}
 
-	def execute(self, query, conn=None, cursor=None):
+	def execute(self, query, conn=None, cursor=None, parameters=None):
 		return None
 
+	def executeInTransaction(self, statements):
+		"""
+		Execute multiple statements within one transaction.
+
+		Implementations should overwrite this if they support
+		transactions. Then none of the statements take effect if one
+		of them fails.
+
+		:param statements: Pairs of a query and the values for its \
+placeholders or `None`.
+		"""
+		for query, parameters in statements:
+			self.execute(query, parameters=parameters)
+
+	@contextmanager
+	def transaction(self):
+		"""
+		Execute the statements of the current thread inside of the
+		block within one transaction.
+
+		If the block raises an exception none of the statements take
+		effect. Transactions can be nested.
+		Implementations should overwrite this if they support
+		transactions.
+		"""
+		yield
+
+	def _inTransaction(self):
+		"Check if the current thread is inside of a transaction."
+		return getattr(self._transactions, 'depth', 0) > 0
+
+	@staticmethod
+	def _getSavepointStatements(depth):
+		"""
+		Get the statements to begin, commit and roll back a transaction
+		nested `depth` levels deep through a savepoint.
+
+		:returns: Lists of statements for beginning, committing and \
+rolling back.
+		"""
+		savepoint = u'opsi_transaction_{0:d}'.format(depth)
+		release = u'RELEASE SAVEPOINT {0};'.format(savepoint)
+		return (
+			[u'SAVEPOINT {0};'.format(savepoint)],
+			[release],
+			[u'ROLLBACK TO SAVEPOINT {0};'.format(savepoint), release]
+		)
+
 	def query(self, query, conn=None, cursor=None):
 		return self.execute(query)
 
@@ -151,16 +244,161 @@ class SQL(object):
 	def escapeAsterisk(self, string):
 		return string.replace('*', self.ESCAPED_ASTERISK)
 
+	def quote(self, value):
+		"""
+		Get the representation of `value` as a literal in a statement.
+
+		:rtype: unicode
+		"""
+		if value is None:
+			return u'NULL'
+		elif isinstance(value, bool):
+			return u'1' if value else u'0'
+		elif isinstance(value, (float, long, int)):
+			return u'{0}'.format(value)
+		elif isinstance(value, str):
+			value = value.decode('utf-8')
+
+		return u"'{0}'".format(self.escapeApostrophe(self.escapeBackslash(value)))
+
+	@staticmethod
+	def toParameter(value):
+		"""
+		Get `value` in the form it is bound to a placeholder.
+		"""
+		if isinstance(value, str):
+			return value.decode('utf-8')
+
+		return value
+
+	def getStatement(self, key, createStatement):
+		"""
+		Get a statement with placeholders from the statement cache.
+
+		Statements are identified by their shape, i.e. the table and
+		the columns they use. If there is no statement for `key` it
+		will be created by calling `createStatement` without arguments.
+		"""
+		try:
+			return self._statements[key]
+		except KeyError:
+			pass
+
+		statement = createStatement()
+		if len(self._statements) >= self.STATEMENT_CACHE_SIZE:
+			self._statements.clear()
+		self._statements[key] = statement
+		return statement
+
+	def _createInsertStatement(self, table, columns):
+		return u'INSERT INTO `{table}` ({columns}) VALUES ({values});'.format(
+			table=table,
+			columns=u', '.join(u'`{0}`'.format(column) for column in columns),
+			values=u', '.join([self.PARAMETER] * len(columns))
+		)
+
+	def getInsertStatement(self, table, valueHash):
+		"""
+		Get the statement for inserting `valueHash` into `table`.
+
+		:returns: The statement and the values for its placeholders.
+		:rtype: (unicode, [value, ])
+		"""
+		columns = tuple(sorted(valueHash))
+		statement = self.getStatement(
+			('insert', table, columns),
+			lambda: self._createInsertStatement(table, columns)
+		)
+		return statement, [self.toParameter(valueHash[column]) for column in columns]
+
+	def getUpdateStatement(self, table, where, valueHash, updateWhereNone=False, whereParameters=None):
+		"""
+		Get the statement for updating the rows of `table` matching `where`.
+
+		If `whereParameters` is `None` the condition is expected to \
+contain no placeholders.
+
+		:raises BackendBadValueError: If there are no values to set.
+		:returns: The statement and the values for its placeholders.
+		:rtype: (unicode, [value, ])
+		"""
+		columns = tuple(sorted(
+			column for column, value in valueHash.items()
+			if value is not None or updateWhereNone
+		))
+		if not columns:
+			raise BackendBadValueError(u"No values given")
+
+		def createStatement(condition):
+			return u"UPDATE `{table}` SET {values} WHERE {condition};".format(
+				table=table,
+				values=u', '.join(
+					u'`{0}` = {1}'.format(column, self.PARAMETER)
+					for column in columns
+				),
+				condition=condition
+			)
+
+		parameters = [self.toParameter(valueHash[column]) for column in columns]
+		if whereParameters is None:
+			statement = createStatement(self.escapeCondition(where))
+		else:
+			statement = self.getStatement(('update', table, columns, where), lambda: createStatement(where))
+			parameters.extend(self.toParameter(value) for value in whereParameters)
+
+		return statement, parameters
+
+	def escapeCondition(self, condition):
+		"""
+		Make a condition without placeholders usable in a statement \
+that has placeholders.
+		"""
+		return condition
+
 
 class SQLBackendObjectModificationTracker(BackendModificationListener):
+	"""
+	Records the modifications of objects in a database table.
+
+	With a `bufferSize` greater than zero modifications are collected
+	in memory and written in batches by a background thread. A batch is
+	written if `bufferSize` modifications are waiting or if the oldest
+	one waits for `flushInterval` seconds. `flush` writes waiting
+	modifications immediately and `close` writes them and stops the
+	thread. Modifications are always written before they are read or
+	cleared through the tracker.
+
+	If `lastModificationOnly` is set only the latest modification of
+	an object is kept. Modifications of the same object that are
+	waiting to be written are then combined into one.
+
+	The time of a modification is stored in milliseconds since the
+	epoch in `modificationTime` and as timestamp in `date`.
+	"""
+
 	def __init__(self, **kwargs):
 		BackendModificationListener.__init__(self)
 		self._sql = None
 		self._lastModificationOnly = False
+		self._bufferSize = 0
+		self._flushInterval = 1.0
 		for (option, value) in kwargs.items():
 			option = option.lower()
 			if option == 'lastmodificationonly':
 				self._lastModificationOnly = forceBool(value)
+			elif option == 'buffersize':
+				self._bufferSize = forceInt(value)
+			elif option == 'flushinterval':
+				self._flushInterval = forceFloat(value)
+
+		self._buffer = OrderedDict()
+		self._bufferedModifications = 0
+		self._lastModificationTime = 0
+		self._bufferLock = threading.Lock()
+		self._flushLock = threading.Lock()
+		self._flushRequested = threading.Event()
+		self._flushThread = None
+		self._closed = False
 
 	def _createTables(self):
 		tables = self._sql.getTables()
@@ -172,6 +410,7 @@ class SQLBackendObjectModificationTracker(BackendModificationListener):
 					`objectClass` varchar(128) NOT NULL,
 					`ident` varchar(1024) NOT NULL,
 					`date` TIMESTAMP,
+					`modificationTime` BIGINT NOT NULL,
 					PRIMARY KEY (`id`)
 				) %s;
 				''' % self._sql.getTableCreationOptions('OBJECT_MODIFICATION_TRACKER')
@@ -179,35 +418,196 @@ class SQLBackendObjectModificationTracker(BackendModificationListener):
 			self._sql.execute(table)
 			self._sql.execute('CREATE INDEX `objectClass` on `OBJECT_MODIFICATION_TRACKER` (`objectClass`);')
 			self._sql.execute('CREATE INDEX `ident` on `OBJECT_MODIFICATION_TRACKER` (`ident`);')
-			self._sql.execute('CREATE INDEX `date` on `OBJECT_MODIFICATION_TRACKER` (`date`);')
+			self._sql.execute('CREATE INDEX `modificationTime` on `OBJECT_MODIFICATION_TRACKER` (`modificationTime`);')
+		elif 'modificationTime' not in tables['OBJECT_MODIFICATION_TRACKER']:
+			self._addModificationTime()
+
+	def _addModificationTime(self):
+		logger.notice(u"Adding column 'modificationTime' on table OBJECT_MODIFICATION_TRACKER")
+		self._sql.execute('ALTER TABLE `OBJECT_MODIFICATION_TRACKER` ADD `modificationTime` BIGINT;')
+
+		dates = [row['date'] for row in self._sql.getSet('SELECT DISTINCT `date` FROM `OBJECT_MODIFICATION_TRACKER`;')]
+		for date in dates:
+			self._sql.update(
+				'OBJECT_MODIFICATION_TRACKER',
+				'`date` = {0}'.format(self._sql.PARAMETER),
+				{'modificationTime': self._toModificationTime(date)},
+				whereParameters=[date]
+			)
+		self._sql.execute('CREATE INDEX `modificationTime` on `OBJECT_MODIFICATION_TRACKER` (`modificationTime`);')
+
+	@staticmethod
+	def _toModificationTime(date):
+		"""
+		Get the milliseconds since the epoch for `date`.
+
+		`date` may be given as seconds since the epoch, as `datetime`
+		or as opsi timestamp in local time.
+
+		:rtype: int
+		"""
+		if isinstance(date, (int, long, float)):
+			return int(date * 1000)
+		elif isinstance(date, datetime):
+			return int(time.mktime(date.timetuple()) * 1000)
+
+		date = forceOpsiTimestamp(date)
+		if date.startswith(u'0000'):
+			return 0
+		return int(time.mktime(time.strptime(date, '%Y-%m-%d %H:%M:%S')) * 1000)
 
 	def _trackModification(self, command, obj):
 		command = forceUnicodeLower(command)
 		if command not in ('insert', 'update', 'delete'):
 			raise ValueError(u"Unhandled command {0!r}".format(command))
 
-		data = {
-			'command': command,
-			'objectClass': obj.__class__.__name__,
-			'ident': obj.getIdent(),
-			'date': timestamp()
-		}
+		objectClass = obj.__class__.__name__
+		ident = obj.getIdent()
+		with self._bufferLock:
+			# Taking the time while holding the lock keeps the times in
+			# the order in which the modifications are recorded.
+			now = time.time()
+			modificationTime = max(int(now * 1000), self._lastModificationTime)
+			self._lastModificationTime = modificationTime
+
+			if self._lastModificationOnly:
+				key = (objectClass, ident)
+				self._buffer.pop(key, None)
+			else:
+				key = self._bufferedModifications
+			self._bufferedModifications += 1
+
+			self._buffer[key] = {
+				'command': command,
+				'objectClass': objectClass,
+				'ident': ident,
+				'date': timestamp(now),
+				'modificationTime': modificationTime
+			}
+			bufferFull = len(self._buffer) >= self._bufferSize
+
+		if self._bufferSize <= 0 or self._closed:
+			self.flush()
+		else:
+			self._startFlushThread()
+			if bufferFull:
+				self._flushRequested.set()
+
+	def _startFlushThread(self):
+		if self._flushThread is not None:
+			return
+
+		with self._flushLock:
+			if self._flushThread is not None:
+				return
+
+			self._flushThread = threading.Thread(
+				target=self._flushPeriodically,
+				name=u'ModificationTrackerFlush'
+			)
+			self._flushThread.daemon = True
+			self._flushThread.start()
+			atexit.register(self.close)
+
+	def _flushPeriodically(self):
+		while not self._closed:
+			self._flushRequested.wait(self._flushInterval)
+			self._flushRequested.clear()
+			try:
+				self.flush()
+			except Exception as error:
+				logger.error(u"Failed to write tracked modifications: {0}", error)
+
+	def flush(self):
+		"""
+		Write all modifications that are waiting to be written.
+		"""
+		with self._flushLock:
+			with self._bufferLock:
+				modifications = self._buffer.values()
+				self._buffer = OrderedDict()
+
+			if not modifications:
+				return
+
+			start = time.time()
+			try:
+				self._writeModifications(modifications)
+			except Exception:
+				self._restoreModifications(modifications)
+				raise
+
+			logger.debug(u"Took {0:0.2f} seconds to track {1} modifications", time.time() - start, len(modifications))
+
+	def _writeModifications(self, modifications):
 		if self._lastModificationOnly:
-			objectClass = data['objectClass']
-			ident = self._sql.escapeApostrophe(self._sql.escapeBackslash(data['ident']))
-			self._sql.delete('OBJECT_MODIFICATION_TRACKER', "`objectClass` = '%s' AND `ident` = '%s'" % (objectClass, ident))
-		start = time.time()
-		self._sql.insert('OBJECT_MODIFICATION_TRACKER', data)
-		logger.debug(u"Took %0.2f seconds to track modification of objectClass %s, ident %s" % ((time.time() - start), data['objectClass'], data['ident']))
+			identsByClass = OrderedDict()
+			for modification in modifications:
+				identsByClass.setdefault(modification['objectClass'], []).append(modification['ident'])
+
+			for objectClass, idents in identsByClass.items():
+				for identChunk in chunk(idents, BULK_QUERY_SIZE):
+					self._sql.delete(
+						'OBJECT_MODIFICATION_TRACKER',
+						'`objectClass` = {0} AND `ident` IN ({1})'.format(
+							self._sql.PARAMETER,
+							u', '.join([self._sql.PARAMETER] * len(identChunk))
+						),
+						parameters=[objectClass] + list(identChunk)
+					)
+
+		self._sql.insertMany('OBJECT_MODIFICATION_TRACKER', modifications)
+
+	def _restoreModifications(self, modifications):
+		"Put modifications that could not be written in front of the buffer."
+		with self._bufferLock:
+			newerModifications = self._buffer
+			self._buffer = OrderedDict()
+			for index, modification in enumerate(modifications):
+				if self._lastModificationOnly:
+					key = (modification['objectClass'], modification['ident'])
+					if key in newerModifications:
+						continue
+				else:
+					key = -len(modifications) + index
+				self._buffer[key] = modification
+			self._buffer.update(newerModifications)
+
+	def close(self):
+		"""
+		Write the waiting modifications and stop the background thread.
+
+		Modifications tracked afterwards are written immediately.
+		"""
+		self._closed = True
+		self._flushRequested.set()
+		flushThread = self._flushThread
+		if flushThread is not None and flushThread is not threading.current_thread():
+			flushThread.join()
+		self.flush()
 
 	def getModifications(self, sinceDate=0):
-		return self._sql.getSet("SELECT * FROM `OBJECT_MODIFICATION_TRACKER` WHERE `date` > '%s'" % forceOpsiTimestamp(sinceDate))
+		"""
+		Get the modifications after `sinceDate` in the order they \
+were made.
+
+		:param sinceDate: Seconds since the epoch, a `datetime` or an \
+opsi timestamp.
+		"""
+		self.flush()
+		return self._sql.getSet(
+			"SELECT * FROM `OBJECT_MODIFICATION_TRACKER` WHERE `modificationTime` > {0} ORDER BY `id`".format(self._sql.PARAMETER),
+			[self._toModificationTime(sinceDate)]
+		)
 
 	def clearModifications(self, objectClass=None, sinceDate=0):
-		where = "`date` > '%s'" % forceOpsiTimestamp(sinceDate)
+		self.flush()
+		where = "`modificationTime` > {0}".format(self._sql.PARAMETER)
+		parameters = [self._toModificationTime(sinceDate)]
 		if objectClass:
-			where = ''.join((where, 'AND `objectClass` = "{0}"'.format(objectClass)))
-		self._sql.execute("DELETE FROM `OBJECT_MODIFICATION_TRACKER` WHERE %s" % where)
+			where += " AND `objectClass` = {0}".format(self._sql.PARAMETER)
+			parameters.append(forceUnicode(objectClass))
+		self._sql.delete('OBJECT_MODIFICATION_TRACKER', where, parameters=parameters)
 
 	def objectInserted(self, backend, obj):
 		self._trackModification('insert', obj)
@@ -220,6 +620,142 @@ class SQLBackendObjectModificationTracker(BackendModificationListener):
 			self._trackModification('delete', obj)
 
 
+class _AuditHardwareClass(object):
+	"""
+	Tables and columns of a hardware class in the database.
+
+	These are derived once from the audit hardware configuration so
+	that queries do not have to process the configuration again.
+	"""
+
+	HOST_ATTRIBUTES = ('hostId', 'state', 'firstseen', 'lastseen')
+
+	def __init__(self, name, values):
+		"""
+		:param name: The name of the hardware class.
+		:param values: The type and scope of each attribute.
+		:type values: {attribute: {'Type': type, 'Scope': scope}}
+		"""
+		self.name = name
+		self.deviceTable = u'HARDWARE_DEVICE_{0}'.format(name)
+		self.configTable = u'HARDWARE_CONFIG_{0}'.format(name)
+		self.attributes = tuple(sorted(values))
+		self._knownAttributes = frozenset(values)
+		self.deviceAttributes = frozenset(
+			attribute for attribute, valueInfo in values.items()
+			if valueInfo.get('Scope') == 'g'
+		)
+		self.configAttributes = frozenset(self.HOST_ATTRIBUTES).union(
+			attribute for attribute, valueInfo in values.items()
+			if valueInfo.get('Scope') == 'i'
+		)
+		self.hardwareAttributes = tuple(
+			attribute for attribute in self.attributes
+			if values[attribute].get('Scope') != 'i'
+		)
+		self._configColumns = tuple(
+			attribute for attribute in self.HOST_ATTRIBUTES + self.attributes
+			if attribute in self.configAttributes
+		)
+		self._joinSelects = {}
+		self._coercers = tuple(
+			(attribute, self._getCoercer(values[attribute].get('Type', u'')))
+			for attribute in self.attributes
+		)
+
+	@staticmethod
+	def _getCoercer(attributeType):
+		"""
+		Get a function converting a value like `AuditHardwareOnHost` \
+does for an attribute of type `attributeType`.
+		"""
+		if attributeType.startswith('varchar'):
+			try:
+				size = int(attributeType.split('(')[1].split(')')[0].strip())
+			except (ValueError, IndexError):
+				size = None
+
+			def coerceText(value):
+				value = forceUnicode(value).strip()
+				if size is not None and len(value) > size:
+					value = value[:size].strip()
+				return value or None
+
+			return coerceText
+		elif 'int' in attributeType:
+			return forceInt
+		elif attributeType == 'double':
+			return forceFloat
+
+		return lambda value: value
+
+	def getInventoryKey(self, values):
+		"""
+		Get the values identifying hardware on a host with the same \
+types for data read from the database and received from a client.
+
+		:param values: A hash of hardware on a host.
+		:rtype: tuple
+		"""
+		key = []
+		for attribute, coerce in self._coercers:
+			value = values.get(attribute)
+			if value is not None:
+				try:
+					value = coerce(value)
+				except ValueError:
+					value = None
+			key.append(value)
+
+		return tuple(key)
+
+	def getUnknownAttributes(self, attributes, hostAttributes=False):
+		"""
+		Get the attributes that are not part of this hardware class.
+
+		:param hostAttributes: Treat the attributes of the hardware \
+on a host as known.
+		:rtype: list
+		"""
+		return [
+			attribute for attribute in attributes
+			if attribute not in self._knownAttributes
+			and not (hostAttributes and attribute in self.HOST_ATTRIBUTES)
+		]
+
+	def getJoinQuery(self, attributes, condition, withConfigId=False):
+		"""
+		Get the query for the hardware of hosts joined with the hardware
+		devices.
+
+		All attributes of the devices are selected. Of the attributes
+		of the hardware on hosts only those in `attributes` are \
+selected or all if `attributes` is empty.
+
+		:param withConfigId: Also select the `config_id` of the rows.
+		"""
+		key = (tuple(attributes), withConfigId)
+		try:
+			select = self._joinSelects[key]
+		except KeyError:
+			configColumns = [
+				column for column in self._configColumns
+				if not attributes or column in attributes
+			]
+			if withConfigId:
+				configColumns.insert(0, u'config_id')
+			select = u'select `d`.*{columns} from `{configTable}` `c` join `{deviceTable}` `d` on `d`.`hardware_id` = `c`.`hardware_id`'.format(
+				columns=u''.join(u', `c`.`{0}`'.format(column) for column in configColumns),
+				configTable=self.configTable,
+				deviceTable=self.deviceTable
+			)
+			self._joinSelects[key] = select
+
+		if condition:
+			return u'{0} where {1}'.format(select, condition)
+		return select
+
+
 class SQLBackend(ConfigDataBackend):
 
 	_OPERATOR_IN_CONDITION_PATTERN = re.compile(r'^\s*([>=<]+)\s*(\d\.?\d*)')
@@ -230,11 +766,14 @@ class SQLBackend(ConfigDataBackend):
 		ConfigDataBackend.__init__(self, **kwargs)
 
 		self._sql = None
+		self._hostsWithRemovedData = threading.local()
 		self._auditHardwareConfig = {}
 		self._setAuditHardwareConfig(self.auditHardware_getConfig())
 
 	def _setAuditHardwareConfig(self, config):
 		self._auditHardwareConfig = {}
+		self._auditHardwareClasses = OrderedDict()
+		self._auditHardwareClassMatches = {}
 		for conf in config:
 			hwClass = conf['Class']['Opsi']
 			self._auditHardwareConfig[hwClass] = {}
@@ -243,6 +782,39 @@ class SQLBackend(ConfigDataBackend):
 					'Type': value["Type"],
 					'Scope': value["Scope"]
 				}
+			self._auditHardwareClasses[hwClass] = _AuditHardwareClass(hwClass, self._auditHardwareConfig[hwClass])
+
+	def _getAuditHardwareClasses(self, hardwareClass):
+		"""
+		Get the hardware classes matching the filter `hardwareClass`.
+
+		:returns: All classes if there is no filter.
+		:rtype: [_AuditHardwareClass, ]
+		"""
+		if hardwareClass in ([], None):
+			return list(self._auditHardwareClasses.values())
+
+		matchingClasses = OrderedDict()
+		for hwc in forceUnicodeList(hardwareClass):
+			try:
+				classNames = self._auditHardwareClassMatches[hwc]
+			except KeyError:
+				if u'*' in hwc:
+					regex = re.compile(u'^{0}$'.format(hwc.replace('*', '.*')))
+					classNames = tuple(name for name in self._auditHardwareClasses if regex.search(name))
+				else:
+					classNames = (hwc, ) if hwc in self._auditHardwareClasses else ()
+				self._auditHardwareClassMatches[hwc] = classNames
+
+			for name in classNames:
+				matchingClasses[name] = self._auditHardwareClasses[name]
+
+		return list(matchingClasses.values())
+
+	@contextmanager
+	def _transaction(self):
+		with self._sql.transaction():
+			yield
 
 	def _requiresEnabledSQLBackendModule(self):
 		"""
@@ -256,9 +828,38 @@ class SQLBackend(ConfigDataBackend):
 	def _filterToSql(self, filter={}):
 		"""
 		Creates a SQL condition out of the given filter.
+
+		The values of the filter are written as literals into the
+		condition.
+		"""
+		return self._createCondition(filter, self._sql.quote)
+
+	def _filterToSqlWithParameters(self, filter={}):
+		"""
+		Creates a SQL condition with placeholders out of the given filter.
+
+		Filters with the same keys and the same kinds of values result
+		in the same condition so that the statement can be reused.
+
+		:returns: The condition and the values for its placeholders.
+		:rtype: (unicode, [value, ])
+		"""
+		parameters = []
+
+		def addParameter(value):
+			parameters.append(value)
+			return self._sql.PARAMETER
+
+		return self._createCondition(filter, addParameter), parameters
+
+	def _createCondition(self, filter, valueToSql):
+		"""
+		Creates a SQL condition out of the given filter.
+
+		:param valueToSql: Function returning the SQL for a value.
 		"""
 		def buildCondition():
-			for key, values in filter.items():
+			for key, values in sorted(filter.items()):
 				if values is None:
 					continue
 				values = forceList(values)
@@ -275,27 +876,23 @@ class SQLBackend(ConfigDataBackend):
 					else:
 						yield u"`{0}` = 0".format(key)
 				elif isinstance(value, (float, long, int)):
-					yield u"`{0}` = {1}".format(key, value)
+					yield u"`{0}` = {1}".format(key, valueToSql(value))
 				elif value is None:
 					yield u"`{0}` is NULL".format(key)
 				else:
-					value = value.replace(self._sql.ESCAPED_ASTERISK, u'\uffff')
-					value = self._sql.escapeApostrophe(self._sql.escapeBackslash(value))
+					value = forceUnicode(value).replace(self._sql.ESCAPED_ASTERISK, u'\uffff')
 					match = self._OPERATOR_IN_CONDITION_PATTERN.search(value)
 					if match:
 						operator = match.group(1)
-						value = match.group(2)
-						value = value.replace(u'\uffff', self._sql.ESCAPED_ASTERISK)
-						yield u"`%s` %s %s" % (key, operator, forceUnicode(value))
+						number = match.group(2)
+						number = float(number) if u'.' in number else int(number)
+						yield u"`{0}` {1} {2}".format(key, operator, valueToSql(number))
+					elif u'*' in value:
+						value = value.replace(u'\\', u'\\\\').replace(u'%', u'\\%').replace(u'_', u'\\_')
+						value = value.replace(u'*', u'%').replace(u'\uffff', u'*')
+						yield u"`{0}` LIKE {1}{2}".format(key, valueToSql(value), self._sql.LIKE_ESCAPE)
 					else:
-						if '*' in value:
-							operator = 'LIKE'
-							value = self._sql.escapeUnderscore(self._sql.escapePercent(value)).replace('*', '%')
-						else:
-							operator = '='
-
-						value = value.replace(u'\uffff', self._sql.ESCAPED_ASTERISK)
-						yield u"`{0}` {1} '{2}'".format(key, operator, forceUnicode(value))
+						yield u"`{0}` = {1}".format(key, valueToSql(value.replace(u'\uffff', u'*')))
 
 		def addParenthesis(conditions):
 			for condition in conditions:
@@ -304,11 +901,28 @@ class SQLBackend(ConfigDataBackend):
 		return u' and '.join(addParenthesis(buildCondition()))
 
 	def _createQuery(self, table, attributes=[], filter={}):
+		"""
+		Creates a query with the values of the filter written as \
+literals into it.
+		"""
+		return self._buildQuery(table, attributes, self._filterToSql(filter))
+
+	def _createQueryWithParameters(self, table, attributes=[], filter={}):
+		"""
+		Creates a query with placeholders for the values of the filter.
+
+		:returns: The query and the values for its placeholders.
+		:rtype: (unicode, [value, ])
+		"""
+		condition, parameters = self._filterToSqlWithParameters(filter)
+		return self._buildQuery(table, attributes, condition), parameters
+
+	@staticmethod
+	def _buildQuery(table, attributes, condition):
 		select = u','.join(
 			u'`{0}`'.format(attribute) for attribute in attributes
 		) or u'*'
 
-		condition = self._filterToSql(filter)
 		if condition:
 			query = u'select %s from `%s` where %s' % (select, table, condition)
 		else:
@@ -433,41 +1047,210 @@ class SQLBackend(ConfigDataBackend):
 				return 'licensePoolId'
 		return attribute
 
+	def _uniqueColumns(self, object):
+		"""
+		Get the columns and their values that identify an object.
+
+		To achieve this the constructor of the object is inspected.
+		Objects must have an attribute named like the parameter.
+
+		:param object: The object to get the columns for.
+		:returns: Pairs of column name and value.
+		:rtype: [(str, value), ]
+		"""
+		columns = []
+		for argument in mandatoryConstructorArgs(object.__class__):
+			value = getattr(object, argument)
+			if value is None:
+				continue
+
+			columns.append((self._objectAttributeToDatabaseAttribute(object.__class__, argument), value))
+
+		if isinstance(object, (HostGroup, ProductGroup)):
+			columns.append(('type', object.getType()))
+
+		return columns
+
 	def _uniqueCondition(self, object):
 		"""
 		Creates an unique condition that can be used in the WHERE part
 		of an SQL query to identify an object.
-		To achieve this the constructor of the object is inspected.
-		Objects must have an attribute named like the parameter.
 
 		:param object: The object to create an condition for.
 		:rtype: str
 		"""
-		def createCondition():
-			for argument in mandatoryConstructorArgs(object.__class__):
-				value = getattr(object, argument)
-				if value is None:
-					continue
+		return self._createUniqueCondition(object, self._sql.quote)
 
-				arg = self._objectAttributeToDatabaseAttribute(object.__class__, argument)
+	def _uniqueConditionWithParameters(self, object):
+		"""
+		Creates an unique condition with placeholders that can be used
+		in the WHERE part of an SQL query to identify an object.
+
+		:param object: The object to create an condition for.
+		:returns: The condition and the values for its placeholders.
+		:rtype: (unicode, [value, ])
+		"""
+		parameters = []
+
+		def addParameter(value):
+			parameters.append(value)
+			return self._sql.PARAMETER
+
+		return self._createUniqueCondition(object, addParameter), parameters
+
+	def _createUniqueCondition(self, object, valueToSql):
+		def createCondition():
+			for arg, value in self._uniqueColumns(object):
 				if isinstance(value, bool):
 					if value:
 						yield u"`{0}` = 1".format(arg)
 					else:
 						yield u"`{0}` = 0".format(arg)
-				elif isinstance(value, (float, long, int)):
-					yield u"`{0}` = {1}".format(arg, value)
 				else:
-					yield u"`{0}` = '{1}'".format(arg, self._sql.escapeApostrophe(self._sql.escapeBackslash(value)))
+					yield u"`{0}` = {1}".format(arg, valueToSql(value))
+
+		return u' and '.join(createCondition())
+
+	def _getParameterChunkSize(self, parametersPerRow, reservedParameters=0):
+		"""
+		Get the number of rows that can be identified in one statement.
 
-			if isinstance(object, (HostGroup, ProductGroup)):
-				yield u"`type` = '{0}'".format(object.getType())
+		The placeholders of all rows and `reservedParameters` other
+		placeholders must fit into one statement. There are never more
+		than `BULK_QUERY_SIZE` rows in one statement.
 
-		return ' and '.join(createCondition())
+		:param parametersPerRow: The number of placeholders for one row.
+		:rtype: int
+		"""
+		parameterCount = self._sql.MAX_PARAMETERS - reservedParameters
+		return max(1, min(BULK_QUERY_SIZE, parameterCount // max(1, parametersPerRow)))
+
+	def _insertOrUpdateRows(self, table, rows):
+		"""
+		Insert rows into `table` or update them if they already exist.
+
+		If the unique columns of all rows are the upsert key of `table`
+		the rows are upserted by the database.
+		Otherwise existing rows are looked up with one query for as many
+		rows as `_getParameterChunkSize` allows. The existing rows are
+		updated through `_updateRows` and all new rows are inserted at
+		once.
+		If multiple rows are identified by the same object only the
+		last of them is written.
+
+		:param rows: Pairs of the object identifying the row and \
+the data of the row.
+		:type rows: [(object, dict), ]
+		"""
+		def getKey(columns):
+			return tuple(
+				(column, forceUnicodeLower(value) if isinstance(value, basestring) else value)
+				for column, value in columns
+			)
+
+		rowsByKey = OrderedDict()
+		for conditionObject, data in rows:
+			columns = self._uniqueColumns(conditionObject)
+			rowsByKey[getKey(columns)] = (conditionObject, columns, data)
+
+		upsertKey = set(self._sql.getUpsertKey(table))
+		if upsertKey and all(upsertKey == set(column for column, _ in columns) for _, columns, _ in rowsByKey.values()):
+			# The database can insert or update the rows by itself.
+			self._sql.upsertMany(table, [data for _, _, data in rowsByKey.values()])
+			return
+
+		existingKeys = set()
+		chunkSize = self._getParameterChunkSize(
+			max(len(columns) for _, columns, _ in rowsByKey.values())
+		)
+		for rowChunk in chunk(rowsByKey.values(), chunkSize):
+			columnNames = set()
+			for _, columns, _ in rowChunk:
+				columnNames.add(tuple(column for column, _ in columns))
+
+			conditions = []
+			parameters = []
+			for conditionObject, _, _ in rowChunk:
+				condition, conditionParameters = self._uniqueConditionWithParameters(conditionObject)
+				conditions.append(u'({0})'.format(condition))
+				parameters.extend(conditionParameters)
+
+			query = u'select * from `{table}` where {condition}'.format(
+				table=table,
+				condition=u' or '.join(conditions)
+			)
+			for row in self._sql.getSet(query, parameters):
+				for names in columnNames:
+					existingKeys.add(getKey((name, row.get(name)) for name in names))
+
+		existingRows = []
+		newRows = []
+		for conditionObject, columns, data in rowsByKey.values():
+			if getKey(columns) in existingKeys:
+				existingRows.append((conditionObject, data))
+			else:
+				newRows.append(data)
+
+		self._updateRows(table, existingRows, updateWhereNone=True)
+		if newRows:
+			self._sql.insertMany(table, newRows)
+
+	def _updateRows(self, table, rows, updateWhereNone=False):
+		"""
+		Update existing rows of `table`.
+
+		Rows that get the same values are updated by one statement for
+		as many rows as `_getParameterChunkSize` allows. All statements
+		are executed within one transaction.
+
+		:param rows: Pairs of the object identifying the row and \
+the data of the row.
+		:type rows: [(object, dict), ]
+		:param updateWhereNone: If `True` columns are set to `NULL` \
+for values that are `None`. Otherwise these columns are kept.
+		"""
+		rowsByValues = OrderedDict()
+		for conditionObject, data in rows:
+			uniqueColumns = set(column for column, _ in self._uniqueColumns(conditionObject))
+			values = dict(
+				(column, value) for (column, value) in data.items()
+				if column not in uniqueColumns and (value is not None or updateWhereNone)
+			)
+			if not values:
+				continue
+
+			key = tuple(sorted(values.items()))
+			try:
+				rowsByValues.setdefault(key, (values, []))[1].append(conditionObject)
+			except TypeError:  # Unhashable values are updated on their own
+				rowsByValues[object()] = (values, [conditionObject])
+
+		statements = []
+		for values, conditionObjects in rowsByValues.values():
+			chunkSize = self._getParameterChunkSize(
+				max(len(self._uniqueColumns(conditionObject)) for conditionObject in conditionObjects),
+				reservedParameters=len(values)
+			)
+			for conditionChunk in chunk(conditionObjects, chunkSize):
+				conditions = []
+				whereParameters = []
+				for conditionObject in conditionChunk:
+					condition, conditionParameters = self._uniqueConditionWithParameters(conditionObject)
+					conditions.append(u'({0})'.format(condition))
+					whereParameters.extend(conditionParameters)
+
+				statements.append(self._sql.getUpdateStatement(
+					table, u' or '.join(conditions), values,
+					updateWhereNone=updateWhereNone, whereParameters=whereParameters
+				))
+
+		if statements:
+			self._sql.executeInTransaction(statements)
 
 	def _objectExists(self, table, object):
-		query = 'select * from `%s` where %s' % (table, self._uniqueCondition(object))
-		return bool(self._sql.getRow(query))
+		where, whereParameters = self._uniqueConditionWithParameters(object)
+		query = 'select * from `%s` where %s' % (table, where)
+		return bool(self._sql.getRow(query, parameters=whereParameters))
 
 	def backend_exit(self):
 		pass
@@ -1057,17 +1840,31 @@ class SQLBackend(ConfigDataBackend):
 	def host_insertObject(self, host):
 		ConfigDataBackend.host_insertObject(self, host)
 		data = self._objectToDatabaseHash(host)
-		where = self._uniqueCondition(host)
-		if self._sql.getRow('select * from `HOST` where {0}'.format(where)):
-			self._sql.update('HOST', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(host)
+		if self._sql.getRow('select * from `HOST` where {0}'.format(where), parameters=whereParameters):
+			self._sql.update('HOST', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('HOST', data)
 
+	def host_insertObjects(self, hosts):
+		hosts = forceObjectClassList(hosts, Host)
+		for host in hosts:
+			ConfigDataBackend.host_insertObject(self, host)
+
+		self._insertOrUpdateRows('HOST', [(host, self._objectToDatabaseHash(host)) for host in hosts])
+
 	def host_updateObject(self, host):
 		ConfigDataBackend.host_updateObject(self, host)
 		data = self._objectToDatabaseHash(host)
-		where = self._uniqueCondition(host)
-		self._sql.update('HOST', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(host)
+		self._sql.update('HOST', where, data, whereParameters=whereParameters)
+
+	def host_updateObjects(self, hosts):
+		hosts = forceObjectClassList(hosts, Host)
+		for host in hosts:
+			ConfigDataBackend.host_updateObject(self, host)
+
+		self._updateRows('HOST', [(host, self._objectToDatabaseHash(host)) for host in hosts])
 
 	def host_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.host_getObjects(self, attributes=[], **filter)
@@ -1080,26 +1877,123 @@ class SQLBackend(ConfigDataBackend):
 
 		hosts = []
 		(attributes, filter) = self._adjustAttributes(Host, attributes, filter)
-		for res in self._sql.getSet(self._createQuery('HOST', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('HOST', attributes, filter)):
 			self._adjustResult(Host, res)
 			hosts.append(Host.fromHash(res))
 
 		return hosts
 
 	def host_deleteObjects(self, hosts):
-		ConfigDataBackend.host_deleteObjects(self, hosts)
+		"""
+		Delete hosts and all data depending on them.
+
+		The data of the hosts is removed from the tables of this
+		backend with one statement per table for as many hosts as fit
+		into it. The objects depending on the hosts are read through
+		the context before. If the context is another backend their
+		deletion is passed on to it so that all backends take note of
+		it. The changes to this backend take effect together.
+		"""
+		hosts = forceObjectClassList(hosts, Host)
+		if not hosts:
+			return
+
+		for host in hosts:
+			logger.info(u"Deleting host {0}", host)
+
+		# The group type needs a placeholder besides the host ids.
+		with self._transaction():
+			for hostChunk in chunk(hosts, self._getParameterChunkSize(1, reservedParameters=1)):
+				objectsOfHosts = self._getObjectsOfHosts(hostChunk)
+				self._sql.executeInTransaction(self._getHostDeletionStatements(hostChunk))
+				if self._context is not self:
+					with self._removedDataOfHosts(hostChunk):
+						ConfigDataBackend._deleteObjectsOfHosts(self, hostChunk, objectsOfHosts)
+
+	def _getHostDeletionStatements(self, hosts):
+		"""
+		Get the statements removing `hosts` and the rows depending on
+		them from the tables of this backend.
+
+		:returns: Pairs of statements and the values for their placeholders.
+		:rtype: [(unicode, list), ]
+		"""
+		hostIds = [host.id for host in hosts]
+		clientIds = [host.id for host in hosts if isinstance(host, OpsiClient)]
+		# This is also true for OpsiConfigservers
+		depotIds = [host.id for host in hosts if isinstance(host, OpsiDepotserver)]
+
+		queries = []
+		if self._sqlBackendModule:
+			queries.extend([
+				(u'DELETE FROM `OBJECT_TO_GROUP` WHERE `groupType` = {parameter} AND `objectId` IN ({ids});', hostIds, [u'HostGroup']),
+				(u'DELETE FROM `PRODUCT_ON_CLIENT` WHERE `clientId` IN ({ids});', clientIds, None),
+				(u'DELETE FROM `PRODUCT_ON_DEPOT` WHERE `depotId` IN ({ids});', depotIds, None),
+				(u'DELETE FROM `PRODUCT_PROPERTY_STATE` WHERE `objectId` IN ({ids});', hostIds, None),
+				(u'DELETE FROM `CONFIG_STATE` WHERE `objectId` IN ({ids});', hostIds, None),
+			])
+
+		queries.append((u'DELETE FROM `SOFTWARE_CONFIG` WHERE `clientId` IN ({ids});', clientIds, None))
+		for hardwareClass in self._auditHardwareClasses.values():
+			queries.append((
+				u'DELETE FROM `{0}` WHERE `hostId` IN ({{ids}});'.format(hardwareClass.configTable),
+				hostIds, None
+			))
+
+		if self._licenseManagementModule:
+			queries.extend([
+				(u'DELETE FROM `LICENSE_ON_CLIENT` WHERE `clientId` IN ({ids});', clientIds, None),
+				(u'UPDATE `SOFTWARE_LICENSE` SET `boundToHost` = NULL WHERE `boundToHost` IN ({ids});', clientIds, None),
+			])
+
+		queries.append((u'DELETE FROM `HOST` WHERE `hostId` IN ({ids});', hostIds, None))
+
+		statements = []
+		for query, ids, parameters in queries:
+			if ids:
+				statements.extend(self._getStatementsForIds(query, ids, parameters))
+
+		return statements
+
+	@contextmanager
+	def _removedDataOfHosts(self, hosts):
+		"""
+		Let this backend skip objects of `hosts` inside of the block.
 
-		for host in forceObjectClassList(hosts, Host):
-			logger.info(u"Deleting host {0}".format(host))
-			where = self._uniqueCondition(host)
-			self._sql.delete('HOST', where)
+		The rows of these objects have already been removed by
+		`host_deleteObjects` when their deletion is passed on to the
+		context and comes back to this backend.
+		"""
+		self._hostsWithRemovedData.hostIds = set(host.id for host in hosts)
+		try:
+			yield
+		finally:
+			self._hostsWithRemovedData.hostIds = set()
 
-			auditHardwareOnDeletedHost = self.auditHardwareOnHost_getObjects(objectId=host.id)
-			if auditHardwareOnDeletedHost:
-				self.auditHardwareOnHost_deleteObjects(auditHardwareOnDeletedHost)
+	def _isDataOfHostRemoved(self, hostId):
+		"Check if the rows of the host `hostId` have already been removed."
+		return hostId in getattr(self._hostsWithRemovedData, 'hostIds', ())
 
-			# TODO: Delete audit data!
-			# Siehe: https://redmine.uib.local/issues/869
+	def _getStatementsForIds(self, query, ids, parameters=None):
+		"""
+		Get the statements to execute `query` for all of `ids`.
+
+		`query` has to contain `{ids}` where the placeholders for the \
+ids are inserted and may contain `{parameter}` for each of the \
+additional `parameters`.
+		Large numbers of ids are split into multiple statements.
+
+		:returns: Pairs of statements and the values for their placeholders.
+		:rtype: [(unicode, list), ]
+		"""
+		parameters = parameters or []
+		chunkSize = self._getParameterChunkSize(1, reservedParameters=len(parameters))
+		for idChunk in chunk(ids, chunkSize):
+			statement = query.format(
+				ids=u', '.join([self._sql.PARAMETER] * len(idChunk)),
+				parameter=self._sql.PARAMETER
+			)
+			yield statement, parameters + list(idChunk)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Configs
@@ -1117,13 +2011,13 @@ class SQLBackend(ConfigDataBackend):
 		del data['possibleValues']
 		del data['defaultValues']
 
-		where = self._uniqueCondition(config)
-		if self._sql.getRow('select * from `CONFIG` where %s' % where):
-			self._sql.update('CONFIG', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(config)
+		if self._sql.getRow('select * from `CONFIG` where %s' % where, parameters=whereParameters):
+			self._sql.update('CONFIG', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('CONFIG', data)
 
-		self._sql.delete('CONFIG_VALUE', where)
+		self._sql.delete('CONFIG_VALUE', where, parameters=whereParameters)
 		for value in possibleValues:
 			self._sql.insert('CONFIG_VALUE', {
 				'configId': data['configId'],
@@ -1135,14 +2029,14 @@ class SQLBackend(ConfigDataBackend):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.config_updateObject(self, config)
 		data = self._objectToDatabaseHash(config)
-		where = self._uniqueCondition(config)
+		where, whereParameters = self._uniqueConditionWithParameters(config)
 		possibleValues = data['possibleValues'] or []
 		defaultValues = data['defaultValues'] or []
 		del data['possibleValues']
 		del data['defaultValues']
 
-		self._sql.update('CONFIG', where, data)
-		self._sql.delete('CONFIG_VALUE', where)
+		self._sql.update('CONFIG', where, data, whereParameters=whereParameters)
+		self._sql.delete('CONFIG_VALUE', where, parameters=whereParameters)
 		for value in possibleValues:
 			self._sql.insert('CONFIG_VALUE', {
 				'configId': data['configId'],
@@ -1163,7 +2057,7 @@ class SQLBackend(ConfigDataBackend):
 				configIds = filter.get('configId')
 				filter['configId'] = [res['configId'] for res in
 					self._sql.getSet(
-						self._createQuery(
+						*self._createQueryWithParameters(
 							'CONFIG_VALUE',
 							('configId', ),
 							{'configId': configIds, 'value': filter['defaultValues'], 'isDefault': True}
@@ -1183,7 +2077,7 @@ class SQLBackend(ConfigDataBackend):
 				configIds = filter.get('configId')
 				filter['configId'] = [res['configId'] for res in
 					self._sql.getSet(
-						self._createQuery(
+						*self._createQueryWithParameters(
 							'CONFIG_VALUE',
 							('configId', ),
 							{'configId': configIds, 'value': filter['possibleValues']}
@@ -1200,12 +2094,13 @@ class SQLBackend(ConfigDataBackend):
 
 		readValues = not attributes or 'possibleValues' in attributes or 'defaultValues' in attributes
 
+		valueQuery = u"select * from CONFIG_VALUE where `configId` = {0}".format(self._sql.PARAMETER)
 		attrs = [attr for attr in attributes if attr not in ('defaultValues', 'possibleValues')]
-		for res in self._sql.getSet(self._createQuery('CONFIG', attrs, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('CONFIG', attrs, filter)):
 			res['possibleValues'] = []
 			res['defaultValues'] = []
 			if readValues:
-				for res2 in self._sql.getSet(u"select * from CONFIG_VALUE where `configId` = '%s'" % res['configId']):
+				for res2 in self._sql.getSet(valueQuery, [res['configId']]):
 					res['possibleValues'].append(res2['value'])
 					if res2['isDefault']:
 						res['defaultValues'].append(res2['value'])
@@ -1218,9 +2113,9 @@ class SQLBackend(ConfigDataBackend):
 		ConfigDataBackend.config_deleteObjects(self, configs)
 		for config in forceObjectClassList(configs, Config):
 			logger.info(u"Deleting config %s" % config)
-			where = self._uniqueCondition(config)
-			self._sql.delete('CONFIG_VALUE', where)
-			self._sql.delete('CONFIG', where)
+			where, whereParameters = self._uniqueConditionWithParameters(config)
+			self._sql.delete('CONFIG_VALUE', where, parameters=whereParameters)
+			self._sql.delete('CONFIG', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ConfigStates
@@ -1231,19 +2126,48 @@ class SQLBackend(ConfigDataBackend):
 		data = self._objectToDatabaseHash(configState)
 		data['values'] = json.dumps(data['values'])
 
-		where = self._uniqueCondition(configState)
-		if self._sql.getRow('select * from `CONFIG_STATE` where %s' % where):
-			self._sql.update('CONFIG_STATE', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(configState)
+		if self._sql.getRow('select * from `CONFIG_STATE` where %s' % where, parameters=whereParameters):
+			self._sql.update('CONFIG_STATE', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('CONFIG_STATE', data)
 
+	def configState_insertObjects(self, configStates):
+		self._requiresEnabledSQLBackendModule()
+		configStates = forceObjectClassList(configStates, ConfigState)
+		for configState in configStates:
+			configState.setDefaults()
+		if self._options['additionalReferentialIntegrityChecks']:
+			self._configState_checkReferentialIntegrity(configStates)
+
+		rows = []
+		for configState in configStates:
+			data = self._objectToDatabaseHash(configState)
+			data['values'] = json.dumps(data['values'])
+			rows.append((configState, data))
+
+		self._insertOrUpdateRows('CONFIG_STATE', rows)
+
 	def configState_updateObject(self, configState):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.configState_updateObject(self, configState)
 		data = self._objectToDatabaseHash(configState)
-		where = self._uniqueCondition(configState)
+		where, whereParameters = self._uniqueConditionWithParameters(configState)
 		data['values'] = json.dumps(data['values'])
-		self._sql.update('CONFIG_STATE', where, data)
+		self._sql.update('CONFIG_STATE', where, data, whereParameters=whereParameters)
+
+	def configState_updateObjects(self, configStates):
+		self._requiresEnabledSQLBackendModule()
+		configStates = forceObjectClassList(configStates, ConfigState)
+
+		rows = []
+		for configState in configStates:
+			ConfigDataBackend.configState_updateObject(self, configState)
+			data = self._objectToDatabaseHash(configState)
+			data['values'] = json.dumps(data['values'])
+			rows.append((configState, data))
+
+		self._updateRows('CONFIG_STATE', rows)
 
 	def configState_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
@@ -1252,7 +2176,7 @@ class SQLBackend(ConfigDataBackend):
 		(attributes, filter) = self._adjustAttributes(ConfigState, attributes, filter)
 
 		configStates = []
-		for res in self._sql.getSet(self._createQuery('CONFIG_STATE', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('CONFIG_STATE', attributes, filter)):
 			try:
 				res['values'] = json.loads(res['values'])
 			except KeyError:
@@ -1266,9 +2190,12 @@ class SQLBackend(ConfigDataBackend):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.configState_deleteObjects(self, configStates)
 		for configState in forceObjectClassList(configStates, ConfigState):
+			if self._isDataOfHostRemoved(configState.objectId):
+				continue
+
 			logger.info("Deleting configState %s" % configState)
-			where = self._uniqueCondition(configState)
-			self._sql.delete('CONFIG_STATE', where)
+			where, whereParameters = self._uniqueConditionWithParameters(configState)
+			self._sql.delete('CONFIG_STATE', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Products
@@ -1305,13 +2232,13 @@ class SQLBackend(ConfigDataBackend):
 		del data['windowsSoftwareIds']
 		del data['productClassIds']
 
-		where = self._uniqueCondition(product)
-		if self._sql.getRow('select * from `PRODUCT` where %s' % where):
-			self._sql.update('PRODUCT', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(product)
+		if self._sql.getRow('select * from `PRODUCT` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT', data)
 
-		self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', "`productId` = '%s'" % data['productId'])
+		self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', u"`productId` = {0}".format(self._sql.PARAMETER), parameters=[data['productId']])
 
 		for windowsSoftwareId in windowsSoftwareIds:
 			mapping = {
@@ -1324,13 +2251,13 @@ class SQLBackend(ConfigDataBackend):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.product_updateObject(self, product)
 		data = self._objectToDatabaseHash(product)
-		where = self._uniqueCondition(product)
+		where, whereParameters = self._uniqueConditionWithParameters(product)
 		windowsSoftwareIds = data['windowsSoftwareIds'] or []
 		del data['windowsSoftwareIds']
 		del data['productClassIds']
 
-		self._sql.update('PRODUCT', where, data)
-		self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', "`productId` = '%s'" % data['productId'])
+		self._sql.update('PRODUCT', where, data, whereParameters=whereParameters)
+		self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', u"`productId` = {0}".format(self._sql.PARAMETER), parameters=[data['productId']])
 
 		for windowsSoftwareId in windowsSoftwareIds:
 			mapping = {
@@ -1347,11 +2274,12 @@ class SQLBackend(ConfigDataBackend):
 
 		readWindowsSoftwareIDs = not attributes or 'windowsSoftwareIds' in attributes
 		products = []
-		for res in self._sql.getSet(self._createQuery('PRODUCT', attributes, filter)):
+		softwareIdQuery = u"select * from WINDOWS_SOFTWARE_ID_TO_PRODUCT where `productId` = {0}".format(self._sql.PARAMETER)
+		for res in self._sql.getSet(*self._createQueryWithParameters('PRODUCT', attributes, filter)):
 			res['windowsSoftwareIds'] = []
 			res['productClassIds'] = []
 			if readWindowsSoftwareIDs:
-				for res2 in self._sql.getSet(u"select * from WINDOWS_SOFTWARE_ID_TO_PRODUCT where `productId` = '%s'" % res['productId']):
+				for res2 in self._sql.getSet(softwareIdQuery, [res['productId']]):
 					res['windowsSoftwareIds'].append(res2['windowsSoftwareId'])
 
 			if not attributes or 'productClassIds' in attributes:
@@ -1367,9 +2295,9 @@ class SQLBackend(ConfigDataBackend):
 		ConfigDataBackend.product_deleteObjects(self, products)
 		for product in forceObjectClassList(products, Product):
 			logger.info("Deleting product %s" % product)
-			where = self._uniqueCondition(product)
-			self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', "`productId` = '%s'" % product.getId())
-			self._sql.delete('PRODUCT', where)
+			where, whereParameters = self._uniqueConditionWithParameters(product)
+			self._sql.delete('WINDOWS_SOFTWARE_ID_TO_PRODUCT', u"`productId` = {0}".format(self._sql.PARAMETER), parameters=[product.getId()])
+			self._sql.delete('PRODUCT', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductProperties
@@ -1387,14 +2315,14 @@ class SQLBackend(ConfigDataBackend):
 		del data['possibleValues']
 		del data['defaultValues']
 
-		where = self._uniqueCondition(productProperty)
-		if self._sql.getRow('select * from `PRODUCT_PROPERTY` where %s' % where):
-			self._sql.update('PRODUCT_PROPERTY', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(productProperty)
+		if self._sql.getRow('select * from `PRODUCT_PROPERTY` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_PROPERTY', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_PROPERTY', data)
 
 		if possibleValues is not None:  # TODO: this is always true. Does it hurt to always do this?
-			self._sql.delete('PRODUCT_PROPERTY_VALUE', where)
+			self._sql.delete('PRODUCT_PROPERTY_VALUE', where, parameters=whereParameters)
 
 		for value in possibleValues:
 			self._sql.insert('PRODUCT_PROPERTY_VALUE', {
@@ -1410,7 +2338,7 @@ class SQLBackend(ConfigDataBackend):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productProperty_updateObject(self, productProperty)
 		data = self._objectToDatabaseHash(productProperty)
-		where = self._uniqueCondition(productProperty)
+		where, whereParameters = self._uniqueConditionWithParameters(productProperty)
 		possibleValues = data['possibleValues']
 		defaultValues = data['defaultValues']
 		if possibleValues is None:
@@ -1419,10 +2347,10 @@ class SQLBackend(ConfigDataBackend):
 			defaultValues = []
 		del data['possibleValues']
 		del data['defaultValues']
-		self._sql.update('PRODUCT_PROPERTY', where, data)
+		self._sql.update('PRODUCT_PROPERTY', where, data, whereParameters=whereParameters)
 
 		if possibleValues is not None:  # TODO: this is always true. Does it hurt to always do this?
-			self._sql.delete('PRODUCT_PROPERTY_VALUE', where)
+			self._sql.delete('PRODUCT_PROPERTY_VALUE', where, parameters=whereParameters)
 
 		for value in possibleValues:
 			self._sql.insert('PRODUCT_PROPERTY_VALUE', {
@@ -1442,20 +2370,24 @@ class SQLBackend(ConfigDataBackend):
 
 		readValues = not attributes or 'possibleValues' in attributes or 'defaultValues' in attributes
 
-		query = self._createQuery('PRODUCT_PROPERTY', attributes, filter)
+		valueQuery = u"""select value, isDefault
+from PRODUCT_PROPERTY_VALUE
+where `propertyId` = {0}
+AND `productId` = {0}
+AND `productVersion` = {0}
+AND `packageVersion` = {0}""".format(self._sql.PARAMETER)
+
+		query, parameters = self._createQueryWithParameters('PRODUCT_PROPERTY', attributes, filter)
 		productProperties = []
-		for productProperty in self._sql.getSet(query):
+		for productProperty in self._sql.getSet(query, parameters):
 			productProperty['possibleValues'] = []
 			productProperty['defaultValues'] = []
 			if readValues:
-				valueQuery = u"""select value, isDefault
-from PRODUCT_PROPERTY_VALUE
-where `propertyId` = '{propertyId}'
-AND `productId` = '{productId}'
-AND `productVersion` = '{productVersion}'
-AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
-
-				for propertyValues in self._sql.getSet(valueQuery):
+				valueParameters = [
+					productProperty['propertyId'], productProperty['productId'],
+					productProperty['productVersion'], productProperty['packageVersion']
+				]
+				for propertyValues in self._sql.getSet(valueQuery, valueParameters):
 					productProperty['possibleValues'].append(propertyValues['value'])
 					if propertyValues['isDefault']:
 						productProperty['defaultValues'].append(propertyValues['value'])
@@ -1469,9 +2401,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.productProperty_deleteObjects(self, productProperties)
 		for productProperty in forceObjectClassList(productProperties, ProductProperty):
 			logger.info("Deleting product property %s" % productProperty)
-			where = self._uniqueCondition(productProperty)
-			self._sql.delete('PRODUCT_PROPERTY_VALUE', where)
-			self._sql.delete('PRODUCT_PROPERTY', where)
+			where, whereParameters = self._uniqueConditionWithParameters(productProperty)
+			self._sql.delete('PRODUCT_PROPERTY_VALUE', where, parameters=whereParameters)
+			self._sql.delete('PRODUCT_PROPERTY', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductDependencies
@@ -1481,9 +2413,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.productDependency_insertObject(self, productDependency)
 		data = self._objectToDatabaseHash(productDependency)
 
-		where = self._uniqueCondition(productDependency)
-		if self._sql.getRow('select * from `PRODUCT_DEPENDENCY` where %s' % where):
-			self._sql.update('PRODUCT_DEPENDENCY', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(productDependency)
+		if self._sql.getRow('select * from `PRODUCT_DEPENDENCY` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_DEPENDENCY', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_DEPENDENCY', data)
 
@@ -1491,24 +2423,24 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productDependency_updateObject(self, productDependency)
 		data = self._objectToDatabaseHash(productDependency)
-		where = self._uniqueCondition(productDependency)
+		where, whereParameters = self._uniqueConditionWithParameters(productDependency)
 
-		self._sql.update('PRODUCT_DEPENDENCY', where, data)
+		self._sql.update('PRODUCT_DEPENDENCY', where, data, whereParameters=whereParameters)
 
 	def productDependency_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productDependency_getObjects(self, attributes=[], **filter)
 		logger.info(u"Getting product dependencies, filter: %s" % filter)
 		(attributes, filter) = self._adjustAttributes(ProductDependency, attributes, filter)
-		return [ProductDependency.fromHash(res) for res in self._sql.getSet(self._createQuery('PRODUCT_DEPENDENCY', attributes, filter))]
+		return [ProductDependency.fromHash(res) for res in self._sql.getSet(*self._createQueryWithParameters('PRODUCT_DEPENDENCY', attributes, filter))]
 
 	def productDependency_deleteObjects(self, productDependencies):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productDependency_deleteObjects(self, productDependencies)
 		for productDependency in forceObjectClassList(productDependencies, ProductDependency):
 			logger.info("Deleting product dependency %s" % productDependency)
-			where = self._uniqueCondition(productDependency)
-			self._sql.delete('PRODUCT_DEPENDENCY', where)
+			where, whereParameters = self._uniqueConditionWithParameters(productDependency)
+			self._sql.delete('PRODUCT_DEPENDENCY', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductOnDepots
@@ -1522,33 +2454,65 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		productOnDepotClone.productVersion = None
 		productOnDepotClone.packageVersion = None
 		productOnDepotClone.productType = None
-		where = self._uniqueCondition(productOnDepotClone)
-		if self._sql.getRow('select * from `PRODUCT_ON_DEPOT` where %s' % where):
-			self._sql.update('PRODUCT_ON_DEPOT', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(productOnDepotClone)
+		if self._sql.getRow('select * from `PRODUCT_ON_DEPOT` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_ON_DEPOT', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_ON_DEPOT', data)
 
+	def productOnDepot_insertObjects(self, productOnDepots):
+		self._requiresEnabledSQLBackendModule()
+		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
+		for productOnDepot in productOnDepots:
+			productOnDepot.setDefaults()
+		if self._options['additionalReferentialIntegrityChecks']:
+			self._productOnDepot_checkReferentialIntegrity(productOnDepots)
+
+		rows = []
+		for productOnDepot in productOnDepots:
+			productOnDepotClone = productOnDepot.clone(identOnly=True)
+			productOnDepotClone.productVersion = None
+			productOnDepotClone.packageVersion = None
+			productOnDepotClone.productType = None
+			rows.append((productOnDepotClone, self._objectToDatabaseHash(productOnDepot)))
+
+		self._insertOrUpdateRows('PRODUCT_ON_DEPOT', rows)
+
 	def productOnDepot_updateObject(self, productOnDepot):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productOnDepot_updateObject(self, productOnDepot)
 		data = self._objectToDatabaseHash(productOnDepot)
-		where = self._uniqueCondition(productOnDepot)
-		self._sql.update('PRODUCT_ON_DEPOT', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(productOnDepot)
+		self._sql.update('PRODUCT_ON_DEPOT', where, data, whereParameters=whereParameters)
+
+	def productOnDepot_updateObjects(self, productOnDepots):
+		self._requiresEnabledSQLBackendModule()
+		productOnDepots = forceObjectClassList(productOnDepots, ProductOnDepot)
+		for productOnDepot in productOnDepots:
+			ConfigDataBackend.productOnDepot_updateObject(self, productOnDepot)
+
+		self._updateRows(
+			'PRODUCT_ON_DEPOT',
+			[(productOnDepot, self._objectToDatabaseHash(productOnDepot)) for productOnDepot in productOnDepots]
+		)
 
 	def productOnDepot_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productOnDepot_getObjects(self, attributes=[], **filter)
 		(attributes, filter) = self._adjustAttributes(ProductOnDepot, attributes, filter)
 		return [ProductOnDepot.fromHash(res) for res in
-				self._sql.getSet(self._createQuery('PRODUCT_ON_DEPOT', attributes, filter))]
+				self._sql.getSet(*self._createQueryWithParameters('PRODUCT_ON_DEPOT', attributes, filter))]
 
 	def productOnDepot_deleteObjects(self, productOnDepots):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productOnDepot_deleteObjects(self, productOnDepots)
 		for productOnDepot in forceObjectClassList(productOnDepots, ProductOnDepot):
+			if self._isDataOfHostRemoved(productOnDepot.depotId):
+				continue
+
 			logger.info(u"Deleting productOnDepot %s" % productOnDepot)
-			where = self._uniqueCondition(productOnDepot)
-			self._sql.delete('PRODUCT_ON_DEPOT', where)
+			where, whereParameters = self._uniqueConditionWithParameters(productOnDepot)
+			self._sql.delete('PRODUCT_ON_DEPOT', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductOnClients
@@ -1562,19 +2526,46 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		productOnClientClone.productVersion = None
 		productOnClientClone.packageVersion = None
 		productOnClientClone.productType = None
-		where = self._uniqueCondition(productOnClientClone)
+		where, whereParameters = self._uniqueConditionWithParameters(productOnClientClone)
 
-		if self._sql.getRow('select * from `PRODUCT_ON_CLIENT` where %s' % where):
-			self._sql.update('PRODUCT_ON_CLIENT', where, data, updateWhereNone=True)
+		if self._sql.getRow('select * from `PRODUCT_ON_CLIENT` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_ON_CLIENT', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_ON_CLIENT', data)
 
+	def productOnClient_insertObjects(self, productOnClients):
+		self._requiresEnabledSQLBackendModule()
+		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
+
+		rows = []
+		for productOnClient in productOnClients:
+			ConfigDataBackend.productOnClient_insertObject(self, productOnClient)
+
+			productOnClientClone = productOnClient.clone(identOnly=True)
+			productOnClientClone.productVersion = None
+			productOnClientClone.packageVersion = None
+			productOnClientClone.productType = None
+			rows.append((productOnClientClone, self._objectToDatabaseHash(productOnClient)))
+
+		self._insertOrUpdateRows('PRODUCT_ON_CLIENT', rows)
+
 	def productOnClient_updateObject(self, productOnClient):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productOnClient_updateObject(self, productOnClient)
 		data = self._objectToDatabaseHash(productOnClient)
-		where = self._uniqueCondition(productOnClient)
-		self._sql.update('PRODUCT_ON_CLIENT', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(productOnClient)
+		self._sql.update('PRODUCT_ON_CLIENT', where, data, whereParameters=whereParameters)
+
+	def productOnClient_updateObjects(self, productOnClients):
+		self._requiresEnabledSQLBackendModule()
+		productOnClients = forceObjectClassList(productOnClients, ProductOnClient)
+		for productOnClient in productOnClients:
+			ConfigDataBackend.productOnClient_updateObject(self, productOnClient)
+
+		self._updateRows(
+			'PRODUCT_ON_CLIENT',
+			[(productOnClient, self._objectToDatabaseHash(productOnClient)) for productOnClient in productOnClients]
+		)
 
 	def productOnClient_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
@@ -1582,15 +2573,18 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting productOnClients, filter: %s" % filter)
 		(attributes, filter) = self._adjustAttributes(ProductOnClient, attributes, filter)
 		return [ProductOnClient.fromHash(res) for res in
-				self._sql.getSet(self._createQuery('PRODUCT_ON_CLIENT', attributes, filter))]
+				self._sql.getSet(*self._createQueryWithParameters('PRODUCT_ON_CLIENT', attributes, filter))]
 
 	def productOnClient_deleteObjects(self, productOnClients):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productOnClient_deleteObjects(self, productOnClients)
 		for productOnClient in forceObjectClassList(productOnClients, ProductOnClient):
+			if self._isDataOfHostRemoved(productOnClient.clientId):
+				continue
+
 			logger.info(u"Deleting productOnClient %s" % productOnClient)
-			where = self._uniqueCondition(productOnClient)
-			self._sql.delete('PRODUCT_ON_CLIENT', where)
+			where, whereParameters = self._uniqueConditionWithParameters(productOnClient)
+			self._sql.delete('PRODUCT_ON_CLIENT', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ProductPropertyStates
@@ -1598,24 +2592,62 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 	def productPropertyState_insertObject(self, productPropertyState):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productPropertyState_insertObject(self, productPropertyState)
-		if not self._sql.getSet(self._createQuery('HOST', ['hostId'], {"hostId": productPropertyState.objectId})):
+		if not self._sql.getSet(*self._createQueryWithParameters('HOST', ['hostId'], {"hostId": productPropertyState.objectId})):
 			raise BackendReferentialIntegrityError(u"Object '%s' does not exist" % productPropertyState.objectId)
 		data = self._objectToDatabaseHash(productPropertyState)
 		data['values'] = json.dumps(data['values'])
 
-		where = self._uniqueCondition(productPropertyState)
-		if self._sql.getRow('select * from `PRODUCT_PROPERTY_STATE` where %s' % where):
-			self._sql.update('PRODUCT_PROPERTY_STATE', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(productPropertyState)
+		if self._sql.getRow('select * from `PRODUCT_PROPERTY_STATE` where %s' % where, parameters=whereParameters):
+			self._sql.update('PRODUCT_PROPERTY_STATE', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('PRODUCT_PROPERTY_STATE', data)
 
+	def productPropertyState_insertObjects(self, productPropertyStates):
+		self._requiresEnabledSQLBackendModule()
+		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
+		for productPropertyState in productPropertyStates:
+			productPropertyState.setDefaults()
+		if self._options['additionalReferentialIntegrityChecks']:
+			self._productPropertyState_checkReferentialIntegrity(productPropertyStates)
+
+		objectIds = set(productPropertyState.objectId for productPropertyState in productPropertyStates)
+		existingObjectIds = set()
+		for objectIdChunk in chunk(objectIds, BULK_QUERY_SIZE):
+			for host in self._sql.getSet(*self._createQueryWithParameters('HOST', ['hostId'], {"hostId": list(objectIdChunk)})):
+				existingObjectIds.add(host['hostId'])
+
+		rows = []
+		for productPropertyState in productPropertyStates:
+			if productPropertyState.objectId not in existingObjectIds:
+				raise BackendReferentialIntegrityError(u"Object '%s' does not exist" % productPropertyState.objectId)
+
+			data = self._objectToDatabaseHash(productPropertyState)
+			data['values'] = json.dumps(data['values'])
+			rows.append((productPropertyState, data))
+
+		self._insertOrUpdateRows('PRODUCT_PROPERTY_STATE', rows)
+
 	def productPropertyState_updateObject(self, productPropertyState):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productPropertyState_updateObject(self, productPropertyState)
 		data = self._objectToDatabaseHash(productPropertyState)
-		where = self._uniqueCondition(productPropertyState)
+		where, whereParameters = self._uniqueConditionWithParameters(productPropertyState)
 		data['values'] = json.dumps(data['values'])
-		self._sql.update('PRODUCT_PROPERTY_STATE', where, data)
+		self._sql.update('PRODUCT_PROPERTY_STATE', where, data, whereParameters=whereParameters)
+
+	def productPropertyState_updateObjects(self, productPropertyStates):
+		self._requiresEnabledSQLBackendModule()
+		productPropertyStates = forceObjectClassList(productPropertyStates, ProductPropertyState)
+
+		rows = []
+		for productPropertyState in productPropertyStates:
+			ConfigDataBackend.productPropertyState_updateObject(self, productPropertyState)
+			data = self._objectToDatabaseHash(productPropertyState)
+			data['values'] = json.dumps(data['values'])
+			rows.append((productPropertyState, data))
+
+		self._updateRows('PRODUCT_PROPERTY_STATE', rows)
 
 	def productPropertyState_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
@@ -1623,7 +2655,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting productPropertyStates, filter: %s" % filter)
 		productPropertyStates = []
 		(attributes, filter) = self._adjustAttributes(ProductPropertyState, attributes, filter)
-		for res in self._sql.getSet(self._createQuery('PRODUCT_PROPERTY_STATE', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('PRODUCT_PROPERTY_STATE', attributes, filter)):
 			try:
 				res['values'] = json.loads(res['values'])
 			except KeyError:
@@ -1635,9 +2667,12 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.productPropertyState_deleteObjects(self, productPropertyStates)
 		for productPropertyState in forceObjectClassList(productPropertyStates, ProductPropertyState):
+			if self._isDataOfHostRemoved(productPropertyState.objectId):
+				continue
+
 			logger.info(u"Deleting productPropertyState %s" % productPropertyState)
-			where = self._uniqueCondition(productPropertyState)
-			self._sql.delete('PRODUCT_PROPERTY_STATE', where)
+			where, whereParameters = self._uniqueConditionWithParameters(productPropertyState)
+			self._sql.delete('PRODUCT_PROPERTY_STATE', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Groups
@@ -1647,9 +2682,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.group_insertObject(self, group)
 		data = self._objectToDatabaseHash(group)
 
-		where = self._uniqueCondition(group)
-		if self._sql.getRow('select * from `GROUP` where %s' % where):
-			self._sql.update('GROUP', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(group)
+		if self._sql.getRow('select * from `GROUP` where %s' % where, parameters=whereParameters):
+			self._sql.update('GROUP', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('GROUP', data)
 
@@ -1657,8 +2692,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.group_updateObject(self, group)
 		data = self._objectToDatabaseHash(group)
-		where = self._uniqueCondition(group)
-		self._sql.update('GROUP', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(group)
+		self._sql.update('GROUP', where, data, whereParameters=whereParameters)
 
 	def group_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
@@ -1666,7 +2701,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting groups, filter: %s" % filter)
 		groups = []
 		(attributes, filter) = self._adjustAttributes(Group, attributes, filter)
-		for res in self._sql.getSet(self._createQuery('GROUP', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('GROUP', attributes, filter)):
 			self._adjustResult(Group, res)
 			groups.append(Group.fromHash(res))
 		return groups
@@ -1676,8 +2711,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.group_deleteObjects(self, groups)
 		for group in forceObjectClassList(groups, Group):
 			logger.info(u"Deleting group %s" % group)
-			where = self._uniqueCondition(group)
-			self._sql.delete('GROUP', where)
+			where, whereParameters = self._uniqueConditionWithParameters(group)
+			self._sql.delete('GROUP', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   ObjectToGroups
@@ -1687,18 +2722,40 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.objectToGroup_insertObject(self, objectToGroup)
 		data = self._objectToDatabaseHash(objectToGroup)
 
-		where = self._uniqueCondition(objectToGroup)
-		if self._sql.getRow('select * from `OBJECT_TO_GROUP` where %s' % where):
-			self._sql.update('OBJECT_TO_GROUP', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(objectToGroup)
+		if self._sql.getRow('select * from `OBJECT_TO_GROUP` where %s' % where, parameters=whereParameters):
+			self._sql.update('OBJECT_TO_GROUP', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('OBJECT_TO_GROUP', data)
 
+	def objectToGroup_insertObjects(self, objectToGroups):
+		self._requiresEnabledSQLBackendModule()
+		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
+		for objectToGroup in objectToGroups:
+			ConfigDataBackend.objectToGroup_insertObject(self, objectToGroup)
+
+		self._insertOrUpdateRows(
+			'OBJECT_TO_GROUP',
+			[(objectToGroup, self._objectToDatabaseHash(objectToGroup)) for objectToGroup in objectToGroups]
+		)
+
 	def objectToGroup_updateObject(self, objectToGroup):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.objectToGroup_updateObject(self, objectToGroup)
 		data = self._objectToDatabaseHash(objectToGroup)
-		where = self._uniqueCondition(objectToGroup)
-		self._sql.update('OBJECT_TO_GROUP', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(objectToGroup)
+		self._sql.update('OBJECT_TO_GROUP', where, data, whereParameters=whereParameters)
+
+	def objectToGroup_updateObjects(self, objectToGroups):
+		self._requiresEnabledSQLBackendModule()
+		objectToGroups = forceObjectClassList(objectToGroups, ObjectToGroup)
+		for objectToGroup in objectToGroups:
+			ConfigDataBackend.objectToGroup_updateObject(self, objectToGroup)
+
+		self._updateRows(
+			'OBJECT_TO_GROUP',
+			[(objectToGroup, self._objectToDatabaseHash(objectToGroup)) for objectToGroup in objectToGroups]
+		)
 
 	def objectToGroup_getObjects(self, attributes=[], **filter):
 		self._requiresEnabledSQLBackendModule()
@@ -1706,15 +2763,18 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting objectToGroups, filter: %s" % filter)
 		(attributes, filter) = self._adjustAttributes(ObjectToGroup, attributes, filter)
 		return [ObjectToGroup.fromHash(res) for res in
-				self._sql.getSet(self._createQuery('OBJECT_TO_GROUP', attributes, filter))]
+				self._sql.getSet(*self._createQueryWithParameters('OBJECT_TO_GROUP', attributes, filter))]
 
 	def objectToGroup_deleteObjects(self, objectToGroups):
 		self._requiresEnabledSQLBackendModule()
 		ConfigDataBackend.objectToGroup_deleteObjects(self, objectToGroups)
 		for objectToGroup in forceObjectClassList(objectToGroups, ObjectToGroup):
+			if objectToGroup.groupType == 'HostGroup' and self._isDataOfHostRemoved(objectToGroup.objectId):
+				continue
+
 			logger.info(u"Deleting objectToGroup %s" % objectToGroup)
-			where = self._uniqueCondition(objectToGroup)
-			self._sql.delete('OBJECT_TO_GROUP', where)
+			where, whereParameters = self._uniqueConditionWithParameters(objectToGroup)
+			self._sql.delete('OBJECT_TO_GROUP', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   LicenseContracts
@@ -1727,9 +2787,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.licenseContract_insertObject(self, licenseContract)
 		data = self._objectToDatabaseHash(licenseContract)
 
-		where = self._uniqueCondition(licenseContract)
-		if self._sql.getRow('select * from `LICENSE_CONTRACT` where %s' % where):
-			self._sql.update('LICENSE_CONTRACT', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(licenseContract)
+		if self._sql.getRow('select * from `LICENSE_CONTRACT` where %s' % where, parameters=whereParameters):
+			self._sql.update('LICENSE_CONTRACT', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('LICENSE_CONTRACT', data)
 
@@ -1740,8 +2800,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.licenseContract_updateObject(self, licenseContract)
 		data = self._objectToDatabaseHash(licenseContract)
-		where = self._uniqueCondition(licenseContract)
-		self._sql.update('LICENSE_CONTRACT', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(licenseContract)
+		self._sql.update('LICENSE_CONTRACT', where, data, whereParameters=whereParameters)
 
 	def licenseContract_getObjects(self, attributes=[], **filter):
 		if not self._licenseManagementModule:
@@ -1752,7 +2812,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting licenseContracts, filter: %s" % filter)
 		licenseContracts = []
 		(attributes, filter) = self._adjustAttributes(LicenseContract, attributes, filter)
-		for res in self._sql.getSet(self._createQuery('LICENSE_CONTRACT', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('LICENSE_CONTRACT', attributes, filter)):
 			self._adjustResult(LicenseContract, res)
 			licenseContracts.append(LicenseContract.fromHash(res))
 		return licenseContracts
@@ -1765,8 +2825,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.licenseContract_deleteObjects(self, licenseContracts)
 		for licenseContract in forceObjectClassList(licenseContracts, LicenseContract):
 			logger.info(u"Deleting licenseContract %s" % licenseContract)
-			where = self._uniqueCondition(licenseContract)
-			self._sql.delete('LICENSE_CONTRACT', where)
+			where, whereParameters = self._uniqueConditionWithParameters(licenseContract)
+			self._sql.delete('LICENSE_CONTRACT', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   SoftwareLicenses
@@ -1779,9 +2839,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.softwareLicense_insertObject(self, softwareLicense)
 		data = self._objectToDatabaseHash(softwareLicense)
 
-		where = self._uniqueCondition(softwareLicense)
-		if self._sql.getRow('select * from `SOFTWARE_LICENSE` where %s' % where):
-			self._sql.update('SOFTWARE_LICENSE', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(softwareLicense)
+		if self._sql.getRow('select * from `SOFTWARE_LICENSE` where %s' % where, parameters=whereParameters):
+			self._sql.update('SOFTWARE_LICENSE', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('SOFTWARE_LICENSE', data)
 
@@ -1792,8 +2852,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.softwareLicense_updateObject(self, softwareLicense)
 		data = self._objectToDatabaseHash(softwareLicense)
-		where = self._uniqueCondition(softwareLicense)
-		self._sql.update('SOFTWARE_LICENSE', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(softwareLicense)
+		self._sql.update('SOFTWARE_LICENSE', where, data, whereParameters=whereParameters)
 
 	def softwareLicense_getObjects(self, attributes=[], **filter):
 		if not self._licenseManagementModule:
@@ -1804,7 +2864,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting softwareLicenses, filter: %s" % filter)
 		softwareLicenses = []
 		(attributes, filter) = self._adjustAttributes(SoftwareLicense, attributes, filter)
-		for res in self._sql.getSet(self._createQuery('SOFTWARE_LICENSE', attributes, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('SOFTWARE_LICENSE', attributes, filter)):
 			self._adjustResult(SoftwareLicense, res)
 			softwareLicenses.append(SoftwareLicense.fromHash(res))
 		return softwareLicenses
@@ -1817,8 +2877,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.softwareLicense_deleteObjects(self, softwareLicenses)
 		for softwareLicense in forceObjectClassList(softwareLicenses, SoftwareLicense):
 			logger.info(u"Deleting softwareLicense %s" % softwareLicense)
-			where = self._uniqueCondition(softwareLicense)
-			self._sql.delete('SOFTWARE_LICENSE', where)
+			where, whereParameters = self._uniqueConditionWithParameters(softwareLicense)
+			self._sql.delete('SOFTWARE_LICENSE', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   LicensePools
@@ -1859,13 +2919,13 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		productIds = data['productIds']
 		del data['productIds']
 
-		where = self._uniqueCondition(licensePool)
-		if self._sql.getRow('select * from `LICENSE_POOL` where %s' % where):
-			self._sql.update('LICENSE_POOL', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(licensePool)
+		if self._sql.getRow('select * from `LICENSE_POOL` where %s' % where, parameters=whereParameters):
+			self._sql.update('LICENSE_POOL', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('LICENSE_POOL', data)
 
-		self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', "`licensePoolId` = '%s'" % data['licensePoolId'])
+		self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', u"`licensePoolId` = {0}".format(self._sql.PARAMETER), parameters=[data['licensePoolId']])
 
 		for productId in productIds:
 			mapping = {
@@ -1881,11 +2941,11 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.licensePool_updateObject(self, licensePool)
 		data = self._objectToDatabaseHash(licensePool)
-		where = self._uniqueCondition(licensePool)
+		where, whereParameters = self._uniqueConditionWithParameters(licensePool)
 		productIds = data['productIds']
 		del data['productIds']
-		self._sql.update('LICENSE_POOL', where, data)
-		self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', "`licensePoolId` = '%s'" % data['licensePoolId'])
+		self._sql.update('LICENSE_POOL', where, data, whereParameters=whereParameters)
+		self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', u"`licensePoolId` = {0}".format(self._sql.PARAMETER), parameters=[data['licensePoolId']])
 
 		for productId in productIds:
 			mapping = {
@@ -1906,13 +2966,13 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		try:
 			if filter['productIds']:
 				licensePoolIds = filter.get('licensePoolId')
-				query = self._createQuery(
+				query, parameters = self._createQueryWithParameters(
 					'PRODUCT_ID_TO_LICENSE_POOL',
 					['licensePoolId'],
 					{'licensePoolId': licensePoolIds, 'productId': filter['productIds']}
 				)
 
-				filter['licensePoolId'] = [res['licensePoolId'] for res in self._sql.getSet(query)]
+				filter['licensePoolId'] = [res['licensePoolId'] for res in self._sql.getSet(query, parameters)]
 
 				if not filter['licensePoolId']:
 					return []
@@ -1924,11 +2984,12 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		readProductIds = not attributes or 'productIds' in attributes
 
 		licensePools = []
+		productIdQuery = u"select * from PRODUCT_ID_TO_LICENSE_POOL where `licensePoolId` = {0}".format(self._sql.PARAMETER)
 		attrs = [attr for attr in attributes if attr != 'productIds']
-		for res in self._sql.getSet(self._createQuery('LICENSE_POOL', attrs, filter)):
+		for res in self._sql.getSet(*self._createQueryWithParameters('LICENSE_POOL', attrs, filter)):
 			res['productIds'] = []
 			if readProductIds:
-				for res2 in self._sql.getSet(u"select * from PRODUCT_ID_TO_LICENSE_POOL where `licensePoolId` = '%s'" % res['licensePoolId']):
+				for res2 in self._sql.getSet(productIdQuery, [res['licensePoolId']]):
 					res['productIds'].append(res2['productId'])
 			self._adjustResult(LicensePool, res)
 			licensePools.append(LicensePool.fromHash(res))
@@ -1942,9 +3003,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.licensePool_deleteObjects(self, licensePools)
 		for licensePool in forceObjectClassList(licensePools, LicensePool):
 			logger.info(u"Deleting licensePool %s" % licensePool)
-			where = self._uniqueCondition(licensePool)
-			self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', "`licensePoolId` = '%s'" % licensePool.id)
-			self._sql.delete('LICENSE_POOL', where)
+			where, whereParameters = self._uniqueConditionWithParameters(licensePool)
+			self._sql.delete('PRODUCT_ID_TO_LICENSE_POOL', u"`licensePoolId` = {0}".format(self._sql.PARAMETER), parameters=[licensePool.id])
+			self._sql.delete('LICENSE_POOL', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   SoftwareLicenseToLicensePools
@@ -1957,9 +3018,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.softwareLicenseToLicensePool_insertObject(self, softwareLicenseToLicensePool)
 		data = self._objectToDatabaseHash(softwareLicenseToLicensePool)
 
-		where = self._uniqueCondition(softwareLicenseToLicensePool)
-		if self._sql.getRow('select * from `SOFTWARE_LICENSE_TO_LICENSE_POOL` where %s' % where):
-			self._sql.update('SOFTWARE_LICENSE_TO_LICENSE_POOL', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(softwareLicenseToLicensePool)
+		if self._sql.getRow('select * from `SOFTWARE_LICENSE_TO_LICENSE_POOL` where %s' % where, parameters=whereParameters):
+			self._sql.update('SOFTWARE_LICENSE_TO_LICENSE_POOL', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('SOFTWARE_LICENSE_TO_LICENSE_POOL', data)
 
@@ -1970,8 +3031,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.softwareLicenseToLicensePool_updateObject(self, softwareLicenseToLicensePool)
 		data = self._objectToDatabaseHash(softwareLicenseToLicensePool)
-		where = self._uniqueCondition(softwareLicenseToLicensePool)
-		self._sql.update('SOFTWARE_LICENSE_TO_LICENSE_POOL', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(softwareLicenseToLicensePool)
+		self._sql.update('SOFTWARE_LICENSE_TO_LICENSE_POOL', where, data, whereParameters=whereParameters)
 
 	def softwareLicenseToLicensePool_getObjects(self, attributes=[], **filter):
 		if not self._licenseManagementModule:
@@ -1983,7 +3044,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		(attributes, filter) = self._adjustAttributes(SoftwareLicenseToLicensePool, attributes, filter)
 		return [SoftwareLicenseToLicensePool.fromHash(res) for res in
 				self._sql.getSet(
-					self._createQuery(
+					*self._createQueryWithParameters(
 						'SOFTWARE_LICENSE_TO_LICENSE_POOL', attributes, filter
 					)
 				)
@@ -1997,8 +3058,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.softwareLicenseToLicensePool_deleteObjects(self, softwareLicenseToLicensePools)
 		for softwareLicenseToLicensePool in forceObjectClassList(softwareLicenseToLicensePools, SoftwareLicenseToLicensePool):
 			logger.info(u"Deleting softwareLicenseToLicensePool %s" % softwareLicenseToLicensePool)
-			where = self._uniqueCondition(softwareLicenseToLicensePool)
-			self._sql.delete('SOFTWARE_LICENSE_TO_LICENSE_POOL', where)
+			where, whereParameters = self._uniqueConditionWithParameters(softwareLicenseToLicensePool)
+			self._sql.delete('SOFTWARE_LICENSE_TO_LICENSE_POOL', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   LicenseOnClients
@@ -2011,9 +3072,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.licenseOnClient_insertObject(self, licenseOnClient)
 		data = self._objectToDatabaseHash(licenseOnClient)
 
-		where = self._uniqueCondition(licenseOnClient)
-		if self._sql.getRow('select * from `LICENSE_ON_CLIENT` where %s' % where):
-			self._sql.update('LICENSE_ON_CLIENT', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(licenseOnClient)
+		if self._sql.getRow('select * from `LICENSE_ON_CLIENT` where %s' % where, parameters=whereParameters):
+			self._sql.update('LICENSE_ON_CLIENT', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('LICENSE_ON_CLIENT', data)
 
@@ -2024,8 +3085,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.licenseOnClient_updateObject(self, licenseOnClient)
 		data = self._objectToDatabaseHash(licenseOnClient)
-		where = self._uniqueCondition(licenseOnClient)
-		self._sql.update('LICENSE_ON_CLIENT', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(licenseOnClient)
+		self._sql.update('LICENSE_ON_CLIENT', where, data, whereParameters=whereParameters)
 
 	def licenseOnClient_getObjects(self, attributes=[], **filter):
 		if not self._licenseManagementModule:
@@ -2037,7 +3098,7 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		(attributes, filter) = self._adjustAttributes(LicenseOnClient, attributes, filter)
 		return [LicenseOnClient.fromHash(res) for res in
 				self._sql.getSet(
-					self._createQuery('LICENSE_ON_CLIENT', attributes, filter)
+					*self._createQueryWithParameters('LICENSE_ON_CLIENT', attributes, filter)
 				)
 		]
 
@@ -2048,9 +3109,12 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		ConfigDataBackend.licenseOnClient_deleteObjects(self, licenseOnClients)
 		for licenseOnClient in forceObjectClassList(licenseOnClients, LicenseOnClient):
+			if self._isDataOfHostRemoved(licenseOnClient.clientId):
+				continue
+
 			logger.info(u"Deleting licenseOnClient %s" % licenseOnClient)
-			where = self._uniqueCondition(licenseOnClient)
-			self._sql.delete('LICENSE_ON_CLIENT', where)
+			where, whereParameters = self._uniqueConditionWithParameters(licenseOnClient)
+			self._sql.delete('LICENSE_ON_CLIENT', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   AuditSoftwares
@@ -2059,21 +3123,31 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.auditSoftware_insertObject(self, auditSoftware)
 		data = self._objectToDatabaseHash(auditSoftware)
 
-		where = self._uniqueCondition(auditSoftware)
-		if self._sql.getRow('select * from `SOFTWARE` where %s' % where):
-			self._sql.update('SOFTWARE', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftware)
+		if self._sql.getRow('select * from `SOFTWARE` where %s' % where, parameters=whereParameters):
+			self._sql.update('SOFTWARE', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('SOFTWARE', data)
 
+	def auditSoftware_insertObjects(self, auditSoftwares):
+		auditSoftwares = forceObjectClassList(auditSoftwares, AuditSoftware)
+		for auditSoftware in auditSoftwares:
+			ConfigDataBackend.auditSoftware_insertObject(self, auditSoftware)
+
+		self._insertOrUpdateRows(
+			'SOFTWARE',
+			[(auditSoftware, self._objectToDatabaseHash(auditSoftware)) for auditSoftware in auditSoftwares]
+		)
+
 	def auditSoftware_updateObject(self, auditSoftware):
 		ConfigDataBackend.auditSoftware_updateObject(self, auditSoftware)
 		data = self._objectToDatabaseHash(auditSoftware)
-		where = self._uniqueCondition(auditSoftware)
-		self._sql.update('SOFTWARE', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftware)
+		self._sql.update('SOFTWARE', where, data, whereParameters=whereParameters)
 
 	def auditSoftware_getHashes(self, attributes=[], **filter):
 		(attributes, filter) = self._adjustAttributes(AuditSoftware, attributes, filter)
-		return self._sql.getSet(self._createQuery('SOFTWARE', attributes, filter))
+		return self._sql.getSet(*self._createQueryWithParameters('SOFTWARE', attributes, filter))
 
 	def auditSoftware_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.auditSoftware_getObjects(self, attributes=[], **filter)
@@ -2086,8 +3160,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.auditSoftware_deleteObjects(self, auditSoftwares)
 		for auditSoftware in forceObjectClassList(auditSoftwares, AuditSoftware):
 			logger.info(u"Deleting auditSoftware %s" % auditSoftware)
-			where = self._uniqueCondition(auditSoftware)
-			self._sql.delete('SOFTWARE', where)
+			where, whereParameters = self._uniqueConditionWithParameters(auditSoftware)
+			self._sql.delete('SOFTWARE', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   AuditSoftwareToLicensePools
@@ -2096,21 +3170,21 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.auditSoftwareToLicensePool_insertObject(self, auditSoftwareToLicensePool)
 		data = self._objectToDatabaseHash(auditSoftwareToLicensePool)
 
-		where = self._uniqueCondition(auditSoftwareToLicensePool)
-		if self._sql.getRow('select * from `AUDIT_SOFTWARE_TO_LICENSE_POOL` where %s' % where):
-			self._sql.update('AUDIT_SOFTWARE_TO_LICENSE_POOL', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareToLicensePool)
+		if self._sql.getRow('select * from `AUDIT_SOFTWARE_TO_LICENSE_POOL` where %s' % where, parameters=whereParameters):
+			self._sql.update('AUDIT_SOFTWARE_TO_LICENSE_POOL', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('AUDIT_SOFTWARE_TO_LICENSE_POOL', data)
 
 	def auditSoftwareToLicensePool_updateObject(self, auditSoftwareToLicensePool):
 		ConfigDataBackend.auditSoftwareToLicensePool_updateObject(self, auditSoftwareToLicensePool)
 		data = self._objectToDatabaseHash(auditSoftwareToLicensePool)
-		where = self._uniqueCondition(auditSoftwareToLicensePool)
-		self._sql.update('AUDIT_SOFTWARE_TO_LICENSE_POOL', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareToLicensePool)
+		self._sql.update('AUDIT_SOFTWARE_TO_LICENSE_POOL', where, data, whereParameters=whereParameters)
 
 	def auditSoftwareToLicensePool_getHashes(self, attributes=[], **filter):
 		(attributes, filter) = self._adjustAttributes(AuditSoftwareToLicensePool, attributes, filter)
-		return self._sql.getSet(self._createQuery('AUDIT_SOFTWARE_TO_LICENSE_POOL', attributes, filter))
+		return self._sql.getSet(*self._createQueryWithParameters('AUDIT_SOFTWARE_TO_LICENSE_POOL', attributes, filter))
 
 	def auditSoftwareToLicensePool_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.auditSoftwareToLicensePool_getObjects(self, attributes=[], **filter)
@@ -2122,8 +3196,8 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.auditSoftwareToLicensePool_deleteObjects(self, auditSoftwareToLicensePools)
 		for auditSoftwareToLicensePool in forceObjectClassList(auditSoftwareToLicensePools, AuditSoftwareToLicensePool):
 			logger.info(u"Deleting auditSoftware %s" % auditSoftwareToLicensePool)
-			where = self._uniqueCondition(auditSoftwareToLicensePool)
-			self._sql.delete('AUDIT_SOFTWARE_TO_LICENSE_POOL', where)
+			where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareToLicensePool)
+			self._sql.delete('AUDIT_SOFTWARE_TO_LICENSE_POOL', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   AuditSoftwareOnClients
@@ -2132,21 +3206,31 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		ConfigDataBackend.auditSoftwareOnClient_insertObject(self, auditSoftwareOnClient)
 		data = self._objectToDatabaseHash(auditSoftwareOnClient)
 
-		where = self._uniqueCondition(auditSoftwareOnClient)
-		if self._sql.getRow('select * from `SOFTWARE_CONFIG` where %s' % where):
-			self._sql.update('SOFTWARE_CONFIG', where, data, updateWhereNone=True)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareOnClient)
+		if self._sql.getRow('select * from `SOFTWARE_CONFIG` where %s' % where, parameters=whereParameters):
+			self._sql.update('SOFTWARE_CONFIG', where, data, updateWhereNone=True, whereParameters=whereParameters)
 		else:
 			self._sql.insert('SOFTWARE_CONFIG', data)
 
+	def auditSoftwareOnClient_insertObjects(self, auditSoftwareOnClients):
+		auditSoftwareOnClients = forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient)
+		for auditSoftwareOnClient in auditSoftwareOnClients:
+			ConfigDataBackend.auditSoftwareOnClient_insertObject(self, auditSoftwareOnClient)
+
+		self._insertOrUpdateRows(
+			'SOFTWARE_CONFIG',
+			[(auditSoftwareOnClient, self._objectToDatabaseHash(auditSoftwareOnClient)) for auditSoftwareOnClient in auditSoftwareOnClients]
+		)
+
 	def auditSoftwareOnClient_updateObject(self, auditSoftwareOnClient):
 		ConfigDataBackend.auditSoftwareOnClient_updateObject(self, auditSoftwareOnClient)
 		data = self._objectToDatabaseHash(auditSoftwareOnClient)
-		where = self._uniqueCondition(auditSoftwareOnClient)
-		self._sql.update('SOFTWARE_CONFIG', where, data)
+		where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareOnClient)
+		self._sql.update('SOFTWARE_CONFIG', where, data, whereParameters=whereParameters)
 
 	def auditSoftwareOnClient_getHashes(self, attributes=[], **filter):
 		(attributes, filter) = self._adjustAttributes(AuditSoftwareOnClient, attributes, filter)
-		return self._sql.getSet(self._createQuery('SOFTWARE_CONFIG', attributes, filter))
+		return self._sql.getSet(*self._createQueryWithParameters('SOFTWARE_CONFIG', attributes, filter))
 
 	def auditSoftwareOnClient_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.auditSoftwareOnClient_getObjects(self, attributes=[], **filter)
@@ -2154,12 +3238,27 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		return [AuditSoftwareOnClient.fromHash(h) for h in
 				self.auditSoftwareOnClient_getHashes(attributes, **filter)]
 
+	def auditSoftwareOnClient_iterObjects(self, attributes=[], **filter):
+		"""
+		Iterate over the auditSoftwareOnClients without reading all
+		of them into memory.
+
+		:rtype: generator
+		"""
+		ConfigDataBackend.auditSoftwareOnClient_getObjects(self, attributes=[], **filter)
+		(attributes, filter) = self._adjustAttributes(AuditSoftwareOnClient, attributes, filter)
+		for h in self._sql.iterSet(*self._createQueryWithParameters('SOFTWARE_CONFIG', attributes, filter)):
+			yield AuditSoftwareOnClient.fromHash(h)
+
 	def auditSoftwareOnClient_deleteObjects(self, auditSoftwareOnClients):
 		ConfigDataBackend.auditSoftwareOnClient_deleteObjects(self, auditSoftwareOnClients)
 		for auditSoftwareOnClient in forceObjectClassList(auditSoftwareOnClients, AuditSoftwareOnClient):
+			if self._isDataOfHostRemoved(auditSoftwareOnClient.clientId):
+				continue
+
 			logger.info(u"Deleting auditSoftwareOnClient %s" % auditSoftwareOnClient)
-			where = self._uniqueCondition(auditSoftwareOnClient)
-			self._sql.delete('SOFTWARE_CONFIG', where)
+			where, whereParameters = self._uniqueConditionWithParameters(auditSoftwareOnClient)
+			self._sql.delete('SOFTWARE_CONFIG', where, parameters=whereParameters)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   AuditHardwares
@@ -2249,20 +3348,9 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		return self._auditHardware_search(returnHardwareIds=False, attributes=attributes, **filter)
 
 	def _auditHardware_search(self, returnHardwareIds=False, attributes=[], **filter):
-		hardwareClasses = set()
-		hardwareClass = filter.get('hardwareClass')
-		if hardwareClass not in ([], None):
-			for hwc in forceUnicodeList(hardwareClass):
-				regex = re.compile(u'^{0}$'.format(hwc.replace('*', '.*')))
-				for key in self._auditHardwareConfig:
-					if regex.search(key):
-						hardwareClasses.add(key)
-
-			if not hardwareClasses:
-				return []
-
+		hardwareClasses = self._getAuditHardwareClasses(filter.get('hardwareClass'))
 		if not hardwareClasses:
-			hardwareClasses = set(self._auditHardwareConfig)
+			return []
 
 		for unwanted_key in ('hardwareClass', 'type'):
 			try:
@@ -2284,50 +3372,41 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 
 		results = []
 		for hardwareClass in hardwareClasses:
+			missingAttributes = hardwareClass.getUnknownAttributes(filter)
+			if missingAttributes:
+				logger.debug(u"Skipping hardwareClass '{0}', because of missing info for attribute '{1}'", hardwareClass.name, missingAttributes[0])
+				continue
+
 			classFilter = {}
 			for (attribute, value) in filter.iteritems():
-				valueInfo = self._auditHardwareConfig[hardwareClass].get(attribute)
-				if not valueInfo:
-					logger.debug(u"Skipping hardwareClass '%s', because of missing info for attribute '%s'" % (hardwareClass, attribute))
-					break
-
-				try:
-					if valueInfo['Scope'] != 'g':
-						continue
-				except KeyError:
-					pass
+				if attribute not in hardwareClass.deviceAttributes:
+					continue
 
 				if value is not None:
 					value = forceList(value)
 				classFilter[attribute] = value
-			else:
-				if not classFilter and filter:
-					continue
 
-				logger.debug(u"Getting auditHardwares, hardwareClass '%s', filter: %s" % (hardwareClass, classFilter))
-				query = self._createQuery(u'HARDWARE_DEVICE_' + hardwareClass, attributes, classFilter)
-				for res in self._sql.getSet(query):
-					if returnHardwareIds:
-						results.append(res['hardware_id'])
-						continue
+			if not classFilter and filter:
+				continue
 
-					try:
-						del res['hardware_id']
-					except KeyError:
-						pass
+			logger.debug(u"Getting auditHardwares, hardwareClass '{0}', filter: {1}", hardwareClass.name, classFilter)
+			query, parameters = self._createQueryWithParameters(hardwareClass.deviceTable, attributes, classFilter)
+			for res in self._sql.getSet(query, parameters):
+				if returnHardwareIds:
+					results.append(res['hardware_id'])
+					continue
 
-					res['hardwareClass'] = hardwareClass
-					for (attribute, valueInfo) in self._auditHardwareConfig[hardwareClass].iteritems():
-						try:
-							if valueInfo['Scope'] == 'i':
-								continue
-						except KeyError:
-							pass
+				try:
+					del res['hardware_id']
+				except KeyError:
+					pass
 
-						if attribute not in res:
-							res[attribute] = None
+				res['hardwareClass'] = hardwareClass.name
+				for attribute in hardwareClass.hardwareAttributes:
+					if attribute not in res:
+						res[attribute] = None
 
-					results.append(res)
+				results.append(res)
 
 		return results
 
@@ -2460,20 +3539,12 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 			self._sql.update('HARDWARE_CONFIG_%s' % auditHardwareOnHost.hardwareClass, where, update)
 
 	def auditHardwareOnHost_getHashes(self, attributes=[], **filter):
-		hardwareClasses = set()
-		hardwareClass = filter.get('hardwareClass')
-		if hardwareClass not in ([], None):
-			for hwc in forceUnicodeList(hardwareClass):
-				regex = re.compile(r'^%s$' % hwc.replace('*', '.*'))
-				keys = (key for key in self._auditHardwareConfig if regex.search(key))
-				for key in keys:
-					hardwareClasses.add(key)
-
-			if not hardwareClasses:
-				return []
+		return list(self._iterAuditHardwareOnHostHashes(attributes, **filter))
 
+	def _iterAuditHardwareOnHostHashes(self, attributes=[], **filter):
+		hardwareClasses = self._getAuditHardwareClasses(filter.get('hardwareClass'))
 		if not hardwareClasses:
-			hardwareClasses = set(self._auditHardwareConfig)
+			return
 
 		for unwanted_key in ('hardwareClass', 'type'):
 			try:
@@ -2481,75 +3552,46 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 			except KeyError:
 				pass  # not there - everything okay.
 
-		for attribute in attributes:
-			if attribute not in filter:
-				filter[attribute] = None
+		requestedAttributes = [attribute for attribute in attributes if attribute not in filter]
 
-		hashes = []
 		for hardwareClass in hardwareClasses:
-			auditHardwareFilter = {}
+			missingAttributes = hardwareClass.getUnknownAttributes(list(filter) + requestedAttributes, hostAttributes=True)
+			if missingAttributes:
+				logger.debug(u"Skipping hardwareClass '{0}', because of missing info for attribute '{1}'", hardwareClass.name, missingAttributes[0])
+				continue
+
 			classFilter = {}
-			skipHardwareClass = False
 			for attribute, value in filter.iteritems():
-				valueInfo = None
-				if attribute not in ('hostId', 'state', 'firstseen', 'lastseen'):
-					valueInfo = self._auditHardwareConfig[hardwareClass].get(attribute)
-					if not valueInfo:
-						logger.debug(u"Skipping hardwareClass '%s', because of missing info for attribute '%s'" % (hardwareClass, attribute))
-						skipHardwareClass = True
-						break
-
-					scope = valueInfo.get('Scope', '')
-					if scope == 'g':
-						auditHardwareFilter[attribute] = value
-						continue
-					if scope != 'i':
-						continue
+				if attribute in hardwareClass.deviceAttributes:
+					# Values are matched like the ones of the
+					# hardware device they belong to.
+					if value is None:
+						value = [None]
+					elif isinstance(value, unicode):
+						value = self._sql.escapeAsterisk(value)
+				elif attribute not in hardwareClass.configAttributes:
+					continue
 
 				if value is not None:
 					value = forceList(value)
 
 				classFilter[attribute] = value
 
-			if skipHardwareClass:
-				continue
-
-			hardwareIds = []
-			if auditHardwareFilter:
-				auditHardwareFilter['hardwareClass'] = hardwareClass
-				hardwareIds = self._getHardwareIds(auditHardwareFilter)
-				logger.debug2(u"Filtered matching hardware ids: {0}", hardwareIds)
-				if not hardwareIds:
-					continue
-			classFilter['hardware_id'] = hardwareIds
-
-			if attributes and 'hardware_id' not in attributes:
-				attributes.append('hardware_id')
-
-			logger.debug(u"Getting auditHardwareOnHosts, hardwareClass '%s', hardwareIds: %s, filter: %s" % (hardwareClass, hardwareIds, classFilter))
-			for res in self._sql.getSet(self._createQuery(u'HARDWARE_CONFIG_{0}'.format(hardwareClass), attributes, classFilter)):
-				data = self._sql.getSet(u'SELECT * from `HARDWARE_DEVICE_%s` where `hardware_id` = %s' \
-								% (hardwareClass, res['hardware_id']))
-
-				if not data:
-					logger.error(u"Hardware device of class '%s' with hardware_id '%s' not found" % (hardwareClass, res['hardware_id']))
-					continue
-
-				data = data[0]
-				data.update(res)
-				data['hardwareClass'] = hardwareClass
-				del data['hardware_id']
-				try:
-					del data['config_id']
-				except KeyError:
-					pass  # not there - everything okay
+			logger.debug(u"Getting auditHardwareOnHosts, hardwareClass '{0}', filter: {1}", hardwareClass.name, classFilter)
+			condition, parameters = self._filterToSqlWithParameters(classFilter)
+			query = hardwareClass.getJoinQuery(attributes, condition)
+			for data in self._sql.iterSet(query, parameters):
+				data['hardwareClass'] = hardwareClass.name
+				for attribute in ('hardware_id', 'config_id'):
+					try:
+						del data[attribute]
+					except KeyError:
+						pass  # not there - everything okay
 
-				for attribute in self._auditHardwareConfig[hardwareClass]:
+				for attribute in hardwareClass.attributes:
 					if attribute not in data:
 						data[attribute] = None
-				hashes.append(data)
-
-		return hashes
+				yield data
 
 	def auditHardwareOnHost_getObjects(self, attributes=[], **filter):
 		ConfigDataBackend.auditHardwareOnHost_getObjects(self, attributes=[], **filter)
@@ -2557,13 +3599,107 @@ AND `packageVersion` = '{packageVersion}'""".format(**productProperty)
 		logger.info(u"Getting auditHardwareOnHosts, filter: %s" % filter)
 		return [AuditHardwareOnHost.fromHash(h) for h in self.auditHardwareOnHost_getHashes(attributes, **filter)]
 
+	def auditHardwareOnHost_iterObjects(self, attributes=[], **filter):
+		"""
+		Iterate over the auditHardwareOnHosts without reading all
+		of them into memory.
+
+		:rtype: generator
+		"""
+		ConfigDataBackend.auditHardwareOnHost_getObjects(self, attributes=[], **filter)
+		for h in self._iterAuditHardwareOnHostHashes(attributes, **filter):
+			yield AuditHardwareOnHost.fromHash(h)
+
 	def auditHardwareOnHost_deleteObjects(self, auditHardwareOnHosts):
 		ConfigDataBackend.auditHardwareOnHost_deleteObjects(self, auditHardwareOnHosts)
 		for auditHardwareOnHost in forceObjectClassList(auditHardwareOnHosts, AuditHardwareOnHost):
+			if self._isDataOfHostRemoved(auditHardwareOnHost.hostId):
+				continue
+
 			logger.info(u"Deleting auditHardwareOnHost: %s" % auditHardwareOnHost)
 			where = self._uniqueAuditHardwareOnHostCondition(auditHardwareOnHost)
 			self._sql.delete(u'HARDWARE_CONFIG_{0}'.format(auditHardwareOnHost.getHardwareClass()), where)
 
+	def auditHardwareOnHost_updateInventory(self, hostId, auditHardwareOnHosts, complete=True):
+		"""
+		Replace the hardware inventory of the host `hostId`.
+
+		The stored hardware of the host is read with one query per
+		hardware class and compared with the inventory. Hardware that
+		was seen again and hardware that vanished is then updated with
+		one statement per class each. Only new hardware is processed
+		one by one. Classes without hardware in an incomplete inventory
+		are not read.
+		"""
+		hostId, auditHardwareOnHosts = self._checkHardwareInventory(hostId, auditHardwareOnHosts)
+		complete = forceBool(complete)
+		now = timestamp()
+
+		inventory = {}
+		for auditHardwareOnHost in auditHardwareOnHosts:
+			hardwareClass = self._auditHardwareClasses.get(auditHardwareOnHost.getHardwareClass())
+			if hardwareClass is None:
+				raise BackendConfigurationError(
+					u"Hardware class {0!r} not found in config".format(auditHardwareOnHost.getHardwareClass())
+				)
+
+			key = hardwareClass.getInventoryKey(auditHardwareOnHost.toHash())
+			inventory.setdefault(hardwareClass.name, OrderedDict()).setdefault(key, auditHardwareOnHost)
+
+		newObjects = []
+		for hardwareClass in self._auditHardwareClasses.values():
+			classInventory = inventory.get(hardwareClass.name, {})
+			if not (complete or classInventory):
+				continue
+
+			seenKeys = set()
+			seenConfigIds = []
+			vanishedConfigIds = []
+
+			query = hardwareClass.getJoinQuery([], u'`hostId` = {0}'.format(self._sql.PARAMETER), withConfigId=True)
+			for row in self._sql.iterSet(query, [hostId]):
+				key = hardwareClass.getInventoryKey(row)
+				if key in classInventory:
+					seenKeys.add(key)
+					seenConfigIds.append(row['config_id'])
+				elif complete and forceInt(row['state']) == 1:
+					vanishedConfigIds.append(row['config_id'])
+
+			logger.debug(
+				u"Inventory of {0} for {1}: {2} seen, {3} new, {4} vanished",
+				hardwareClass.name, hostId, len(seenConfigIds),
+				len(classInventory) - len(seenKeys), len(vanishedConfigIds)
+			)
+			self._updateHardwareConfigs(hardwareClass, seenConfigIds, {'lastseen': now, 'state': 1})
+			self._updateHardwareConfigs(hardwareClass, vanishedConfigIds, {'state': 0})
+
+			newObjects.extend(
+				auditHardwareOnHost
+				for key, auditHardwareOnHost in classInventory.items()
+				if key not in seenKeys
+			)
+
+		newRows = {}
+		for auditHardwareOnHost in newObjects:
+			logger.info(u"Inserting auditHardwareOnHost: {0}", auditHardwareOnHost)
+			# Sets the defaults and inserts the hardware device if needed.
+			ConfigDataBackend.auditHardwareOnHost_insertObject(self, auditHardwareOnHost)
+			newRows.setdefault(auditHardwareOnHost.getHardwareClass(), []).append(
+				self._auditHardwareOnHostObjectToDatabaseHash(auditHardwareOnHost)
+			)
+
+		for hardwareClass, rows in newRows.items():
+			self._sql.insertMany(self._auditHardwareClasses[hardwareClass].configTable, rows)
+
+	def _updateHardwareConfigs(self, hardwareClass, configIds, values):
+		for configIdChunk in chunk(configIds, BULK_QUERY_SIZE):
+			self._sql.update(
+				hardwareClass.configTable,
+				u'`config_id` IN ({0})'.format(u', '.join([self._sql.PARAMETER] * len(configIdChunk))),
+				values,
+				whereParameters=list(configIdChunk)
+			)
+
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 	# -   Extension for direct connect to db
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
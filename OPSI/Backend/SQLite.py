@@ -24,15 +24,19 @@ SQLite backend.
 :license: GNU Affero GPL version 3
 """
 
+import threading
+import time
+from contextlib import contextmanager
 from itertools import izip
 
 from apsw import (
 	SQLITE_OPEN_CREATE, SQLITE_CONFIG_MULTITHREAD, SQLITE_OPEN_READWRITE,
-	Connection)
+	BusyError, Connection)
 
 from OPSI.Exceptions import BackendBadValueError
 from OPSI.Logger import Logger
-from OPSI.Types import forceBool, forceFilename, forceUnicode
+from OPSI.Types import (
+	forceBool, forceFilename, forceInt, forceUnicode, forceUnicodeUpper)
 from OPSI.Backend.SQL import SQL, SQLBackend, SQLBackendObjectModificationTracker
 
 __all__ = ('SQLite', 'SQLiteBackend', 'SQLiteObjectBackendModificationTracker')
@@ -40,17 +44,50 @@ __all__ = ('SQLite', 'SQLiteBackend', 'SQLiteObjectBackendModificationTracker')
 logger = Logger()
 
 
+def _rowToDict(cursor, row):
+	return dict(izip((description[0] for description in cursor.getdescription()), row))
+
+
+class _NoLock(object):
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		return False
+
+
 class SQLite(SQL):
+	"""
+	Access to a SQLite database.
+
+	Every thread uses a connection of its own.
+	Databases in files are opened in WAL mode by default so that
+	reading threads do not block each other or the writing thread.
+	Writes are serialized by this class.
+	In-memory databases only exist for a single connection and
+	therefore share one connection with all access serialized.
+	"""
+
 	AUTOINCREMENT = ''
 	ALTER_TABLE_CHANGE_SUPPORTED = False
 	ESCAPED_BACKSLASH = "\\"
 	ESCAPED_APOSTROPHE = "''"
 	ESCAPED_ASTERISK = "**"
+	PARAMETER = u'?'
+	# SQLITE_MAX_VARIABLE_NUMBER of SQLite before 3.32
+	MAX_PARAMETERS = 999
+	LIKE_ESCAPE = u" ESCAPE '\\'"
 
 	def __init__(self, **kwargs):
+		SQL.__init__(self, **kwargs)
 		self._database = ":memory:"
 		self._synchronous = True
 		self._databaseCharset = 'utf8'
+		self._journalMode = u'WAL'
+		self._busyTimeout = 5000
+		self._busyRetries = 3
+		self._cacheSize = None
+		self._mmapSize = None
 		for (option, value) in kwargs.items():
 			option = option.lower()
 			if option == 'database':
@@ -59,172 +96,296 @@ class SQLite(SQL):
 				self._synchronous = forceBool(value)
 			elif option == 'databasecharset':
 				self._databaseCharset = str(value)
+			elif option == 'journalmode':
+				self._journalMode = forceUnicodeUpper(value)
+			elif option == 'busytimeout':
+				self._busyTimeout = forceInt(value)
+			elif option == 'busyretries':
+				self._busyRetries = forceInt(value)
+			elif option == 'cachesize':
+				self._cacheSize = forceInt(value)
+			elif option == 'mmapsize':
+				self._mmapSize = forceInt(value)
+
+		self._writeLock = threading.RLock()
+		# The connections are kept here and not in thread-local storage
+		# because apsw objects must not be freed while a thread exits.
+		self._connections = {}
+		self._connectionsLock = threading.Lock()
+		if self._isInMemory():
+			self._readLock = self._writeLock
+		else:
+			self._readLock = _NoLock()
 
-		self._connection = None
-		self._cursor = None
 		logger.debug(u'SQLite created: %s' % self)
 
+	def _isInMemory(self):
+		return self._database == ':memory:'
+
 	def connect(self):
+		"""
+		Get the connection and cursor of the current thread.
+
+		The connection is created on first use.
+		"""
+		thread = threading.current_thread()
+		key = None if self._isInMemory() else thread.ident
+		try:
+			owner, connection, cursor = self._connections[key]
+			if key is None or owner is thread:
+				return (connection, cursor)
+		except KeyError:
+			pass
+
 		try:
-			logger.debug2(u"Connecting to sqlite db '%s'" % self._database)
-			if not self._connection:
-				self._connection = Connection(
-					filename=self._database,
-					flags=SQLITE_OPEN_READWRITE | SQLITE_OPEN_CREATE | SQLITE_CONFIG_MULTITHREAD,
-					vfs=None,
-					statementcachesize=100
-				)
-			if not self._cursor:
-				def rowtrace(cursor, row):
-					valueSet = {}
-					for rowDescription, current in izip(cursor.getdescription(), row):
-						valueSet[rowDescription[0]] = current
-
-					return valueSet
-
-				self._cursor = self._connection.cursor()
-				if not self._synchronous:
-					self._cursor.execute('PRAGMA synchronous=OFF')
-					self._cursor.execute('PRAGMA temp_store=MEMORY')
-					self._cursor.execute('PRAGMA cache_size=5000')
-				if self._databaseCharset.lower() in ('utf8', 'utf-8'):
-					self._cursor.execute('PRAGMA encoding="UTF-8"')
-				self._cursor.setrowtrace(rowtrace)
-			return (self._connection, self._cursor)
+			connection = self._createConnection()
+			cursor = connection.cursor()
+			cursor.setrowtrace(_rowToDict)
 		except Exception as connectionError:
 			logger.warning("Problem connecting to SQLite databse: {!r}", connectionError)
 			raise connectionError
 
+		with self._connectionsLock:
+			self._closeUnusedConnections(thread)
+			self._connections[key] = (thread, connection, cursor)
+
+		return (connection, cursor)
+
+	def _closeUnusedConnections(self, currentThread):
+		for key, (owner, connection, cursor) in self._connections.items():
+			if key is None or owner is currentThread:
+				continue
+
+			if key == currentThread.ident or not owner.is_alive():
+				del self._connections[key]
+				self._closeConnection(connection, cursor)
+
+	@staticmethod
+	def _closeConnection(connection, cursor):
+		try:
+			cursor.close(True)
+			connection.close(True)
+		except Exception as closeError:
+			logger.debug(u"Failed to close SQLite connection: {0!r}", closeError)
+
+	def _createConnection(self):
+		logger.debug2(u"Connecting to sqlite db '%s'" % self._database)
+		connection = Connection(
+			filename=self._database,
+			flags=SQLITE_OPEN_READWRITE | SQLITE_OPEN_CREATE | SQLITE_CONFIG_MULTITHREAD,
+			vfs=None,
+			statementcachesize=self.STATEMENT_CACHE_SIZE
+		)
+		connection.setbusytimeout(self._busyTimeout)
+
+		pragmas = []
+		if self._databaseCharset.lower() in ('utf8', 'utf-8'):
+			pragmas.append(u'encoding="UTF-8"')
+		if self._journalMode and not self._isInMemory():
+			pragmas.append(u'journal_mode={0}'.format(self._journalMode))
+
+		cacheSize = self._cacheSize
+		if not self._synchronous:
+			pragmas.append(u'synchronous=OFF')
+			pragmas.append(u'temp_store=MEMORY')
+			if cacheSize is None:
+				cacheSize = 5000
+		elif self._journalMode == u'WAL':
+			# Durable in WAL mode and needs less syncing than FULL.
+			pragmas.append(u'synchronous=NORMAL')
+
+		if cacheSize is not None:
+			pragmas.append(u'cache_size={0:d}'.format(cacheSize))
+		if self._mmapSize is not None:
+			pragmas.append(u'mmap_size={0:d}'.format(self._mmapSize))
+
+		cursor = connection.cursor()
+		try:
+			for pragma in pragmas:
+				list(cursor.execute(u'PRAGMA {0};'.format(pragma)))
+		finally:
+			cursor.close()
+
+		return connection
+
 	def close(self, conn, cursor):
 		pass
 
-	def getSet(self, query):
+	def disconnect(self):
+		"Close the connections of all threads."
+		with self._connectionsLock:
+			connections = self._connections.values()
+			self._connections.clear()
+
+		for _, connection, cursor in connections:
+			self._closeConnection(connection, cursor)
+
+	def getSet(self, query, parameters=None):
 		logger.debug2(u"getSet: %s" % query)
-		(conn, cursor) = self.connect()
-		valueSet = []
-		try:
-			self.execute(query, conn, cursor)
+		with self._readLock:
+			(conn, cursor) = self.connect()
+			self._execute(query, conn, cursor, parameters)
 			valueSet = cursor.fetchall()
-			if not valueSet:
-				logger.debug(u"No result for query '%s'" % query)
-				valueSet = []
-		finally:
-			self.close(conn, cursor)
+
+		if not valueSet:
+			logger.debug(u"No result for query '%s'" % query)
+			valueSet = []
+
 		return valueSet
 
-	def getRow(self, query):
+	def iterSet(self, query, parameters=None):
+		"""
+		Iterate over the rows returned by `query`.
+
+		The rows are read by a cursor of their own while iterating.
+		The shared connection of an in-memory database can not be
+		held while iterating, so the rows are read at once there.
+		"""
+		logger.debug2(u"iterSet: %s" % query)
+		if self._isInMemory():
+			for row in self.getSet(query, parameters):
+				yield row
+			return
+
+		(conn, _) = self.connect()
+		cursor = conn.cursor()
+		try:
+			cursor.setrowtrace(_rowToDict)
+			for row in self._execute(query, conn, cursor, parameters):
+				yield row
+		finally:
+			cursor.close()
+
+	def getRow(self, query, parameters=None):
 		logger.debug2(u"getRow: %s" % query)
-		(conn, cursor) = self.connect()
 		row = {}
-		try:
-			self.execute(query, conn, cursor)
+		with self._readLock:
+			(conn, cursor) = self.connect()
+			self._execute(query, conn, cursor, parameters)
 			try:
 				row = cursor.next()
 			except Exception:
 				pass
 
-			if not row:
-				logger.debug(u"No result for query '%s'" % query)
-				row = {}
-			else:
-				logger.debug2(u"Result: '%s'" % row)
-		finally:
-			self.close(conn, cursor)
+		if not row:
+			logger.debug(u"No result for query '%s'" % query)
+			row = {}
+		else:
+			logger.debug2(u"Result: '%s'" % row)
+
 		return row
 
 	def insert(self, table, valueHash):
-		(conn, cursor) = self.connect()
-		result = -1
-		try:
-			colNames = []
-			values = []
-			for (key, value) in valueHash.items():
-				colNames.append(u"`{0}`".format(key))
-				if value is None:
-					values.append(u"NULL")
-				elif isinstance(value, bool):
-					if value:
-						values.append(u"1")
-					else:
-						values.append(u"0")
-				elif isinstance(value, (float, long, int)):
-					values.append(u"{0}".format(value))
-				elif isinstance(value, str):
-					values.append(u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value.decode("utf-8")))))
-				else:
-					values.append(u"\'{0}\'".format(self.escapeApostrophe(self.escapeBackslash(value))))
-
-			query = u'INSERT INTO `{table}` ({columns}) VALUES ({values});'.format(columns=', '.join(colNames), values=', '.join(values), table=table)
+		with self._writeLock:
+			(conn, cursor) = self.connect()
+			query, parameters = self.getInsertStatement(table, valueHash)
 			logger.debug2(u"insert: %s" % query)
 
-			self.execute(query, conn, cursor)
-			result = conn.last_insert_rowid()
-		finally:
-			self.close(conn, cursor)
-
-		return result
+			self._execute(query, conn, cursor, parameters)
+			return conn.last_insert_rowid()
 
-	def update(self, table, where, valueHash, updateWhereNone=False):
-		(conn, cursor) = self.connect()
-		result = 0
-		try:
-			if not valueHash:
-				raise BackendBadValueError(u"No values given")
+	def insertMany(self, table, valueHashes):
+		"""
+		Insert multiple rows into `table` within one transaction.
 
-			values = []
-			for (key, value) in valueHash.items():
-				if value is None and not updateWhereNone:
-					continue
+		Rows with the same columns are inserted with the same statement.
+		If inserting a row fails none of the rows will be inserted.
+		"""
+		self.executeInTransaction(
+			self.getInsertStatement(table, valueHash)
+			for valueHash in valueHashes
+		)
 
-				if value is None:
-					values.append(u"`{0}` = NULL".format(key))
-				elif isinstance(value, bool):
-					if value:
-						values.append(u"`{0}` = 1".format(key))
-					else:
-						values.append(u"`{0}` = 0".format(key))
-				elif isinstance(value, (float, long, int)):
-					values.append(u"`{0}` = {1}".format(key, value))
-				elif isinstance(value, str):
-					values.append(u"`{0}` = \'{1}\'".format(key, self.escapeApostrophe(self.escapeBackslash(value.decode("utf-8")))))
-				else:
-					values.append(u"`{0}` = \'{1}\'".format(key, self.escapeApostrophe(self.escapeBackslash(value))))
+	def update(self, table, where, valueHash, updateWhereNone=False, whereParameters=None):
+		if not valueHash:
+			raise BackendBadValueError(u"No values given")
 
-			query = u"UPDATE `{table}` SET {values} WHERE {condition};".format(table=table, values=', '.join(values), condition=where)
+		with self._writeLock:
+			(conn, cursor) = self.connect()
+			query, parameters = self.getUpdateStatement(table, where, valueHash, updateWhereNone, whereParameters)
 			logger.debug2(u"update: %s" % query)
-			self.execute(query, conn, cursor)
-			result = conn.changes()
-		finally:
-			self.close(conn, cursor)
-		return result
+			self._execute(query, conn, cursor, parameters)
+			return conn.changes()
 
-	def delete(self, table, where):
-		(conn, cursor) = self.connect()
-		result = 0
-		try:
+	def delete(self, table, where, parameters=None):
+		with self._writeLock:
+			(conn, cursor) = self.connect()
 			query = u"DELETE FROM `%s` WHERE %s;" % (table, where)
 			logger.debug2(u"delete: %s" % query)
-			self.execute(query, conn, cursor)
-			result = conn.changes()
-		finally:
-			self.close(conn, cursor)
-		return result
+			self._execute(query, conn, cursor, parameters)
+			return conn.changes()
+
+	def execute(self, query, conn=None, cursor=None, parameters=None):
+		with self._writeLock:
+			if not conn or not cursor:
+				(conn, cursor) = self.connect()
+
+			return self._execute(query, conn, cursor, parameters)
+
+	def executeInTransaction(self, statements):
+		"""
+		Execute multiple statements within one transaction.
 
-	def execute(self, query, conn=None, cursor=None):
-		res = None
-		needClose = False
-		if not conn or not cursor:
+		If a statement fails none of the statements take effect.
+
+		:param statements: Pairs of a query and the values for its \
+placeholders or `None`.
+		"""
+		with self.transaction():
 			(conn, cursor) = self.connect()
-			needClose = True
+			for query, parameters in statements:
+				self._execute(query, conn, cursor, parameters)
 
-		try:
-			logger.debug2(u"SQL query: %s" % forceUnicode(query))
-			res = cursor.execute(query)
-		finally:
-			if needClose:
-				self.close(conn, cursor)
+	@contextmanager
+	def transaction(self):
+		"""
+		Execute the statements of the current thread inside of the
+		block within one transaction.
 
-		return res
+		If the block raises an exception none of the statements take
+		effect. Nested transactions use savepoints.
+		Other threads can not write until the block is left.
+		"""
+		with self._writeLock:
+			(conn, cursor) = self.connect()
+			depth = getattr(self._transactions, 'depth', 0)
+			if depth:
+				(begin, commit, rollback) = self._getSavepointStatements(depth)
+			else:
+				(begin, commit, rollback) = ([u'BEGIN IMMEDIATE;'], [u'COMMIT;'], [u'ROLLBACK;'])
+
+			for query in begin:
+				self._execute(query, conn, cursor)
+
+			self._transactions.depth = depth + 1
+			try:
+				yield
+				for query in commit:
+					self._execute(query, conn, cursor)
+			except Exception:
+				for query in rollback:
+					self._execute(query, conn, cursor)
+				raise
+			finally:
+				self._transactions.depth = depth
+
+	def _execute(self, query, conn, cursor, parameters=None):
+		"""
+		Execute `query` and retry it if the database is locked by
+		another process for longer than the busy timeout.
+
+		Statements inside of a transaction are not retried.
+		"""
+		logger.debug2(u"SQL query: %s" % forceUnicode(query))
+		for retry in range(self._busyRetries + 1):
+			try:
+				return cursor.execute(query, parameters)
+			except BusyError:
+				if retry >= self._busyRetries or not conn.getautocommit():
+					raise
+
+				logger.info(u"SQLite database is locked, retrying query #{0}", retry + 1)
+				time.sleep(0.1 * (retry + 1))
 
 	def getTables(self):
 		"""
@@ -264,6 +425,9 @@ class SQLiteBackend(SQLBackend):
 		self._sqlBackendModule = True
 		logger.debug(u'SQLiteBackend created: %s' % self)
 
+	def backend_exit(self):
+		self._sql.disconnect()
+
 	def _createAuditHardwareTables(self):
 		"""
 		Creating tables for hardware audit data.
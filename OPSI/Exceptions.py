@@ -39,7 +39,8 @@ __all__ = (
 	'OpsiAuthenticationError', 'OpsiBackupBackendNotFound',
 	'OpsiBackupFileError', 'OpsiBackupFileNotFound', 'OpsiBadRpcError',
 	'OpsiConnectionError', 'OpsiError', 'OpsiProductOrderingError',
-	'OpsiRpcError', 'OpsiServiceVerificationError', 'OpsiTimeoutError',
+	'OpsiRequestTooLargeError', 'OpsiRpcError',
+	'OpsiServiceVerificationError', 'OpsiTimeoutError',
 	'RepositoryError',
 )
 
@@ -111,6 +112,10 @@ class OpsiRpcError(OpsiError):
 	ExceptionShortDescription = u"Opsi rpc error"
 
 
+class OpsiRequestTooLargeError(OpsiError):
+	ExceptionShortDescription = u"Opsi request too large error"
+
+
 class OpsiConnectionError(OpsiError):
 	ExceptionShortDescription = u"Opsi connection error"
 
@@ -29,6 +29,8 @@ As an example this contains classes for hosts, products, configurations.
 """
 
 import inspect
+import operator
+from itertools import izip
 
 from OPSI.Logger import Logger
 from OPSI.Exceptions import BackendBadValueError, BackendConfigurationError
@@ -61,12 +63,15 @@ __all__ = (
 	'RetailSoftwareLicense', 'SoftwareLicense', 'SoftwareLicenseToLicensePool',
 	'UnicodeConfig', 'UnicodeProductProperty', 'VolumeSoftwareLicense',
 	'decodeIdent', 'getBackendMethodPrefix', 'getForeignIdAttributes',
-	'getIdentAttributes', 'getPossibleClassAttributes',
+	'getIdentAttributes', 'getObjectClass', 'getPossibleClassAttributes',
 	'mandatoryConstructorArgs', 'objectsDiffer'
 )
 
 logger = Logger()
 _MANDATORY_CONSTRUCTOR_ARGS_CACHE = {}
+_ATTRIBUTE_ACCESS_CACHE = {}
+_OBJECT_CLASSES = {}
+_CONSTRUCTOR_ARGS = {}
 
 
 def mandatoryConstructorArgs(Class):
@@ -115,6 +120,85 @@ def getPossibleClassAttributes(klass):
 	return attributes
 
 
+def _getAttributeAccess(klass):
+	"""
+	Returns the names of the attributes stored in the slots of a class, \
+a function returning their values as a tuple and if instances of the \
+class have an instance dict.
+
+	The flag for generated defaults is not part of these attributes.
+	"""
+	try:
+		return _ATTRIBUTE_ACCESS_CACHE[klass]
+	except KeyError:
+		names = []
+		for cls in reversed(klass.__mro__):
+			for name in cls.__dict__.get('__slots__', ()):
+				if name not in ('__dict__', '__weakref__', '_isGeneratedDefault') and name not in names:
+					names.append(name)
+
+		if len(names) > 1:
+			getter = operator.attrgetter(*names)
+		elif names:
+			getSingle = operator.attrgetter(names[0])
+			getter = lambda obj: (getSingle(obj), )
+		else:
+			getter = lambda obj: ()
+
+		_ATTRIBUTE_ACCESS_CACHE[klass] = (tuple(names), getter, klass.__dictoffset__ != 0)
+		return _ATTRIBUTE_ACCESS_CACHE[klass]
+
+
+def getObjectClass(name):
+	"""
+	Returns the object class with the given name.
+
+	:raises ValueError: If there is no such class.
+	"""
+	try:
+		return _OBJECT_CLASSES[name]
+	except (KeyError, TypeError):
+		raise ValueError(u"Invalid object type: {0!r}".format(name))
+
+
+def _registerObjectClass(klass):
+	"""
+	Make `klass` available through `getObjectClass`.
+
+	The names of the arguments of its constructor and of its attributes
+	are collected once so that they do not have to be looked up when
+	objects are created from or turned into hashes.
+	"""
+	try:
+		init = klass.__init__.func_code
+		_CONSTRUCTOR_ARGS[klass] = init.co_varnames[1:init.co_argcount]
+	except AttributeError:  # No constructor of its own
+		_CONSTRUCTOR_ARGS[klass] = ()
+	_getAttributeAccess(klass)
+	_OBJECT_CLASSES[klass.__name__] = klass
+
+
+def _objectFromHash(hash):
+	Class = getObjectClass(hash['type'])
+	decodeIdent(Class, hash)
+	kwargs = {
+		name: hash[name]
+		for name in _CONSTRUCTOR_ARGS[Class]
+		if name in hash
+	}
+
+	try:
+		return Class(**kwargs)
+	except TypeError as error:
+		if '__init__() takes at least' in forceUnicode(error):
+			args = mandatoryConstructorArgs(Class)
+			missingArgs = [arg for arg in args if arg not in kwargs]
+			if missingArgs:
+				raise TypeError("Missing required argument(s): {0}".format(', '.join(repr(a) for a in missingArgs)))
+
+		raise error
+
+
 def getBackendMethodPrefix(klass):
 	return klass.backendMethodPrefix
 
@@ -200,11 +284,19 @@ def toStr(value):
 
 
 class BaseObject(object):
+	"""
+	Base for all objects.
+
+	The attributes of the objects are kept in slots instead of an
+	instance dict to keep the memory used by large amounts of objects
+	low. Every subclass therefore has to list the attributes it adds in
+	`__slots__`.
+	"""
+	__slots__ = ('_isGeneratedDefault', )
 	subClasses = {}
 	identSeparator = u';'
 	foreignIdAttributes = []
 	backendMethodPrefix = ''
-	_isGeneratedDefault = False
 
 	def getBackendMethodPrefix(self):
 		return self.backendMethodPrefix
@@ -249,9 +341,9 @@ class BaseObject(object):
 			keepAttributes.add(attribute)
 		keepAttributes.add('type')
 
-		for attribute in self.__dict__.keys():
+		for attribute in self._getAttributes():
 			if attribute not in keepAttributes:
-				self.__dict__[attribute] = None
+				setattr(self, attribute, None)
 
 	def update(self, updateObject, updateWithNoneValues=True):
 		if not issubclass(updateObject.__class__, self.__class__):
@@ -269,7 +361,8 @@ class BaseObject(object):
 				if value is None:
 					del hash[key]
 
-		self.__dict__.update(hash)
+		for (key, value) in hash.items():
+			setattr(self, key, value)
 
 	def getType(self):
 		return unicode(self.__class__.__name__)
@@ -278,13 +371,51 @@ class BaseObject(object):
 		self._isGeneratedDefault = forceBool(flag)
 
 	def isGeneratedDefault(self):
-		return self._isGeneratedDefault
+		try:
+			return self._isGeneratedDefault
+		except AttributeError:
+			return False
+
+	def _getAttributes(self):
+		"""
+		Returns the attributes that are set.
+
+		:rtype: dict
+		"""
+		names, getValues, hasInstanceDict = _getAttributeAccess(self.__class__)
+		try:
+			attributes = dict(izip(names, getValues(self)))
+		except AttributeError:  # Not all attributes are set
+			attributes = {}
+			for name in names:
+				try:
+					attributes[name] = getattr(self, name)
+				except AttributeError:
+					pass
+
+		if hasInstanceDict:
+			attributes.update(self.__dict__)
+
+		isGeneratedDefault = getattr(self, '_isGeneratedDefault', None)
+		if isGeneratedDefault is not None:
+			attributes['_isGeneratedDefault'] = isGeneratedDefault
+
+		return attributes
 
 	def toHash(self):
-		hash = dict(self.__dict__)
+		# Copying keeps the order of the keys the same as for objects
+		# storing their attributes in an instance dict.
+		hash = dict(self._getAttributes())
 		hash['type'] = self.getType()
 		return hash
 
+	def __getstate__(self):
+		return self._getAttributes()
+
+	def __setstate__(self, state):
+		for (name, value) in state.items():
+			setattr(self, name, value)
+
 	def toJson(self):
 		return toJson(self)
 
@@ -317,6 +448,7 @@ class BaseObject(object):
 
 
 class Entity(BaseObject):
+	__slots__ = ()
 	subClasses = {}
 
 	def setDefaults(self):
@@ -329,28 +461,7 @@ class Entity(BaseObject):
 		except KeyError:
 			hash['type'] = 'Entity'
 
-		Class = eval(hash['type'])
-		kwargs = {}
-		decodeIdent(Class, hash)
-		for varname in Class.__init__.func_code.co_varnames[1:]:
-			try:
-				kwargs[varname] = hash[varname]
-			except KeyError:
-				pass
-
-		try:
-			return Class(**kwargs)
-		except TypeError as error:
-			if '__init__() takes at least' in forceUnicode(error):
-				try:
-					args = mandatoryConstructorArgs(Class)
-					missingArgs = [arg for arg in args if arg not in kwargs]
-					if missingArgs:
-						raise TypeError("Missing required argument(s): {0}".format(', '.join(repr(a) for a in missingArgs)))
-				except NameError:
-					pass
-
-			raise error
+		return _objectFromHash(hash)
 
 	def clone(self, identOnly=False):
 		hash = {}
@@ -380,6 +491,7 @@ BaseObject.subClasses['Entity'] = Entity
 
 
 class Relationship(BaseObject):
+	__slots__ = ()
 	subClasses = {}
 
 	def setDefaults(self):
@@ -392,28 +504,7 @@ class Relationship(BaseObject):
 		except KeyError:
 			hash['type'] = 'Relationship'
 
-		Class = eval(hash['type'])
-		kwargs = {}
-		decodeIdent(Class, hash)
-		for varname in Class.__init__.func_code.co_varnames[1:]:
-			try:
-				kwargs[varname] = hash[varname]
-			except KeyError:
-				pass
-
-		try:
-			return Class(**kwargs)
-		except TypeError as error:
-			if '__init__() takes at least' in forceUnicode(error):
-				try:
-					args = mandatoryConstructorArgs(Class)
-					missingArgs = [arg for arg in args if arg not in kwargs]
-					if missingArgs:
-						raise TypeError("Missing required argument(s): {0}".format(', '.join(repr(a) for a in missingArgs)))
-				except NameError:
-					pass
-
-			raise error
+		return _objectFromHash(hash)
 
 	def clone(self, identOnly=False):
 		hash = {}
@@ -442,6 +533,7 @@ BaseObject.subClasses['Relationship'] = Relationship
 
 
 class Object(Entity):
+	__slots__ = ('description', 'notes', 'id')
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes + ['objectId']
 
@@ -497,6 +589,7 @@ Entity.subClasses['Object'] = Object
 
 
 class Host(Object):
+	__slots__ = ('hardwareAddress', 'ipAddress', 'inventoryNumber')
 	subClasses = {}
 	foreignIdAttributes = Object.foreignIdAttributes + ['hostId']
 	backendMethodPrefix = 'host'
@@ -560,6 +653,7 @@ Object.subClasses['Host'] = Host
 
 
 class OpsiClient(Host):
+	__slots__ = ('opsiHostKey', 'created', 'lastSeen', 'oneTimePassword')
 	subClasses = {}
 	foreignIdAttributes = Host.foreignIdAttributes + ['clientId']
 
@@ -634,6 +728,12 @@ Host.subClasses['OpsiClient'] = OpsiClient
 
 
 class OpsiDepotserver(Host):
+	__slots__ = (
+		'opsiHostKey', 'depotLocalUrl', 'depotRemoteUrl', 'depotWebdavUrl',
+		'repositoryLocalUrl', 'repositoryRemoteUrl', 'networkAddress',
+		'maxBandwidth', 'isMasterDepot', 'masterDepotId', 'workbenchLocalUrl',
+		'workbenchRemoteUrl'
+	)
 	subClasses = {}
 	foreignIdAttributes = Host.foreignIdAttributes + ['depotId']
 
@@ -793,6 +893,7 @@ Host.subClasses['OpsiDepotserver'] = OpsiDepotserver
 
 
 class OpsiConfigserver(OpsiDepotserver):
+	__slots__ = ()
 	subClasses = {}
 	foreignIdAttributes = OpsiDepotserver.foreignIdAttributes + ['serverId']
 
@@ -836,6 +937,7 @@ Host.subClasses['OpsiConfigserver'] = OpsiConfigserver
 
 
 class Config(Entity):
+	__slots__ = ('description', 'possibleValues', 'defaultValues', 'editable', 'multiValue', 'id')
 	subClasses = {}
 	foreignIdAttributes = Object.foreignIdAttributes + ['configId']
 	backendMethodPrefix = 'config'
@@ -964,6 +1066,7 @@ Entity.subClasses['Config'] = Config
 
 
 class UnicodeConfig(Config):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, description='', possibleValues=None,
@@ -1008,6 +1111,7 @@ Config.subClasses['UnicodeConfig'] = UnicodeConfig
 
 
 class BoolConfig(Config):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, description=None, defaultValues=None):
@@ -1057,6 +1161,7 @@ Config.subClasses['BoolConfig'] = BoolConfig
 
 
 class ConfigState(Relationship):
+	__slots__ = ('values', 'configId', 'objectId')
 	subClasses = {}
 	backendMethodPrefix = 'configState'
 
@@ -1113,6 +1218,13 @@ Relationship.subClasses['ConfigState'] = ConfigState
 
 
 class Product(Entity):
+	__slots__ = (
+		'name', 'licenseRequired', 'setupScript', 'uninstallScript',
+		'updateScript', 'alwaysScript', 'onceScript', 'customScript',
+		'userLoginScript', 'priority', 'description', 'advice', 'changelog',
+		'productClassIds', 'windowsSoftwareIds', 'id', 'productVersion',
+		'packageVersion'
+	)
 	subClasses = {}
 	foreignIdAttributes = Object.foreignIdAttributes + ['productId']
 	backendMethodPrefix = 'product'
@@ -1347,6 +1459,7 @@ Entity.subClasses['Product'] = Product
 
 
 class LocalbootProduct(Product):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, productVersion, packageVersion, name=None,
@@ -1382,6 +1495,7 @@ Product.subClasses['LocalbootProduct'] = LocalbootProduct
 
 
 class NetbootProduct(Product):
+	__slots__ = ('pxeConfigTemplate', )
 	subClasses = {}
 
 	def __init__(self, id, productVersion, packageVersion, name=None,
@@ -1427,6 +1541,11 @@ Product.subClasses['NetbootProduct'] = NetbootProduct
 
 
 class ProductProperty(Entity):
+	__slots__ = (
+		'description', 'possibleValues', 'defaultValues', 'editable',
+		'multiValue', 'productId', 'productVersion', 'packageVersion',
+		'propertyId'
+	)
 	subClasses = {}
 	backendMethodPrefix = 'productProperty'
 
@@ -1587,6 +1706,7 @@ Entity.subClasses['ProductProperty'] = ProductProperty
 
 
 class UnicodeProductProperty(ProductProperty):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, productId, productVersion, packageVersion, propertyId,
@@ -1635,6 +1755,7 @@ ProductProperty.subClasses['UnicodeProductProperty'] = UnicodeProductProperty
 
 
 class BoolProductProperty(ProductProperty):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, productId, productVersion, packageVersion, propertyId,
@@ -1700,6 +1821,11 @@ ProductProperty.subClasses['BoolProductProperty'] = BoolProductProperty
 
 
 class ProductDependency(Relationship):
+	__slots__ = (
+		'requiredProductVersion', 'requiredPackageVersion', 'requiredAction',
+		'requiredInstallationStatus', 'requirementType', 'productId',
+		'productVersion', 'packageVersion', 'productAction', 'requiredProductId'
+	)
 	subClasses = {}
 	backendMethodPrefix = 'productDependency'
 
@@ -1819,6 +1945,10 @@ Relationship.subClasses['ProductDependency'] = ProductDependency
 
 
 class ProductOnDepot(Relationship):
+	__slots__ = (
+		'locked', 'productId', 'productType', 'productVersion',
+		'packageVersion', 'depotId'
+	)
 	subClasses = {}
 	backendMethodPrefix = 'productOnDepot'
 
@@ -1896,6 +2026,12 @@ Relationship.subClasses['ProductOnDepot'] = ProductOnDepot
 
 
 class ProductOnClient(Relationship):
+	__slots__ = (
+		'targetConfiguration', 'installationStatus', 'actionRequest',
+		'lastAction', 'actionProgress', 'actionResult', 'productVersion',
+		'packageVersion', 'modificationTime', 'actionSequence', 'productId',
+		'productType', 'clientId'
+	)
 	subClasses = {}
 	backendMethodPrefix = 'productOnClient'
 
@@ -2055,6 +2191,7 @@ Relationship.subClasses['ProductOnClient'] = ProductOnClient
 
 
 class ProductPropertyState(Relationship):
+	__slots__ = ('values', 'productId', 'propertyId', 'objectId')
 	subClasses = {}
 	backendMethodPrefix = 'productPropertyState'
 
@@ -2127,6 +2264,7 @@ Relationship.subClasses['ProductPropertyState'] = ProductPropertyState
 
 
 class Group(Object):
+	__slots__ = ('parentGroupId', )
 	subClasses = {}
 	foreignIdAttributes = Object.foreignIdAttributes + ['groupId']
 	backendMethodPrefix = 'group'
@@ -2176,6 +2314,7 @@ Object.subClasses['Group'] = Group
 
 
 class HostGroup(Group):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, description=None, notes=None, parentGroupId=None):
@@ -2202,6 +2341,7 @@ Group.subClasses['HostGroup'] = HostGroup
 
 
 class ProductGroup(Group):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, description=None, notes=None, parentGroupId=None):
@@ -2228,6 +2368,7 @@ Group.subClasses['ProductGroup'] = ProductGroup
 
 
 class ObjectToGroup(Relationship):
+	__slots__ = ('groupType', 'groupId', 'objectId')
 	subClasses = {}
 	backendMethodPrefix = 'objectToGroup'
 
@@ -2275,6 +2416,10 @@ Relationship.subClasses['ObjectToGroup'] = ObjectToGroup
 
 
 class LicenseContract(Entity):
+	__slots__ = (
+		'description', 'notes', 'partner', 'conclusionDate', 'notificationDate',
+		'expirationDate', 'id'
+	)
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes + ['licenseContractId']
 	backendMethodPrefix = 'licenseContract'
@@ -2394,6 +2539,7 @@ Entity.subClasses['LicenseContract'] = LicenseContract
 
 
 class SoftwareLicense(Entity):
+	__slots__ = ('maxInstallations', 'boundToHost', 'expirationDate', 'id', 'licenseContractId')
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes + ['softwareLicenseId']
 	backendMethodPrefix = 'softwareLicense'
@@ -2482,6 +2628,7 @@ Entity.subClasses['LicenseContract'] = LicenseContract
 
 
 class RetailSoftwareLicense(SoftwareLicense):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, licenseContractId, maxInstallations=None,
@@ -2511,6 +2658,7 @@ SoftwareLicense.subClasses['RetailSoftwareLicense'] = RetailSoftwareLicense
 
 
 class OEMSoftwareLicense(SoftwareLicense):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, licenseContractId, maxInstallations=None,
@@ -2550,6 +2698,7 @@ SoftwareLicense.subClasses['OEMSoftwareLicense'] = OEMSoftwareLicense
 
 
 class VolumeSoftwareLicense(SoftwareLicense):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, licenseContractId, maxInstallations=None,
@@ -2580,6 +2729,7 @@ SoftwareLicense.subClasses['VolumeSoftwareLicense'] = VolumeSoftwareLicense
 
 
 class ConcurrentSoftwareLicense(SoftwareLicense):
+	__slots__ = ()
 	subClasses = {}
 
 	def __init__(self, id, licenseContractId, maxInstallations=None,
@@ -2608,6 +2758,7 @@ SoftwareLicense.subClasses['ConcurrentSoftwareLicense'] = ConcurrentSoftwareLice
 
 
 class LicensePool(Entity):
+	__slots__ = ('description', 'productIds', 'id')
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes + ['licensePoolId']
 	backendMethodPrefix = 'licensePool'
@@ -2676,6 +2827,7 @@ Entity.subClasses['LicensePool'] = LicensePool
 
 
 class AuditSoftwareToLicensePool(Relationship):
+	__slots__ = ('name', 'version', 'subVersion', 'language', 'architecture', 'licensePoolId')
 	subClasses = {}
 	backendMethodPrefix = 'auditSoftwareToLicensePool'
 
@@ -2770,6 +2922,7 @@ Relationship.subClasses['AuditSoftwareToLicensePool'] = AuditSoftwareToLicensePo
 
 
 class SoftwareLicenseToLicensePool(Relationship):
+	__slots__ = ('licenseKey', 'softwareLicenseId', 'licensePoolId')
 	subClasses = {}
 	backendMethodPrefix = 'softwareLicenseToLicensePool'
 
@@ -2823,6 +2976,7 @@ Relationship.subClasses['SoftwareLicenseToLicensePool'] = SoftwareLicenseToLicen
 
 
 class LicenseOnClient(Relationship):
+	__slots__ = ('licenseKey', 'notes', 'softwareLicenseId', 'licensePoolId', 'clientId')
 	subClasses = {}
 	backendMethodPrefix = 'licenseOnClient'
 
@@ -2895,6 +3049,11 @@ Relationship.subClasses['LicenseOnClient'] = LicenseOnClient
 
 
 class AuditSoftware(Entity):
+	__slots__ = (
+		'windowsSoftwareId', 'windowsDisplayName', 'windowsDisplayVersion',
+		'installSize', 'name', 'version', 'subVersion', 'language',
+		'architecture'
+	)
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes
 	backendMethodPrefix = 'auditSoftware'
@@ -3004,6 +3163,11 @@ Entity.subClasses['AuditSoftware'] = AuditSoftware
 
 
 class AuditSoftwareOnClient(Relationship):
+	__slots__ = (
+		'uninstallString', 'binaryName', 'firstseen', 'lastseen', 'state',
+		'usageFrequency', 'lastUsed', 'licenseKey', 'name', 'version',
+		'subVersion', 'language', 'architecture', 'clientId'
+	)
 	subClasses = {}
 	backendMethodPrefix = 'auditSoftwareOnClient'
 
@@ -3169,6 +3333,7 @@ Relationship.subClasses['AuditSoftwareOnClient'] = AuditSoftwareOnClient
 
 
 class AuditHardware(Entity):
+	__slots__ = ('hardwareClass', '__dict__')
 	subClasses = {}
 	foreignIdAttributes = Entity.foreignIdAttributes
 	backendMethodPrefix = 'auditHardware'
@@ -3334,6 +3499,7 @@ Entity.subClasses['AuditHardware'] = AuditHardware
 
 
 class AuditHardwareOnHost(Relationship):
+	__slots__ = ('hardwareClass', 'hostId', 'firstseen', 'lastseen', 'state', '__dict__')
 	subClasses = {}
 	backendMethodPrefix = 'auditHardwareOnHost'
 	hardwareAttributes = {}
@@ -3533,3 +3699,9 @@ class AuditHardwareOnHost(Relationship):
 
 
 Relationship.subClasses['AuditHardwareOnHost'] = AuditHardwareOnHost
+
+
+for _objectClass in list(globals().values()):
+	if isinstance(_objectClass, type) and issubclass(_objectClass, BaseObject):
+		_registerObjectClass(_objectClass)
+del _objectClass
@@ -36,11 +36,12 @@ http://www.jsonrpc.org/specification
 import sys
 import time
 import traceback
+import types
 
 from OPSI.Exceptions import OpsiBadRpcError, OpsiRpcError
 from OPSI.Logger import Logger, LOG_INFO
 from OPSI.Types import forceUnicode
-from OPSI.Util import deserialize
+from OPSI.Util import EncodedJson, deserialize, iterJson
 
 
 logger = Logger()
@@ -138,6 +139,11 @@ class JsonRpc(object):
 			else:
 				self.result = method(*params)
 
+			if isinstance(self.result, types.GeneratorType):
+				# Consume the generator in this thread and encode the
+				# objects one by one. Only the JSON text is kept.
+				self.result = EncodedJson(u''.join(iterJson(self.result)))
+
 			logger.info(u'Got result for {}', methodName)
 			logger.debug2("RPC ID {0}: {1!r}", self.tid, self.result)
 		except Exception as error:
@@ -32,16 +32,18 @@ Worker for the various interfaces.
 
 import base64
 import urllib
+import zlib
 
 from twisted.internet import defer, reactor, threads
 from twisted.python import failure
 
 from OPSI.web2 import responsecode, http_headers, http, stream
 
-from OPSI.Exceptions import OpsiAuthenticationError, OpsiBadRpcError
+from OPSI.Exceptions import (
+	OpsiAuthenticationError, OpsiBadRpcError, OpsiRequestTooLargeError)
 from OPSI.Logger import Logger, LOG_ERROR, LOG_INFO
 from OPSI.Types import forceUnicode, forceList
-from OPSI.Util import objectToHtml, toJson, fromJson, serialize
+from OPSI.Util import EncodedJson, objectToHtml, toJson, fromJson, iterJson
 from OPSI.Util.HTTP import deflateEncode, deflateDecode, gzipEncode, gzipDecode
 from OPSI.Service.JsonRpc import JsonRpc
 
@@ -232,6 +234,9 @@ interfacePage = u'''<?xml version="1.0" encoding="UTF-8"?>
 
 
 class WorkerOpsi:
+	# Maximum size of the decompressed body of a request in bytes.
+	maxQuerySize = 512 * 1024 * 1024
+
 	def __init__(self, service, request, resource):
 		self.service = service
 		if request.headers.hasHeader("x-forwarded-for"):
@@ -239,6 +244,10 @@ class WorkerOpsi:
 			request.remoteAddr.host = request.headers.getRawHeaders("x-forwarded-for")[0]
 		self.request = request
 		self.query = u''
+		self._queryChunks = []
+		self._querySize = 0
+		self._queryDecompressor = None
+		self._queryDecompressed = False
 		self.path = u''
 		self.resource = resource
 		self.session = None
@@ -294,6 +303,9 @@ class WorkerOpsi:
 		except OpsiBadRpcError as error:
 			logger.logException(error)
 			result.code = responsecode.BAD_REQUEST
+		except OpsiRequestTooLargeError as error:
+			logger.error(u"{0}", error)
+			result.code = responsecode.REQUEST_ENTITY_TOO_LARGE
 		except Exception as error:
 			logger.logException(error, LOG_ERROR)
 			logger.error(failure)
@@ -465,38 +477,110 @@ class WorkerOpsi:
 		if self.request.method == 'GET':
 			self.query = urllib.unquote(self.request.querystring)
 		elif self.request.method == 'POST':
+			self._startReadingPostData()
 			# Returning deferred needed for chaining
 			d = stream.readStream(self.request.stream, self._handlePostData)
+			d.addCallback(self._finishReadingPostData)
 			return d
 		else:
 			raise ValueError(u"Unhandled method '%s'" % self.request.method)
 
 		return result
 
+	def _getContentEncoding(self):
+		"""
+		Get the compression used for the body of the request.
+
+		:returns: 'gzip', 'deflate' or `None` if not compressed.
+		"""
+		contentType = self.request.headers.getHeader('content-type')
+		try:
+			contentEncoding = self.request.headers.getHeader('content-encoding')[0].lower()
+		except Exception:
+			contentEncoding = None
+
+		logger.debug(u"Content-Type: {0}, Content-Encoding: {1}", contentType, contentEncoding)
+		if contentType and contentType.mediaType.startswith('gzip'):
+			# Invalid MIME type.
+			# Probably it is gzip-application/json-rpc and therefore
+			# we need to behave like we did before.
+			logger.debug(u"Expecting compressed data from client (backwards compatible)")
+			return 'deflate'
+		elif contentEncoding == 'gzip':
+			logger.debug(u"Expecting gzip compressed data from client")
+			return 'gzip'
+		elif contentEncoding == 'deflate':
+			logger.debug(u"Expecting deflate compressed data from client")
+			return 'deflate'
+
+		return None
+
+	def _startReadingPostData(self):
+		self._queryChunks = []
+		self._querySize = 0
+		self._queryDecompressed = False
+
+		contentEncoding = self._getContentEncoding()
+		if contentEncoding == 'gzip':
+			# Adding 16 to the window size makes zlib expect a gzip header.
+			self._queryDecompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+		elif contentEncoding == 'deflate':
+			self._queryDecompressor = zlib.decompressobj()
+		else:
+			self._queryDecompressor = None
+			length = getattr(self.request.stream, 'length', None)
+			if length is not None and length > self.maxQuerySize:
+				raise OpsiRequestTooLargeError(
+					u"Request of {0:d} bytes exceeds the maximum size of "
+					u"{1:d} bytes".format(length, self.maxQuerySize)
+				)
+
 	def _handlePostData(self, chunk):
-		self.query += chunk
+		if not self._queryDecompressor:
+			self._addQueryData(chunk)
+			return
+
+		try:
+			while chunk:
+				# Limiting the output keeps highly compressed data
+				# from filling up the memory.
+				data = self._queryDecompressor.decompress(chunk, self.maxQuerySize - self._querySize + 1)
+				self._addQueryData(data)
+				chunk = self._queryDecompressor.unconsumed_tail
+		except zlib.error as error:
+			raise OpsiBadRpcError(u"Failed to decompress request: %s" % error)
+
+	def _addQueryData(self, data):
+		self._querySize += len(data)
+		if self._querySize > self.maxQuerySize:
+			raise OpsiRequestTooLargeError(
+				u"Request exceeds the maximum size of {0:d} bytes".format(self.maxQuerySize)
+			)
+
+		if data:
+			self._queryChunks.append(data)
+
+	def _finishReadingPostData(self, result):
+		if self._queryDecompressor:
+			try:
+				self._addQueryData(self._queryDecompressor.flush())
+			except zlib.error as error:
+				raise OpsiBadRpcError(u"Failed to decompress request: %s" % error)
+
+			self._queryDecompressor = None
+			self._queryDecompressed = True
+
+		self.query = ''.join(self._queryChunks)
+		self._queryChunks = []
+		return result
 
 	def _decodeQuery(self, result):
 		try:
-			if self.request.method == 'POST':
-				contentType = self.request.headers.getHeader('content-type')
-				try:
-					contentEncoding = self.request.headers.getHeader('content-encoding')[0].lower()
-				except Exception:
-					contentEncoding = None
-
-				logger.debug(u"Content-Type: {0}, Content-Encoding: {1}", contentType, contentEncoding)
-				if contentType and contentType.mediaType.startswith('gzip'):
-					# Invalid MIME type.
-					# Probably it is gzip-application/json-rpc and therefore
-					# we need to behave like we did before.
-					logger.debug(u"Expecting compressed data from client (backwards compatible)")
-					self.query = deflateDecode(self.query)
-				elif contentEncoding == 'gzip':
-					logger.debug(u"Expecting gzip compressed data from client")
+			if self.request.method == 'POST' and not self._queryDecompressed:
+				contentEncoding = self._getContentEncoding()
+				if contentEncoding == 'gzip':
 					self.query = gzipDecode(self.query)
 				elif contentEncoding == 'deflate':
-					logger.debug(u"Expecting deflate compressed data from client")
 					self.query = deflateDecode(self.query)
 
 			if not isinstance(self.query, unicode):
@@ -609,7 +693,7 @@ class WorkerOpsiJsonRpc(WorkerOpsi):
 		except Exception as error:
 			logger.error(u"Failed to get accepted mime types from header: {0}", error)
 
-		response = [serialize(rpc.getResponse()) for rpc in self._rpcs]
+		response = [rpc.getResponse() for rpc in self._rpcs]
 
 		if len(response) == 1:
 			response = response[0]
@@ -622,24 +706,31 @@ class WorkerOpsiJsonRpc(WorkerOpsi):
 
 		result.headers.setHeader('content-type', http_headers.MimeType("application", "json", {"charset": "utf-8"}))
 
+		if any(isinstance(rpc.result, EncodedJson) for rpc in self._rpcs):
+			# Generated results have been encoded already.
+			response = u''.join(iterJson(response))
+		else:
+			response = toJson(response)
+		response = response.encode('utf-8')
+
 		if invalidMime:
 			# The invalid requests expect the encoding set to
 			# gzip but the content is deflated.
 			result.headers.setHeader('content-encoding', ["gzip"])
 			result.headers.setHeader('content-type', http_headers.MimeType("gzip-application", "json", {"charset": "utf-8"}))
 			logger.debug(u"Sending deflated data (backwards compatible - with content-encoding 'gzip')")
-			result.stream = stream.IByteStream(deflateEncode(toJson(response).encode('utf-8')))
+			result.stream = stream.IByteStream(deflateEncode(response))
 		elif encoding == "deflate":
 			logger.debug(u"Sending deflated data")
 			result.headers.setHeader('content-encoding', [encoding])
-			result.stream = stream.IByteStream(deflateEncode(toJson(response).encode('utf-8')))
+			result.stream = stream.IByteStream(deflateEncode(response))
 		elif encoding == "gzip":
 			logger.debug(u"Sending gzip compressed data")
 			result.headers.setHeader('content-encoding', [encoding])
-			result.stream = stream.IByteStream(gzipEncode(toJson(response).encode('utf-8')))
+			result.stream = stream.IByteStream(gzipEncode(response))
 		else:
 			logger.debug(u"Sending plain data")
-			result.stream = stream.IByteStream(toJson(response).encode('utf-8'))
+			result.stream = stream.IByteStream(response)
 
 		return result
 
@@ -739,7 +830,7 @@ class WorkerOpsiJsonInterface(WorkerOpsiJsonRpc):
 			results.append(wrapInDiv(objectToHtml(error)))
 		else:
 			for rpc in self._rpcs:
-				results.append(wrapInDiv(objectToHtml(serialize(rpc.getResponse()))))
+				results.append(wrapInDiv(objectToHtml(fromJson(u''.join(iterJson(rpc.getResponse())), preventObjectCreation=True))))
 		results.append(u'</div>')
 
 		html = interfacePage % {
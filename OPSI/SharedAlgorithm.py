@@ -184,6 +184,38 @@ def addDependentProductOnClients(productOnClients, availableProducts, productDep
 	for productDependency in productDependencies:
 		productDependenciesByProductId[productDependency.productId].append(productDependency)
 
+	productOnClientsByClientIdAndProductId = _addDependentProductOnClients(productOnClients, availableProductsByProductId, productDependenciesByProductId)
+	if not productOnClientsByClientIdAndProductId:
+		return []
+
+	# Only the productOnClients of the last processed client are returned.
+	return productOnClientsByClientIdAndProductId.values()[-1].values()
+
+
+def addDependentProductOnClientsWithMapping(productOnClients, availableProductsByProductId, productDependenciesByProductId):
+	"""
+	Add the productOnClients required by the action requests of
+	`productOnClients`.
+
+	:param availableProductsByProductId: The available products by \
+their id.
+	:type availableProductsByProductId: dict
+	:param productDependenciesByProductId: The dependencies of the \
+available products by product id.
+	:type productDependenciesByProductId: dict
+	:returns: The productOnClients of all clients.
+	:rtype: [ProductOnClient, ]
+	"""
+	productOnClientsByClientIdAndProductId = _addDependentProductOnClients(productOnClients, availableProductsByProductId, productDependenciesByProductId)
+
+	return [
+		productOnClient
+		for productOnClientByProductId in productOnClientsByClientIdAndProductId.values()
+		for productOnClient in productOnClientByProductId.values()
+	]
+
+
+def _addDependentProductOnClients(productOnClients, availableProductsByProductId, productDependenciesByProductId):
 	productOnClientsByClientIdAndProductId = defaultdict(dict)
 	for productOnClient in productOnClients:
 		productOnClientsByClientIdAndProductId[productOnClient.clientId][productOnClient.productId] = productOnClient
@@ -195,7 +227,7 @@ def addDependentProductOnClients(productOnClients, availableProducts, productDep
 		for productId in productOnClientByProductId.keys():
 			addActionRequest(productOnClientByProductId, productId, productDependenciesByProductId, availableProductsByProductId, addedInfo)
 
-	return productOnClientByProductId.values()
+	return productOnClientsByClientIdAndProductId
 
 
 class XClassifiedProduct(object):
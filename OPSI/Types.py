@@ -98,11 +98,16 @@ if sys.version_info > (3, ):
 	_STRING_TYPE = str
 	_UNICODE_TYPE = str
 	_STRING_TYPES = (str, )
+	_NUMBER_TYPES = (int, float)
 else:
 	# Python 2
 	_STRING_TYPE = str
 	_UNICODE_TYPE = unicode
 	_STRING_TYPES = (str, unicode)
+	_NUMBER_TYPES = (int, long, float)
+
+# Types whose instances have the same hash if they are equal
+_SIMPLE_HASHABLE_TYPES = _STRING_TYPES + _NUMBER_TYPES + (type(None), )
 
 
 def forceList(var):
@@ -534,17 +539,15 @@ def forceObjectClass(var, objectClass):
 		if 'type' not in var:
 			raise ValueError(u"Key 'type' missing in hash {0!r}".format(var))
 
-		import OPSI.Object
+		from OPSI.Object import getObjectClass
 		try:
-			c = eval('OPSI.Object.%s' % var['type'])
+			try:
+				c = getObjectClass(var['type'])
+			except ValueError:
+				raise ValueError("Invalild object type: {0}".format(var['type']))
+
 			if issubclass(c, objectClass):
 				var = c.fromHash(var)
-		except AttributeError as error:
-			if "'module' object has no attribute " in str(error):
-				error = ValueError("Invalild object type: {0}".format(var['type']))
-
-			exception = error
-			logger.debug(u"Failed to get object from dict {0!r}: {1!r}", var, error)
 		except Exception as error:
 			exception = error
 			logger.debug(u"Failed to get object from dict {0!r}: {1!r}", var, error)
@@ -559,7 +562,23 @@ def forceObjectClass(var, objectClass):
 
 
 def forceObjectClassList(var, objectClass):
-	return [forceObjectClass(element, objectClass) for element in forceList(var)]
+	if isinstance(var, _STRING_TYPES) and var.lstrip().startswith('['):
+		from OPSI.Util import fromJson
+
+		try:
+			var = fromJson(var)
+		except Exception as error:
+			logger.debug(u"Failed to get objects from json {0!r}: {1!r}", var, error)
+
+	var = forceList(var)
+	for element in var:
+		if not isinstance(element, objectClass):
+			break
+	else:
+		# Nothing to convert
+		return var
+
+	return [forceObjectClass(element, objectClass) for element in var]
 
 
 def forceGroupId(var):
@@ -690,9 +709,19 @@ def forceArchitectureList(var):
 
 def forceUniqueList(_list):
 	cleanedList = []
+	seen = set()
+	others = []  # Entries that may be equal to entries with another hash
 	for entry in _list:
-		if entry not in cleanedList:
-			cleanedList.append(entry)
+		if isinstance(entry, _SIMPLE_HASHABLE_TYPES):
+			if entry in seen:
+				continue
+			seen.add(entry)
+		else:
+			if entry in others:
+				continue
+			others.append(entry)
+
+		cleanedList.append(entry)
 	return cleanedList
 
 
@@ -34,11 +34,12 @@ import os
 import re
 import tarfile
 import tempfile
+import threading
 import shutil
 import socket
 import StringIO
 from collections import namedtuple
-from contextlib import closing
+from contextlib import closing, contextmanager
 from hashlib import sha1
 from operator import itemgetter
 from subprocess import Popen, PIPE, STDOUT
@@ -56,7 +57,8 @@ from OPSI.Types import (
 	forceProductPropertyType, forceProductType, forceProductVersion,
 	forceRequirementType, forceUnicode, forceUnicodeList, forceUnicodeLower,
 	forceUniqueList)
-from OPSI.Util.File import ConfigFile, IniFile, TextFile, requiresParsing
+from OPSI.Util.File import (
+	ConfigFile, IniFile, LockableFile, TextFile, requiresParsing)
 from OPSI.Util import md5sum, toJson, fromJson
 
 if os.name == 'posix':
@@ -156,6 +158,290 @@ class HostKeyFile(ConfigFile):
 			del self._opsiHostKeys[hostId]
 
 
+class IndexedHostKeyFile(HostKeyFile):
+	"""
+	Host key file that is changed incrementally.
+
+	The keys and the positions of their lines are kept in memory and
+	only read again if the file was changed by someone else.
+	Changes are written to the file at once: keys of new hosts are
+	appended and the lines of changed or deleted hosts are turned into
+	comments by replacing their first character.
+	Every step leaves a file that can be read by `HostKeyFile` and
+	writing a single byte or appending a line does not require to
+	write the whole file for every host.
+
+	If the outdated lines make up a large part of the file the file
+	is compacted by writing it again.
+	"""
+
+	MIN_LINES_TO_COMPACT = 100
+	_commentRegex = re.compile(r'[;/#]')
+
+	def __init__(self, filename, lockFailTimeout=2000):
+		HostKeyFile.__init__(self, filename, lockFailTimeout)
+		self._lineOffsets = {}
+		self._outdatedLines = 0
+		self._endsWithNewline = True
+		self._signature = None
+		self._indexLock = threading.RLock()
+
+	@contextmanager
+	def _lockedFile(self, exclusive=False):
+		with self._indexLock:
+			if exclusive and not os.path.exists(self._filename):
+				open(self._filename, 'ab').close()
+
+			while True:
+				if not exclusive and not os.path.exists(self._filename):
+					self._fileHandle = None
+					break
+
+				LockableFile.open(self, 'rb+' if exclusive else 'rb', encoding=None)
+				try:
+					if os.fstat(self._fileHandle.fileno()).st_ino == os.stat(self._filename).st_ino:
+						break
+				except OSError:
+					pass
+
+				# The file was replaced while waiting for the lock.
+				self.close()
+
+			try:
+				self._refresh()
+				yield
+			finally:
+				self.close()
+
+	def _getSignature(self):
+		if not self._fileHandle:
+			return None
+
+		stat = os.fstat(self._fileHandle.fileno())
+		return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+	def _refresh(self):
+		signature = self._getSignature()
+		if signature == self._signature:
+			return
+
+		logger.debug(u"Reading host keys from '%s'" % self._filename)
+		self._opsiHostKeys = {}
+		self._lineOffsets = {}
+		self._outdatedLines = 0
+		self._endsWithNewline = True
+		if self._fileHandle:
+			self._fileHandle.seek(0)
+			self._index(self._fileHandle.read())
+
+		self._signature = signature
+		self._parsed = True
+
+	def _index(self, data):
+		lines = data.split('\n')
+		self._endsWithNewline = not lines[-1]
+		if self._endsWithNewline:
+			lines.pop()
+		else:
+			# Incomplete line left by an interrupted change
+			self._outdatedLines += 1
+
+		offset = 0
+		for line in lines:
+			lineOffset = offset
+			offset += len(line) + 1
+
+			line = self._commentRegex.split(line.decode('utf-8', 'replace'), 1)[0]
+			if not line.strip():
+				self._outdatedLines += 1
+				continue
+
+			match = self.lineRegex.search(line)
+			if not match:
+				logger.error(u"Found bad formatted line '%s' in pckey file '%s'" % (line, self._filename))
+				self._outdatedLines += 1
+				continue
+
+			try:
+				hostId = forceHostId(match.group(1))
+				opsiHostKey = forceOpsiHostKey(match.group(2))
+			except ValueError as error:
+				logger.error(u"Found bad formatted line '%s' in pckey file '%s': %s" % (line, self._filename, error))
+				self._outdatedLines += 1
+				continue
+
+			if hostId in self._lineOffsets:
+				# Left by an interrupted change, the last line is valid.
+				self._outdatedLines += 1
+
+			self._opsiHostKeys[hostId] = opsiHostKey
+			self._lineOffsets[hostId] = lineOffset
+
+	def _appendLines(self, opsiHostKeys):
+		self._fileHandle.seek(0, os.SEEK_END)
+		offset = self._fileHandle.tell()
+		data = []
+		if not self._endsWithNewline:
+			data.append('\n')
+			offset += 1
+
+		for (hostId, opsiHostKey) in opsiHostKeys:
+			line = (u'%s:%s\n' % (hostId, opsiHostKey)).encode('utf-8')
+			self._opsiHostKeys[hostId] = opsiHostKey
+			self._lineOffsets[hostId] = offset
+			offset += len(line)
+			data.append(line)
+
+		self._fileHandle.write(''.join(data))
+		self._endsWithNewline = True
+
+	def _commentOutLines(self, offsets):
+		for offset in sorted(offsets):
+			self._fileHandle.seek(offset)
+			self._fileHandle.write('#')
+			self._outdatedLines += 1
+
+	def _finishChange(self):
+		self._fileHandle.flush()
+		os.fsync(self._fileHandle.fileno())
+		self._signature = self._getSignature()
+
+		if self._outdatedLines >= max(self.MIN_LINES_TO_COMPACT, len(self._opsiHostKeys) // 4):
+			self._compact()
+
+	def _compact(self):
+		logger.debug(u"Compacting pckey file '%s'" % self._filename)
+		(directory, basename) = os.path.split(self._filename)
+		try:
+			(handle, temporaryFilename) = tempfile.mkstemp(prefix=u'.%s.' % basename, dir=directory)
+		except OSError as error:
+			logger.debug(u"Not compacting pckey file '%s': %s" % (self._filename, error))
+			return
+
+		try:
+			lineOffsets = {}
+			data = []
+			offset = 0
+			for (hostId, opsiHostKey) in sorted(self._opsiHostKeys.items(), key=itemgetter(1)):
+				line = (u'%s:%s\n' % (hostId, opsiHostKey)).encode('utf-8')
+				lineOffsets[hostId] = offset
+				offset += len(line)
+				data.append(line)
+
+			os.write(handle, ''.join(data))
+			os.fsync(handle)
+
+			if os.name == 'posix':
+				stat = os.fstat(self._fileHandle.fileno())
+				os.fchmod(handle, stat.st_mode & 0o7777)
+				try:
+					os.fchown(handle, stat.st_uid, stat.st_gid)
+				except OSError as error:
+					logger.debug(u"Failed to change owner of '%s': %s" % (temporaryFilename, error))
+
+			stat = os.fstat(handle)
+			os.rename(temporaryFilename, self._filename)
+		except Exception:
+			os.close(handle)
+			if os.path.exists(temporaryFilename):
+				os.unlink(temporaryFilename)
+			raise
+
+		os.close(handle)
+		self._lineOffsets = lineOffsets
+		self._outdatedLines = 0
+		self._endsWithNewline = True
+		self._signature = (stat.st_ino, stat.st_size, stat.st_mtime)
+
+	def parse(self, lines=None):
+		if lines:
+			# The given lines do not belong to the indexed file.
+			self._signature = None
+			return HostKeyFile.parse(self, lines)
+
+		return self.getOpsiHostKeys()
+
+	def generate(self):
+		with self._lockedFile(exclusive=True):
+			self._compact()
+
+	def getOpsiHostKeys(self):
+		"""
+		Get the keys of all hosts.
+
+		:returns: Mapping of host ID to key.
+		:rtype: dict
+		"""
+		with self._lockedFile():
+			return dict(self._opsiHostKeys)
+
+	def getOpsiHostKey(self, hostId):
+		hostId = forceHostId(hostId)
+		with self._lockedFile():
+			return self._opsiHostKeys.get(hostId)
+
+	def setOpsiHostKeys(self, opsiHostKeys):
+		"""
+		Set the keys of several hosts with one change of the file.
+
+		:param opsiHostKeys: Mapping of host ID to key.
+		:type opsiHostKeys: dict
+		"""
+		opsiHostKeys = dict(
+			(forceHostId(hostId), forceOpsiHostKey(opsiHostKey))
+			for (hostId, opsiHostKey) in opsiHostKeys.items()
+		)
+
+		with self._lockedFile(exclusive=True):
+			changed = [
+				(hostId, opsiHostKey)
+				for (hostId, opsiHostKey) in sorted(opsiHostKeys.items())
+				if self._opsiHostKeys.get(hostId) != opsiHostKey
+			]
+			if not changed:
+				return
+
+			outdatedOffsets = [
+				self._lineOffsets[hostId]
+				for (hostId, _) in changed
+				if hostId in self._lineOffsets
+			]
+			# The new lines are written first so that an interrupted
+			# change leaves either the old or the new key valid.
+			self._appendLines(changed)
+			self._commentOutLines(outdatedOffsets)
+			self._finishChange()
+
+	def setOpsiHostKey(self, hostId, opsiHostKey):
+		self.setOpsiHostKeys({hostId: opsiHostKey})
+
+	def deleteOpsiHostKeys(self, hostIds):
+		"""
+		Delete the keys of several hosts with one change of the file.
+
+		:type hostIds: [str, ]
+		"""
+		hostIds = set(forceHostId(hostId) for hostId in forceList(hostIds))
+
+		with self._lockedFile(exclusive=True):
+			outdatedOffsets = [
+				self._lineOffsets.pop(hostId)
+				for hostId in hostIds
+				if hostId in self._lineOffsets
+			]
+			if not outdatedOffsets:
+				return
+
+			for hostId in hostIds:
+				self._opsiHostKeys.pop(hostId, None)
+
+			self._commentOutLines(outdatedOffsets)
+			self._finishChange()
+
+	def deleteOpsiHostKey(self, hostId):
+		self.deleteOpsiHostKeys([hostId])
+
+
 class BackendACLFile(ConfigFile):
 
 	aclEntryRegex = re.compile(r'^([^:]+)+\s*:\s*(\S.*)$')
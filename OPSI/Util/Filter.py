@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Matching of object hashes against backend filters.
+
+A filter is a dict mapping attribute names to the wanted values as it
+is used by the `*_getObjects` methods of the backends.
+Instead of interpreting the filter again for every object it is
+compiled once into a predicate that can then be applied to any number
+of object hashes.
+
+:license: GNU Affero General Public License version 3
+"""
+
+import re
+import threading
+
+from OPSI.Exceptions import BackendError
+from OPSI.Types import forceUnicode, forceUnicodeList
+from OPSI.Util import compareVersions
+
+__all__ = ('compileFilter', 'objectHashMatches')
+
+_OPERATOR_REGEX = re.compile(r'^\s*([>=<]+)\s*([\d.]+)')
+_SEQUENCE_TYPES = (list, tuple, set)
+_NUMBER_TYPES = (float, long, int)
+
+_COMPILED_FILTER_CACHE = {}
+_COMPILED_FILTER_CACHE_SIZE = 512
+_COMPILED_FILTER_CACHE_LOCK = threading.Lock()
+
+
+def _matchEverything(objHash):
+	return True
+
+
+def _getTypeSubClassNames(typeName):
+	import OPSI.Object
+
+	Class = getattr(OPSI.Object, typeName)
+	return frozenset(Class.subClasses)
+
+
+def _compileTypeMatcher(filterValues):
+	"""
+	Creates a matcher for the `type` attribute.
+
+	A type matches if it is either the requested one or a subclass of it.
+	"""
+	wantedTypes = frozenset(filterValues)
+	try:
+		subClassNames = frozenset()
+		for filterValue in filterValues:
+			subClassNames = subClassNames.union(_getTypeSubClassNames(filterValue))
+		resolveError = None
+	except Exception as error:
+		resolveError = error
+
+	def matchType(value):
+		if isinstance(value, _SEQUENCE_TYPES):
+			if forceUnicodeList(value) == filterValues:
+				return True
+		if forceUnicode(value) in wantedTypes:
+			return True
+
+		if resolveError is not None:
+			raise resolveError
+
+		try:
+			return value in subClassNames
+		except TypeError:  # unhashable value
+			return False
+
+	return matchType
+
+
+def _compileValueMatcher(filterValues):
+	"""
+	Creates a matcher for an attribute other than `type`.
+
+	The checks are done in the same order as `Backend._objectHashMatches`
+	did before: direct comparison, list membership, version comparison
+	and finally wildcard matching.
+	"""
+	wantedValues = frozenset(filterValues)
+
+	conditions = []
+	wildcards = []
+	for filterValue in filterValues:
+		match = _OPERATOR_REGEX.search(filterValue)
+		if match:
+			conditions.append((match.group(1), match.group(2)))
+			wildcards.append(None)
+		else:
+			conditions.append(None)
+			if '*' in filterValue:
+				wildcards.append(u'^%s$' % filterValue.replace('*', '.*'))
+			else:
+				wildcards.append(None)
+
+	# Compiling the patterns is postponed until they are needed.
+	# This way invalid patterns behave as they did when evaluated
+	# for each object.
+	compiledWildcards = {}
+
+	def searchWildcard(index, value):
+		try:
+			regex = compiledWildcards[index]
+		except KeyError:
+			regex = compiledWildcards[index] = re.compile(wildcards[index])
+
+		return regex.search(value)
+
+	def compareNumber(value):
+		for filterValue, condition in zip(filterValues, conditions):
+			if condition is None:
+				operator, wantedVersion = u'==', filterValue
+			else:
+				operator, wantedVersion = condition
+
+			try:
+				if compareVersions(value, operator, wantedVersion):
+					return True
+			except Exception:
+				pass
+
+		return False
+
+	def matchValue(value):
+		if isinstance(value, _SEQUENCE_TYPES):
+			if forceUnicodeList(value) == filterValues:
+				return True
+		if forceUnicode(value) in wantedValues:
+			return True
+
+		if isinstance(value, list):
+			for filterValue in filterValues:
+				if filterValue in value:
+					return True
+
+			return False
+		elif value is None or isinstance(value, bool):
+			return False
+		elif isinstance(value, _NUMBER_TYPES):
+			return compareNumber(value)
+
+		for index, condition in enumerate(conditions):
+			if condition is not None:
+				try:
+					if compareVersions(value, condition[0], condition[1]):
+						return True
+				except Exception:
+					pass
+			elif wildcards[index] is not None and searchWildcard(index, value):
+				return True
+
+		return False
+
+	return matchValue
+
+
+def _compileAttributeMatcher(attribute, filterValue):
+	try:
+		filterValues = forceUnicodeList(filterValue)
+	except Exception as error:
+		def failingMatcher(value):
+			raise error
+
+		return failingMatcher
+
+	if attribute == 'type':
+		return _compileTypeMatcher(filterValues)
+
+	return _compileValueMatcher(filterValues)
+
+
+def _getCacheKey(filter):
+	"""
+	Returns a hashable representation of `filter`.
+
+	:raises TypeError: If the filter can not be represented as a key.
+	"""
+	# The types are part of the key because values like `1`, `True`
+	# and `u'1'` are considered equal but lead to different matchers.
+	key = []
+	for attribute, value in filter.items():
+		if isinstance(value, _SEQUENCE_TYPES):
+			value = (type(value), tuple((type(element), element) for element in value))
+		else:
+			value = (type(value), value)
+		key.append((attribute, value))
+
+	key = frozenset(key)
+	hash(key)
+	return key
+
+
+def _compile(filter):
+	filter = dict(filter)
+	matchers = {}
+	for attribute, value in filter.items():
+		if not value:
+			continue
+
+		matchers[attribute] = _compileAttributeMatcher(attribute, value)
+
+	if not matchers:
+		return _matchEverything
+
+	def raiseMatchError(attribute, value, error):
+		raise BackendError(
+			u"Testing match of filter {0!r} of attribute {1!r} with "
+			u"value {2!r} failed: {error}".format(
+				filter[attribute], attribute, value, error=error
+			)
+		)
+
+	if len(matchers) == 1:
+		((attribute, matcher), ) = matchers.items()
+
+		def matchSingleAttribute(objHash):
+			try:
+				value = objHash[attribute]
+			except KeyError:
+				return True
+
+			try:
+				return matcher(value)
+			except Exception as error:
+				raiseMatchError(attribute, value, error)
+
+		return matchSingleAttribute
+
+	def matchAttributes(objHash):
+		for attribute, value in objHash.iteritems():
+			try:
+				matcher = matchers[attribute]
+			except KeyError:
+				continue
+
+			try:
+				if not matcher(value):
+					return False
+			except Exception as error:
+				raiseMatchError(attribute, value, error)
+
+		return True
+
+	return matchAttributes
+
+
+def compileFilter(filter):
+	"""
+	Compile `filter` into a function checking if an object hash matches.
+
+	Filter values are the same as accepted by the `*_getObjects` methods
+	of the backends: single values or lists of values, wildcards
+	(``*``), version comparisons like ``>=1.0`` and for the attribute
+	`type` also the names of parent classes.
+	Attributes with an empty filter value are ignored.
+
+	Compiled filters are cached so that compiling the same filter
+	repeatedly is cheap.
+
+	:type filter: dict
+	:returns: A function that takes an object hash and returns `True` \
+if the hash matches the filter.
+	:rtype: func
+	"""
+	if not filter:
+		return _matchEverything
+
+	try:
+		key = _getCacheKey(filter)
+	except TypeError:
+		return _compile(filter)
+
+	try:
+		return _COMPILED_FILTER_CACHE[key]
+	except KeyError:
+		pass
+
+	compiledFilter = _compile(filter)
+	with _COMPILED_FILTER_CACHE_LOCK:
+		if len(_COMPILED_FILTER_CACHE) >= _COMPILED_FILTER_CACHE_SIZE:
+			_COMPILED_FILTER_CACHE.clear()
+		_COMPILED_FILTER_CACHE[key] = compiledFilter
+
+	return compiledFilter
+
+
+def objectHashMatches(objHash, **filter):
+	"""
+	Checks if the opsi object hash `objHash` matches the filter.
+
+	If many hashes are checked against the same filter it is better to
+	use :py:func:`compileFilter` once and to use the returned function.
+
+	:rtype: bool
+	"""
+	return compileFilter(filter)(objHash)
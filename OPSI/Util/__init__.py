@@ -33,12 +33,14 @@ or to JSON, working with librsync and more.
 
 import base64
 import json
+import operator
 import os
 import random
 import re
 import shutil
 import socket
 import struct
+import threading
 import time
 import types
 from collections import namedtuple
@@ -55,16 +57,18 @@ from OPSI.Types import (forceBool, forceFilename, forceFqdn, forceInt,
 						forceIPAddress, forceNetworkAddress, forceUnicode)
 
 __all__ = (
-	'BLOWFISH_IV', 'PickleString',
+	'BLOWFISH_IV', 'EncodedJson', 'PickleString',
 	'RANDOM_DEVICE', 'blowfishDecrypt', 'blowfishEncrypt',
 	'chunk', 'compareVersions', 'decryptWithPrivateKeyFromPEMFile',
 	'deserialize', 'encryptWithPublicKeyFromX509CertificatePEMFile',
 	'findFiles', 'formatFileSize', 'fromJson', 'generateOpsiHostKey',
-	'getfqdn', 'ipAddressInNetwork', 'isRegularExpressionPattern',
+	'getVersionKey', 'getfqdn', 'ipAddressInNetwork', 'isRegularExpressionPattern',
+	'iterJson',
 	'librsyncDeltaFile', 'librsyncPatchFile', 'librsyncSignature',
 	'md5sum', 'objectToBash', 'objectToBeautifiedText', 'objectToHtml',
 	'randomString', 'removeDirectory', 'removeUnit',
-	'replaceSpecialHTMLCharacters', 'serialize', 'timestamp', 'toJson'
+	'replaceSpecialHTMLCharacters', 'serialize', 'timestamp', 'toJson',
+	'VersionKey'
 )
 
 logger = Logger()
@@ -88,6 +92,22 @@ _ACCEPTED_CHARACTERS = (
 
 Version = namedtuple('Version', 'product package')
 
+_VERSION_REGEX = re.compile(r'^\s*([\w.]+)-*([\w.]*)\s*$')
+_VERSION_TOKEN_REGEX = re.compile(r'(\d+)|(\D+)')
+_VERSION_COMPONENT_END = u'\x01'
+_VERSION_COMPONENT_ZERO = (0, _VERSION_COMPONENT_END)
+_VERSION_CONDITIONS = {
+	u'==': operator.eq,
+	u'=': operator.eq,
+	u'<': operator.lt,
+	u'<=': operator.le,
+	u'>': operator.gt,
+	u'>=': operator.ge,
+}
+_VERSION_KEY_CACHE = {}
+_VERSION_KEY_CACHE_SIZE = 4096
+_VERSION_KEY_CACHE_LOCK = threading.Lock()
+
 
 class CryptoError(ValueError):
 	pass
@@ -126,9 +146,9 @@ object instance from it
 		return [deserialize(element, preventObjectCreation=preventObjectCreation) for element in obj]
 	elif isinstance(obj, dict):
 		if not preventObjectCreation and 'type' in obj:
-			import OPSI.Object
+			from OPSI.Object import getObjectClass
 			try:
-				objectClass = eval('OPSI.Object.%s' % obj['type'])
+				objectClass = getObjectClass(obj['type'])
 				return objectClass.fromHash(obj)
 			except Exception as error:
 				logger.debug(u"Failed to get object from dict {0!r}: {1}", obj, forceUnicode(error))
@@ -189,6 +209,77 @@ def toJson(obj, ensureAscii=False):
 	return json.dumps(serialize(obj), ensure_ascii=ensureAscii)
 
 
+class EncodedJson(unicode):
+	"""
+	Text that already is JSON.
+
+	:py:func:`iterJson` embeds it into its output as it is.
+	"""
+
+
+def iterJson(obj, ensureAscii=False):
+	"""
+	Encode `obj` as JSON and yield the text in parts.
+
+	Generators are encoded element by element so that the list of
+	their serialised elements is never built. Parts of `obj` that
+	contain neither generators nor :py:class:`EncodedJson` are encoded
+	at once.
+	The joined text is the same as the one returned by
+	:py:func:`toJson`.
+	"""
+	if isinstance(obj, EncodedJson):
+		yield obj
+	elif isinstance(obj, types.GeneratorType):
+		yield u'['
+		for index, element in enumerate(obj):
+			if index:
+				yield u', '
+
+			for text in iterJson(element, ensureAscii):
+				yield text
+		yield u']'
+	elif not _isEncodedInParts(obj):
+		yield json.dumps(serialize(obj), ensure_ascii=ensureAscii)
+	elif isinstance(obj, dict):
+		yield u'{'
+		for index, (key, value) in enumerate(obj.items()):
+			if index:
+				yield u', '
+
+			if not isinstance(key, (unicode, str)):
+				key = json.dumps(key)
+			yield json.dumps(key, ensure_ascii=ensureAscii)
+			yield u': '
+			for text in iterJson(value, ensureAscii):
+				yield text
+		yield u'}'
+	else:
+		yield u'['
+		for index, element in enumerate(obj):
+			if index:
+				yield u', '
+
+			for text in iterJson(element, ensureAscii):
+				yield text
+		yield u']'
+
+
+def _isEncodedInParts(obj):
+	"""
+	Check if `obj` has to be encoded in parts because it is or \
+contains a generator or `EncodedJson`.
+	"""
+	if isinstance(obj, (EncodedJson, types.GeneratorType)):
+		return True
+	elif isinstance(obj, dict):
+		return any(_isEncodedInParts(value) for value in obj.itervalues())
+	elif isinstance(obj, list):
+		return any(_isEncodedInParts(element) for element in obj)
+	else:
+		return False
+
+
 def librsyncSignature(filename, base64Encoded=True):
 	filename = forceFilename(filename)
 	try:
@@ -449,118 +540,148 @@ def combineVersions(obj):
 	return '{0.productVersion}-{0.packageVersion}'.format(obj)
 
 
-def compareVersions(v1, condition, v2):
+def _splitVersionComponent(value):
 	"""
-	Compare the versions `v1` and `v2` with the given `condition`.
+	Split a single part of a version into its comparable tokens.
 
-	`condition` may be one of `==`, `<`, `<=`, `>`, `>=`.
+	Numbers and letters are separated from each other: `10a2` becomes
+	`(10, u'a', 2)`. A marker is appended that sorts after any number
+	but before any letter. This way `1.0` is lower than `1.0a` but
+	`1.0a1` is lower than `1.0a`.
+	"""
+	tokens = []
+	for number, text in _VERSION_TOKEN_REGEX.findall(value):
+		if number:
+			tokens.append(int(number))
+		else:
+			tokens.append(text)
+	tokens.append(_VERSION_COMPONENT_END)
+	return tuple(tokens)
 
-	Versions will be made the same length by appending '.0' until they
-	match.
-	If `1.0.0` and `2` are compared the latter will be viewed as `2.0.0`.
-	If a version contains a `~` that character and everything following
-	it will not be taken into account.
 
-	:raises ValueError: If invalid value for version or condition if given.
-	:rtype: bool
-	:return: If the comparison matches this will return True.
+def _splitVersionPart(versionPart):
+	components = [_splitVersionComponent(value) for value in versionPart.split(u'.')]
+
+	# Missing parts count as `0`. Every other part is greater than `0`
+	# which means removing trailing zeros is enough to make versions
+	# of different depth comparable.
+	while components and components[-1] == _VERSION_COMPONENT_ZERO:
+		components.pop()
+
+	return tuple(components)
+
+
+def _parseVersion(versionString):
+	versionString = forceUnicode(versionString)
+	if u"~" in versionString:
+		versionString = versionString[:versionString.find(u"~")]
+
+	match = _VERSION_REGEX.search(versionString)
+	if not match:
+		raise ValueError(u"Bad version string '%s'" % versionString)
+
+	version = Version(match.group(1), match.group(2) or u'0')
+	key = (_splitVersionPart(version.product), _splitVersionPart(version.package))
+	return version, key
+
+
+class VersionKey(object):
 	"""
-	def removePartAfterWave(versionString):
-		if "~" in versionString:
-			return versionString[:versionString.find("~")]
-		else:
-			return versionString
+	A parsed opsi version that can be compared with other versions.
 
-	def splitProductAndPackageVersion(versionString):
-		productVersion = packageVersion = u'0'
+	The version consists of a product and a package version separated
+	by a `-`. Anything after a `~` is not taken into account.
 
-		match = re.search(r'^\s*([\w.]+)-*([\w.]*)\s*$', versionString)
-		if not match:
-			raise ValueError(u"Bad version string '%s'" % versionString)
+	Use :py:func:`getVersionKey` to get instances because the parsed
+	versions are cached there.
+	"""
+	__slots__ = ('version', 'key')
 
-		productVersion = match.group(1)
-		if match.group(2):
-			packageVersion = match.group(2)
+	def __init__(self, version):
+		"""
+		:raises ValueError: If `version` is not a valid version string.
+		"""
+		self.version, self.key = _parseVersion(version)
 
-		return Version(productVersion, packageVersion)
+	def __eq__(self, other):
+		return self.key == other.key
 
-	def makeEqualLength(first, second):
-		while len(first) < len(second):
-			first.append(u'0')
+	def __ne__(self, other):
+		return self.key != other.key
 
-		while len(second) < len(first):
-			second.append(u'0')
+	def __lt__(self, other):
+		return self.key < other.key
 
-	def splitValue(value):
-		match = re.search(r'^(\d+)(\D*.*)$', value)
-		if match:
-			return int(match.group(1)), match.group(2)
-		else:
-			match = re.search(r'^(\D+)(\d*.*)$', value)
-			if match:
-				return match.group(1), match.group(2)
+	def __le__(self, other):
+		return self.key <= other.key
 
-		return u'', value
+	def __gt__(self, other):
+		return self.key > other.key
 
-	if not condition:
-		condition = u'=='
-	if condition not in (u'==', u'=', u'<', u'<=', u'>', u'>='):
-		raise ValueError(u"Bad condition '%s'" % condition)
-	if condition == u'=':
-		condition = u'=='
+	def __ge__(self, other):
+		return self.key >= other.key
 
-	v1 = removePartAfterWave(forceUnicode(v1))
-	v2 = removePartAfterWave(forceUnicode(v2))
+	def __hash__(self):
+		return hash(self.key)
 
-	version = splitProductAndPackageVersion(v1)
-	otherVersion = splitProductAndPackageVersion(v2)
-	logger.debug2("Versions: {0!r}, {1!r}", version, otherVersion)
+	def __repr__(self):
+		return u'<{0}({1!r}, {2!r})>'.format(self.__class__.__name__, self.version.product, self.version.package)
 
-	comparisons = (
-		(version.product, otherVersion.product),
-		(version.package, otherVersion.package)
-	)
 
-	for first, second in comparisons:
-		logger.debug2("Comparing {0!r} with {1!r}...", first, second)
-		firstParts = first.split(u'.')
-		secondParts = second.split(u'.')
-		makeEqualLength(firstParts, secondParts)
+def getVersionKey(version):
+	"""
+	Get the parsed representation of `version`.
 
-		for value, otherValue in zip(firstParts, secondParts):
-			while value or otherValue:
-				cv1, value = splitValue(value)
-				cv2, otherValue = splitValue(otherValue)
+	The result can be compared with the usual operators and can be
+	used as a sort key: `sorted(versions, key=getVersionKey)`.
+	Already parsed versions are cached.
 
-				if cv1 == u'':
-					cv1 = chr(1)
-				if cv2 == u'':
-					cv2 = chr(1)
+	:raises ValueError: If `version` is not a valid version string.
+	:rtype: VersionKey
+	"""
+	if isinstance(version, VersionKey):
+		return version
+	elif not isinstance(version, basestring):
+		# Values like `1` and `True` are equal as keys of a dict
+		# but are different versions.
+		version = forceUnicode(version)
 
-				if cv1 == cv2:
-					logger.debug2(u"{0!r} == {1!r} => continue", cv1, cv2)
-					continue
+	try:
+		return _VERSION_KEY_CACHE[version]
+	except KeyError:
+		pass
 
-				if not isinstance(cv1, int):
-					cv1 = u"'%s'" % cv1
-				if not isinstance(cv2, int):
-					cv2 = u"'%s'" % cv2
+	versionKey = VersionKey(version)
+	with _VERSION_KEY_CACHE_LOCK:
+		if len(_VERSION_KEY_CACHE) >= _VERSION_KEY_CACHE_SIZE:
+			_VERSION_KEY_CACHE.clear()
+		_VERSION_KEY_CACHE[version] = versionKey
 
-				logger.debug2(u"Is {0!r} {1} {2!r}?", cv1, condition, cv2)
-				conditionFulfilled = eval(u"%s %s %s" % (cv1, condition, cv2))
-				if not conditionFulfilled:
-					logger.debug(u"Unfulfilled condition: {0} {1} {2}", version, condition, otherVersion)
-					return False
+	return versionKey
 
-				logger.debug(u"Fulfilled condition: {0} {1} {2}", version, condition, otherVersion)
-				return True
 
-	if u'=' not in condition:
-		logger.debug(u"Unfulfilled condition: {0} {1} {2}", version, condition, otherVersion)
-		return False
+def compareVersions(v1, condition, v2):
+	"""
+	Compare the versions `v1` and `v2` with the given `condition`.
+
+	`condition` may be one of `==`, `<`, `<=`, `>`, `>=`.
+
+	Versions will be made the same length by appending '.0' until they
+	match.
+	If `1.0.0` and `2` are compared the latter will be viewed as `2.0.0`.
+	If a version contains a `~` that character and everything following
+	it will not be taken into account.
+
+	:raises ValueError: If invalid value for version or condition if given.
+	:rtype: bool
+	:return: If the comparison matches this will return True.
+	"""
+	try:
+		compare = _VERSION_CONDITIONS[condition or u'==']
+	except (KeyError, TypeError):
+		raise ValueError(u"Bad condition '%s'" % condition)
 
-	logger.debug(u"Fulfilled condition: {0} {1} {2}", version, condition, otherVersion)
-	return True
+	return compare(getVersionKey(v1).key, getVersionKey(v2).key)
 
 
 def removeUnit(x):
@@ -21,12 +21,17 @@
 
 from __future__ import absolute_import
 
+import os
+import shutil
+import subprocess
+import tempfile
+import time
 from contextlib import contextmanager
 
 import pytest
 
 from OPSI.Backend.MySQL import (
-    MySQL, MySQLBackend, MySQLBackendObjectModificationTracker)
+    ConnectionPool, MySQL, MySQLBackend, MySQLBackendObjectModificationTracker)
 from OPSI.Util.Task.UpdateBackend.MySQL import disableForeignKeyChecks
 
 try:
@@ -50,11 +55,127 @@ def getMySQLBackend(**backendOptions):
 
 
 @contextmanager
-def getMySQLModificationTracker():
+def getMySQLConfiguration():
+    """
+    Get the configuration for a MySQL database to test with.
+
+    If no configuration is given a temporary MySQL or MariaDB server
+    will be started if one is installed.
+    """
+    if MySQLconfiguration:
+        with cleanDatabase(MySQL(**MySQLconfiguration)):
+            yield dict(MySQLconfiguration)
+    else:
+        with temporaryMySQLServer() as configuration:
+            yield configuration
+
+
+@contextmanager
+def temporaryMySQLServer():
+    """
+    Start a MySQL or MariaDB server with a temporary data directory.
+
+    The server only listens on a socket and does not check passwords.
+    """
+    serverBinary = findExecutable('mariadbd', 'mysqld')
+    if not serverBinary:
+        pytest.skip('no MySQL server installed.')
+
+    tempDir = tempfile.mkdtemp()
+    dataDir = os.path.join(tempDir, 'data')
+    socket = os.path.join(tempDir, 'mysql.sock')
+    serverArguments = [
+        serverBinary, '--no-defaults', '--datadir={0}'.format(dataDir),
+        '--socket={0}'.format(socket), '--skip-networking',
+        '--skip-grant-tables', '--pid-file={0}'.format(os.path.join(tempDir, 'mysql.pid')),
+    ]
+    if os.getuid() == 0:
+        serverArguments.append('--user=root')
+
+    installDb = findExecutable('mariadb-install-db', 'mysql_install_db')
+    with open(os.devnull, 'w') as devnull:
+        try:
+            if installDb and 'mariadb' in subprocess.check_output([serverBinary, '--version']).lower():
+                subprocess.check_call(
+                    [installDb, '--no-defaults', '--datadir={0}'.format(dataDir), '--auth-root-authentication-method=normal'],
+                    stdout=devnull, stderr=devnull
+                )
+            else:
+                subprocess.check_call(
+                    serverArguments[:3] + ['--initialize-insecure'] + serverArguments[-1:],
+                    stdout=devnull, stderr=devnull
+                )
+        except (OSError, subprocess.CalledProcessError) as error:
+            shutil.rmtree(tempDir)
+            pytest.skip('failed to initialise a MySQL data directory: {0}'.format(error))
+
+        server = subprocess.Popen(serverArguments, stdout=devnull, stderr=devnull)
+
+    configuration = {
+        'address': u'localhost',
+        'socket': socket,
+        'username': u'root',
+        'password': u'',
+        'database': u'opsi',
+    }
+    try:
+        try:
+            database = waitForServer(dict(configuration, database=u'mysql'))
+            database.execute(u'CREATE DATABASE `opsi`;')
+        finally:
+            destroyConnectionPool()
+
+        yield configuration
+    finally:
+        destroyConnectionPool()
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tempDir)
+
+
+def findExecutable(*names):
+    directories = os.environ.get('PATH', '').split(os.pathsep) + ['/usr/sbin', '/usr/local/sbin']
+    for name in names:
+        for directory in directories:
+            path = os.path.join(directory, name)
+            if os.access(path, os.X_OK):
+                return path
+
+    return None
+
+
+def waitForServer(configuration, timeout=30):
+    start = time.time()
+    while True:
+        try:
+            database = MySQL(**configuration)
+            database.getSet(u'SELECT 1;')
+            return database
+        except Exception:
+            destroyConnectionPool()
+            if time.time() - start > timeout:
+                raise
+
+            time.sleep(0.2)
+
+
+def destroyConnectionPool():
+    "The connection pool is shared and has to be reset for other servers."
+    ConnectionPool._ConnectionPool__instance = None
+
+
+@contextmanager
+def getMySQLModificationTracker(**trackerOptions):
     if not MySQLconfiguration:
         pytest.skip('no MySQL backend configuration given.')
 
-    yield MySQLBackendObjectModificationTracker(**MySQLconfiguration)
+    options = dict(MySQLconfiguration)
+    options.update(trackerOptions)
+    tracker = MySQLBackendObjectModificationTracker(**options)
+    try:
+        yield tracker
+    finally:
+        tracker.close()
 
 
 @contextmanager
@@ -56,8 +56,14 @@ def getSQLiteBackend(**backendOptions):
 
 
 @contextmanager
-def getSQLiteModificationTracker():
+def getSQLiteModificationTracker(**trackerOptions):
 	sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
 	trackerClass = sqliteModule.SQLiteObjectBackendModificationTracker
 
-	yield trackerClass(database=":memory:")
+	options = {'database': ":memory:"}
+	options.update(trackerOptions)
+	tracker = trackerClass(**options)
+	try:
+		yield tracker
+	finally:
+		tracker.close()
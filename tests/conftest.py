@@ -28,6 +28,9 @@ creating a test function. No rurther imports are needed.
 Backends with MySQL / SQLite sometimes require a modules file and may
 be skipped if it does not exist.
 
+Tests marked as `benchmark` measure durations. They are only run if
+``--run-benchmarks`` is given.
+
 :author: Niko Wenselowski <n.wenselowski@uib.de>
 :license: GNU Affero General Public License version 3
 """
@@ -234,8 +237,23 @@ def licenseManagentAndAuditBackend(request):
             yield ExtendedConfigDataBackend(backend)
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks", action="store_true", default=False,
+        help="Run the tests marked as benchmark."
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: measures durations, only run with --run-benchmarks")
+
+
 def pytest_runtest_setup(item):
     envmarker = item.get_closest_marker("requiresModulesFile")
     if envmarker is not None:
         if not _MODULES_FILE:
             pytest.skip("{0} requires a modules file!".format(item.name))
+
+    if item.get_closest_marker("benchmark") is not None:
+        if not item.config.getoption("--run-benchmarks"):
+            pytest.skip("{0} is a benchmark, use --run-benchmarks to run it.".format(item.name))
@@ -285,6 +285,26 @@ def testOnlyAccessingSelfIsPossible(extendedConfigDataBackend):
     assert 1 == len(hosts)
 
 
+def testFilteringGeneratedObjects(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+
+    configServer, _, clients = fillBackendWithHosts(backend)
+
+    acl = {'type': u'self', 'ids': [], 'denyAttributes': [], 'allowAttributes': []}
+    backend = BackendAccessControl(
+        backend=backend,
+        username=configServer.id,
+        password=configServer.opsiHostKey,
+        acl=[['.*', [acl]]]
+    )
+
+    hosts = (host for host in [configServer] + list(clients))
+    filteredHosts = backend._filterResult(hosts, [acl])
+
+    assert not isinstance(filteredHosts, list)
+    assert [configServer.id] == [host.id for host in filteredHosts]
+
+
 def testDenyingAccessToSpecifiedAttributes(extendedConfigDataBackend):
     backend = extendedConfigDataBackend
 
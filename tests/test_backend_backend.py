@@ -28,6 +28,7 @@ import os.path
 
 from OPSI.Backend.Backend import temporaryBackendOptions
 from OPSI.Backend.Backend import Backend, ExtendedBackend
+from OPSI.Backend.File import FileBackend, _getHostKeyFile
 from OPSI.Exceptions import BackendMissingDataError
 from OPSI.Object import BoolConfig, OpsiClient, UnicodeConfig
 from OPSI.Util import blowfishDecrypt, generateOpsiHostKey, randomString
@@ -80,6 +81,11 @@ def testWorkingWithManyCredentials(fakeCredentialsBackend, number):
 def testSettingUserCredentialsWithoutDepot(fakeCredentialsBackend):
     backend = fakeCredentialsBackend
     backend.host_deleteObjects(backend.host_getObjects())
+    if isinstance(backend, FileBackend):
+        # The config server can not be deleted from the file backend.
+        # Without its key there is nothing to encrypt the password with.
+        hostKeyFile = _getHostKeyFile(backend._getConfigFile('', {}, 'key'))
+        hostKeyFile.deleteOpsiHostKeys([host.id for host in backend.host_getObjects()])
 
     with pytest.raises(Exception):
         backend.user_setCredentials("hans", '')
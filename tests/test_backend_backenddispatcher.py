@@ -25,11 +25,15 @@ Testing BackendDispatcher.
 from __future__ import absolute_import
 
 import os
+import sys
 
 import pytest
 
+from OPSI.Backend.Backend import ClientToDepotIndex
 from OPSI.Backend.BackendManager import BackendDispatcher
 from OPSI.Exceptions import BackendConfigurationError
+from OPSI.Object import (
+    ConfigState, OpsiClient, ProductOnClient, UnicodeConfig)
 
 from .Backends.File import getFileBackend
 from .conftest import _backendBase
@@ -71,6 +75,20 @@ def testLoadingDispatchConfig(dispatcher):
     assert [(u'.*', (u'file', ))] == dispatcher.dispatcher_getConfig()
 
 
+def testDispatchersWithTheSameConfigShareTheClientToDepotIndex(dispatcher, tempDir):
+    otherDispatcher = BackendDispatcher(
+        dispatchConfig=dispatcher.dispatcher_getConfig(),
+        backendConfigDir=os.path.join(tempDir, 'etc', 'opsi', 'backends')
+    )
+    assert ClientToDepotIndex.getIndex(dispatcher) is ClientToDepotIndex.getIndex(otherDispatcher)
+
+    otherDispatcher = BackendDispatcher(
+        dispatchConfig=[(u'^host_.*', (u'file', )), (u'.*', (u'file', ))],
+        backendConfigDir=os.path.join(tempDir, 'etc', 'opsi', 'backends')
+    )
+    assert ClientToDepotIndex.getIndex(dispatcher) is not ClientToDepotIndex.getIndex(otherDispatcher)
+
+
 @pytest.fixture
 def dispatcherBackend(tempDir):
     "A file backend for dispatching"
@@ -101,3 +119,81 @@ def _patchDispatchConfigForFileBackend(targetDirectory):
 """)
 
     return dispatchConfigPath
+
+
+RECORDING_BACKEND = '''
+from OPSI.Backend.Backend import ConfigDataBackend
+
+deletedObjects = []
+
+
+class RecordingBackend(ConfigDataBackend):
+    def productOnClient_deleteObjects(self, productOnClients):
+        deletedObjects.extend(productOnClients)
+
+    def configState_deleteObjects(self, configStates):
+        deletedObjects.extend(configStates)
+'''
+
+
+@pytest.fixture
+def sqliteModule():
+    return pytest.importorskip("OPSI.Backend.SQLite")
+
+
+@pytest.fixture
+def sqliteAndRecordingDispatcher(sqliteModule, tempDir, monkeypatch):
+    moduleDir = os.path.join(tempDir, 'modules')
+    os.mkdir(moduleDir)
+    with open(os.path.join(moduleDir, 'Recording.py'), 'w') as moduleFile:
+        moduleFile.write(RECORDING_BACKEND)
+    monkeypatch.syspath_prepend(moduleDir)
+    monkeypatch.delitem(sys.modules, 'Recording', raising=False)
+
+    backendConfigDir = os.path.join(tempDir, 'backends')
+    os.mkdir(backendConfigDir)
+    with open(os.path.join(backendConfigDir, 'sqlite.conf'), 'w') as config:
+        config.write("module = 'SQLite'\nconfig = {'database': %r}\n" % os.path.join(tempDir, 'opsi.sqlite3'))
+    with open(os.path.join(backendConfigDir, 'recording.conf'), 'w') as config:
+        config.write("module = 'Recording'\nconfig = {}\n")
+
+    dispatcher = BackendDispatcher(
+        dispatchConfig=[
+            (u'^productOnClient_.*', (u'sqlite', u'recording')),
+            (u'^configState_.*', (u'sqlite', u'recording')),
+            (u'.*', (u'sqlite', )),
+        ],
+        backendConfigDir=backendConfigDir
+    )
+    dispatcher.backend_createBase()
+    try:
+        yield dispatcher
+    finally:
+        dispatcher.backend_exit()
+        monkeypatch.delitem(sys.modules, 'Recording', raising=False)
+
+
+def testDeletingHostsIsDispatchedToAllBackends(sqliteAndRecordingDispatcher):
+    dispatcher = sqliteAndRecordingDispatcher
+    clients = [OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(2)]
+    dispatcher.host_insertObjects(clients)
+    dispatcher.config_insertObject(UnicodeConfig(id=u'config1', defaultValues=[u'a']))
+    for client in clients:
+        dispatcher.productOnClient_insertObject(
+            ProductOnClient(
+                productId=u'product1', productType=u'LocalbootProduct',
+                clientId=client.id, actionRequest=u'setup'
+            )
+        )
+        dispatcher.configState_insertObject(ConfigState(configId=u'config1', objectId=client.id, values=[u'b']))
+
+    dispatcher.host_deleteObjects(clients[:1])
+
+    deletedObjects = sys.modules['Recording'].deletedObjects
+    assert set([u'ProductOnClient', u'ConfigState']) == set(obj.getType() for obj in deletedObjects)
+    assert all(
+        getattr(obj, 'clientId', getattr(obj, 'objectId', None)) == clients[0].id
+        for obj in deletedObjects
+    )
+    assert [clients[1].id] == [host.id for host in dispatcher.host_getObjects()]
+    assert [clients[1].id] == [poc.clientId for poc in dispatcher.productOnClient_getObjects()]
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the creation and updating of many objects at once.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import time
+from collections import defaultdict
+
+from OPSI.Backend.Backend import (
+    BULK_QUERY_SIZE, BackendModificationListener, ExtendedBackend,
+    ExtendedConfigDataBackend, ModificationTrackingBackend,
+    temporaryBackendOptions)
+from OPSI.Exceptions import BackendError
+from OPSI.Object import (
+    AuditSoftwareOnClient, ConfigState, LocalbootProduct, OpsiClient, OpsiDepotserver,
+    ProductOnClient, ProductOnDepot, UnicodeConfig)
+
+from .Backends.File import getFileBackend
+from .Backends.SQLite import getSQLiteBackend
+
+import pytest
+
+
+class CallCountingBackend(ExtendedBackend):
+    "Counts the calls of the methods of the wrapped backend."
+
+    def __init__(self, backend):
+        ExtendedBackend.__init__(self, backend)
+        self.calls = defaultdict(int)
+
+    def _executeMethod(self, methodName, **kwargs):
+        self.calls[methodName] += 1
+        return ExtendedBackend._executeMethod(self, methodName, **kwargs)
+
+
+class ModificationCollector(BackendModificationListener):
+    def __init__(self):
+        self.inserted = []
+        self.updated = []
+
+    def objectInserted(self, backend, obj):
+        self.inserted.append(obj)
+
+    def objectUpdated(self, backend, obj):
+        self.updated.append(obj)
+
+
+@pytest.fixture(
+    params=[
+        getFileBackend,
+        pytest.param(getSQLiteBackend, marks=pytest.mark.requiresModulesFile),
+    ],
+    ids=['file', 'sqlite']
+)
+def storageBackend(request):
+    with request.param() as backend:
+        backend.backend_createBase()
+        try:
+            yield backend
+        finally:
+            backend.backend_deleteBase()
+
+
+@pytest.fixture
+def countingBackend(storageBackend):
+    return CallCountingBackend(storageBackend)
+
+
+@pytest.fixture
+def backend(countingBackend):
+    return ExtendedConfigDataBackend(countingBackend)
+
+
+def getClients(count):
+    return [
+        OpsiClient(id=u'client{0}.test.invalid'.format(index))
+        for index in range(count)
+    ]
+
+
+def createDepotWithProducts(backend, productCount):
+    depot = OpsiDepotserver(id=u'depot1.test.invalid')
+    backend.host_createObjects(depot)
+
+    products = [
+        LocalbootProduct(id=u'product{0}'.format(index), productVersion=u'1.0', packageVersion=u'1')
+        for index in range(productCount)
+    ]
+    backend.product_createObjects(products)
+    backend.productOnDepot_createObjects([
+        ProductOnDepot(
+            productId=product.id, productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion, depotId=depot.id
+        )
+        for product in products
+    ])
+
+    return depot, products
+
+
+def testCreatingObjectsUsesBulkInsert(backend, countingBackend):
+    clients = getClients(10)
+    backend.host_createObjects(clients)
+
+    assert 1 == countingBackend.calls['host_insertObjects']
+    assert 0 == countingBackend.calls['host_insertObject']
+    assert set(client.id for client in clients) == set(backend.host_getIdents(type='OpsiClient'))
+
+
+def testUpdatingObjectsChecksExistenceInBulk(backend, countingBackend):
+    clients = getClients(BULK_QUERY_SIZE + 10)
+    backend.host_createObjects(clients[:20])
+
+    for client in clients:
+        client.setDescription(u'updated')
+    backend.host_updateObjects(clients)
+
+    assert 2 == countingBackend.calls['host_getObjects']
+    assert 1 == countingBackend.calls['host_updateObjects']
+    assert 2 == countingBackend.calls['host_insertObjects']
+
+    hosts = backend.host_getObjects(type='OpsiClient')
+    assert len(clients) == len(hosts)
+    assert all(host.description == u'updated' for host in hosts)
+
+
+def testUpdatingOnlyChangesGivenAttributes(backend):
+    backend.host_createObjects(OpsiClient(id=u'client1.test.invalid', description=u'desc', notes=u'notes'))
+
+    backend.host_updateObjects(OpsiClient(id=u'client1.test.invalid', description=u'new'))
+
+    host = backend.host_getObjects(id=u'client1.test.invalid')[0]
+    assert u'new' == host.description
+    assert u'notes' == host.notes
+
+
+def testUpdatingWithDuplicatesInOneCall(backend):
+    backend.host_updateObjects([
+        OpsiClient(id=u'client1.test.invalid', description=u'first', notes=u'notes'),
+        OpsiClient(id=u'client1.test.invalid', description=u'second'),
+    ])
+
+    hosts = backend.host_getObjects(type='OpsiClient')
+    assert 1 == len(hosts)
+    assert u'second' == hosts[0].description
+    assert u'notes' == hosts[0].notes
+
+
+def testReturningObjectsAfterBulkCreation(backend):
+    depot, products = createDepotWithProducts(backend, 3)
+
+    with temporaryBackendOptions(backend, returnObjectsOnUpdateAndCreate=True):
+        result = backend.product_updateObjects(products)
+
+    assert len(products) == len(result)
+    assert set(product.id for product in products) == set(product.id for product in result)
+
+
+def testCreatingProductOnDepotsReplacesOtherVersions(backend):
+    depot, products = createDepotWithProducts(backend, 5)
+
+    newProducts = [
+        LocalbootProduct(id=product.id, productVersion=u'2.0', packageVersion=u'1')
+        for product in products
+    ]
+    backend.product_createObjects(newProducts)
+    backend.productOnDepot_createObjects([
+        ProductOnDepot(
+            productId=product.id, productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion, depotId=depot.id
+        )
+        for product in newProducts
+    ])
+
+    productOnDepots = backend.productOnDepot_getObjects(depotId=depot.id)
+    assert len(products) == len(productOnDepots)
+    assert all(pod.productVersion == u'2.0' for pod in productOnDepots)
+
+
+def testInstalledProductOnClientsGetVersionsFromDepot(backend, countingBackend):
+    depot, products = createDepotWithProducts(backend, 5)
+    clients = getClients(5)
+    backend.host_createObjects(clients)
+    backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+
+    countingBackend.calls.clear()
+    backend.productOnClient_createObjects([
+        ProductOnClient(
+            productId=product.id, productType=product.getType(),
+            clientId=client.id, installationStatus=u'installed'
+        )
+        for client in clients
+        for product in products
+    ])
+
+    assert 1 == countingBackend.calls['productOnClient_insertObjects']
+    assert countingBackend.calls['productOnDepot_getObjects'] <= 3
+
+    productOnClients = backend.productOnClient_getObjects()
+    assert len(clients) * len(products) == len(productOnClients)
+    for productOnClient in productOnClients:
+        assert u'1.0' == productOnClient.productVersion
+        assert u'1' == productOnClient.packageVersion
+
+
+def testInstalledProductOnClientFailsWithoutProductOnDepot(backend):
+    depot = OpsiDepotserver(id=u'depot1.test.invalid')
+    client = OpsiClient(id=u'client1.test.invalid')
+    backend.host_createObjects([depot, client])
+    backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+
+    with pytest.raises(BackendError):
+        backend.productOnClient_createObjects(
+            ProductOnClient(
+                productId=u'product1', productType=u'LocalbootProduct',
+                clientId=client.id, installationStatus=u'installed'
+            )
+        )
+
+
+def testUpdatingConfigStatesInBulk(backend):
+    clients = getClients(3)
+    backend.host_createObjects(clients)
+    backend.config_createObjects(UnicodeConfig(id=u'some.config', defaultValues=[u'a']))
+
+    backend.configState_createObjects(ConfigState(configId=u'some.config', objectId=clients[0].id, values=[u'b']))
+    backend.configState_updateObjects([
+        ConfigState(configId=u'some.config', objectId=client.id, values=[u'c'])
+        for client in clients
+    ])
+
+    configStates = backend.configState_getObjects(configId=u'some.config')
+    assert len(clients) == len(configStates)
+    assert all(configState.values == [u'c'] for configState in configStates)
+
+
+def testConfigDataBackendFallsBackToSingleObjects(storageBackend):
+    clients = getClients(3)
+    storageBackend.host_insertObjects(clients)
+    assert len(clients) == len(storageBackend.host_getObjects())
+
+    for client in clients:
+        client.setDescription(u'updated')
+    storageBackend.host_updateObjects(clients)
+    assert all(host.description == u'updated' for host in storageBackend.host_getObjects())
+
+
+def testTrackingModificationsOfBulkOperations(storageBackend):
+    tracker = ModificationTrackingBackend(storageBackend)
+    collector = ModificationCollector()
+    tracker.addBackendChangeListener(collector)
+
+    clients = getClients(3)
+    tracker.host_insertObjects(clients)
+    tracker.host_updateObjects(clients)
+
+    assert clients == collector.inserted
+    assert clients == collector.updated
+
+
+def testSQLiteInsertsManyRowsInOneTransaction():
+    sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
+    database = sqliteModule.SQLite()
+    database.execute(u'CREATE TABLE `TEST` (`id` varchar(50) NOT NULL, `value` integer, PRIMARY KEY (`id`));')
+
+    database.insertMany('TEST', [{'id': u'a', 'value': 1}, {'id': u'b', 'value': None}])
+    assert 2 == len(database.getSet(u'SELECT * FROM `TEST`'))
+
+    with pytest.raises(Exception):
+        database.insertMany('TEST', [{'id': u'c', 'value': 3}, {'id': u'a', 'value': 4}])
+
+    assert [u'a', u'b'] == sorted(row['id'] for row in database.getSet(u'SELECT * FROM `TEST`'))
+
+
+@pytest.fixture
+def sqliteBackend():
+    with getSQLiteBackend() as backend:
+        backend.backend_createBase()
+        try:
+            yield backend
+        finally:
+            backend.backend_deleteBase()
+
+
+def recordTransactions(backend, monkeypatch):
+    transactions = []
+    executeInTransaction = backend._sql.executeInTransaction
+
+    def recordTransaction(statements):
+        statements = list(statements)
+        transactions.append([query for (query, _) in statements])
+        return executeInTransaction(statements)
+
+    monkeypatch.setattr(backend._sql, 'executeInTransaction', recordTransaction)
+    return transactions
+
+
+def testSQLBackendUpdatesRowsWithSameValuesAtOnce(sqliteBackend, monkeypatch):
+    sqliteBackend.host_insertObjects(getClients(20))
+    clients = getClients(20)
+    for (index, client) in enumerate(clients):
+        client.setDescription(u'odd' if index % 2 else u'even')
+
+    transactions = recordTransactions(sqliteBackend, monkeypatch)
+    sqliteBackend.host_updateObjects(clients)
+    assert 1 == len(transactions)
+    assert 2 == len(transactions[0])
+    assert all(query.startswith(u'UPDATE `HOST`') for query in transactions[0])
+
+    # Inserting replaces all values which differ for every host.
+    sqliteBackend.host_insertObjects(clients)
+    assert 2 == len(transactions)
+    assert len(clients) == len(transactions[1])
+
+    descriptions = dict((host.id, host.description) for host in sqliteBackend.host_getObjects())
+    assert dict((client.id, client.description) for client in clients) == descriptions
+
+
+def testSQLBackendKeepsValuesNotGivenOnUpdate(sqliteBackend):
+    sqliteBackend.host_insertObjects([
+        OpsiClient(id=u'client1.test.invalid', description=u'desc', notes=u'notes'),
+        OpsiClient(id=u'client2.test.invalid', description=u'desc'),
+    ])
+
+    sqliteBackend.host_updateObjects([
+        OpsiClient(id=u'client1.test.invalid', description=u'new'),
+        OpsiClient(id=u'client2.test.invalid', notes=u'new'),
+    ])
+
+    hosts = dict((host.id, host) for host in sqliteBackend.host_getObjects())
+    assert (u'new', u'notes') == (hosts[u'client1.test.invalid'].description, hosts[u'client1.test.invalid'].notes)
+    assert (u'desc', u'new') == (hosts[u'client2.test.invalid'].description, hosts[u'client2.test.invalid'].notes)
+
+
+@pytest.mark.parametrize("createObjects", [
+    lambda count: [
+        AuditSoftwareOnClient(
+            name=u'software{0}'.format(index), version=u'1.0',
+            subVersion=u'', language=u'de', architecture=u'x64',
+            clientId=u'client.test.invalid', state=1
+        )
+        for index in range(count)
+    ],
+    lambda count: [
+        ConfigState(configId=u'config{0}'.format(index), objectId=u'client.test.invalid', values=[u'a'])
+        for index in range(count)
+    ],
+], ids=['auditSoftwareOnClient', 'configState'])
+def testSQLBackendCreatesMoreObjectsThanFitIntoOneStatement(sqliteBackend, createObjects):
+    count = BULK_QUERY_SIZE + 100
+    sqliteBackend.host_insertObjects([OpsiClient(id=u'client.test.invalid')])
+    sqliteBackend.config_insertObjects([
+        UnicodeConfig(id=u'config{0}'.format(index)) for index in range(count)
+    ])
+    objects = createObjects(count)
+    prefix = objects[0].backendMethodPrefix
+
+    getattr(sqliteBackend, prefix + '_insertObjects')(objects)
+    # Now all rows exist and have to be looked up and updated.
+    getattr(sqliteBackend, prefix + '_insertObjects')(createObjects(count))
+    getattr(sqliteBackend, prefix + '_updateObjects')(createObjects(count))
+
+    assert count == len(getattr(sqliteBackend, prefix + '_getObjects')())
+
+
+@pytest.mark.benchmark
+def testBenchmarkingBulkUpdate():
+    clients = getClients(600)
+
+    with getFileBackend() as storageBackend:
+        storageBackend.backend_createBase()
+        try:
+            backend = ExtendedConfigDataBackend(storageBackend)
+            backend.host_createObjects(clients)
+            for client in clients:
+                client.setDescription(u'updated')
+
+            start = time.time()
+            for client in clients[:300]:
+                backend.host_updateObjects(client)
+            singleDuration = time.time() - start
+
+            start = time.time()
+            backend.host_updateObjects(clients[300:])
+            bulkDuration = time.time() - start
+        finally:
+            storageBackend.backend_deleteBase()
+
+    print("Updating 300 hosts: one by one {0:.3f}s, in bulk {1:.3f}s".format(singleDuration, bulkDuration))
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the caching of backend results.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import threading
+
+from OPSI.Backend.Backend import (
+    ExtendedConfigDataBackend, ModificationTrackingBackend, backendTransaction)
+from OPSI.Backend.Cache import ObjectCache, ObjectCacheBackend
+from OPSI.Object import (
+    LocalbootProduct, OpsiClient, OpsiDepotserver, ProductOnDepot)
+
+from .Backends.File import getFileBackend
+from .Backends.SQLite import getSQLiteBackend
+
+import pytest
+
+
+@pytest.fixture(
+    params=[
+        getFileBackend,
+        pytest.param(getSQLiteBackend, marks=pytest.mark.requiresModulesFile),
+    ],
+    ids=['file', 'sqlite']
+)
+def storageBackend(request):
+    with request.param() as backend:
+        backend.backend_createBase()
+        try:
+            yield backend
+        finally:
+            backend.backend_deleteBase()
+
+
+@pytest.fixture
+def cacheBackend(storageBackend):
+    return ObjectCacheBackend(storageBackend)
+
+
+@pytest.fixture
+def backend(cacheBackend):
+    return ExtendedConfigDataBackend(cacheBackend)
+
+
+def getStatistics(backend):
+    return backend._backend.objectCache.getStatistics()
+
+
+def testRepeatedReadsAreCached(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+
+    first = backend.host_getObjects(id='client1.test.invalid')
+    second = backend.host_getObjects(id='client1.test.invalid')
+
+    assert first == second
+    assert 1 == len(second)
+
+    stats = getStatistics(backend)
+    assert stats['hits'] >= 1
+    assert stats['misses'] >= 1
+
+
+def testCachedResultsAreCopies(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+
+    host = backend.host_getObjects(id='client1.test.invalid')[0]
+    host.setDescription(u'changed without updating')
+
+    assert backend.host_getObjects(id='client1.test.invalid')[0].description != u'changed without updating'
+
+
+def testInsertInvalidatesCache(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+    assert 1 == len(backend.host_getObjects(type='OpsiClient'))
+
+    backend.host_createObjects(OpsiClient(id='client2.test.invalid'))
+    assert 2 == len(backend.host_getObjects(type='OpsiClient'))
+
+
+def testUpdateInvalidatesCache(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+    assert u'updated' != backend.host_getObjects(id='client1.test.invalid')[0].description
+
+    backend.host_updateObjects(OpsiClient(id='client1.test.invalid', description=u'updated'))
+    assert u'updated' == backend.host_getObjects(id='client1.test.invalid')[0].description
+
+
+def testDeleteInvalidatesCache(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+    assert [u'client1.test.invalid'] == backend.host_getIdents(type='OpsiClient')
+
+    backend.host_delete(id='client1.test.invalid')
+    assert [] == backend.host_getIdents(type='OpsiClient')
+
+
+def testDeletingHostInvalidatesDependentObjects(backend):
+    depot = OpsiDepotserver(id='depot1.test.invalid')
+    product = LocalbootProduct(id='product1', productVersion='1.0', packageVersion='1')
+    backend.host_createObjects(depot)
+    backend.product_createObjects(product)
+    backend.productOnDepot_createObjects(
+        ProductOnDepot(
+            productId=product.id, productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion, depotId=depot.id
+        )
+    )
+    assert 1 == len(backend.productOnDepot_getObjects(depotId=depot.id))
+
+    backend.host_delete(id=depot.id)
+    assert [] == backend.productOnDepot_getObjects(depotId=depot.id)
+
+
+def testChangesOfOtherKindsKeepCache(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+    backend.host_getObjects()
+
+    backend.product_createObjects(LocalbootProduct(id='product1', productVersion='1.0', packageVersion='1'))
+
+    hits = getStatistics(backend)['hits']
+    backend.host_getObjects()
+    assert hits + 1 == getStatistics(backend)['hits']
+
+
+def testInvalidatingThroughOtherModificationTracker(storageBackend):
+    cacheBackend = ObjectCacheBackend(storageBackend)
+    tracker = ModificationTrackingBackend(storageBackend)
+    tracker.addBackendChangeListener(cacheBackend.objectCache)
+
+    assert [] == cacheBackend.host_getObjects()
+    tracker.host_insertObject(OpsiClient(id='client1.test.invalid'))
+
+    assert 1 == len(cacheBackend.host_getObjects())
+
+
+def testUnknownMethodsClearCache(cacheBackend):
+    cacheBackend.host_insertObject(OpsiClient(id='client1.test.invalid'))
+    cacheBackend.host_getObjects()
+    assert cacheBackend.objectCache.getStatistics()['entries']
+
+    cacheBackend.backend_createBase()
+    assert 0 == cacheBackend.objectCache.getStatistics()['entries']
+
+
+def testCacheIsClearedAfterFailedTransaction(backend):
+    backend.host_createObjects(OpsiClient(id='client1.test.invalid'))
+
+    with pytest.raises(RuntimeError):
+        with backendTransaction(backend):
+            backend.host_createObjects(OpsiClient(id='client2.test.invalid'))
+            assert 2 == len(backend.host_getObjects())
+            raise RuntimeError(u'Failing on purpose.')
+
+    assert [u'client1.test.invalid'] == [host.id for host in backend.host_getObjects()]
+
+
+def getEntrySize(result):
+    cache = ObjectCache()
+    cache.getResult('host', 'host_getObjects', {}, lambda: result)
+    return cache.getStatistics()['size']
+
+
+def testCacheSizeIsLimited():
+    entrySize = getEntrySize([1, 2])
+    cache = ObjectCache(maxSize=entrySize * 3 // 2)
+    cache.getResult('host', 'host_getObjects', {'id': 'a'}, lambda: [1, 2])
+    cache.getResult('host', 'host_getObjects', {'id': 'b'}, lambda: [3, 4])
+
+    stats = cache.getStatistics()
+    assert 1 == stats['entries']
+    assert entrySize == stats['size']
+    assert 1 == stats['evictions']
+
+    # Too large to be cached at all
+    assert list(range(100)) == cache.getResult('host', 'host_getObjects', {}, lambda: list(range(100)))
+    assert 1 == cache.getStatistics()['entries']
+
+
+def testCachedResultsAreNotShared():
+    cache = ObjectCache()
+    result = [OpsiClient(id='client1.test.invalid')]
+
+    assert result is cache.getResult('host', 'host_getObjects', {}, lambda: result)
+    first = cache.getResult('host', 'host_getObjects', {}, lambda: pytest.fail("Not cached"))
+    second = cache.getResult('host', 'host_getObjects', {}, lambda: pytest.fail("Not cached"))
+
+    assert result == first == second
+    assert first[0] is not second[0]
+    assert result[0] is not first[0]
+
+
+def testUnserializableResultsAreNotCached():
+    cache = ObjectCache()
+    result = [threading.Lock()]
+
+    assert result is cache.getResult('host', 'host_getObjects', {}, lambda: result)
+    assert 0 == cache.getStatistics()['entries']
+
+
+def testLeastRecentlyUsedEntryIsEvicted():
+    cache = ObjectCache(maxSize=2 * getEntrySize([1]))
+    cache.getResult('host', 'host_getObjects', {'id': 'a'}, lambda: [1])
+    cache.getResult('host', 'host_getObjects', {'id': 'b'}, lambda: [2])
+    cache.getResult('host', 'host_getObjects', {'id': 'a'}, lambda: [1])
+    cache.getResult('host', 'host_getObjects', {'id': 'c'}, lambda: [3])
+
+    assert [1] == cache.getResult('host', 'host_getObjects', {'id': 'a'}, lambda: pytest.fail("Not cached"))
+    assert [2] == cache.getResult('host', 'host_getObjects', {'id': 'b'}, lambda: [2])
+    assert 2 == cache.getStatistics()['hits']
+
+
+def testResultReadDuringInvalidationIsNotCached():
+    cache = ObjectCache()
+
+    def readWhileInvalidating():
+        cache.invalidate('host')
+        return [u'outdated']
+
+    cache.getResult('host', 'host_getObjects', {}, readWhileInvalidating)
+    assert [u'new'] == cache.getResult('host', 'host_getObjects', {}, lambda: [u'new'])
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the index of the depots used by clients.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+
+from OPSI.Backend.Backend import ClientToDepotIndex, ExtendedConfigDataBackend
+from OPSI.Object import (
+    ConfigState, LocalbootProduct, OpsiClient, OpsiDepotserver,
+    ProductOnDepot, UnicodeConfig)
+
+from .Backends.File import getFileBackend
+from .test_backend_bulk import CallCountingBackend
+
+import pytest
+
+
+@pytest.fixture
+def depots(extendedConfigDataBackend):
+    depots = [
+        OpsiDepotserver(id=u'depot{0}.test.invalid'.format(index), isMasterDepot=True)
+        for index in range(3)
+    ]
+    extendedConfigDataBackend.host_createObjects(depots)
+    extendedConfigDataBackend.config_createObjects(
+        UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depots[0].id])
+    )
+    return depots
+
+
+def getMapping(backend, **kwargs):
+    return {
+        clientToDepot['clientId']: clientToDepot['depotId']
+        for clientToDepot in backend.configState_getClientToDepotserver(**kwargs)
+    }
+
+
+def getAlternatives(backend, **kwargs):
+    return {
+        clientToDepot['clientId']: clientToDepot['alternativeDepotIds']
+        for clientToDepot in backend.configState_getClientToDepotserver(masterOnly=False, **kwargs)
+    }
+
+
+def createProductsOnDepot(backend, depot, products):
+    productObjects = [
+        LocalbootProduct(id=productId, productVersion=productVersion, packageVersion=u'1')
+        for productId, productVersion in products
+    ]
+    backend.product_createObjects(productObjects)
+    backend.productOnDepot_createObjects([
+        ProductOnDepot(
+            productId=product.id, productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion, depotId=depot.id
+        )
+        for product in productObjects
+    ])
+
+
+def testMappingFollowsConfigStateChanges(extendedConfigDataBackend, depots):
+    backend = extendedConfigDataBackend
+    client1 = OpsiClient(id=u'client1.test.invalid')
+    client2 = OpsiClient(id=u'client2.test.invalid')
+    backend.host_createObjects([client1, client2])
+
+    assert {client1.id: depots[0].id, client2.id: depots[0].id} == getMapping(backend)
+
+    backend.configState_createObjects(
+        ConfigState(configId=u'clientconfig.depot.id', objectId=client1.id, values=[depots[1].id])
+    )
+    assert {client1.id: depots[1].id, client2.id: depots[0].id} == getMapping(backend)
+
+    backend.configState_updateObjects(
+        ConfigState(configId=u'clientconfig.depot.id', objectId=client1.id, values=[depots[2].id])
+    )
+    assert {client1.id: depots[2].id} == getMapping(backend, clientIds=[client1.id])
+
+    backend.configState_delete(configId=u'clientconfig.depot.id', objectId=client1.id)
+    assert {client1.id: depots[0].id, client2.id: depots[0].id} == getMapping(backend)
+
+
+def testMappingFollowsConfigAndHostChanges(extendedConfigDataBackend, depots):
+    backend = extendedConfigDataBackend
+    client1 = OpsiClient(id=u'client1.test.invalid')
+    backend.host_createObjects(client1)
+    assert {client1.id: depots[0].id} == getMapping(backend)
+
+    backend.config_updateObjects(
+        UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depots[1].id])
+    )
+    assert {client1.id: depots[1].id} == getMapping(backend)
+    assert {} == getMapping(backend, depotIds=[depots[0].id])
+
+    client2 = OpsiClient(id=u'client2.test.invalid')
+    backend.host_createObjects(client2)
+    assert {client1.id: depots[1].id, client2.id: depots[1].id} == getMapping(backend)
+
+    backend.host_delete(id=client1.id)
+    assert {client2.id: depots[1].id} == getMapping(backend)
+
+    backend.host_delete(id=depots[1].id)
+    assert {} == getMapping(backend)
+
+
+def testAlternativeDepotsProvideTheSameProducts(extendedConfigDataBackend, depots):
+    backend = extendedConfigDataBackend
+    client = OpsiClient(id=u'client1.test.invalid')
+    backend.host_createObjects(client)
+
+    for depot in depots:
+        createProductsOnDepot(backend, depot, [(u'product1', u'1.0'), (u'product2', u'1.0')])
+
+    assert [{'clientId': client.id, 'depotId': depots[0].id, 'alternativeDepotIds': []}] == backend.configState_getClientToDepotserver()
+    assert {client.id: [depots[1].id, depots[2].id]} == getAlternatives(backend)
+
+    createProductsOnDepot(backend, depots[2], [(u'product2', u'2.0')])
+    assert {client.id: [depots[1].id]} == getAlternatives(backend)
+    assert {client.id: [depots[1].id, depots[2].id]} == getAlternatives(backend, productIds=[u'product1'])
+
+    backend.productOnDepot_delete(productId=u'product1', depotId=depots[1].id)
+    assert {client.id: []} == getAlternatives(backend)
+    assert {client.id: [depots[2].id]} == getAlternatives(backend, productIds=[u'product1'])
+
+
+def testMappingIsNotReadAgainWithoutChanges():
+    with getFileBackend() as storageBackend:
+        storageBackend.backend_createBase()
+        try:
+            countingBackend = CallCountingBackend(storageBackend)
+            backend = ExtendedConfigDataBackend(countingBackend)
+            depot = OpsiDepotserver(id=u'depot1.test.invalid', isMasterDepot=True)
+            backend.host_createObjects(depot)
+            backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+            backend.host_createObjects([OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(20)])
+
+            assert 20 == len(backend.configState_getClientToDepotserver())
+            countingBackend.calls.clear()
+            for _ in range(3):
+                assert 20 == len(backend.configState_getClientToDepotserver(masterOnly=False))
+            assert not countingBackend.calls
+
+            backend.host_createObjects(OpsiClient(id=u'new.test.invalid'))
+            countingBackend.calls.clear()
+            assert 21 == len(backend.configState_getClientToDepotserver())
+            assert 1 == countingBackend.calls['host_getObjects']
+            assert 0 == countingBackend.calls['productOnDepot_getObjects']
+        finally:
+            storageBackend.backend_deleteBase()
+
+
+def testChangesThroughOtherBackendAreNoticed(extendedConfigDataBackend, depots):
+    client = OpsiClient(id=u'client1.test.invalid')
+    extendedConfigDataBackend.host_createObjects(client)
+    otherBackend = ExtendedConfigDataBackend(extendedConfigDataBackend._backend)
+    assert {client.id: depots[0].id} == getMapping(otherBackend)
+
+    extendedConfigDataBackend.configState_createObjects(
+        ConfigState(configId=u'clientconfig.depot.id', objectId=client.id, values=[depots[1].id])
+    )
+    assert {client.id: depots[1].id} == getMapping(otherBackend)
+
+
+@pytest.fixture
+def countingBackend():
+    with getFileBackend() as storageBackend:
+        storageBackend.backend_createBase()
+        try:
+            countingBackend = CallCountingBackend(storageBackend)
+            backend = ExtendedConfigDataBackend(countingBackend)
+            depots = [
+                OpsiDepotserver(id=u'depot{0}.test.invalid'.format(index), isMasterDepot=True)
+                for index in range(2)
+            ]
+            backend.host_createObjects(depots)
+            backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depots[0].id]))
+            backend.host_createObjects([OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(20)])
+            backend.configState_createObjects(
+                ConfigState(configId=u'clientconfig.depot.id', objectId=u'client1.test.invalid', values=[depots[1].id])
+            )
+            countingBackend.calls.clear()
+
+            yield countingBackend
+        finally:
+            storageBackend.backend_deleteBase()
+
+
+def testDepotsOfFewClientsAreReadDirectly(countingBackend):
+    backend = ExtendedConfigDataBackend(countingBackend)
+    clientIds = [u'client1.test.invalid', u'client0.test.invalid', u'unknown.test.invalid']
+
+    assert [
+        {'clientId': u'client1.test.invalid', 'depotId': u'depot1.test.invalid', 'alternativeDepotIds': []},
+        {'clientId': u'client0.test.invalid', 'depotId': u'depot0.test.invalid', 'alternativeDepotIds': []},
+    ] == backend.configState_getClientToDepotserver(clientIds=clientIds)
+    assert {u'client0.test.invalid': u'depot0.test.invalid'} == getMapping(backend, clientIds=clientIds, depotIds=[u'depot0.test.invalid'])
+    assert 0 == countingBackend.calls['productOnDepot_getObjects']
+
+    # The index is only read for larger requests.
+    assert 20 == len(getMapping(backend))
+    assert 1 == countingBackend.calls['productOnDepot_getObjects']
+    countingBackend.calls.clear()
+    assert {u'client1.test.invalid': u'depot1.test.invalid'} == getMapping(backend, clientIds=clientIds[:1])
+    assert not countingBackend.calls
+
+
+def testIndexIsSharedByBackendsUsingTheSameData(countingBackend):
+    backend = ExtendedConfigDataBackend(countingBackend)
+    assert 20 == len(getMapping(backend))
+
+    otherBackend = ExtendedConfigDataBackend(countingBackend)
+    countingBackend.calls.clear()
+    assert 20 == len(getMapping(otherBackend))
+    assert not countingBackend.calls
+
+    otherBackend.host_createObjects(OpsiClient(id=u'new.test.invalid'))
+    assert 21 == len(getMapping(backend))
+
+
+def testChangesOfOtherProcessesAreNoticedAfterMaxAge(tempDir, monkeypatch):
+    SQLiteBackend = pytest.importorskip("OPSI.Backend.SQLite").SQLiteBackend
+    database = os.path.join(tempDir, 'opsi.sqlite3')
+    depots = [
+        OpsiDepotserver(id=u'depot{0}.test.invalid'.format(index), isMasterDepot=True)
+        for index in range(2)
+    ]
+    clients = [OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(20)]
+
+    with SQLiteBackend(database=database) as storageBackend:
+        storageBackend.backend_createBase()
+        backend = ExtendedConfigDataBackend(storageBackend)
+        backend.host_createObjects(depots + clients)
+        backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depots[0].id]))
+        assert set([depots[0].id]) == set(getMapping(backend).values())
+
+        # A backend of its own, like one of another process, changes the data.
+        with SQLiteBackend(database=database) as otherStorageBackend:
+            otherBackend = ExtendedConfigDataBackend(otherStorageBackend)
+            otherBackend.configState_createObjects([
+                ConfigState(configId=u'clientconfig.depot.id', objectId=client.id, values=[depots[1].id])
+                for client in clients
+            ])
+            assert set([depots[1].id]) == set(getMapping(otherBackend).values())
+
+        expiry = time.time() + ClientToDepotIndex.MAX_AGE + 1
+        monkeypatch.setattr(time, 'time', lambda: expiry)
+        assert set([depots[1].id]) == set(getMapping(backend).values())
@@ -25,8 +25,10 @@ Testing extended backends features
 from __future__ import absolute_import, print_function
 
 import random
+import time
 
-from OPSI.Backend.Backend import temporaryBackendOptions
+from OPSI.Backend.Backend import (
+    ExtendedConfigDataBackend, temporaryBackendOptions)
 from OPSI.Exceptions import BackendError, BackendMissingDataError
 from OPSI.Object import (
     BoolProductProperty, ConfigState, LocalbootProduct, OpsiClient,
@@ -34,6 +36,7 @@ from OPSI.Object import (
     UnicodeConfig, UnicodeProductProperty)
 from OPSI.Util.Task.ConfigureBackend.ConfigurationData import initializeConfigs
 
+from .Backends.File import getFileBackend
 from .test_backend_replicator import fillBackend
 from .test_configs import getConfigs, getConfigStates
 from .test_hosts import getClients, getConfigServer, getDepotServers
@@ -196,6 +199,150 @@ def test_selectProductOnClientsByWildcard(extendedConfigDataBackend):
     assert productOnClients == [poc]
 
 
+@pytest.fixture
+def depotWithProducts(extendedConfigDataBackend):
+    depot = OpsiDepotserver(id='depotserver1.test.invalid', isMasterDepot=True)
+    extendedConfigDataBackend.host_createObjects(depot)
+    extendedConfigDataBackend.config_createObjects(
+        UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id])
+    )
+
+    products = [
+        LocalbootProduct(id='product{0}'.format(index), productVersion='1.0', packageVersion=1)
+        for index in range(3)
+    ]
+    extendedConfigDataBackend.product_createObjects(products)
+    extendedConfigDataBackend.productOnDepot_createObjects([
+        ProductOnDepot(
+            productId=product.id,
+            productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion,
+            depotId=depot.id
+        )
+        for product in products
+    ])
+
+    return depot, products
+
+
+def testProductOnClientDefaultsAreCreatedForMissingProducts(extendedConfigDataBackend, depotWithProducts):
+    clients = [OpsiClient(id='client{0}.test.invalid'.format(index)) for index in range(2)]
+    extendedConfigDataBackend.host_createObjects(clients)
+    extendedConfigDataBackend.productOnClient_createObjects(
+        ProductOnClient(
+            productId='product0',
+            productType='LocalbootProduct',
+            clientId=clients[0].id,
+            installationStatus='installed',
+            actionRequest='none',
+            productVersion='1.0',
+            packageVersion=1
+        )
+    )
+
+    with temporaryBackendOptions(extendedConfigDataBackend, addProductOnClientDefaults=True):
+        productOnClients = extendedConfigDataBackend.productOnClient_getObjects()
+        notInstalled = extendedConfigDataBackend.productOnClient_getObjects(installationStatus='not_installed')
+        filtered = extendedConfigDataBackend.productOnClient_getObjects(clientId=clients[1].id, productId=['product1', 'product2'])
+        setupRequested = extendedConfigDataBackend.productOnClient_getObjects(actionRequest='setup')
+
+    assert 6 == len(productOnClients)
+    assert 5 == len([poc for poc in productOnClients if poc.isGeneratedDefault()])
+
+    assert 5 == len(notInstalled)
+    assert (clients[0].id, 'product0') not in set((poc.clientId, poc.productId) for poc in notInstalled)
+
+    assert [(clients[1].id, u'product1'), (clients[1].id, u'product2')] == sorted((poc.clientId, poc.productId) for poc in filtered)
+    assert [] == setupRequested
+
+
+def testProductOnClientDefaultsAreIndependentObjects(extendedConfigDataBackend, depotWithProducts):
+    clients = [OpsiClient(id='client{0}.test.invalid'.format(index)) for index in range(2)]
+    extendedConfigDataBackend.host_createObjects(clients)
+
+    with temporaryBackendOptions(extendedConfigDataBackend, addProductOnClientDefaults=True):
+        productOnClients = extendedConfigDataBackend.productOnClient_getObjects(productId='product0')
+
+    assert 2 == len(productOnClients)
+    productOnClients[0].setActionRequest('setup')
+    assert u'none' == productOnClients[1].actionRequest
+    assert set(client.id for client in clients) == set(poc.clientId for poc in productOnClients)
+
+
+def testFilteredProductOnClientDefaultsReadOnlyRequestedProducts(extendedConfigDataBackend, depotWithProducts):
+    depot, _ = depotWithProducts
+    clients = [OpsiClient(id='client{0}.test.invalid'.format(index)) for index in range(3)]
+    extendedConfigDataBackend.host_createObjects(clients)
+
+    productOnDepotFilters = []
+    storageBackend = extendedConfigDataBackend._backend
+    getProductOnDepots = storageBackend.productOnDepot_getObjects
+
+    def recordingProductOnDepotGetObjects(attributes=[], **filter):
+        productOnDepotFilters.append(filter)
+        return getProductOnDepots(attributes, **filter)
+
+    storageBackend.productOnDepot_getObjects = recordingProductOnDepotGetObjects
+    try:
+        with temporaryBackendOptions(extendedConfigDataBackend, addProductOnClientDefaults=True):
+            productOnClients = extendedConfigDataBackend.productOnClient_getObjects(clientId=clients[0].id, productId='product1')
+    finally:
+        del storageBackend.productOnDepot_getObjects
+
+    assert [(clients[0].id, u'product1')] == [(poc.clientId, poc.productId) for poc in productOnClients]
+    assert 1 == len(productOnDepotFilters)
+    assert [depot.id] == productOnDepotFilters[0]['depotId']
+    assert 'product1' == productOnDepotFilters[0]['productId']
+
+
+@pytest.mark.benchmark
+def testBenchmarkingFilteredProductOnClientDefaults():
+    def getFilteredDuration(clientCount):
+        with getFileBackend() as storageBackend:
+            storageBackend.backend_createBase()
+            try:
+                backend = ExtendedConfigDataBackend(storageBackend)
+                depot = OpsiDepotserver(id='depotserver1.test.invalid', isMasterDepot=True)
+                backend.host_createObjects(depot)
+                backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+                products = [
+                    LocalbootProduct(id='product{0}'.format(index), productVersion='1.0', packageVersion=1)
+                    for index in range(40)
+                ]
+                backend.product_createObjects(products)
+                backend.productOnDepot_createObjects([
+                    ProductOnDepot(
+                        productId=product.id, productType=product.getType(),
+                        productVersion=product.productVersion,
+                        packageVersion=product.packageVersion, depotId=depot.id
+                    )
+                    for product in products
+                ])
+                backend.host_createObjects([
+                    OpsiClient(id='client{0}.test.invalid'.format(index))
+                    for index in range(clientCount)
+                ])
+
+                with temporaryBackendOptions(backend, addProductOnClientDefaults=True):
+                    assert clientCount * len(products) == len(backend.productOnClient_getObjects())
+
+                    start = time.time()
+                    for _ in range(20):
+                        productOnClients = backend.productOnClient_getObjects(clientId='client1.test.invalid', productId='product1')
+                    duration = time.time() - start
+
+                assert 1 == len(productOnClients)
+                return duration
+            finally:
+                storageBackend.backend_deleteBase()
+
+    smallDuration = getFilteredDuration(50)
+    largeDuration = getFilteredDuration(500)
+
+    print("Filtered defaults: 50 clients {0:.3f}s, 500 clients {1:.3f}s".format(smallDuration, largeDuration))
+
+
 def testHost_createDepotServer(extendedConfigDataBackend):
     extendedConfigDataBackend.host_createOpsiDepotserver(
         id='depot100.test.invalid',
@@ -24,10 +24,18 @@ Testing the opsi file backend.
 
 from __future__ import absolute_import
 
+import grp
+import os
+import pwd
+import threading
+import time
+
 import pytest
 
 from OPSI.Backend.File import FileBackend
 from OPSI.Exceptions import BackendConfigurationError
+from OPSI.Object import (
+    OpsiClient, ProductOnClient, UnicodeConfig)
 
 from .Backends.File import getFileBackend
 
@@ -49,3 +57,323 @@ def testGetDataFailsOnFileBackendBecauseMissingQuerySupport():
 ])
 def testProductFilenamePattern(filename):
     assert FileBackend.PRODUCT_FILENAME_REGEX.search(filename) is not None
+
+
+@pytest.fixture
+def fileBackend():
+    with getFileBackend() as backend:
+        backend.backend_createBase()
+        yield backend
+
+
+def getBackendUsingSameFiles(backend):
+    return FileBackend(
+        baseDir=backend._FileBackend__baseDir,
+        hostKeyFile=backend._FileBackend__hostKeyFile,
+        fileGroupName=grp.getgrgid(os.getgid())[0],
+        fileUserName=pwd.getpwuid(os.getuid())[0]
+    )
+
+
+def ageFiles(backend, seconds=60):
+    "Make the files of `backend` look older so that they get indexed."
+    timestamp = time.time() - seconds
+    for (directory, _, filenames) in os.walk(backend._FileBackend__baseDir):
+        for filename in filenames:
+            os.utime(os.path.join(directory, filename), (timestamp, timestamp))
+        os.utime(directory, (timestamp, timestamp))
+
+
+def countReadingIdents(monkeypatch):
+    reads = []
+    original = FileBackend._readProductOnClientIdents
+
+    def readProductOnClientIdents(filename, clientId):
+        reads.append(filename)
+        return original(filename, clientId)
+
+    monkeypatch.setattr(FileBackend, '_readProductOnClientIdents', staticmethod(readProductOnClientIdents))
+    return reads
+
+
+def createProductOnClients(backend, clientIds, productId=u'product1', actionRequest=u'setup'):
+    for clientId in clientIds:
+        backend.host_insertObject(OpsiClient(id=clientId))
+        backend.productOnClient_insertObject(
+            ProductOnClient(
+                productId=productId, productType=u'LocalbootProduct',
+                clientId=clientId, actionRequest=actionRequest
+            )
+        )
+
+
+def testIdentsAreReadFromIndex(fileBackend, monkeypatch):
+    createProductOnClients(fileBackend, [u'client1.test.invalid', u'client2.test.invalid'])
+    ageFiles(fileBackend)
+    reads = countReadingIdents(monkeypatch)
+
+    assert 2 == len(fileBackend.productOnClient_getObjects(productId=u'product1'))
+    assert 2 == len(reads)
+
+    assert 2 == len(fileBackend.productOnClient_getObjects(productId=u'product1'))
+    assert 2 == len(reads)
+
+
+def testIndexFollowsChangesThroughBackend(fileBackend):
+    createProductOnClients(fileBackend, [u'client1.test.invalid'])
+    ageFiles(fileBackend)
+    assert 1 == len(fileBackend.productOnClient_getObjects())
+
+    createProductOnClients(fileBackend, [u'client1.test.invalid', u'client2.test.invalid'], productId=u'product2')
+    assert 3 == len(fileBackend.productOnClient_getObjects())
+
+    fileBackend.productOnClient_deleteObjects(fileBackend.productOnClient_getObjects(productId=u'product1'))
+    assert [u'product2', u'product2'] == [poc.productId for poc in fileBackend.productOnClient_getObjects()]
+
+
+def testIndexNoticesChangedFiles(fileBackend):
+    fileBackend.config_insertObject(UnicodeConfig(id=u'config1'))
+    ageFiles(fileBackend, seconds=120)
+    assert [u'config1'] == [config.id for config in fileBackend.config_getObjects()]
+
+    otherBackend = getBackendUsingSameFiles(fileBackend)
+    otherBackend.config_insertObject(UnicodeConfig(id=u'config2'))
+    ageFiles(fileBackend, seconds=60)
+
+    assert [u'config1', u'config2'] == sorted(config.id for config in fileBackend.config_getObjects())
+
+
+def testIndexIsUsedByLaterBackends(fileBackend, monkeypatch):
+    createProductOnClients(fileBackend, [u'client1.test.invalid', u'client2.test.invalid'])
+    ageFiles(fileBackend)
+    fileBackend.productOnClient_getObjects()
+    fileBackend.backend_exit()
+
+    reads = countReadingIdents(monkeypatch)
+    laterBackend = getBackendUsingSameFiles(fileBackend)
+    assert 2 == len(laterBackend.productOnClient_getObjects())
+    assert [] == reads
+
+
+def testDamagedIndexIsIgnored(fileBackend):
+    createProductOnClients(fileBackend, [u'client1.test.invalid'])
+    with open(fileBackend._identIndex._filename, 'w') as indexFile:
+        indexFile.write('{"version": 1, "files": ')
+
+    assert 1 == len(getBackendUsingSameFiles(fileBackend).productOnClient_getObjects())
+
+
+@pytest.mark.benchmark
+def testBenchmarkReadingFromLargeFileTree(fileBackend, monkeypatch):
+    clientCount = 10000
+    clientDir = os.path.join(fileBackend._FileBackend__baseDir, 'clients')
+    for index in range(clientCount):
+        products = [u'product{0}'.format(number) for number in range(5)]
+        if index % 1000 == 0:
+            products.append(u'rare')
+
+        lines = [u'[localboot_product_states]']
+        lines.extend(u'{0} = installed:none'.format(productId) for productId in products)
+        for productId in products:
+            lines.extend([u'', u'[{0}-state]'.format(productId), u'producttype = LocalbootProduct'])
+
+        with open(os.path.join(clientDir, 'client{0}.test.invalid.ini'.format(index)), 'w') as clientFile:
+            clientFile.write(u'\n'.join(lines).encode('utf-8'))
+    ageFiles(fileBackend)
+
+    def readRareProduct(backend):
+        start = time.time()
+        productOnClients = backend.productOnClient_getObjects(productId=u'rare')
+        assert clientCount // 1000 == len(productOnClients)
+        return time.time() - start
+
+    withoutIndex = readRareProduct(fileBackend)
+    withIndex = readRareProduct(fileBackend)
+    fileBackend.backend_exit()
+    withSavedIndex = readRareProduct(getBackendUsingSameFiles(fileBackend))
+
+    print(
+        "Reading from {0} clients took {1:.3f}s without index, {2:.3f}s "
+        "with index and {3:.3f}s with saved index".format(
+            clientCount, withoutIndex, withIndex, withSavedIndex
+        )
+    )
+
+
+
+def countParsing(monkeypatch):
+    import OPSI.Backend.File as fileModule
+
+    parsedFiles = []
+    original = fileModule._parseIniFile
+
+    def parseIniFile(filename):
+        parsedFiles.append(filename)
+        return original(filename)
+
+    monkeypatch.setattr(fileModule, '_parseIniFile', parseIniFile)
+    monkeypatch.setattr(fileModule, '_parsedFiles', fileModule._ParsedFileCache())
+    return parsedFiles
+
+
+def testParsedFilesAreReused(fileBackend, monkeypatch):
+    createProductOnClients(fileBackend, [u'client1.test.invalid', u'client2.test.invalid'])
+    ageFiles(fileBackend)
+    parsedFiles = countParsing(monkeypatch)
+
+    fileBackend.productOnClient_getObjects(clientId=u'client1.test.invalid')
+    assert 1 == len(parsedFiles)
+
+    for _ in range(3):
+        productOnClients = fileBackend.productOnClient_getObjects(clientId=u'client1.test.invalid')
+    assert 1 == len(parsedFiles)
+    assert [u'setup'] == [poc.actionRequest for poc in productOnClients]
+
+
+def testFilesChangedByOtherProcessesAreParsedAgain(fileBackend, monkeypatch):
+    createProductOnClients(fileBackend, [u'client1.test.invalid'])
+    ageFiles(fileBackend, seconds=120)
+    countParsing(monkeypatch)
+    assert [u'setup'] == [poc.actionRequest for poc in fileBackend.productOnClient_getObjects()]
+
+    createProductOnClients(getBackendUsingSameFiles(fileBackend), [u'client1.test.invalid'], actionRequest=u'always')
+    ageFiles(fileBackend, seconds=60)
+
+    assert [u'always'] == [poc.actionRequest for poc in fileBackend.productOnClient_getObjects()]
+
+
+def testParsedFileCacheIsLimited(tempDir):
+    from OPSI.Backend.File import _ParsedFileCache
+
+    filenames = [os.path.join(tempDir, 'file{0}'.format(index)) for index in range(3)]
+    timestamp = time.time() - 60
+    for filename in filenames:
+        with open(filename, 'w') as testFile:
+            testFile.write(filename)
+        os.utime(filename, (timestamp, timestamp))
+
+    parsedFiles = []
+
+    def parse(filename):
+        parsedFiles.append(filename)
+        return filename
+
+    cache = _ParsedFileCache(maxFiles=2)
+    for filename in filenames + filenames[1:]:
+        assert filename == cache.get(filename, parse)
+    assert filenames == parsedFiles
+
+    cache.get(filenames[0], parse)
+    assert 4 == len(parsedFiles)
+
+    cache.invalidate(filenames[2])
+    cache.get(filenames[2], parse)
+    assert 5 == len(parsedFiles)
+
+
+def testReadingWhileOtherBackendRewritesFile(fileBackend):
+    clientId = u'client1.test.invalid'
+    createProductOnClients(fileBackend, [clientId])
+    ageFiles(fileBackend)
+    writingBackend = getBackendUsingSameFiles(fileBackend)
+    stop = threading.Event()
+    errors = []
+    actionRequests = set()
+
+    def write():
+        try:
+            for actionRequest in [u'always', u'setup'] * 25:
+                createProductOnClients(writingBackend, [clientId], actionRequest=actionRequest)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            stop.set()
+
+    def read():
+        try:
+            while not stop.is_set():
+                for productOnClient in fileBackend.productOnClient_getObjects(clientId=clientId):
+                    actionRequests.add(productOnClient.actionRequest)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [] == errors
+    assert actionRequests <= set([u'setup', u'always'])
+    assert [u'setup'] == [poc.actionRequest for poc in fileBackend.productOnClient_getObjects()]
+
+
+def getProductOnClients(clientId, productIds, actionRequest):
+    return [
+        ProductOnClient(
+            productId=productId, productType=u'LocalbootProduct',
+            clientId=clientId, actionRequest=actionRequest
+        )
+        for productId in productIds
+    ]
+
+
+def testUpdatingManyObjectsWritesFileOnce(fileBackend, monkeypatch):
+    clientId = u'client1.test.invalid'
+    productIds = [u'product{0}'.format(index) for index in range(20)]
+    fileBackend.host_insertObject(OpsiClient(id=clientId))
+    fileBackend.productOnClient_insertObjects(getProductOnClients(clientId, productIds, u'setup'))
+
+    writtenFiles = []
+    original = FileBackend._replaceFile
+
+    def replaceFile(backend, filename, write):
+        writtenFiles.append(filename)
+        return original(backend, filename, write)
+
+    monkeypatch.setattr(FileBackend, '_replaceFile', replaceFile)
+    fileBackend.productOnClient_updateObjects(getProductOnClients(clientId, productIds, u'uninstall'))
+
+    assert 1 == len(writtenFiles)
+    assert set([u'uninstall']) == set(poc.actionRequest for poc in fileBackend.productOnClient_getObjects())
+    assert not [
+        entry for entry in os.listdir(os.path.dirname(writtenFiles[0]))
+        if entry.endswith('.tmp')
+    ]
+
+
+def testDeletingObjectsOfSeveralFiles(fileBackend):
+    fileBackend.host_insertObjects([OpsiClient(id=u'client1.test.invalid'), OpsiClient(id=u'client2.test.invalid')])
+    for clientId in (u'client1.test.invalid', u'client2.test.invalid'):
+        fileBackend.productOnClient_insertObjects(getProductOnClients(clientId, [u'product1', u'product2'], u'setup'))
+
+    fileBackend.productOnClient_deleteObjects(
+        getProductOnClients(u'client1.test.invalid', [u'product1'], u'setup') +
+        getProductOnClients(u'client2.test.invalid', [u'product2'], u'setup')
+    )
+
+    remaining = set((poc.clientId, poc.productId) for poc in fileBackend.productOnClient_getObjects())
+    assert set([(u'client1.test.invalid', u'product2'), (u'client2.test.invalid', u'product1')]) == remaining
+
+
+@pytest.mark.benchmark
+def testBenchmarkUpdatingManyProductOnClients(fileBackend):
+    clientId = u'client1.test.invalid'
+    productIds = [u'product{0}'.format(index) for index in range(300)]
+    fileBackend.host_insertObject(OpsiClient(id=clientId))
+    fileBackend.productOnClient_insertObjects(getProductOnClients(clientId, productIds, u'none'))
+
+    start = time.time()
+    for productOnClient in getProductOnClients(clientId, productIds, u'setup'):
+        fileBackend.productOnClient_updateObject(productOnClient)
+    separately = time.time() - start
+
+    start = time.time()
+    fileBackend.productOnClient_updateObjects(getProductOnClients(clientId, productIds, u'uninstall'))
+    together = time.time() - start
+
+    print(
+        "Updating {0} productOnClients took {1:.3f}s separately and "
+        "{2:.3f}s together".format(len(productIds), separately, together)
+    )
+    assert set([u'uninstall']) == set(poc.actionRequest for poc in fileBackend.productOnClient_getObjects())
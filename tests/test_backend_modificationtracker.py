@@ -27,6 +27,11 @@ Based on work of Christian Kampka.
 
 from __future__ import absolute_import
 
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 from OPSI.Backend.Backend import ModificationTrackingBackend
 from OPSI.Object import OpsiClient
 
@@ -109,3 +114,158 @@ def testTrackingOfDeletingObject(backendAndTracker):
     assert modification['objectClass'] == host.__class__.__name__
     assert modification['command'] == 'delete'
     assert modification['ident'] == host.getIdent()
+
+
+@pytest.fixture(
+    params=[getSQLiteModificationTracker, getMySQLModificationTracker],
+    ids=['sqlite', 'mysql']
+)
+def trackerFactory(request):
+    @contextmanager
+    def createTracker(**options):
+        with request.param(**options) as tracker:
+            tracker.clearModifications()
+            yield tracker
+            tracker.clearModifications()
+
+    return createTracker
+
+
+def getClients(count, prefix='client'):
+    return [
+        OpsiClient(id='{0}{1}.test.invalid'.format(prefix, index))
+        for index in range(count)
+    ]
+
+
+def testBufferedModificationsAreWrittenBeforeReading(trackerFactory):
+    with trackerFactory(bufferSize=100, flushInterval=60) as tracker:
+        for client in getClients(10):
+            tracker.objectInserted(None, client)
+
+        assert 10 == len(tracker._buffer)
+        modifications = tracker.getModifications()
+        assert not tracker._buffer
+
+    assert [client.id for client in getClients(10)] == [mod['ident'] for mod in modifications]
+
+
+def testBufferIsWrittenAfterFlushInterval(trackerFactory):
+    with trackerFactory(bufferSize=100, flushInterval=0.05) as tracker:
+        tracker.objectInserted(None, getClients(1)[0])
+
+        for _ in range(100):
+            if not tracker._buffer:
+                break
+            time.sleep(0.05)
+
+        assert not tracker._buffer
+        assert 1 == len(tracker.getModifications())
+
+
+def testClosingWritesBufferedModifications(trackerFactory):
+    with trackerFactory(bufferSize=100, flushInterval=60) as tracker:
+        tracker.objectsDeleted(None, getClients(5))
+        tracker.close()
+
+        assert not tracker._buffer
+        assert 5 == len(tracker.getModifications())
+
+        tracker.objectInserted(None, getClients(1, prefix='late')[0])
+        assert not tracker._buffer
+
+
+def testCombiningModificationsOfTheSameObject(trackerFactory):
+    client1, client2 = getClients(2)
+    with trackerFactory(bufferSize=100, flushInterval=60, lastModificationOnly=True) as tracker:
+        tracker.objectInserted(None, client1)
+        tracker.flush()
+
+        tracker.objectInserted(None, client2)
+        tracker.objectUpdated(None, client1)
+        tracker.objectUpdated(None, client2)
+        assert 2 == len(tracker._buffer)
+
+        modifications = tracker.getModifications()
+
+    assert [(client1.id, 'update'), (client2.id, 'update')] == [
+        (mod['ident'], mod['command']) for mod in modifications
+    ]
+
+
+def testGettingModificationsSinceEpoch(trackerFactory):
+    client1, client2 = getClients(2)
+    with trackerFactory() as tracker:
+        tracker.objectInserted(None, client1)
+        time.sleep(0.01)
+        since = time.time()
+        time.sleep(0.01)
+        tracker.objectInserted(None, client2)
+
+        modifications = tracker.getModifications(sinceDate=since)
+        assert [client2.id] == [mod['ident'] for mod in modifications]
+        assert modifications[0]['modificationTime'] > since * 1000
+
+        tracker.clearModifications(sinceDate=since)
+        assert [client1.id] == [mod['ident'] for mod in tracker.getModifications()]
+
+
+@pytest.mark.parametrize("lastModificationOnly", [False, True])
+def testConcurrentModificationsAreNeitherLostNorReordered(trackerFactory, lastModificationOnly):
+    threadCount = 5
+    clients = getClients(40)
+
+    with trackerFactory(bufferSize=25, flushInterval=0.01, lastModificationOnly=lastModificationOnly) as tracker:
+        def modify(threadIndex):
+            for client in clients[threadIndex::threadCount]:
+                tracker.objectInserted(None, client)
+                tracker.objectUpdated(None, client)
+
+        threads = [threading.Thread(target=modify, args=(index, )) for index in range(threadCount)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        modifications = tracker.getModifications()
+
+    modificationTimes = [mod['modificationTime'] for mod in modifications]
+    assert sorted(modificationTimes) == modificationTimes
+
+    commands = [(mod['ident'], mod['command']) for mod in modifications]
+    if lastModificationOnly:
+        assert sorted((client.id, 'update') for client in clients) == sorted(commands)
+    else:
+        assert 2 * len(clients) == len(commands)
+        for index in range(threadCount):
+            expected = []
+            for client in clients[index::threadCount]:
+                expected.extend([(client.id, 'insert'), (client.id, 'update')])
+            threadClientIds = set(client.id for client in clients[index::threadCount])
+            assert expected == [command for command in commands if command[0] in threadClientIds]
+
+
+def testAddingModificationTimeToExistingTable(tempDir):
+    sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
+    databasePath = os.path.join(tempDir, 'tracker.sqlite')
+
+    database = sqliteModule.SQLite(database=databasePath)
+    database.execute(
+        u'CREATE TABLE `OBJECT_MODIFICATION_TRACKER` ('
+        u'`id` integer NOT NULL, `command` varchar(6) NOT NULL, '
+        u'`objectClass` varchar(128) NOT NULL, `ident` varchar(1024) NOT NULL, '
+        u'`date` TIMESTAMP, PRIMARY KEY (`id`));'
+    )
+    database.insert('OBJECT_MODIFICATION_TRACKER', {
+        'command': u'insert', 'objectClass': u'OpsiClient',
+        'ident': u'client.test.invalid', 'date': u'2019-01-02 03:04:05'
+    })
+    database.disconnect()
+
+    with getSQLiteModificationTracker(database=databasePath) as tracker:
+        assert [] == tracker.getModifications(sinceDate=u'2019-01-02 03:04:05')
+
+        modifications = tracker.getModifications(sinceDate=u'2019-01-01 00:00:00')
+        assert 1 == len(modifications)
+        expectedTime = time.mktime(time.strptime(u'2019-01-02 03:04:05', '%Y-%m-%d %H:%M:%S'))
+        assert expectedTime * 1000 == modifications[0]['modificationTime']
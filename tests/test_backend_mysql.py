@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the bulk operations of the MySQL backend.
+
+If no MySQL configuration is given the tests are run against a
+temporary MySQL or MariaDB server.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import pytest
+
+MySQLdb = pytest.importorskip("MySQLdb")
+
+from OPSI.Backend.MySQL import ConnectionPool, MySQL, MySQLBackend
+from OPSI.Exceptions import BackendUnableToConnectError
+from OPSI.Object import AuditSoftware, OpsiClient
+
+from .Backends.MySQL import cleanDatabase, getMySQLConfiguration
+
+
+@pytest.fixture(scope='module')
+def mysqlConfiguration():
+    with getMySQLConfiguration() as configuration:
+        yield configuration
+
+
+@pytest.fixture
+def database(mysqlConfiguration):
+    database = MySQL(**mysqlConfiguration)
+    with cleanDatabase(database):
+        database.execute(
+            u'CREATE TABLE `TEST` ('
+            u'`id` varchar(255) NOT NULL, `value` integer, `text` TEXT, '
+            u'PRIMARY KEY (`id`));'
+        )
+        yield database
+
+
+@pytest.fixture
+def backend(mysqlConfiguration):
+    with cleanDatabase(MySQL(**mysqlConfiguration)):
+        backend = MySQLBackend(**mysqlConfiguration)
+        backend.backend_createBase()
+        yield backend
+
+
+def getRows(database):
+    return {
+        row['id']: (row['value'], row['text'])
+        for row in database.getSet(u'SELECT * FROM `TEST`;')
+    }
+
+
+def testSplittingRowsIntoBatches():
+    rows = [[u'x' * 10, 1] for _ in range(10)]
+
+    batches = list(MySQL._splitIntoBatches(rows, 500))
+
+    assert rows == [row for batch in batches for row in batch]
+    assert len(batches) > 1
+    assert all(len(batch) > 0 for batch in batches)
+
+
+def testSplittingKeepsLargeRowsInOwnBatch():
+    rows = [[u'x' * 1000], [u'y'], [u'z' * 1000]]
+
+    assert [[rows[0]], [rows[1]], [rows[2]]] == list(MySQL._splitIntoBatches(rows, 100))
+
+
+def testGettingPrimaryKey(database):
+    assert (u'id', ) == database.getPrimaryKey('TEST')
+    assert (u'id', ) == database.getUpsertKey('TEST')
+
+
+def testTablesWithFurtherUniqueKeysAreNotUpserted(database):
+    database.execute(u'ALTER TABLE `TEST` ADD UNIQUE KEY (`value`);')
+
+    assert (u'id', ) == database.getPrimaryKey('TEST')
+    assert () == database.getUpsertKey('TEST')
+
+
+def testInsertingManyRows(database):
+    database.insertMany('TEST', [
+        {'id': u'a', 'value': 1, 'text': u'first'},
+        {'id': u'b', 'value': None, 'text': u"it's"},
+        {'id': u'c', 'value': 3},
+    ])
+
+    assert {u'a': (1, u'first'), u'b': (None, u"it's"), u'c': (3, None)} == getRows(database)
+
+
+def testInsertingManyRowsIsOneTransaction(database):
+    database.insertMany('TEST', [{'id': u'a', 'value': 1}])
+
+    with pytest.raises(Exception):
+        database.insertMany('TEST', [{'id': u'b', 'value': 2}, {'id': u'a', 'value': 3}])
+
+    assert {u'a': (1, None)} == getRows(database)
+
+
+def testUpsertingManyRows(database):
+    database.insertMany('TEST', [{'id': u'a', 'value': 1, 'text': u'old'}])
+
+    database.upsertMany('TEST', [
+        {'id': u'a', 'value': 2, 'text': None},
+        {'id': u'b', 'value': 3, 'text': u'new'},
+    ])
+
+    assert {u'a': (2, None), u'b': (3, u'new')} == getRows(database)
+
+
+def testInsertingInBatchesBelowPacketSize(database, monkeypatch):
+    monkeypatch.setattr(database, '_maxAllowedPacket', 8192)
+    rows = [
+        {'id': u'row{0}'.format(index), 'value': index, 'text': u'x' * 200}
+        for index in range(200)
+    ]
+
+    database.insertMany('TEST', rows)
+
+    assert 200 == len(getRows(database))
+
+
+def testCreatingHostsUpsertsRows(backend):
+    clients = [
+        OpsiClient(id=u'client{0}.test.invalid'.format(index))
+        for index in range(50)
+    ]
+    backend.host_insertObjects(clients)
+
+    for client in clients:
+        client.setDescription(u'updated')
+    backend.host_insertObjects(clients + [OpsiClient(id=u'new.test.invalid')])
+
+    hosts = backend.host_getObjects()
+    assert 51 == len(hosts)
+    assert all(host.description == u'updated' for host in hosts if host.id != u'new.test.invalid')
+
+
+def testCreatingAuditSoftwareInBulk(backend):
+    software = [
+        AuditSoftware(
+            name=u'software{0}'.format(index), version=u'1.0',
+            subVersion=u'', language=u'de', architecture=u'x64'
+        )
+        for index in range(20)
+    ]
+
+    backend.auditSoftware_insertObjects(software)
+    backend.auditSoftware_insertObjects(software)
+
+    assert 20 == len(backend.auditSoftware_getObjects())
+
+
+class FakeConnection(object):
+    def __init__(self, pool, broken=False):
+        self.pool = pool
+        self.broken = broken
+        self.invalidated = False
+        self.pings = 0
+        self.info = {}
+
+    def ping(self):
+        self.pings += 1
+        if self.broken:
+            raise MySQLError(2006, 'MySQL server has gone away')
+
+    def autocommit(self, value):
+        pass
+
+    def invalidate(self, soft=False):
+        self.invalidated = True
+
+    def close(self):
+        self.pool.checkedOut -= 1
+        if not self.invalidated:
+            self.pool.idleConnections.append(self)
+
+
+class FakeQueuePool(object):
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30, recycle=-1):
+        self.poolSize = pool_size
+        self.checkedOut = 0
+        self.brokenConnections = 0
+        self.failWith = None
+        self.idleConnections = []
+
+    def connect(self):
+        if self.failWith:
+            raise self.failWith
+
+        self.checkedOut += 1
+        broken = self.brokenConnections > 0
+        self.brokenConnections -= 1
+        if not broken and self.idleConnections:
+            return self.idleConnections.pop(0)
+        return FakeConnection(self, broken)
+
+    def size(self):
+        return self.poolSize
+
+    def checkedout(self):
+        return self.checkedOut
+
+    def checkedin(self):
+        return 0
+
+    def overflow(self):
+        return max(0, self.checkedOut - self.poolSize)
+
+    def status(self):
+        return u'fake pool'
+
+
+class MySQLError(Exception):
+    pass
+
+
+@pytest.fixture
+def connectionPool(monkeypatch):
+    import OPSI.Backend.MySQL as mysqlModule
+
+    monkeypatch.setattr(mysqlModule.pool, 'QueuePool', FakeQueuePool, raising=False)
+    connectionPool = ConnectionPool(pool_size=2, max_overflow=1)
+    try:
+        yield connectionPool
+    finally:
+        connectionPool.destroy()
+
+
+def testCheckingOutConnectionsIsCounted(connectionPool):
+    connections = [connectionPool.checkout() for _ in range(2)]
+
+    statistics = connectionPool.getStatistics()
+    assert 2 == statistics['checkouts']
+    assert 2 == statistics['checkedOut']
+    assert 3 == statistics['capacity']
+    assert 0 == statistics['waits']
+    assert 0 == statistics['reconnects']
+
+    for connection in connections:
+        connection.close()
+    assert 0 == connectionPool.getStatistics()['checkedOut']
+
+
+def testBrokenConnectionsAreReplacedOnCheckout(connectionPool):
+    connectionPool.brokenConnections = 2
+
+    connection = connectionPool.checkout()
+
+    assert not connection.broken
+    assert 2 == connectionPool.getStatistics()['reconnects']
+    assert 1 == connectionPool.getStatistics()['checkedOut']
+
+
+def testOnlyIdleConnectionsArePinged(connectionPool):
+    connection = connectionPool.checkout()
+    assert 1 == connection.pings
+    connection.close()
+
+    assert connection is connectionPool.checkout()
+    assert 1 == connection.pings
+    connection.close()
+
+    connection.info['lastCheckout'] -= ConnectionPool.PING_AFTER_IDLE
+    assert connection is connectionPool.checkout()
+    assert 2 == connection.pings
+
+
+def testGivingUpIfNoConnectionWorks(connectionPool):
+    connectionPool.brokenConnections = ConnectionPool.CHECKOUT_ATTEMPTS
+
+    with pytest.raises(BackendUnableToConnectError):
+        connectionPool.checkout()
+
+    assert 0 == connectionPool.getStatistics()['checkedOut']
+
+
+def testWaitingForConnectionsIsCounted(connectionPool):
+    connections = [connectionPool.checkout() for _ in range(3)]
+
+    connections[0].close()
+    connectionPool.checkedOut = 3  # all connections still in use
+    connections.append(connectionPool.checkout())
+
+    connectionPool.failWith = RuntimeError(u'timeout')
+    with pytest.raises(RuntimeError):
+        connectionPool.checkout()
+
+    statistics = connectionPool.getStatistics()
+    assert 2 == statistics['waits']
+    assert 1 == statistics['timeouts']
+    assert statistics['maxWaitTime'] <= statistics['waitTime']
+
+
+class FakeCursor(object):
+    def __init__(self, database):
+        self.database = database
+        self.lastrowid = 1
+        self.rowcount = 1
+
+    def execute(self, query, parameters=None):
+        self.database.executedQueries.append(query)
+        if self.database.failures:
+            self.database.failures -= 1
+            raise MySQLError(2013, 'Lost connection to MySQL server during query')
+
+    def fetchall(self):
+        return [{'value': 1}]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def unreliableDatabase(connectionPool, monkeypatch):
+    pytest.importorskip("MySQLdb.cursors")
+
+    database = MySQL()
+    database.executedQueries = []
+    database.failures = 1
+    monkeypatch.setattr(FakeConnection, 'cursor', lambda conn, cursorType=None: FakeCursor(database), raising=False)
+    monkeypatch.setattr(FakeConnection, 'commit', lambda conn: None, raising=False)
+    return database
+
+
+def testReadingIsRetriedAfterLosingConnection(unreliableDatabase):
+    assert [{'value': 1}] == unreliableDatabase.getSet(u'SELECT * FROM `TEST`;')
+
+    assert 2 == len(unreliableDatabase.executedQueries)
+    assert 1 == unreliableDatabase.getConnectionPoolStatistics()['retries']
+
+
+def testLostConnectionIsNotUsedAgain(unreliableDatabase):
+    unreliableDatabase.getSet(u'SELECT * FROM `TEST`;')
+
+    statistics = unreliableDatabase.getConnectionPoolStatistics()
+    assert 1 == statistics['reconnects']
+    assert 0 == statistics['checkedOut']
+
+
+def testDeletingIsRetriedAfterLosingConnection(unreliableDatabase):
+    assert 1 == unreliableDatabase.delete('TEST', u'`id` = %s', parameters=[u'a'])
+
+    assert 2 == len(unreliableDatabase.executedQueries)
+
+
+def testInsertingIsNotRetriedAfterLosingConnection(unreliableDatabase):
+    with pytest.raises(MySQLError):
+        unreliableDatabase.insert('TEST', {'id': u'a', 'value': 1})
+
+    assert 1 == len(unreliableDatabase.executedQueries)
+    assert 0 == unreliableDatabase.getConnectionPoolStatistics()['retries']
+
+
+def testStatementsOfTransactionUseOneConnection(unreliableDatabase):
+    unreliableDatabase.failures = 0
+
+    with unreliableDatabase.transaction():
+        unreliableDatabase.insert('TEST', {'id': u'a', 'value': 1})
+
+        with pytest.raises(MySQLError):
+            with unreliableDatabase.transaction():
+                unreliableDatabase.failures = 1
+                unreliableDatabase.delete('TEST', u'`id` = %s', parameters=[u'a'])
+
+    queries = unreliableDatabase.executedQueries
+    assert queries[0].startswith(u'INSERT INTO `TEST`')
+    assert [
+        u'SAVEPOINT opsi_transaction_1;',
+        u'DELETE FROM `TEST` WHERE `id` = %s;',
+        u'ROLLBACK TO SAVEPOINT opsi_transaction_1;',
+        u'RELEASE SAVEPOINT opsi_transaction_1;',
+        u'COMMIT;',
+    ] == queries[1:]
+    assert 1 == unreliableDatabase.getConnectionPoolStatistics()['checkouts']
+    assert 0 == unreliableDatabase.getConnectionPoolStatistics()['checkedOut']
+
+
+def testRollingBackTransaction(database):
+    database.insert('TEST', {'id': u'a', 'value': 1})
+
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.update('TEST', u'`id` = %s', {'value': 2}, whereParameters=[u'a'])
+            database.insert('TEST', {'id': u'b', 'value': 3})
+            raise RuntimeError(u'Failing on purpose.')
+
+    assert {u'a': (1, None)} == getRows(database)
+
+
+def testConnectionPoolStatisticsThroughBackend(backend):
+    backend.host_getObjects()
+
+    statistics = backend.backend_getConnectionPoolStatistics()
+    assert statistics['checkouts'] > 0
+    assert 0 == statistics['timeouts']
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the graph of product dependencies on depots.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import time
+
+from OPSI.Backend.Backend import ExtendedConfigDataBackend, ProductDependencyGraph
+from OPSI.Object import (
+    LocalbootProduct, OpsiClient, OpsiDepotserver, ProductDependency,
+    ProductOnClient, ProductOnDepot, UnicodeConfig)
+
+from .Backends.File import getFileBackend
+from .test_backend_bulk import CallCountingBackend
+
+import pytest
+
+
+@pytest.fixture
+def countingBackend():
+    with getFileBackend() as storageBackend:
+        storageBackend.backend_createBase()
+        try:
+            yield CallCountingBackend(storageBackend)
+        finally:
+            storageBackend.backend_deleteBase()
+
+
+@pytest.fixture
+def backend(countingBackend):
+    backend = ExtendedConfigDataBackend(countingBackend)
+    depot = OpsiDepotserver(id=u'depot1.test.invalid')
+    backend.host_createObjects(depot)
+    backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+    backend.host_createObjects([
+        OpsiClient(id=u'client{0}.test.invalid'.format(index))
+        for index in range(5)
+    ])
+
+    for productId in (u'product1', u'product2', u'product3'):
+        installProduct(backend, productId, u'1.0')
+
+    createDependency(backend, u'product1', u'1.0', u'product2')
+    return backend
+
+
+def installProduct(backend, productId, productVersion):
+    product = LocalbootProduct(id=productId, productVersion=productVersion, packageVersion=u'1')
+    backend.product_createObjects(product)
+    backend.productOnDepot_createObjects(
+        ProductOnDepot(
+            productId=product.id, productType=product.getType(),
+            productVersion=product.productVersion,
+            packageVersion=product.packageVersion,
+            depotId=u'depot1.test.invalid'
+        )
+    )
+
+
+def createDependency(backend, productId, productVersion, requiredProductId):
+    backend.productDependency_createObjects(
+        ProductDependency(
+            productId=productId, productVersion=productVersion,
+            packageVersion=u'1', productAction=u'setup',
+            requiredProductId=requiredProductId, requiredAction=u'setup',
+            requirementType=u'before'
+        )
+    )
+
+
+def getProductOnClients(backend):
+    return [
+        ProductOnClient(
+            productId=u'product1', productType=u'LocalbootProduct',
+            clientId=clientId, actionRequest=u'setup'
+        )
+        for clientId in backend.host_getIdents(type='OpsiClient')
+    ]
+
+
+def getActionRequests(productOnClients):
+    return set(
+        (poc.clientId, poc.productId, poc.actionRequest)
+        for poc in productOnClients
+    )
+
+
+def getSequence(productOnClients, clientId):
+    return [
+        poc.productId
+        for poc in sorted(productOnClients, key=lambda poc: poc.actionSequence)
+        if poc.clientId == clientId
+    ]
+
+
+def testDependenciesAreAddedForAllClients(backend):
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    clientIds = backend.host_getIdents(type='OpsiClient')
+    assert 2 * len(clientIds) == len(productOnClients)
+    for clientId in clientIds:
+        assert (clientId, u'product2', u'setup') in getActionRequests(productOnClients)
+
+
+def testGraphIsNotReadAgainWithoutChanges(backend, countingBackend):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    countingBackend.calls.clear()
+    for _ in range(3):
+        productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+        backend.productOnClient_generateSequence(productOnClients)
+
+    assert 0 == countingBackend.calls['productDependency_getObjects']
+    assert 0 == countingBackend.calls['product_getObjects']
+    assert 0 == countingBackend.calls['productOnDepot_getObjects']
+
+
+def testSequenceFollowsDependencies(backend):
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    productOnClients = backend.productOnClient_generateSequence(productOnClients)
+
+    assert [u'product2', u'product1'] == getSequence(productOnClients, u'client0.test.invalid')
+
+
+def testNewDependenciesAreUsed(backend):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    createDependency(backend, u'product2', u'1.0', u'product3')
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert (u'client0.test.invalid', u'product3', u'setup') in getActionRequests(productOnClients)
+
+    productOnClients = backend.productOnClient_generateSequence(productOnClients)
+    assert [u'product3', u'product2', u'product1'] == getSequence(productOnClients, u'client0.test.invalid')
+
+    backend.productDependency_delete(u'product2', u'1.0', u'1', u'setup', u'product3')
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert u'product3' not in set(poc.productId for poc in productOnClients)
+
+
+def testDependenciesOfTheVersionOnDepotAreUsed(backend):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    installProduct(backend, u'product1', u'2.0')
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert set([u'product1']) == set(poc.productId for poc in productOnClients)
+
+    createDependency(backend, u'product1', u'2.0', u'product3')
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert set([u'product1', u'product3']) == set(poc.productId for poc in productOnClients)
+
+
+def testGraphIsSharedByBackendsUsingTheSameData(backend, countingBackend):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    otherBackend = ExtendedConfigDataBackend(countingBackend)
+    countingBackend.calls.clear()
+    otherBackend.productOnClient_addDependencies(getProductOnClients(otherBackend))
+    assert 0 == countingBackend.calls['productDependency_getObjects']
+    assert 0 == countingBackend.calls['product_getObjects']
+
+    createDependency(otherBackend, u'product2', u'1.0', u'product3')
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert (u'client0.test.invalid', u'product3', u'setup') in getActionRequests(productOnClients)
+
+
+def testUnreportedProductsOnDepotAreReadAgain(backend, countingBackend):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    # The product is created without the graph being told about it.
+    countingBackend.product_insertObject(
+        LocalbootProduct(id=u'product1', productVersion=u'2.0', packageVersion=u'1')
+    )
+    backend.productOnDepot_createObjects(
+        ProductOnDepot(
+            productId=u'product1', productType=u'LocalbootProduct',
+            productVersion=u'2.0', packageVersion=u'1',
+            depotId=u'depot1.test.invalid'
+        )
+    )
+
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert set([u'product1']) == set(poc.productId for poc in productOnClients)
+
+
+def testUnreportedChangesAreNoticedAfterMaxAge(backend, countingBackend, monkeypatch):
+    backend.productOnClient_addDependencies(getProductOnClients(backend))
+
+    countingBackend.productDependency_insertObject(
+        ProductDependency(
+            productId=u'product2', productVersion=u'1.0',
+            packageVersion=u'1', productAction=u'setup',
+            requiredProductId=u'product3', requiredAction=u'setup',
+            requirementType=u'before'
+        )
+    )
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert u'product3' not in set(poc.productId for poc in productOnClients)
+
+    now = time.time() + ProductDependencyGraph.MAX_AGE + 1
+    monkeypatch.setattr(time, 'time', lambda: now)
+    productOnClients = backend.productOnClient_addDependencies(getProductOnClients(backend))
+    assert (u'client0.test.invalid', u'product3', u'setup') in getActionRequests(productOnClients)
@@ -26,12 +26,15 @@ from __future__ import absolute_import
 
 import os.path
 import sys
+import time
 
 import pytest
 
 import OPSI.Backend.SQL as sql
 import OPSI.Object as ob
+from OPSI.Backend.Backend import ExtendedConfigDataBackend
 
+from .Backends.SQLite import getSQLiteBackend
 from .helpers import cleanMandatoryConstructorArgsCache as cmcac
 from .helpers import createTemporaryTestfile
 
@@ -321,3 +324,553 @@ def testAlteringTableAfterChangeOfHardwareAuditConfig(sqlBackendCreationContextM
                 backend._setAuditHardwareConfig(backend.auditHardware_getConfig())
 
                 backend.backend_createBase()
+
+
+@pytest.mark.parametrize("filterExpression", [
+    {},
+    {'a': False},
+    {'a': [1, 2], 'b': False},
+    {'a': [None, 'x']},
+    {'a': '*bc', 'b': 2.3},
+    {'a': ['> 1', '<= 2.5']},
+    {'a': u"it's a\\path"},
+])
+def testFilterWithParametersMatchesFilterWithLiterals(sqlBackendWithoutConnection, filterExpression):
+    backend = sqlBackendWithoutConnection
+    condition, parameters = backend._filterToSqlWithParameters(filterExpression)
+
+    literals = iter(backend._sql.quote(parameter) for parameter in parameters)
+    assert backend._filterToSql(filterExpression) == condition.replace('%s', '{}').format(*literals)
+
+
+@pytest.mark.parametrize("filterExpression, otherFilterExpression", [
+    ({'a': 'b', 'c': 1}, {'c': 2, 'a': 'd'}),
+    ({'a': ['b', 'c']}, {'a': ['d', 'e']}),
+    ({'a': 'b*'}, {'a': '*c*'}),
+    ({'a': '> 1'}, {'a': '>2.5'}),
+])
+def testFiltersOfSameShapeCreateSameQuery(sqlBackendWithoutConnection, filterExpression, otherFilterExpression):
+    backend = sqlBackendWithoutConnection
+    query, parameters = backend._createQueryWithParameters('foo', ['a'], filterExpression)
+    otherQuery, otherParameters = backend._createQueryWithParameters('foo', ['a'], otherFilterExpression)
+
+    assert query == otherQuery
+    assert parameters != otherParameters
+
+
+def testFilterWithParametersDoesNotContainValues(sqlBackendWithoutConnection):
+    condition, parameters = sqlBackendWithoutConnection._filterToSqlWithParameters({'a': u"'; DROP TABLE `HOST`; --"})
+
+    assert u'(`a` = %s)' == condition
+    assert [u"'; DROP TABLE `HOST`; --"] == parameters
+
+
+@pytest.mark.parametrize("value, expectedCondition, expectedParameters", [
+    (u'abc', u'`a` = %s', [u'abc']),
+    (u'a*c', u'`a` LIKE %s', [u'a%c']),
+    (u'a_b*', u'`a` LIKE %s', [u'a\\_b%']),
+    (u'100%*', u'`a` LIKE %s', [u'100\\%%']),
+    (u'a\\*b', u'`a` = %s', [u'a*b']),
+    (u'a\\**', u'`a` LIKE %s', [u'a*%']),
+    (u'>= 2', u'`a` >= %s', [2]),
+    (u'< 2.5', u'`a` < %s', [2.5]),
+    (None, u'`a` is NULL', []),
+    (True, u'`a` = 1', []),
+    (3, u'`a` = %s', [3]),
+])
+def testFilterWithParametersForEachKindOfValue(sqlBackendWithoutConnection, value, expectedCondition, expectedParameters):
+    condition, parameters = sqlBackendWithoutConnection._filterToSqlWithParameters({'a': [value]})
+
+    assert u'({0})'.format(expectedCondition) == condition
+    assert expectedParameters == parameters
+
+
+def testUniqueConditionWithParameters(sqlBackendWithoutConnection, cleanMandatoryConstructorArgsCache):
+    softwareLicense = ob.SoftwareLicense('a', 'b')
+    condition, parameters = sqlBackendWithoutConnection._uniqueConditionWithParameters(softwareLicense)
+
+    assert "`softwareLicenseId` = %s and `licenseContractId` = %s" == condition
+    assert ['a', 'b'] == parameters
+
+
+def testStatementsAreCachedByShape():
+    database = sql.SQL()
+
+    statement, parameters = database.getInsertStatement('foo', {'a': 1, 'b': u'x'})
+    otherStatement, otherParameters = database.getInsertStatement('foo', {'b': u'y', 'a': 2})
+
+    assert statement is otherStatement
+    assert u'INSERT INTO `foo` (`a`, `b`) VALUES (%s, %s);' == statement
+    assert [1, u'x'] == parameters
+    assert [2, u'y'] == otherParameters
+
+
+def testUpdateStatementWithParameters():
+    database = sql.SQL()
+
+    statement, parameters = database.getUpdateStatement('foo', '`a` = %s', {'b': None, 'c': 'x'}, whereParameters=[1])
+    assert u'UPDATE `foo` SET `c` = %s WHERE `a` = %s;' == statement
+    assert [u'x', 1] == parameters
+
+    statement, parameters = database.getUpdateStatement('foo', '`a` = %s', {'b': None, 'c': 'x'}, updateWhereNone=True, whereParameters=[1])
+    assert u'UPDATE `foo` SET `b` = %s, `c` = %s WHERE `a` = %s;' == statement
+    assert [None, u'x', 1] == parameters
+
+
+@pytest.fixture
+def sqliteBackendWithTable():
+    sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
+
+    backend = sql.SQLBackend()
+    backend._sql = sqliteModule.SQLite()
+    backend._sql.execute(
+        u'CREATE TABLE `TEST` (`id` integer NOT NULL, `name` varchar(50), '
+        u'`number` integer, `ratio` double, `flag` bool, PRIMARY KEY (`id`));'
+    )
+    backend._sql.insertMany('TEST', [
+        {'id': 1, 'name': u'client1.test.invalid', 'number': 1, 'ratio': 1.5, 'flag': True},
+        {'id': 2, 'name': u'client2.test.invalid', 'number': 2, 'ratio': 2.5, 'flag': False},
+        {'id': 3, 'name': u"it's a\\path", 'number': 3, 'ratio': None, 'flag': False},
+        {'id': 4, 'name': u'under_score', 'number': None, 'ratio': None, 'flag': False},
+        {'id': 5, 'name': u'underXscore', 'number': None, 'ratio': None, 'flag': False},
+        {'id': 6, 'name': u'star*name', 'number': None, 'ratio': None, 'flag': False},
+        {'id': 7, 'name': u'100%', 'number': None, 'ratio': None, 'flag': False},
+    ])
+
+    yield backend
+
+
+@pytest.mark.parametrize("filterExpression, expectedIds", [
+    ({}, [1, 2, 3, 4, 5, 6, 7]),
+    ({'name': None}, [1, 2, 3, 4, 5, 6, 7]),
+    ({'name': []}, [1, 2, 3, 4, 5, 6, 7]),
+    ({'name': u'client1.test.invalid'}, [1]),
+    ({'name': [u'client1.test.invalid', u'client2.test.invalid']}, [1, 2]),
+    ({'name': u'client*'}, [1, 2]),
+    ({'name': u'*.invalid'}, [1, 2]),
+    ({'name': u'*2*'}, [2]),
+    ({'name': u"it's a\\path"}, [3]),
+    ({'name': u"it's*"}, [3]),
+    ({'name': u'under_*'}, [4]),
+    ({'name': u'star**name'}, [6]),
+    ({'name': u'star***'}, [6]),
+    ({'name': u'*%'}, [7]),
+    ({'number': 2}, [2]),
+    ({'number': long(2)}, [2]),
+    ({'number': [1, 3]}, [1, 3]),
+    ({'number': [None]}, [4, 5, 6, 7]),
+    ({'number': [None, 1]}, [1, 4, 5, 6, 7]),
+    ({'number': u'> 1'}, [2, 3]),
+    ({'number': u'<= 2'}, [1, 2]),
+    ({'number': u'= 3'}, [3]),
+    ({'ratio': 2.5}, [2]),
+    ({'ratio': u'>= 2.0'}, [2]),
+    ({'flag': True}, [1]),
+    ({'flag': [True, False]}, [1, 2, 3, 4, 5, 6, 7]),
+    ({'name': u'client*', 'flag': False}, [2]),
+])
+def testFilterWithParametersIsEquivalentToFilterWithLiterals(sqliteBackendWithTable, filterExpression, expectedIds):
+    backend = sqliteBackendWithTable
+
+    literalQuery = backend._createQuery('TEST', ['id'], filterExpression)
+    literalIds = sorted(row['id'] for row in backend._sql.getSet(literalQuery))
+
+    query, parameters = backend._createQueryWithParameters('TEST', ['id'], filterExpression)
+    ids = sorted(row['id'] for row in backend._sql.getSet(query, parameters))
+
+    assert expectedIds == ids
+    assert literalIds == ids
+
+
+def testUpdatingAndDeletingWithParameters(sqliteBackendWithTable):
+    database = sqliteBackendWithTable._sql
+
+    assert 1 == database.update('TEST', u'`name` = ?', {'number': 42}, whereParameters=[u"it's a\\path"])
+    assert [{'number': 42}] == database.getSet(u'SELECT `number` FROM `TEST` WHERE `id` = ?', [3])
+
+    assert 1 == database.delete('TEST', u'`name` = ?', parameters=[u"it's a\\path"])
+    assert {} == database.getRow(u'SELECT * FROM `TEST` WHERE `id` = ?', [3])
+
+
+def testIteratingOverSetAllowsOtherQueries(sqliteBackendWithTable):
+    database = sqliteBackendWithTable._sql
+
+    rows = database.iterSet(u'SELECT * FROM `TEST` WHERE `flag` = ? ORDER BY `id`', [False])
+    assert not isinstance(rows, list)
+
+    names = []
+    for row in rows:
+        other = database.getRow(u'SELECT `name` FROM `TEST` WHERE `id` = ?', [row['id']])
+        names.append(other['name'])
+
+    assert [row['name'] for row in database.getSet(u'SELECT * FROM `TEST` WHERE `flag` = 0 ORDER BY `id`')] == names
+
+
+def testIteratingOverSetFallsBackToGettingSet():
+    class StaticSQL(sql.SQL):
+        def getSet(self, query, parameters=None):
+            return [{'id': 1}, {'id': 2}]
+
+    assert [{'id': 1}, {'id': 2}] == list(StaticSQL().iterSet(u'SELECT * FROM `TEST`'))
+
+
+@pytest.fixture
+def hardwareAuditBackend(hardwareAuditConfigPath):
+    sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
+
+    backend = sqliteModule.SQLiteBackend(auditHardwareConfigFile=hardwareAuditConfigPath)
+    backend._createAuditHardwareTables()
+    yield backend
+    backend.backend_exit()
+
+
+def createHardwareOnHosts(backend, hardwareClass, hostCount, deviceCount=10):
+    backend._sql.insertMany(u'HARDWARE_DEVICE_{0}'.format(hardwareClass), [
+        {'hardware_id': index, 'model': u'device{0}'.format(index), 'vendor': u'vendor{0}'.format(index % 2)}
+        for index in range(1, deviceCount + 1)
+    ])
+    backend._sql.insertMany(u'HARDWARE_CONFIG_{0}'.format(hardwareClass), [
+        {
+            'hostId': u'client{0}.test.invalid'.format(index),
+            'hardware_id': index % deviceCount + 1,
+            'state': 1
+        }
+        for index in range(hostCount)
+    ])
+
+
+def recordQueries(database, monkeypatch):
+    queries = []
+
+    def record(method):
+        def recordingMethod(query, *args, **kwargs):
+            queries.append(query)
+            return method(query, *args, **kwargs)
+
+        return recordingMethod
+
+    for methodName in ('getSet', 'iterSet', 'getRow'):
+        monkeypatch.setattr(database, methodName, record(getattr(database, methodName)))
+
+    return queries
+
+
+def testHardwareClassesAreMatchedByName(hardwareAuditBackend):
+    backend = hardwareAuditBackend
+
+    assert [u'COMPUTER_SYSTEM'] == [hwClass.name for hwClass in backend._getAuditHardwareClasses(u'COMPUTER_SYSTEM')]
+    assert [] == backend._getAuditHardwareClasses(u'COMPUTER')
+    assert len(backend._auditHardwareConfig) == len(backend._getAuditHardwareClasses(None))
+
+    matchingClasses = set(hwClass.name for hwClass in backend._getAuditHardwareClasses([u'COMPUTER*', u'*_CONTROLLER']))
+    assert u'COMPUTER_SYSTEM' in matchingClasses
+    assert u'NETWORK_CONTROLLER' in matchingClasses
+    assert all(name.startswith(u'COMPUTER') or name.endswith(u'_CONTROLLER') for name in matchingClasses)
+
+
+def testHardwareClassesChangeWithConfig(hardwareAuditBackend):
+    backend = hardwareAuditBackend
+    assert backend._getAuditHardwareClasses(u'NETWORK_CONTROLLER')
+
+    configPath = os.path.join(os.path.dirname(__file__), 'testdata', 'backend', 'small_hwaudit.conf')
+    with createTemporaryTestfile(configPath) as smallConfig:
+        backend._auditHardwareConfigFile = smallConfig
+        backend._setAuditHardwareConfig(backend.auditHardware_getConfig())
+
+    assert [] == backend._getAuditHardwareClasses(u'NETWORK_CONTROLLER')
+    assert [u'COMPUTER_SYSTEM'] == [hwClass.name for hwClass in backend._getAuditHardwareClasses(u'*')]
+
+
+def testGettingHardwareOfClassOnlyQueriesItsTables(hardwareAuditBackend, monkeypatch):
+    backend = hardwareAuditBackend
+    createHardwareOnHosts(backend, u'COMPUTER_SYSTEM', 20)
+    createHardwareOnHosts(backend, u'NETWORK_CONTROLLER', 20)
+
+    queries = recordQueries(backend._sql, monkeypatch)
+    hashes = backend.auditHardwareOnHost_getHashes(hardwareClass=u'COMPUTER_SYSTEM')
+
+    assert 20 == len(hashes)
+    # The in-memory database reads an iterated set through getSet.
+    queries = set(queries)
+    assert 1 == len(queries)
+    query = queries.pop()
+    assert u'HARDWARE_CONFIG_COMPUTER_SYSTEM' in query
+    assert u'HARDWARE_DEVICE_COMPUTER_SYSTEM' in query
+    assert u'NETWORK_CONTROLLER' not in query
+
+    queries = recordQueries(backend._sql, monkeypatch)
+    assert 10 == len(backend.auditHardware_getHashes(hardwareClass=u'NETWORK_CONTROLLER'))
+    assert [u'NETWORK_CONTROLLER'] == [recordedQuery.split(u'HARDWARE_DEVICE_')[1].split(u'`')[0] for recordedQuery in queries]
+
+
+def testHardwareOnHostsIsJoinedWithDevice(hardwareAuditBackend):
+    backend = hardwareAuditBackend
+    createHardwareOnHosts(backend, u'COMPUTER_SYSTEM', 20)
+
+    hashes = backend.auditHardwareOnHost_getHashes(
+        hardwareClass=u'COMPUTER_SYSTEM', hostId=u'client3.test.invalid'
+    )
+    assert 1 == len(hashes)
+    hardware = hashes[0]
+    assert u'client3.test.invalid' == hardware['hostId']
+    assert u'device4' == hardware['model']
+    assert u'vendor0' == hardware['vendor']
+    assert u'COMPUTER_SYSTEM' == hardware['hardwareClass']
+    assert 'hardware_id' not in hardware
+    assert 'config_id' not in hardware
+    assert set(backend._auditHardwareConfig[u'COMPUTER_SYSTEM']).issubset(hardware)
+
+    hashes = backend.auditHardwareOnHost_getHashes(hardwareClass=u'COMPUTER_SYSTEM', vendor=u'vendor1')
+    assert 10 == len(hashes)
+    assert all(hardware['vendor'] == u'vendor1' for hardware in hashes)
+
+    hashes = backend.auditHardwareOnHost_getHashes(attributes=['hostId', 'model'], hardwareClass=u'COMPUTER_SYSTEM')
+    assert 20 == len(hashes)
+    assert all(hardware['hostId'] and hardware['model'] for hardware in hashes)
+    assert all(hardware['serialNumber'] is None for hardware in hashes)
+
+
+@pytest.mark.benchmark
+def testBenchmarkGettingHardwareOfManyHosts(hardwareAuditBackend):
+    backend = hardwareAuditBackend
+    hostCount = 2000
+    for hardwareClass in (u'COMPUTER_SYSTEM', u'NETWORK_CONTROLLER', u'HARDDISK_DRIVE'):
+        createHardwareOnHosts(backend, hardwareClass, hostCount)
+
+    start = time.time()
+    hashes = backend.auditHardwareOnHost_getHashes(hardwareClass=u'COMPUTER_SYSTEM')
+    classDuration = time.time() - start
+    assert hostCount == len(hashes)
+
+    start = time.time()
+    for index in range(0, hostCount, 20):
+        assert 3 == len(backend.auditHardwareOnHost_getHashes(hostId=u'client{0}.test.invalid'.format(index)))
+    hostDuration = time.time() - start
+
+    print(
+        u"Hardware of one class for {0} hosts: {1:0.3f}s, hardware of "
+        u"{2} single hosts: {3:0.3f}s".format(hostCount, classDuration, hostCount // 20, hostDuration)
+    )
+
+
+def testUpdatingUnchangedInventoryOnlyUpdatesSeenRows(hardwareAuditBackend, monkeypatch):
+    backend = hardwareAuditBackend
+    createHardwareOnHosts(backend, u'COMPUTER_SYSTEM', 20)
+    createHardwareOnHosts(backend, u'NETWORK_CONTROLLER', 20)
+    hostId = u'client3.test.invalid'
+    inventory = backend.auditHardwareOnHost_getObjects(hostId=hostId)
+    assert 2 == len(inventory)
+
+    writes = []
+    for methodName in ('insert', 'insertMany', 'update', 'delete'):
+        monkeypatch.setattr(
+            backend._sql, methodName,
+            lambda table, *args, **kwargs: writes.append(table)
+        )
+    queries = recordQueries(backend._sql, monkeypatch)
+
+    backend.auditHardwareOnHost_updateInventory(hostId, inventory)
+
+    assert sorted([u'HARDWARE_CONFIG_COMPUTER_SYSTEM', u'HARDWARE_CONFIG_NETWORK_CONTROLLER']) == sorted(writes)
+    assert len(backend._auditHardwareConfig) == len(set(queries))
+
+
+def testUploadingInventoryUpdatesRowsPerClass(hardwareAuditBackend, monkeypatch):
+    backend = hardwareAuditBackend
+    createHardwareOnHosts(backend, u'COMPUTER_SYSTEM', 20)
+    createHardwareOnHosts(backend, u'NETWORK_CONTROLLER', 20)
+    hostId = u'client3.test.invalid'
+    inventory = backend.auditHardwareOnHost_getObjects(hostId=hostId)
+    assert 2 == len(inventory)
+    extendedBackend = ExtendedConfigDataBackend(backend)
+
+    writes = []
+    for methodName in ('insert', 'insertMany', 'update', 'delete'):
+        monkeypatch.setattr(
+            backend._sql, methodName,
+            lambda table, *args, **kwargs: writes.append(table)
+        )
+    queries = recordQueries(backend._sql, monkeypatch)
+
+    # This is how clients upload their hardware inventory.
+    extendedBackend.auditHardwareOnHost_setObsolete(hostId)
+    obsoletingQueryCount = len(queries)
+    extendedBackend.auditHardwareOnHost_updateObjects(inventory)
+
+    assert sorted(2 * [u'HARDWARE_CONFIG_COMPUTER_SYSTEM', u'HARDWARE_CONFIG_NETWORK_CONTROLLER']) == sorted(writes)
+    assert len(backend._auditHardwareConfig) == len(set(queries[:obsoletingQueryCount]))
+    # Only the classes of the uploaded hardware are read again.
+    assert 2 == len(set(queries[obsoletingQueryCount:]))
+
+
+def testStatementsForManyIdsAreSplit(sqlBackendWithoutConnection):
+    ids = [u'client{0}.test.invalid'.format(index) for index in range(sql.BULK_QUERY_SIZE + 1)]
+
+    statements = list(sqlBackendWithoutConnection._getStatementsForIds(
+        u'DELETE FROM `X` WHERE `a` = {parameter} AND `b` IN ({ids});', ids, [u'value']
+    ))
+
+    assert 2 == len(statements)
+    assert [u'value'] + ids[:sql.BULK_QUERY_SIZE] == statements[0][1]
+    assert [u'value', ids[-1]] == statements[1][1]
+    assert u'DELETE FROM `X` WHERE `a` = %s AND `b` IN (%s);' == statements[1][0]
+
+
+@pytest.fixture
+def sqliteBackend(hardwareAuditConfigPath):
+    with getSQLiteBackend(auditHardwareConfigFile=hardwareAuditConfigPath) as backend:
+        backend.backend_createBase()
+        yield backend
+        backend.backend_deleteBase()
+
+
+def createClientsWithData(backend, count):
+    clients = [ob.OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(count)]
+    backend.host_insertObjects(clients)
+    backend.config_insertObject(ob.UnicodeConfig(id=u'config1', defaultValues=[u'a']))
+    backend.group_insertObject(ob.HostGroup(id=u'group1'))
+    for client in clients:
+        backend.configState_insertObject(ob.ConfigState(configId=u'config1', objectId=client.id, values=[u'b']))
+        backend.objectToGroup_insertObject(ob.ObjectToGroup(groupType=u'HostGroup', groupId=u'group1', objectId=client.id))
+
+    createHardwareOnHosts(backend, u'COMPUTER_SYSTEM', count)
+    return clients
+
+
+def getRowCount(backend, table):
+    return backend._sql.getRow(u'SELECT COUNT(*) AS `count` FROM `{0}`;'.format(table))['count']
+
+
+def testDeletingHostsRemovesDataAtOnce(sqliteBackend, monkeypatch):
+    clients = createClientsWithData(sqliteBackend, 20)
+    sqliteBackend.auditSoftwareOnClient_insertObjects([
+        ob.AuditSoftwareOnClient(
+            name=u'software{0}'.format(index), version=u'1.0', subVersion=u'',
+            language=u'de', architecture=u'x64', clientId=client.id
+        )
+        for client in clients for index in range(3)
+    ])
+
+    transactions = []
+    executeInTransaction = sqliteBackend._sql.executeInTransaction
+
+    def recordTransaction(statements):
+        statements = list(statements)
+        transactions.append(statements)
+        return executeInTransaction(statements)
+
+    deletes = []
+    delete = sqliteBackend._sql.delete
+
+    def recordDelete(table, where, parameters=None):
+        deletes.append(table)
+        return delete(table, where, parameters)
+
+    monkeypatch.setattr(sqliteBackend._sql, 'executeInTransaction', recordTransaction)
+    monkeypatch.setattr(sqliteBackend._sql, 'delete', recordDelete)
+    sqliteBackend.host_deleteObjects(clients[:10])
+
+    assert not deletes
+    assert 1 == len(transactions)
+    queries = [query for (query, _) in transactions[0]]
+    placeholders = u', '.join([u'?'] * 10)
+    assert u'DELETE FROM `SOFTWARE_CONFIG` WHERE `clientId` IN ({0});'.format(placeholders) in queries
+    assert u'DELETE FROM `HARDWARE_CONFIG_COMPUTER_SYSTEM` WHERE `hostId` IN ({0});'.format(placeholders) in queries
+    assert u'DELETE FROM `HOST` WHERE `hostId` IN ({0});'.format(placeholders) == queries[-1]
+    # One statement per table
+    assert len(queries) == len(set(query.split(u' WHERE ')[0] for query in queries))
+
+    assert 10 == getRowCount(sqliteBackend, 'HOST')
+    assert 10 == getRowCount(sqliteBackend, 'CONFIG_STATE')
+    assert 10 == getRowCount(sqliteBackend, 'OBJECT_TO_GROUP')
+    assert 30 == getRowCount(sqliteBackend, 'SOFTWARE_CONFIG')
+    assert 10 == getRowCount(sqliteBackend, 'HARDWARE_CONFIG_COMPUTER_SYSTEM')
+
+
+def testDeletingHostsPassesDeletedObjectsOnToTheContext(sqliteBackend, monkeypatch):
+    clients = createClientsWithData(sqliteBackend, 3)
+
+    class RecordingContext(object):
+        def __init__(self, backend):
+            self.backend = backend
+            self.deleted = []
+
+        def __getattr__(self, name):
+            method = getattr(self.backend, name)
+            if not name.endswith('_deleteObjects'):
+                return method
+
+            def recordDeletion(objects):
+                self.deleted.extend(objects)
+                return method(objects)
+
+            return recordDeletion
+
+    # The rows have already been removed when the deletion comes back.
+    deletes = []
+    monkeypatch.setattr(sqliteBackend._sql, 'delete', lambda table, where, parameters=None: deletes.append(table))
+
+    context = RecordingContext(sqliteBackend)
+    sqliteBackend._setContext(context)
+    try:
+        sqliteBackend.host_deleteObjects(clients[:2])
+    finally:
+        sqliteBackend._setContext(sqliteBackend)
+
+    assert 4 == len([obj for obj in context.deleted if isinstance(obj, (ob.ConfigState, ob.ObjectToGroup))])
+    assert 2 == len([obj for obj in context.deleted if isinstance(obj, ob.AuditHardwareOnHost)])
+    assert not deletes
+    assert 1 == getRowCount(sqliteBackend, 'CONFIG_STATE')
+    assert 1 == getRowCount(sqliteBackend, 'HARDWARE_CONFIG_COMPUTER_SYSTEM')
+
+
+def testDeletingHostsKeepsDataOnFailure(sqliteBackend, monkeypatch):
+    clients = createClientsWithData(sqliteBackend, 5)
+    executeInTransaction = sqliteBackend._sql.executeInTransaction
+
+    def failAtTheEnd(statements):
+        statements = list(statements)
+        statements.append((u'INSERT INTO `NOT_EXISTING` VALUES (1);', None))
+        return executeInTransaction(statements)
+
+    monkeypatch.setattr(sqliteBackend._sql, 'executeInTransaction', failAtTheEnd)
+    with pytest.raises(Exception):
+        sqliteBackend.host_deleteObjects(clients)
+
+    assert 5 == getRowCount(sqliteBackend, 'HOST')
+    assert 5 == getRowCount(sqliteBackend, 'CONFIG_STATE')
+    assert 5 == getRowCount(sqliteBackend, 'HARDWARE_CONFIG_COMPUTER_SYSTEM')
+
+
+def testRowsAreOnlyUpsertedIfIdentifiedByTheUpsertKey(sqliteBackend, monkeypatch):
+    client = ob.OpsiClient(id=u'client1.test.invalid')
+    sqliteBackend.host_insertObjects([client])
+
+    # ProductOnClients are identified by more than this upsert key.
+    upsertKeys = {u'HOST': (u'hostId', ), u'PRODUCT_ON_CLIENT': (u'productId', )}
+    upsertedTables = []
+    monkeypatch.setattr(sqliteBackend._sql, 'getUpsertKey', upsertKeys.get)
+    monkeypatch.setattr(sqliteBackend._sql, 'upsertMany', lambda table, valueHashes: upsertedTables.append(table), raising=False)
+
+    sqliteBackend.host_insertObjects([client])
+    sqliteBackend.productOnClient_insertObjects([
+        ob.ProductOnClient(productId=u'product1', productType=u'LocalbootProduct', clientId=client.id)
+    ])
+
+    assert [u'HOST'] == upsertedTables
+    assert 1 == len(sqliteBackend.productOnClient_getObjects())
+
+
+@pytest.mark.benchmark
+def testBenchmarkDeletingManyHosts(sqliteBackend):
+    clients = createClientsWithData(sqliteBackend, 500)
+
+    start = time.time()
+    sqliteBackend.host_deleteObjects(clients)
+    duration = time.time() - start
+
+    assert 0 == getRowCount(sqliteBackend, 'HOST')
+    assert 0 == getRowCount(sqliteBackend, 'CONFIG_STATE')
+    assert 0 == getRowCount(sqliteBackend, 'OBJECT_TO_GROUP')
+    assert 0 == getRowCount(sqliteBackend, 'HARDWARE_CONFIG_COMPUTER_SYSTEM')
+    print(u"Deleting {0} hosts took {1:.3f}s".format(len(clients), duration))
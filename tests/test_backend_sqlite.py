@@ -25,12 +25,233 @@ Testing the opsi SQLite backend.
 
 from __future__ import absolute_import
 
+import os
+import threading
+import time
+
 import pytest
 
 
+@pytest.fixture
+def sqliteModule():
+    return pytest.importorskip("OPSI.Backend.SQLite")
+
+
+@pytest.fixture
+def databasePath(tempDir):
+    return os.path.join(tempDir, 'test.sqlite3')
+
+
+def createTestTable(database):
+    database.execute(
+        u'CREATE TABLE `TEST` (`id` integer NOT NULL, `value` varchar(50), '
+        u'PRIMARY KEY (`id`));'
+    )
+
+
+def runInThreads(function, count):
+    errors = []
+
+    def run(index):
+        try:
+            function(index)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(index, )) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [] == errors
+
+
 def testInitialisationOfSQLiteBackendWithoutParametersDoesNotFail():
     sqlModule = pytest.importorskip("OPSI.Backend.SQLite")
     SQLiteBackend = sqlModule.SQLiteBackend
 
     backend = SQLiteBackend()
     backend.backend_createBase()
+
+
+def testFileDatabaseUsesWriteAheadLog(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+
+    assert u'wal' == database.getRow(u'PRAGMA journal_mode;')['journal_mode']
+
+
+def testSettingJournalModeAndCaches(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath, journalMode=u'delete', cacheSize=1234, mmapSize=0)
+
+    assert u'delete' == database.getRow(u'PRAGMA journal_mode;')['journal_mode']
+    assert 1234 == database.getRow(u'PRAGMA cache_size;')['cache_size']
+
+
+def testThreadsUseConnectionsOfTheirOwn(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    connections = []
+    runInThreads(lambda index: connections.append(database.connect()[0]), 3)
+
+    assert 3 == len(set(id(connection) for connection in connections))
+    assert database.connect()[0] is database.connect()[0]
+
+
+def testConnectionsOfFinishedThreadsAreClosed(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    runInThreads(lambda index: database.connect(), 3)
+
+    database.connect()
+    assert [threading.current_thread()] == [owner for owner, _, _ in database._connections.values()]
+
+
+def testInMemoryDatabaseIsSharedBetweenThreads(sqliteModule):
+    database = sqliteModule.SQLite()
+    createTestTable(database)
+
+    runInThreads(lambda index: database.insert('TEST', {'id': index, 'value': u'x'}), 5)
+
+    assert 5 == len(database.getSet(u'SELECT * FROM `TEST`'))
+
+
+def testDisconnectingClosesAllConnections(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    createTestTable(database)
+    database.insert('TEST', {'id': 1, 'value': u'x'})
+
+    database.disconnect()
+
+    assert 1 == len(database.getSet(u'SELECT * FROM `TEST`'))
+
+
+def testWritingFailsIfDatabaseStaysLocked(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath, busyTimeout=10, busyRetries=1)
+    createTestTable(database)
+
+    otherProcess = sqliteModule.SQLite(database=databasePath)
+    otherProcess.execute(u'BEGIN IMMEDIATE;')
+    try:
+        with pytest.raises(sqliteModule.BusyError):
+            database.insert('TEST', {'id': 1, 'value': u'x'})
+    finally:
+        otherProcess.execute(u'COMMIT;')
+
+    database.insert('TEST', {'id': 1, 'value': u'x'})
+
+
+def testWritingIsRetriedWhileDatabaseIsLocked(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath, busyTimeout=20, busyRetries=5)
+    createTestTable(database)
+
+    otherProcess = sqliteModule.SQLite(database=databasePath)
+    locked = threading.Event()
+
+    def lockDatabase():
+        otherProcess.execute(u'BEGIN IMMEDIATE;')
+        locked.set()
+        time.sleep(0.2)
+        otherProcess.execute(u'COMMIT;')
+
+    locker = threading.Thread(target=lockDatabase)
+    locker.start()
+    try:
+        locked.wait()
+        database.insert('TEST', {'id': 1, 'value': u'x'})
+    finally:
+        locker.join()
+
+    assert 1 == len(database.getSet(u'SELECT * FROM `TEST`'))
+
+
+def testConcurrentReadingAndWriting(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    createTestTable(database)
+    rowsPerWriter = 200
+    writers = 2
+    readers = 4
+
+    def work(index):
+        if index < writers:
+            for number in range(rowsPerWriter):
+                rowId = index * rowsPerWriter + number
+                database.insert('TEST', {'id': rowId, 'value': u'value{0}'.format(rowId)})
+        else:
+            lastCount = 0
+            while lastCount < writers * rowsPerWriter:
+                count = database.getRow(u'SELECT count(*) AS `rows` FROM `TEST`')['rows']
+                assert count >= lastCount
+                lastCount = count
+
+    runInThreads(work, writers + readers)
+
+    rows = database.getSet(u'SELECT * FROM `TEST`')
+    assert writers * rowsPerWriter == len(rows)
+    assert all(row['value'] == u'value{0}'.format(row['id']) for row in rows)
+
+
+@pytest.mark.benchmark
+def testBenchmarkingConcurrentReaders(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    createTestTable(database)
+    database.insertMany('TEST', [{'id': index, 'value': u'value{0}'.format(index)} for index in range(20000)])
+    queriesPerReader = 50
+    expectedCount = len([index for index in range(20000) if str(index).count('5') >= 2])
+
+    def read(index):
+        for _ in range(queriesPerReader):
+            assert expectedCount == database.getRow(u'SELECT count(*) AS `rows` FROM `TEST` WHERE `value` LIKE ?', [u'%5%5%'])['rows']
+
+    durations = {}
+    for readers in (1, 4):
+        start = time.time()
+        runInThreads(read, readers)
+        durations[readers] = time.time() - start
+
+    print("Queries per second: 1 reader {0:.0f}, 4 readers {1:.0f}".format(
+        queriesPerReader / durations[1], 4 * queriesPerReader / durations[4]
+    ))
+
+
+def testExecutingStatementsInTransaction(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    createTestTable(database)
+    database.insert('TEST', {'id': 1, 'value': u'a'})
+
+    database.executeInTransaction([
+        (u'UPDATE `TEST` SET `value` = ? WHERE `id` = ?;', [u'b', 1]),
+        (u'INSERT INTO `TEST` (`id`, `value`) VALUES (2, NULL);', None),
+    ])
+    assert [(1, u'b'), (2, None)] == [(row['id'], row['value']) for row in database.getSet(u'SELECT * FROM `TEST` ORDER BY `id`;')]
+
+    with pytest.raises(Exception):
+        database.executeInTransaction([
+            (u'DELETE FROM `TEST` WHERE `id` = ?;', [2]),
+            (u'INSERT INTO `TEST` (`id`, `value`) VALUES (?, ?);', [1, u'duplicate']),
+        ])
+    assert 2 == len(database.getSet(u'SELECT * FROM `TEST`;'))
+
+
+def testRollingBackNestedTransactions(sqliteModule, databasePath):
+    database = sqliteModule.SQLite(database=databasePath)
+    createTestTable(database)
+
+    with database.transaction():
+        database.insert('TEST', {'id': 1, 'value': u'outer'})
+
+        with pytest.raises(Exception):
+            with database.transaction():
+                database.insert('TEST', {'id': 2, 'value': u'inner'})
+                database.insert('TEST', {'id': 1, 'value': u'duplicate'})
+
+        database.executeInTransaction([
+            (u'INSERT INTO `TEST` (`id`, `value`) VALUES (?, ?);', [3, u'outer']),
+        ])
+
+    assert [(1, u'outer'), (3, u'outer')] == [(row['id'], row['value']) for row in database.getSet(u'SELECT * FROM `TEST` ORDER BY `id`;')]
+
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.delete('TEST', u'`id` = 1')
+            raise RuntimeError(u'Failing on purpose.')
+
+    assert 2 == len(database.getSet(u'SELECT * FROM `TEST`;'))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing transactions spanning multiple backend calls.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+
+from OPSI.Backend.Backend import ExtendedConfigDataBackend, backendTransaction
+from OPSI.Object import (
+    LocalbootProduct, OpsiClient, OpsiDepotserver, ProductOnClient,
+    UnicodeConfig)
+
+import pytest
+
+
+class TransactionFailed(Exception):
+    pass
+
+
+def getClientIds(backend):
+    return sorted(backend.host_getIdents(type='OpsiClient', returnType='unicode'))
+
+
+def testChangesAreKeptAfterTransaction(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+    client = OpsiClient(id=u'client1.test.invalid', description=u'old')
+    backend.host_createObjects(client)
+
+    with backendTransaction(backend):
+        client.setDescription(u'new')
+        backend.host_updateObjects(client)
+        backend.host_createObjects(OpsiClient(id=u'client2.test.invalid'))
+
+    assert [u'client1.test.invalid', u'client2.test.invalid'] == getClientIds(backend)
+    assert u'new' == backend.host_getObjects(id=client.id)[0].description
+
+
+def testChangesOfFailedTransactionAreDiscarded(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+    client = OpsiClient(id=u'client1.test.invalid', description=u'old')
+    backend.host_createObjects(client)
+
+    with pytest.raises(TransactionFailed):
+        with backendTransaction(backend):
+            client.setDescription(u'new')
+            backend.host_updateObjects(client)
+            backend.host_createObjects(OpsiClient(id=u'client2.test.invalid'))
+
+            # Changes are visible inside of the transaction.
+            assert [u'client1.test.invalid', u'client2.test.invalid'] == getClientIds(backend)
+            raise TransactionFailed(u'Failing on purpose.')
+
+    assert [u'client1.test.invalid'] == getClientIds(backend)
+    assert u'old' == backend.host_getObjects(id=client.id)[0].description
+
+
+def testDeletedObjectsAreRestoredAfterFailedTransaction(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+    client = OpsiClient(id=u'client1.test.invalid')
+    product = LocalbootProduct(id=u'product1', productVersion=u'1.0', packageVersion=u'1')
+    backend.host_createObjects(client)
+    backend.product_createObjects(product)
+    backend.productOnClient_createObjects(
+        ProductOnClient(
+            productId=product.id, productType=product.getType(),
+            clientId=client.id, actionRequest=u'setup'
+        )
+    )
+
+    with pytest.raises(TransactionFailed):
+        with backendTransaction(backend):
+            backend.host_delete(id=client.id)
+            assert [] == getClientIds(backend)
+            raise TransactionFailed(u'Failing on purpose.')
+
+    assert [client.id] == getClientIds(backend)
+    productOnClients = backend.productOnClient_getObjects(clientId=client.id)
+    assert 1 == len(productOnClients)
+    assert u'setup' == productOnClients[0].actionRequest
+
+
+def testRollingBackNestedTransaction(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+
+    with backendTransaction(backend):
+        backend.host_createObjects(OpsiClient(id=u'client1.test.invalid'))
+
+        with pytest.raises(TransactionFailed):
+            with backendTransaction(backend):
+                backend.host_createObjects(OpsiClient(id=u'client2.test.invalid'))
+                raise TransactionFailed(u'Failing on purpose.')
+
+        backend.host_createObjects(OpsiClient(id=u'client3.test.invalid'))
+
+    assert [u'client1.test.invalid', u'client3.test.invalid'] == getClientIds(backend)
+
+
+def testIndexesAreResetAfterFailedTransaction(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+    depot = OpsiDepotserver(id=u'depot1.test.invalid')
+    backend.host_createObjects(depot)
+    backend.config_createObjects(UnicodeConfig(id=u'clientconfig.depot.id', defaultValues=[depot.id]))
+
+    with pytest.raises(TransactionFailed):
+        with backendTransaction(backend):
+            backend.host_createObjects(OpsiClient(id=u'client1.test.invalid'))
+            assert 1 == len(backend.configState_getClientToDepotserver())
+            raise TransactionFailed(u'Failing on purpose.')
+
+    assert [] == backend.configState_getClientToDepotserver()
+
+
+def testBackendsWithoutTransactionsAreUsable():
+    class SimpleBackend(object):
+        def host_insertObject(self, host):
+            self.host = host
+
+    backend = SimpleBackend()
+    with backendTransaction(backend):
+        backend.host_insertObject(u'host')
+
+    assert u'host' == backend.host
+
+
+@pytest.mark.benchmark
+def testBenchmarkingUpdatesInTransaction(tempDir):
+    sqliteModule = pytest.importorskip("OPSI.Backend.SQLite")
+    storageBackend = sqliteModule.SQLiteBackend(
+        database=os.path.join(tempDir, 'transactions.sqlite3')
+    )
+    storageBackend.backend_createBase()
+    try:
+        backend = ExtendedConfigDataBackend(storageBackend)
+
+        product = LocalbootProduct(id=u'product1', productVersion=u'1.0', packageVersion=u'1')
+        backend.product_createObjects(product)
+        clients = [
+            OpsiClient(id=u'client{0}.test.invalid'.format(index))
+            for index in range(300)
+        ]
+        backend.host_createObjects(clients)
+
+        def getProductOnClients(actionRequest):
+            return [
+                ProductOnClient(
+                    productId=product.id, productType=product.getType(),
+                    clientId=client.id, actionRequest=actionRequest
+                )
+                for client in clients
+            ]
+
+        def updateActionRequests(actionRequest):
+            for productOnClient in getProductOnClients(actionRequest):
+                backend.productOnClient_updateObjects(productOnClient)
+
+        backend.productOnClient_createObjects(getProductOnClients(u'none'))
+
+        start = time.time()
+        updateActionRequests(u'setup')
+        separately = time.time() - start
+
+        start = time.time()
+        with backendTransaction(backend):
+            updateActionRequests(u'uninstall')
+        together = time.time() - start
+
+        print(
+            "Updating {0} objects took {1:.3f}s separately and {2:.3f}s "
+            "in one transaction".format(len(clients), separately, together)
+        )
+
+        productOnClients = backend.productOnClient_getObjects()
+        assert len(clients) == len(productOnClients)
+        assert all(poc.actionRequest == u'uninstall' for poc in productOnClients)
+    finally:
+        storageBackend.backend_exit()
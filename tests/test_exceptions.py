@@ -32,7 +32,7 @@ from OPSI.Exceptions import (BackendError, OpsiError, OpsiProductOrderingError,
     OpsiBackupFileError, OpsiBackupFileNotFound, OpsiBackupBackendNotFound,
     OpsiAuthenticationError, OpsiServiceVerificationError, OpsiBadRpcError,
     OpsiRpcError, OpsiConnectionError, OpsiTimeoutError,
-    BackendIOError, BackendConfigurationError, BackendReferentialIntegrityError,
+    OpsiRequestTooLargeError, BackendIOError, BackendConfigurationError, BackendReferentialIntegrityError,
     BackendBadValueError, BackendMissingDataError, BackendAuthenticationError,
     BackendPermissionDeniedError, BackendTemporaryError,
     BackendUnaccomplishableError, BackendModuleDisabledError,
@@ -46,7 +46,7 @@ from OPSI.Exceptions import (BackendError, OpsiError, OpsiProductOrderingError,
         OpsiBackupFileError, OpsiBackupFileNotFound,
         OpsiBackupBackendNotFound, OpsiAuthenticationError,
         OpsiServiceVerificationError, OpsiBadRpcError, OpsiRpcError,
-        OpsiConnectionError, OpsiTimeoutError,
+        OpsiConnectionError, OpsiTimeoutError, OpsiRequestTooLargeError,
         BackendIOError, BackendConfigurationError,
         BackendReferentialIntegrityError, BackendBadValueError,
         BackendMissingDataError, BackendAuthenticationError,
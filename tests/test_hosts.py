@@ -30,8 +30,10 @@ import socket
 import pytest
 
 from OPSI.Exceptions import BackendError, BackendMissingDataError
-from OPSI.Object import (HostGroup, ObjectToGroup, OpsiClient, OpsiConfigserver,
-    OpsiDepotserver)
+from OPSI.Object import (AuditSoftware, AuditSoftwareOnClient, ConfigState,
+    HostGroup, LocalbootProduct, ObjectToGroup, OpsiClient, OpsiConfigserver,
+    OpsiDepotserver, ProductOnClient, ProductOnDepot, ProductPropertyState,
+    UnicodeConfig, UnicodeProductProperty)
 from OPSI.Util import randomString
 
 
@@ -518,3 +520,81 @@ def testInventoryNumberOnHosts(configDataBackend, hostClass, inventoryNumber):
 
     assert hostFromBackend.inventoryNumber == inventoryNumber
     assert hostFromBackend.getInventoryNumber() == inventoryNumber
+
+
+def getDependentData(backend, hostIds):
+    return {
+        'objectToGroup': backend.objectToGroup_getObjects(objectId=hostIds),
+        'productOnClient': backend.productOnClient_getObjects(clientId=hostIds),
+        'productOnDepot': backend.productOnDepot_getObjects(depotId=hostIds),
+        'productPropertyState': backend.productPropertyState_getObjects(objectId=hostIds),
+        'configState': backend.configState_getObjects(objectId=hostIds),
+        'auditSoftwareOnClient': backend.auditSoftwareOnClient_getObjects(clientId=hostIds),
+    }
+
+
+def testDeletingHostsRemovesDependentData(extendedConfigDataBackend):
+    backend = extendedConfigDataBackend
+    depots = [OpsiDepotserver(id=u'depot{0}.test.invalid'.format(index)) for index in range(2)]
+    clients = [OpsiClient(id=u'client{0}.test.invalid'.format(index)) for index in range(3)]
+    backend.host_createObjects(depots + clients)
+
+    product = LocalbootProduct(id=u'product1', productVersion=u'1.0', packageVersion=u'1')
+    backend.product_createObjects(product)
+    backend.productProperty_createObjects(
+        UnicodeProductProperty(
+            productId=product.id, productVersion=product.productVersion,
+            packageVersion=product.packageVersion, propertyId=u'property1',
+            possibleValues=[u'a', u'b'], defaultValues=[u'a'], editable=False
+        )
+    )
+    backend.config_createObjects(UnicodeConfig(id=u'config1', defaultValues=[u'a']))
+    backend.group_createObjects(HostGroup(id=u'group1'))
+    backend.auditSoftware_createObjects(
+        AuditSoftware(name=u'software', version=u'1.0', subVersion=u'', language=u'', architecture=u'x64')
+    )
+
+    for depot in depots:
+        backend.productOnDepot_createObjects(
+            ProductOnDepot(
+                productId=product.id, productType=product.getType(),
+                productVersion=product.productVersion,
+                packageVersion=product.packageVersion, depotId=depot.id
+            )
+        )
+
+    for host in depots + clients:
+        backend.configState_createObjects(ConfigState(configId=u'config1', objectId=host.id, values=[u'b']))
+        backend.productPropertyState_createObjects(
+            ProductPropertyState(productId=product.id, propertyId=u'property1', objectId=host.id, values=[u'b'])
+        )
+        backend.objectToGroup_createObjects(ObjectToGroup(groupType=u'HostGroup', groupId=u'group1', objectId=host.id))
+
+    for client in clients:
+        backend.productOnClient_createObjects(
+            ProductOnClient(
+                productId=product.id, productType=product.getType(),
+                productVersion=product.productVersion,
+                packageVersion=product.packageVersion, clientId=client.id,
+                installationStatus=u'installed'
+            )
+        )
+        backend.auditSoftwareOnClient_createObjects(
+            AuditSoftwareOnClient(
+                name=u'software', version=u'1.0', subVersion=u'', language=u'',
+                architecture=u'x64', clientId=client.id
+            )
+        )
+
+    remainingIds = [depots[1].id, clients[2].id]
+    remainingData = getDependentData(backend, remainingIds)
+    assert all(remainingData.values())
+
+    backend.host_deleteObjects([depots[0], clients[0], clients[1]])
+
+    assert set(remainingIds) == set(backend.host_getIdents(returnType='unicode', id=[host.id for host in depots + clients]))
+    deletedIds = [depots[0].id, clients[0].id, clients[1].id]
+    assert not any(getDependentData(backend, deletedIds).values())
+
+    for kind, objects in getDependentData(backend, remainingIds).items():
+        assert len(remainingData[kind]) == len(objects), kind
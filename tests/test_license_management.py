@@ -326,3 +326,16 @@ def createLicensePool(backend):
 		(licensePool1, licensePool2),
 		products
 	)
+
+
+def testDeletingClientsFreesTheirLicenses(licenseManagementBackend):
+	backend = licenseManagementBackend
+	licenseOnClients, _, _, _, softwareLicenses, _, clients = createLicenseOnClients(backend)
+	boundLicense = [softwareLicense for softwareLicense in softwareLicenses if softwareLicense.boundToHost][0]
+
+	backend.host_deleteObjects(clients[:2])
+
+	assert not backend.licenseOnClient_getObjects()
+	softwareLicense = backend.softwareLicense_getObjects(id=boundLicense.id)[0]
+	assert softwareLicense.boundToHost is None
+	assert len(softwareLicenses) == len(backend.softwareLicense_getObjects())
@@ -24,13 +24,20 @@ Testing OPSI.Objects
 
 from __future__ import absolute_import, print_function
 
+import copy
+import pickle
+import sys
+import time
+
 import pytest
 
-from OPSI.Object import (AuditHardwareOnHost, BoolProductProperty, Host,
-    LocalbootProduct, OpsiConfigserver, OpsiDepotserver, Product,
-    ProductDependency, ProductProperty, ProductPropertyState,
-    UnicodeConfig, UnicodeProductProperty,
-    getPossibleClassAttributes, mandatoryConstructorArgs)
+from OPSI.Object import (AuditHardwareOnHost, AuditSoftwareOnClient,
+    BoolProductProperty, Host, LocalbootProduct, OpsiClient, OpsiConfigserver,
+    OpsiDepotserver, Product, ProductDependency, ProductOnClient,
+    ProductProperty, ProductPropertyState, UnicodeConfig,
+    UnicodeProductProperty, getObjectClass, getPossibleClassAttributes,
+    mandatoryConstructorArgs)
+from OPSI.Util import deserialize
 
 from .helpers import cleanMandatoryConstructorArgsCache
 
@@ -409,3 +416,130 @@ def testProductPropertyStateShowSelectedValues(testValues):
     assert repr(testValues) in r
     assert r.startswith('<')
     assert r.endswith('>')
+
+
+@pytest.fixture(params=[
+    lambda: OpsiClient(id='client1.test.invalid', description='desc'),
+    lambda: ProductOnClient(productId='product1', productType='LocalbootProduct', clientId='client1.test.invalid', actionRequest='setup'),
+    lambda: AuditHardwareOnHost(hostId='client1.test.invalid', hardwareClass='COMPUTER_SYSTEM', name='computer', vendorId='abcd'),
+], ids=['OpsiClient', 'ProductOnClient', 'AuditHardwareOnHost'])
+def someObject(request):
+    return request.param()
+
+
+@pytest.mark.parametrize("protocol", [0, 1, 2])
+def testPicklingObjects(someObject, protocol):
+    restored = pickle.loads(pickle.dumps(someObject, protocol))
+
+    assert someObject.__class__ == restored.__class__
+    assert someObject.toHash() == restored.toHash()
+
+
+def testCopyingObjects(someObject):
+    copied = copy.copy(someObject)
+    assert someObject.toHash() == copied.toHash()
+
+    copied.setDefaults()
+    assert someObject.toHash() != copied.toHash()
+
+
+def testHashOnlyContainsAssignedAttributes():
+    productOnClient = ProductOnClient(productId='product1', productType='LocalbootProduct', clientId='client1.test.invalid')
+    assert '_isGeneratedDefault' not in productOnClient.toHash()
+
+    productOnClient.setGeneratedDefault(True)
+    assert productOnClient.toHash()['_isGeneratedDefault']
+    assert productOnClient.isGeneratedDefault()
+
+
+def testUpdatingObjectsWithSlots():
+    client = OpsiClient(id='client1.test.invalid', description='desc', notes='notes')
+    client.update(OpsiClient(id='client1.test.invalid', description='new'), updateWithNoneValues=False)
+    assert 'new' == client.description
+    assert 'notes' == client.notes
+
+    client.emptyValues()
+    assert client.description is None
+    assert 'client1.test.invalid' == client.id
+
+
+def testObjectsHaveNoInstanceDict():
+    assert not hasattr(OpsiClient(id='client1.test.invalid'), '__dict__')
+    assert not hasattr(ProductOnClient(productId='product1', productType='LocalbootProduct', clientId='client1.test.invalid'), '__dict__')
+
+
+@pytest.mark.benchmark
+def testBenchmarkingMemoryFootprint():
+    """
+    Show the memory used by the audit software of clients.
+
+    The footprint of an object with an instance dict is estimated
+    from the size of a dict with the same attributes.
+    """
+    objectCount = 1000000
+    auditSoftwareOnClient = AuditSoftwareOnClient(
+        name='software', version='1.0', subVersion='', language='de',
+        architecture='x64', clientId='client1.test.invalid'
+    )
+    auditSoftwareOnClient.setDefaults()
+
+    slotSize = sys.getsizeof(auditSoftwareOnClient)
+    attributes = {}
+    for (attribute, value) in auditSoftwareOnClient.toHash().items():
+        if attribute != 'type':
+            attributes[attribute] = value
+    dictSize = sys.getsizeof(object()) + sys.getsizeof(attributes)
+
+    print(
+        "Footprint of {0} AuditSoftwareOnClient objects: "
+        "{1:.1f} MiB with slots, {2:.1f} MiB with instance dicts".format(
+            objectCount,
+            slotSize * objectCount / 1048576.0,
+            dictSize * objectCount / 1048576.0
+        )
+    )
+    assert slotSize < dictSize
+
+
+@pytest.mark.parametrize("klass", [OpsiClient, ProductOnClient, AuditHardwareOnHost, LocalbootProduct])
+def testGettingObjectClassByName(klass):
+    assert klass is getObjectClass(klass.__name__)
+
+
+@pytest.mark.parametrize("name", ['NotValid', 'Logger', 'forceInt', None])
+def testGettingObjectClassFailsForOtherNames(name):
+    with pytest.raises(ValueError):
+        getObjectClass(name)
+
+
+def testCreatingObjectFromHashIgnoresUnknownKeys():
+    client = OpsiClient.fromHash({
+        'type': 'OpsiClient',
+        'id': 'client1.test.invalid',
+        'unknown': 'value',
+    })
+
+    assert 'client1.test.invalid' == client.id
+    assert 'unknown' not in client.toHash()
+
+
+@pytest.mark.benchmark
+def testBenchmarkingDeserialization():
+    objectCount = 100000
+    hashes = [
+        ProductOnClient(
+            productId='product{0}'.format(index % 100),
+            productType='LocalbootProduct',
+            clientId='client{0}.test.invalid'.format(index),
+            actionRequest='setup'
+        ).toHash()
+        for index in range(objectCount)
+    ]
+
+    start = time.time()
+    objects = deserialize(hashes)
+    duration = time.time() - start
+
+    print("Deserializing {0} objects took {1:.3f}s".format(objectCount, duration))
+    assert objectCount == len(objects)
+    assert all(isinstance(obj, ProductOnClient) for obj in objects)
@@ -25,6 +25,7 @@ from __future__ import absolute_import, print_function
 import pytest
 
 from OPSI.Service.JsonRpc import JsonRpc
+from OPSI.Util import EncodedJson, fromJson, iterJson
 
 from .helpers import mock
 
@@ -105,6 +106,26 @@ def testExecutingMethodOnInstance():
 	assert not response['error']
 
 
+def testGeneratedResultsAreEncodedInExecution():
+	class TestInstance:
+		def testMethod(self):
+			for number in range(3):
+				yield mock.Mock(serialize=mock.Mock(return_value={'number': number}))
+
+	j = JsonRpc(
+		instance=TestInstance(),
+		interface=[{"name": "testMethod", "keywords": []}],
+		rpc={"id": 42, "method": "testMethod"}
+	)
+	j.execute()
+
+	assert not j.exception
+	assert isinstance(j.result, EncodedJson)
+
+	response = fromJson(u''.join(iterJson(j.getResponse())))
+	assert [{'number': 0}, {'number': 1}, {'number': 2}] == response['result']
+
+
 def testRequiringValidMethod():
 	j = JsonRpc(None, [], {"id": 1, "method": "foo"})
 	j.execute()
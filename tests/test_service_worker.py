@@ -23,6 +23,9 @@ Testing the workers.
 """
 
 import gzip
+import json
+import os
+import time
 import zlib
 
 try:
@@ -32,8 +35,10 @@ except ImportError:
 
 import pytest
 
+from OPSI.Exceptions import OpsiBadRpcError, OpsiRequestTooLargeError
 from OPSI.Service.Worker import WorkerOpsi, WorkerOpsiJsonRpc
-from OPSI.Util.HTTP import gzipEncode, deflateEncode
+from OPSI.Util import EncodedJson
+from OPSI.Util.HTTP import deflateEncode, gzipDecode, gzipEncode
 
 
 class FakeHeader(object):
@@ -71,6 +76,12 @@ class FakeRequest(object):
 	def __init__(self, headers=None):
 		self.headers = headers or FakeHeader()
 		self.method = 'POST'
+		self.stream = None
+
+
+class FakeStream(object):
+	def __init__(self, length=None):
+		self.length = length
 
 
 class FakeRPC(object):
@@ -148,6 +159,18 @@ def testHandlingSingleResultConsistingOfList():
 	assert '["Eins", "Zwei", "Drei"]' == str(result.stream.read())
 
 
+def testHandlingEncodedResults():
+	"""
+	Results that already are JSON must be embedded as they are.
+	"""
+	worker = WorkerOpsiJsonRpc(service=None, request=FakeRequest(), resource=None)
+	worker._rpcs = [FakeRPC(EncodedJson(u'["Eins", "Zwei"]')), FakeRPC(u"Drei")]
+
+	result = worker._generateResponse(None)
+	assert 200 == result.code
+	assert '[["Eins", "Zwei"], "Drei"]' == str(result.stream.read())
+
+
 def testCompressingResponseDataWithGzip():
 	"""
 	Responding with data compressed by gzip.
@@ -270,3 +293,121 @@ def testDecodingCallQuery(contentEncoding, compressor):
 	worker.query = compressor("Test 1234")
 	worker._decodeQuery(None)
 	assert u'Test 1234' == worker.query
+
+
+def getPostingWorker(contentEncoding=None, length=None):
+	headers = {"content-type": FakeMediaType("application/json")}
+	if contentEncoding:
+		headers['content-encoding'] = [contentEncoding]
+
+	request = FakeRequest(headers=FakeHeader(headers))
+	request.stream = FakeStream(length)
+	return WorkerOpsi(service=None, request=request, resource=None)
+
+
+def postInChunks(worker, data, chunkSize=65536):
+	worker._startReadingPostData()
+	for index in range(0, len(data), chunkSize):
+		worker._handlePostData(data[index:index + chunkSize])
+	worker._finishReadingPostData(None)
+	worker._decodeQuery(None)
+
+
+@pytest.mark.parametrize("contentEncoding, compressor", [
+	["gzip", gzipEncode],
+	["deflate", deflateEncode],
+	[None, lambda x: x],
+])
+def testDecompressingPostDataWhileReading(contentEncoding, compressor):
+	query = json.dumps([{"id": index, "method": "backend_info", "params": []} for index in range(1000)])
+
+	worker = getPostingWorker(contentEncoding)
+	postInChunks(worker, compressor(query), chunkSize=100)
+
+	assert query == worker.query
+	assert isinstance(worker.query, unicode)
+
+
+@pytest.mark.parametrize("contentEncoding, compressor", [
+	["gzip", gzipEncode],
+	["deflate", deflateEncode],
+	[None, lambda x: x],
+])
+def testRefusingTooLargePostData(contentEncoding, compressor):
+	worker = getPostingWorker(contentEncoding)
+	worker.maxQuerySize = 1000
+
+	with pytest.raises(OpsiRequestTooLargeError):
+		postInChunks(worker, compressor('x' * 1001))
+
+	worker = getPostingWorker(contentEncoding)
+	worker.maxQuerySize = 1000
+	postInChunks(worker, compressor('x' * 1000))
+	assert 'x' * 1000 == worker.query
+
+
+def testRefusingPostDataByContentLength():
+	worker = getPostingWorker(length=1001)
+	worker.maxQuerySize = 1000
+
+	with pytest.raises(OpsiRequestTooLargeError):
+		worker._startReadingPostData()
+
+
+def testHighlyCompressedPostDataIsNotDecompressedCompletely():
+	worker = getPostingWorker('gzip')
+	worker.maxQuerySize = 1024 * 1024
+	data = gzipEncode('\0' * 100 * 1024 * 1024)
+
+	worker._startReadingPostData()
+	with pytest.raises(OpsiRequestTooLargeError):
+		worker._handlePostData(data)
+
+	assert worker._querySize <= worker.maxQuerySize + 1
+
+
+def testRefusingInvalidCompressedPostData():
+	worker = getPostingWorker('gzip')
+
+	with pytest.raises(OpsiBadRpcError):
+		postInChunks(worker, 'not compressed at all')
+
+
+@pytest.mark.benchmark
+def testBenchmarkReadingLargeCompressedBatch():
+	query = json.dumps([
+		{
+			"id": index,
+			"method": "auditHardwareOnHost_setObsolete",
+			"params": [{
+				"hostId": "client.test.invalid",
+				"hardwareClass": "COMPUTER_SYSTEM",
+				"serialNumber": os.urandom(32).encode('hex'),
+			}],
+		}
+		for index in range(100000)
+	])
+	data = gzipEncode(query)
+	chunkSize = 4096
+
+	# Collecting the body as done before
+	worker = getPostingWorker('gzip')
+	worker.query = ''
+	start = time.time()
+	for index in range(0, len(data), chunkSize):
+		worker.query += data[index:index + chunkSize]
+	oldQuery = gzipDecode(worker.query)
+	concatenating = time.time() - start
+
+	worker = getPostingWorker('gzip')
+	start = time.time()
+	postInChunks(worker, data, chunkSize)
+	streaming = time.time() - start
+
+	print(
+		"Reading {0:d} bytes compressed to {1:d} bytes took {2:.3f}s "
+		"concatenating and {3:.3f}s streaming".format(
+			len(query), len(data), concatenating, streaming
+		)
+	)
+	assert oldQuery == worker.query
@@ -25,6 +25,7 @@ Backend mixin for testing software / hardware audit functionality.
 
 from __future__ import absolute_import
 
+from OPSI.Exceptions import BackendBadValueError
 from OPSI.Object import (AuditSoftware, AuditSoftwareOnClient,
     AuditHardware, AuditHardwareOnHost, AuditSoftwareToLicensePool)
 
@@ -653,3 +654,198 @@ def fillBackendWithAuditHardwareOnHosts(backend):
     backend.auditHardwareOnHost_createObjects(auditHardwareOnHosts)
 
     return auditHardwareOnHosts, auditHardwares, clients
+
+
+
+def getIteratingMethod(backend, methodName):
+    if not hasattr(backend, methodName):
+        pytest.skip("{0} is not supported by the backend.".format(methodName))
+
+    return getattr(backend, methodName)
+
+
+def assertSameObjects(expected, objects):
+    objects = list(objects)
+    assert len(expected) == len(objects)
+    for obj in objects:
+        assert obj in expected
+
+
+def testIteratingOverAuditSoftwareOnClients(auditDataBackend):
+    iterObjects = getIteratingMethod(auditDataBackend, 'auditSoftwareOnClient_iterObjects')
+    asoc, _, clients = fillBackendWithAuditSoftwareOnClient(auditDataBackend)
+
+    result = iterObjects()
+    assert not isinstance(result, list)
+    assertSameObjects(asoc, result)
+
+    expected = auditDataBackend.auditSoftwareOnClient_getObjects(clientId=clients[0].id)
+    assert expected
+    assertSameObjects(expected, iterObjects(clientId=clients[0].id))
+
+
+def testIteratingOverAuditHardwareOnHosts(auditDataBackend):
+    iterObjects = getIteratingMethod(auditDataBackend, 'auditHardwareOnHost_iterObjects')
+    auditHardwareOnHosts, _, clients = fillBackendWithAuditHardwareOnHosts(auditDataBackend)
+
+    result = iterObjects()
+    assert not isinstance(result, list)
+    assertSameObjects(auditDataBackend.auditHardwareOnHost_getObjects(), result)
+
+    expected = auditDataBackend.auditHardwareOnHost_getObjects(hostId=clients[0].id, hardwareClass='COMPUTER_SYSTEM')
+    assert expected
+    assertSameObjects(expected, iterObjects(hostId=clients[0].id, hardwareClass='COMPUTER_SYSTEM'))
+
+
+def getInventory(backend, hostId):
+    return {
+        (ahoh.hardwareClass, ahoh.serialNumber): ahoh
+        for ahoh in backend.auditHardwareOnHost_getObjects(hostId=hostId)
+    }
+
+
+def getReportedHardware(auditHardwareOnHost, **changes):
+    "Get the hardware as reported by a client without the seen attributes."
+    values = auditHardwareOnHost.toHash()
+    for attribute in ('firstseen', 'lastseen', 'state'):
+        del values[attribute]
+    values.update(changes)
+
+    return AuditHardwareOnHost.fromHash(values)
+
+
+@pytest.fixture
+def inventoryBackend(auditDataBackend):
+    auditHardwareOnHosts, _, clients = fillBackendWithAuditHardwareOnHosts(auditDataBackend)
+    for ahoh in auditHardwareOnHosts:
+        ahoh.setFirstseen(u'2019-01-01 00:00:00')
+        ahoh.setLastseen(u'2019-01-02 00:00:00')
+        ahoh.setState(1)
+    # The extended backend would set lastseen to the current time.
+    auditDataBackend._backend.auditHardwareOnHost_updateObjects(auditHardwareOnHosts)
+
+    return auditDataBackend, auditHardwareOnHosts, clients
+
+
+def testUpdatingInventoryMarksSeenHardware(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    client1 = clients[0]
+    inventory = [
+        getReportedHardware(ahoh)
+        for ahoh in auditHardwareOnHosts
+        if ahoh.hostId == client1.id
+    ]
+
+    backend.auditHardwareOnHost_updateInventory(client1.id, inventory)
+
+    stored = getInventory(backend, client1.id)
+    assert 2 == len(stored)
+    for ahoh in stored.values():
+        assert u'2019-01-01 00:00:00' == ahoh.firstseen
+        assert ahoh.lastseen > u'2019-01-02 00:00:00'
+        assert 1 == ahoh.state
+
+
+def testUpdatingInventoryAddsNewAndMarksVanishedHardware(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    client1 = clients[0]
+    computerSystem, baseBoard = [ahoh for ahoh in auditHardwareOnHosts if ahoh.hostId == client1.id]
+    changedBaseBoard = getReportedHardware(baseBoard, serialNumber=u'new-serial')
+
+    backend.auditHardwareOnHost_updateInventory(client1.id, [computerSystem, changedBaseBoard])
+
+    stored = getInventory(backend, client1.id)
+    assert 3 == len(stored)
+    assert 1 == stored[(u'COMPUTER_SYSTEM', computerSystem.serialNumber)].state
+
+    vanished = stored[(u'BASE_BOARD', baseBoard.serialNumber)]
+    assert 0 == vanished.state
+    assert u'2019-01-01 00:00:00' == vanished.firstseen
+    assert u'2019-01-02 00:00:00' == vanished.lastseen
+
+    added = stored[(u'BASE_BOARD', u'new-serial')]
+    assert 1 == added.state
+    assert added.firstseen > u'2019-01-02 00:00:00'
+    assert added.lastseen > u'2019-01-02 00:00:00'
+
+    backend.auditHardwareOnHost_updateInventory(client1.id, [computerSystem, baseBoard])
+
+    stored = getInventory(backend, client1.id)
+    assert 3 == len(stored)
+    assert 1 == stored[(u'BASE_BOARD', baseBoard.serialNumber)].state
+    assert u'2019-01-01 00:00:00' == stored[(u'BASE_BOARD', baseBoard.serialNumber)].firstseen
+    assert 0 == stored[(u'BASE_BOARD', u'new-serial')].state
+
+
+def testUpdatingInventoryOnlyChangesTheGivenHost(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    before = backend.auditHardwareOnHost_getObjects(hostId=[client.id for client in clients[1:]])
+
+    backend.auditHardwareOnHost_updateInventory(clients[0].id, [])
+
+    assert all(0 == ahoh.state for ahoh in backend.auditHardwareOnHost_getObjects(hostId=clients[0].id))
+    after = backend.auditHardwareOnHost_getObjects(hostId=[client.id for client in clients[1:]])
+    assertSameObjects(before, after)
+    assert all(1 == ahoh.state for ahoh in after)
+
+
+def testUpdatingInventoryIgnoresDuplicates(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    client1 = clients[0]
+    newHardware = AuditHardwareOnHost(
+        hostId=client1.id, hardwareClass='BASE_BOARD',
+        vendor=u'vendor', model=u'model', serialNumber=u'duplicate'
+    )
+    inventory = [ahoh for ahoh in auditHardwareOnHosts if ahoh.hostId == client1.id]
+
+    backend.auditHardwareOnHost_updateInventory(client1.id, inventory + inventory + [newHardware, newHardware.clone()])
+
+    assert 3 == len(backend.auditHardwareOnHost_getObjects(hostId=client1.id))
+
+
+def testUpdatingInventoryRequiresHardwareOfTheHost(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    otherHardware = [ahoh for ahoh in auditHardwareOnHosts if ahoh.hostId == clients[1].id]
+
+    with pytest.raises(BackendBadValueError):
+        backend.auditHardwareOnHost_updateInventory(clients[0].id, otherHardware)
+
+    assert all(1 == ahoh.state for ahoh in backend.auditHardwareOnHost_getObjects())
+
+
+def testUploadingInventoryMarksSeenNewAndVanishedHardware(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    client1 = clients[0]
+    computerSystem, baseBoard = [ahoh for ahoh in auditHardwareOnHosts if ahoh.hostId == client1.id]
+    changedBaseBoard = getReportedHardware(baseBoard, serialNumber=u'new-serial')
+
+    backend.auditHardwareOnHost_setObsolete(client1.id)
+    backend.auditHardwareOnHost_updateObjects([getReportedHardware(computerSystem), changedBaseBoard])
+
+    stored = getInventory(backend, client1.id)
+    assert 3 == len(stored)
+    seen = stored[(u'COMPUTER_SYSTEM', computerSystem.serialNumber)]
+    assert 1 == seen.state
+    assert u'2019-01-01 00:00:00' == seen.firstseen
+    assert seen.lastseen > u'2019-01-02 00:00:00'
+
+    vanished = stored[(u'BASE_BOARD', baseBoard.serialNumber)]
+    assert 0 == vanished.state
+    assert u'2019-01-02 00:00:00' == vanished.lastseen
+
+    assert 1 == stored[(u'BASE_BOARD', u'new-serial')].state
+
+
+def testUpdatingHardwareKeepsOtherHardwareOfTheHost(inventoryBackend):
+    backend, auditHardwareOnHosts, clients = inventoryBackend
+    client1 = clients[0]
+    computerSystem, baseBoard = [ahoh for ahoh in auditHardwareOnHosts if ahoh.hostId == client1.id]
+
+    backend.auditHardwareOnHost_updateObjects([getReportedHardware(computerSystem)])
+
+    stored = getInventory(backend, client1.id)
+    assert 2 == len(stored)
+    assert stored[(u'COMPUTER_SYSTEM', computerSystem.serialNumber)].lastseen > u'2019-01-02 00:00:00'
+    unchanged = stored[(u'BASE_BOARD', baseBoard.serialNumber)]
+    assert 1 == unchanged.state
+    assert u'2019-01-02 00:00:00' == unchanged.lastseen
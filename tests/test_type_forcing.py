@@ -32,7 +32,7 @@ from OPSI.Types import (args, forceActionRequest, forceActionProgress,
 	forceFilename, forceFloat, forceFqdn, forceGroupType, forceHardwareAddress,
 	forceHostId, forceInstallationStatus, forceInt, forceIntList, forceIPAddress,
 	forceNetworkAddress, forceLanguageCode, forceList, forceObjectClass,
-	forceOct, forceOpsiHostKey, forceOpsiTimestamp,	forcePackageVersion,
+	forceObjectClassList, forceOct, forceOpsiHostKey, forceOpsiTimestamp,	forcePackageVersion,
 	forceProductId, forceProductType, forceProductVersion, forceTime,
 	forceUnicode, forceUnicodeList, forceUnicodeLowerList, forceUniqueList,
 	forceUrl)
@@ -570,6 +570,61 @@ def testForceUniqueListDoesNotChangeOrder():
 	assert [2, 1, 3, 5, 4] == forceUniqueList([2, 2, 1, 3, 5, 4, 1])
 
 
+def testForceUniqueListWithMixedEntries():
+	client = OpsiClient(id='client1.test.invalid')
+	sameClient = OpsiClient(id='client1.test.invalid')
+
+	assert [u'a', 1, [1], client, None] == forceUniqueList(
+		[u'a', 'a', 1, 1.0, [1], [1], client, sameClient, None, None]
+	)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [10000, 100000])
+def testBenchmarkingForceUniqueList(count):
+	values = [u'value{0}'.format(index % (count // 2)) for index in range(count)]
+
+	start = time.time()
+	uniqueValues = forceUniqueList(values)
+	duration = time.time() - start
+
+	print("forceUniqueList with {0} entries took {1:.3f}s".format(count, duration))
+	assert values[:count // 2] == uniqueValues
+
+
+def testForceObjectClassListKeepsInstances(opsiClient):
+	clients = [opsiClient, OpsiClient(id='test2.test.invalid')]
+	assert clients == forceObjectClassList(clients, Host)
+	assert clients == forceObjectClassList(tuple(clients), OpsiClient)
+
+
+def testForceObjectClassListConvertsHashesAndJson(opsiClient):
+	clients = forceObjectClassList([opsiClient, opsiClient.toHash(), opsiClient.toJson()], OpsiClient)
+	assert 3 == len(clients)
+	assert all(isinstance(client, OpsiClient) for client in clients)
+
+	clients = forceObjectClassList('[{0}]'.format(opsiClient.toJson()), OpsiClient)
+	assert [opsiClient] == clients
+
+
+def testForceObjectClassListFailsForOtherClasses(opsiClient):
+	with pytest.raises(ValueError):
+		forceObjectClassList([opsiClient], ProductOnClient)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [10000, 100000])
+def testBenchmarkingForceObjectClassList(count):
+	clients = [OpsiClient(id='client{0}.test.invalid'.format(index)) for index in range(count)]
+
+	start = time.time()
+	forcedClients = forceObjectClassList(clients, Host)
+	duration = time.time() - start
+
+	print("forceObjectClassList with {0} objects took {1:.3f}s".format(count, duration))
+	assert clients == forcedClients
+
+
 def testArgsDecoratorArgumentsDefaultToNone():
 
 	@args("somearg", "someOtherArg")
@@ -40,10 +40,10 @@ from OPSI.Util import (
 	decryptWithPrivateKeyFromPEMFile,
 	encryptWithPublicKeyFromX509CertificatePEMFile, findFiles, formatFileSize,
 	fromJson, generateOpsiHostKey, getfqdn, ipAddressInNetwork,
-	isRegularExpressionPattern, librsyncDeltaFile, librsyncSignature,
+	isRegularExpressionPattern, iterJson, librsyncDeltaFile, librsyncSignature,
 	librsyncPatchFile, md5sum, objectToBash, objectToBeautifiedText,
-	objectToHtml, randomString, removeUnit, toJson)
-from OPSI.Util import BlowfishError
+	objectToHtml, randomString, removeUnit, toJson, getVersionKey, VersionKey)
+from OPSI.Util import BlowfishError, EncodedJson
 from OPSI.Util.Config import getGlobalConfig
 from OPSI.Util.Task.Certificate import createCertificate
 
@@ -524,6 +524,75 @@ def testPackageVersionsAreComparedAswell(v1, operator, v2):
 	assert compareVersions(v1, operator, v2)
 
 
+@pytest.mark.parametrize("v1, operator, v2", [
+	('1.0', '<', '1.0a'),
+	('1.0a1', '<', '1.0a'),
+	('1.0a', '<', '1.0b'),
+	('1.0a2', '<', '1.0a10'),
+	('1.2', '<', '1.a'),
+	('1.10', '>', '1.9'),
+	('1.01', '==', '1.1'),
+	('1.0', '<', '1.0.'),
+	('1.0b', '>', '1.0.1'),
+	('10a2b', '<', '10a2c'),
+	('2.0', '==', '2'),
+	('2', '>', '1.a'),
+	('1.0-1', '>', '1.0'),
+	('1.0-0', '==', '1.0'),
+	('1.0-a', '>', '1.0-1'),
+])
+def testComparingSplitsLettersAndNumbers(v1, operator, v2):
+	assert compareVersions(v1, operator, v2)
+
+
+@pytest.mark.parametrize("version", ['1.0-2', u'1.0-2', ' 1.0-2 ', '1.0.0-2.0', '1-2~foo'])
+def testVersionKeysOfEqualVersionsAreEqual(version):
+	assert getVersionKey(version) == getVersionKey('1.0-2')
+	assert hash(getVersionKey(version)) == hash(getVersionKey('1.0-2'))
+
+
+def testVersionKeyOrdering():
+	assert getVersionKey('1.0') < getVersionKey('1.1')
+	assert getVersionKey('1.0') <= getVersionKey('1.0-0')
+	assert getVersionKey('2.0-1') > getVersionKey('2.0')
+	assert getVersionKey('2.0-1') >= getVersionKey('2.0')
+	assert getVersionKey('2.0') != getVersionKey('2.1')
+
+
+def testSortingWithVersionKey():
+	versions = ['1.10', '1.a', '1.2-3', '1.2', '1.2a', '0.9', '1.2-10']
+	assert ['0.9', '1.2', '1.2-3', '1.2-10', '1.2a', '1.10', '1.a'] == sorted(versions, key=getVersionKey)
+
+
+def testVersionKeysAreCached():
+	assert getVersionKey('4.1.2-7') is getVersionKey('4.1.2-7')
+
+
+def testGettingVersionKeyFromVersionKey():
+	versionKey = getVersionKey('1.0')
+	assert versionKey is getVersionKey(versionKey)
+
+
+def testVersionKeyKeepsVersion():
+	versionKey = VersionKey('4.1-2~beta')
+	assert '4.1' == versionKey.version.product
+	assert '2' == versionKey.version.package
+
+
+@pytest.mark.parametrize("value", ['', '1.0 beta', 'abc-1.2.3-4', '1.0+1'])
+def testVersionKeyFailsOnInvalidVersion(value):
+	with pytest.raises(ValueError):
+		getVersionKey(value)
+
+
+@pytest.mark.parametrize("v1, v2", [
+	(True, '1'),
+	(1, 'True'),
+])
+def testVersionKeysOfNonStringsAreDistinguished(v1, v2):
+	assert not compareVersions(v1, '==', v2)
+
+
 @pytest.fixture
 def globalConfigTestFile():
 	return os.path.join(
@@ -829,6 +898,55 @@ def testSerialisingTuples():
 	assert '[1, 2, 3, 4]' == toJson(values)
 
 
+@pytest.mark.parametrize("value", [
+	[1, 2.3, u"a", None, True],
+	{'a': [1, {'b': u'\xe4'}], 1: set('c'), None: (4, 5)},
+	[OpsiClient(id='foo.test.invalid'), {'client': OpsiClient(id='bar.test.invalid')}],
+	u'text',
+])
+def testIteratingJsonGivesSameTextAsToJson(value):
+	assert toJson(value) == u''.join(iterJson(value))
+
+
+def testIteratingJsonEncodesGeneratorsElementByElement():
+	encoded = []
+
+	class Element(object):
+		def __init__(self, number):
+			self.number = number
+
+		def serialize(self):
+			encoded.append(self.number)
+			return {'number': self.number}
+
+	def gen():
+		for number in range(3):
+			yield Element(number)
+			assert [number] == encoded[-1:]
+
+	text = u''.join(iterJson({'result': gen()}))
+
+	assert u'{"result": [{"number": 0}, {"number": 1}, {"number": 2}]}' == text
+
+
+def testIteratingJsonEmbedsEncodedJson():
+	text = u''.join(iterJson({'result': EncodedJson(u'[1, 2]')}))
+
+	assert [1, 2] == fromJson(text)['result']
+
+
+def testIteratingJsonEncodesPlainDataAtOnce():
+	value = {'result': [{'id': 1, 'values': [1, 2]}, {'id': 2}]}
+
+	assert [toJson(value)] == list(iterJson(value))
+
+	def gen():
+		yield {'values': [1, 2]}
+
+	parts = list(iterJson({'result': gen()}))
+	assert u'{"values": [1, 2]}' in parts
+
+
 def testFindFilesWithEmptyDirectory(tempDir):
 	assert [] == findFiles(tempDir)
 
@@ -26,10 +26,12 @@ from __future__ import absolute_import
 import os
 import pytest
 import random
+import time
 
 from OPSI.Util import findFiles, md5sum
 from OPSI.Util.File.Opsi import (
-	BackendDispatchConfigFile, FileInfo, HostKeyFile, OpsiConfFile,
+	BackendDispatchConfigFile, FileInfo, HostKeyFile, IndexedHostKeyFile,
+	OpsiConfFile,
 	PackageContentFile, PackageControlFile, parseFilename,
 )
 
@@ -526,6 +528,140 @@ def testHostKeyFileParsingSkippingInvalidEntries(emptyFile, hostKeyEntries):
 	hkf.parse()
 
 
+def readHostKeys(filename):
+	return HostKeyFile(filename).parse()
+
+
+def getHostKey(number):
+	return '{0:032x}'.format(number)
+
+
+def testIndexedHostKeyFileIsReadableByHostKeyFile(emptyFile, hostKeyEntries):
+	hkf = IndexedHostKeyFile(emptyFile)
+	hkf.setOpsiHostKeys(dict(hostKeyEntries))
+
+	assert dict(hostKeyEntries) == readHostKeys(emptyFile)
+	assert dict(hostKeyEntries) == IndexedHostKeyFile(emptyFile).getOpsiHostKeys()
+
+
+def testIndexedHostKeyFileChangesLinesInPlace(emptyFile):
+	hkf = IndexedHostKeyFile(emptyFile)
+	hkf.setOpsiHostKey('client1.domain.test', getHostKey(1))
+	hkf.setOpsiHostKey('client2.domain.test', getHostKey(2))
+	hkf.setOpsiHostKey('client1.domain.test', getHostKey(3))
+	hkf.deleteOpsiHostKey('client2.domain.test')
+
+	with open(emptyFile) as f:
+		lines = f.read().splitlines()
+
+	assert 3 == len(lines)
+	assert all(line.startswith('#') for line in lines[:2])
+	assert 'client1.domain.test:{0}'.format(getHostKey(3)) == lines[2]
+	assert {'client1.domain.test': getHostKey(3)} == readHostKeys(emptyFile)
+	assert getHostKey(3) == hkf.getOpsiHostKey('client1.domain.test')
+	assert hkf.getOpsiHostKey('client2.domain.test') is None
+
+
+def testIndexedHostKeyFileNoticesChangesOfOthers(emptyFile):
+	hkf = IndexedHostKeyFile(emptyFile)
+	hkf.setOpsiHostKey('client1.domain.test', getHostKey(1))
+
+	IndexedHostKeyFile(emptyFile).setOpsiHostKey('client2.domain.test', getHostKey(2))
+	assert getHostKey(2) == hkf.getOpsiHostKey('client2.domain.test')
+
+	other = HostKeyFile(emptyFile)
+	other.deleteOpsiHostKey('client1.domain.test')
+	other.setOpsiHostKey('client3.domain.test', getHostKey(3))
+	other.generate()
+
+	assert {
+		'client2.domain.test': getHostKey(2),
+		'client3.domain.test': getHostKey(3),
+	} == hkf.getOpsiHostKeys()
+
+
+def testIndexedHostKeyFileIgnoresIncompleteLines(emptyFile):
+	with open(emptyFile, 'w') as f:
+		f.write('client1.domain.test:{0}\n'.format(getHostKey(1)))
+		f.write('client2.domain.test:{0}'.format(getHostKey(2)[:10]))
+
+	hkf = IndexedHostKeyFile(emptyFile)
+	assert {'client1.domain.test': getHostKey(1)} == hkf.getOpsiHostKeys()
+
+	hkf.setOpsiHostKey('client2.domain.test', getHostKey(2))
+	assert {
+		'client1.domain.test': getHostKey(1),
+		'client2.domain.test': getHostKey(2),
+	} == readHostKeys(emptyFile)
+
+
+def testIndexedHostKeyFileUsesLastValidLine(emptyFile):
+	with open(emptyFile, 'w') as f:
+		f.write('client1.domain.test:{0}\n'.format(getHostKey(1)))
+		f.write('client1.domain.test:{0}\n'.format(getHostKey(2)))
+
+	hkf = IndexedHostKeyFile(emptyFile)
+	assert getHostKey(2) == hkf.getOpsiHostKey('client1.domain.test')
+
+	hkf.deleteOpsiHostKey('client1.domain.test')
+	assert hkf.getOpsiHostKey('client1.domain.test') is None
+
+
+def testIndexedHostKeyFileIsCompacted(emptyFile):
+	hkf = IndexedHostKeyFile(emptyFile)
+	hostIds = ['client{0}.domain.test'.format(index) for index in range(10)]
+	for number in range(IndexedHostKeyFile.MIN_LINES_TO_COMPACT // len(hostIds) + 1):
+		hkf.setOpsiHostKeys(dict(
+			(hostId, getHostKey(number * len(hostIds) + index))
+			for (index, hostId) in enumerate(hostIds)
+		))
+
+	with open(emptyFile) as f:
+		lines = f.read().splitlines()
+
+	assert len(lines) < IndexedHostKeyFile.MIN_LINES_TO_COMPACT
+	assert not [line for line in lines if line.startswith('#')]
+
+	# Same order as written by HostKeyFile
+	hostKeys = sorted(hkf.getOpsiHostKeys().items(), key=lambda item: item[1])
+	assert ['{0}:{1}'.format(*item) for item in hostKeys] == lines
+
+
+def testIndexedHostKeyFileKeepsRightsWhenCompacting(emptyFile):
+	os.chmod(emptyFile, 0o640)
+	hkf = IndexedHostKeyFile(emptyFile)
+	hkf.setOpsiHostKey('client1.domain.test', getHostKey(1))
+	hkf.generate()
+
+	assert 0o640 == os.stat(emptyFile).st_mode & 0o777
+	assert {'client1.domain.test': getHostKey(1)} == readHostKeys(emptyFile)
+
+
+@pytest.mark.benchmark
+def testBenchmarkAddingHostKeys(emptyFile):
+	hostIds = ['client{0}.domain.test'.format(index) for index in range(500)]
+
+	start = time.time()
+	for (index, hostId) in enumerate(hostIds):
+		hkf = HostKeyFile(emptyFile)
+		hkf.setOpsiHostKey(hostId, getHostKey(index))
+		hkf.generate()
+	rewriting = time.time() - start
+
+	os.unlink(emptyFile)
+	hkf = IndexedHostKeyFile(emptyFile)
+	start = time.time()
+	for (index, hostId) in enumerate(hostIds):
+		hkf.setOpsiHostKey(hostId, getHostKey(index))
+	appending = time.time() - start
+
+	print(
+		"Adding {0} host keys took {1:.3f}s rewriting the file and "
+		"{2:.3f}s with the index".format(len(hostIds), rewriting, appending)
+	)
+	assert len(hostIds) == len(readHostKeys(emptyFile))
+
+
 @pytest.mark.parametrize("filename, expected", [
 	('sap_7.40.8-3.opsi', FileInfo('sap', '7.40.8-3')),
 	('sap_7.40.8-3.opsi.md5', FileInfo('sap', '7.40.8-3')),
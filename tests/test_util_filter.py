@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of python-opsi.
+# Copyright (C) 2019 uib GmbH <info@uib.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Testing the compiled filters of OPSI.Util.Filter.
+
+The results of the compiled filters are compared against the
+implementation that was used in `Backend._objectHashMatches` before.
+
+:license: GNU Affero General Public License version 3
+"""
+
+from __future__ import absolute_import
+
+import random
+import re
+import time
+
+import OPSI.Object
+from OPSI.Backend.Backend import Backend
+from OPSI.Exceptions import BackendError
+from OPSI.Types import forceUnicode, forceUnicodeList
+from OPSI.Util import compareVersions
+from OPSI.Util.Filter import compileFilter, objectHashMatches
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+
+def legacyObjectHashMatches(objHash, **filter):
+    "The filter implementation as it was before compiling filters."
+    for attribute, value in objHash.iteritems():
+        if not filter.get(attribute):
+            continue
+        matched = False
+
+        try:
+            filterValues = forceUnicodeList(filter[attribute])
+            if forceUnicodeList(value) == filterValues or forceUnicode(value) in filterValues:
+                matched = True
+            else:
+                for filterValue in filterValues:
+                    if attribute == 'type':
+                        Class = eval(filterValue, vars(OPSI.Object))
+                        for subClass in Class.subClasses:
+                            if subClass == value:
+                                matched = True
+                                break
+
+                        continue
+
+                    if isinstance(value, list):
+                        if filterValue in value:
+                            matched = True
+                            break
+
+                        continue
+                    elif value is None or isinstance(value, bool):
+                        continue
+                    elif isinstance(value, (float, long, int)) or re.search(r'^\s*([>=<]+)\s*([\d\.]+)', forceUnicode(filterValue)):
+                        operator = '=='
+                        v = forceUnicode(filterValue)
+                        match = re.search(r'^\s*([>=<]+)\s*([\d.]+)', filterValue)
+                        if match:
+                            operator = match.group(1)
+                            v = match.group(2)
+
+                        try:
+                            matched = compareVersions(value, operator, v)
+                            if matched:
+                                break
+                        except Exception:
+                            pass
+
+                        continue
+
+                    if '*' in filterValue and re.search(r'^%s$' % filterValue.replace('*', '.*'), value):
+                        matched = True
+                        break
+
+            if not matched:
+                return False
+        except Exception as err:
+            raise BackendError(
+                u"Testing match of filter {0!r} of attribute {1!r} with "
+                u"value {2!r} failed: {error}".format(
+                    filter[attribute], attribute, value, error=err
+                )
+            )
+
+    return True
+
+
+def evaluate(function, *args, **kwargs):
+    "Returns the result of `function` or the class of the raised exception."
+    try:
+        return function(*args, **kwargs)
+    except Exception as error:
+        return error.__class__
+
+
+_TYPES = [u'OpsiClient', u'OpsiDepotserver', u'OpsiConfigserver', u'Host',
+          u'LocalbootProduct', u'NetbootProduct', u'Product']
+_STRINGS = [u'a', u'ab', u'abc', u'client.test.invalid', u'1.0', u'2.0',
+            u'1.0.1', u'10', u'1.0-2', u'2.1a', u'installed', u'none', u'',
+            u'setup', u'a.b']
+_PATTERNS = [u'*', u'a*', u'*b', u'*.invalid', u'1.*', u'+*', u'a.*',
+             u'>=1.0', u'<2', u'> 1.0', u'==1.0', u'=1.0', u'<=10', u'>0.9.1']
+
+
+def randomValue(rand):
+    kind = rand.randint(0, 9)
+    if kind == 0:
+        return None
+    elif kind == 1:
+        return rand.choice([True, False])
+    elif kind == 2:
+        return rand.randint(0, 12)
+    elif kind == 3:
+        return [rand.choice(_STRINGS) for _ in range(rand.randint(0, 3))]
+    elif kind == 4:
+        return rand.choice(_TYPES)
+
+    return rand.choice(_STRINGS)
+
+
+def randomFilterValue(rand):
+    kind = rand.randint(0, 11)
+    if kind == 0:
+        return None
+    elif kind == 1:
+        return []
+    elif kind == 2:
+        return [None]
+    elif kind == 3:
+        return rand.choice([True, False, 0, 1, 5])
+    elif kind == 4:
+        return rand.choice(_PATTERNS)
+    elif kind == 5:
+        return [rand.choice(_PATTERNS + _STRINGS) for _ in range(rand.randint(1, 3))]
+    elif kind == 6:
+        return rand.choice(_TYPES)
+
+    return rand.choice(_STRINGS)
+
+
+def randomTypeFilterValue(rand):
+    values = [rand.choice(_TYPES + [u'Unknown']) for _ in range(rand.randint(1, 3))]
+    if len(values) == 1:
+        return values[0]
+    return values
+
+
+@pytest.mark.parametrize("seed", range(50))
+def testCompiledFilterMatchesLegacyImplementation(seed):
+    rand = random.Random(seed)
+    attributes = ['id', 'productVersion', 'state', 'values', 'description']
+
+    for _ in range(200):
+        objHash = {attribute: randomValue(rand) for attribute in attributes}
+        objHash['type'] = rand.choice(_TYPES)
+
+        filter = {}
+        for attribute in rand.sample(attributes, rand.randint(1, 3)):
+            filter[attribute] = randomFilterValue(rand)
+        if rand.random() < 0.3:
+            filter['type'] = randomTypeFilterValue(rand)
+
+        expected = evaluate(legacyObjectHashMatches, objHash, **filter)
+        assert expected == evaluate(compileFilter(filter), objHash), (objHash, filter)
+
+
+_ATTRIBUTES = ['id', 'productVersion', 'state', 'values', 'description']
+_TEXTS = st.text(alphabet=u'ab1.*<>=+ ', max_size=6)
+
+objectValues = st.one_of(
+    st.none(),
+    st.booleans(),
+    st.integers(min_value=0, max_value=12),
+    st.lists(st.one_of(st.sampled_from(_STRINGS), _TEXTS), max_size=3),
+    st.sampled_from(_TYPES),
+    st.sampled_from(_STRINGS),
+    _TEXTS,
+)
+filterValues = st.one_of(
+    st.none(),
+    st.sampled_from([True, False, 0, 1, 5]),
+    st.sampled_from(_PATTERNS + _STRINGS + _TYPES),
+    _TEXTS,
+    st.lists(st.one_of(st.none(), st.sampled_from(_PATTERNS + _STRINGS), _TEXTS), max_size=3),
+)
+objectHashes = st.fixed_dictionaries(
+    dict({attribute: objectValues for attribute in _ATTRIBUTES}, type=st.sampled_from(_TYPES))
+)
+filters = st.dictionaries(st.sampled_from(_ATTRIBUTES), filterValues, min_size=1, max_size=3)
+typeFilterValues = st.one_of(
+    st.sampled_from(_TYPES),
+    st.lists(st.sampled_from(_TYPES + [u'Unknown']), min_size=1, max_size=3),
+)
+
+
+@settings(max_examples=500, deadline=None, database=None)
+@given(objHash=objectHashes, filter=filters)
+def testCompiledFilterBehavesLikeLegacyImplementation(objHash, filter):
+    expected = evaluate(legacyObjectHashMatches, objHash, **filter)
+    assert expected == evaluate(compileFilter(filter), objHash)
+
+
+@settings(deadline=None, database=None)
+@given(objHash=objectHashes, filter=filters, typeFilter=typeFilterValues)
+def testCompiledTypeFilterBehavesLikeLegacyImplementation(objHash, filter, typeFilter):
+    filter = dict(filter, type=typeFilter)
+
+    expected = evaluate(legacyObjectHashMatches, objHash, **filter)
+    assert expected == evaluate(compileFilter(filter), objHash)
+
+
+@pytest.mark.parametrize("objHash, filter, expected", [
+    ({'id': u'client.test.invalid'}, {'id': u'*.invalid'}, True),
+    ({'id': u'client.test.invalid'}, {'id': u'client*'}, True),
+    ({'id': u'client.test.invalid'}, {'id': u'*.local'}, False),
+    ({'id': u'client.test.invalid'}, {'id': [u'a', u'client.test.invalid']}, True),
+    ({'id': u'client.test.invalid'}, {'id': None}, True),
+    ({'id': u'client.test.invalid'}, {'id': []}, True),
+    ({'id': u'client.test.invalid'}, {'notThere': u'x'}, True),
+    ({'productVersion': u'1.0'}, {'productVersion': u'>=0.9'}, True),
+    ({'productVersion': u'1.0'}, {'productVersion': u'<1.0'}, False),
+    ({'productVersion': u'1.0'}, {'productVersion': [u'<0.5', u'>0.9']}, True),
+    ({'state': 1}, {'state': 1}, True),
+    ({'state': 1}, {'state': u'>0'}, True),
+    ({'state': 0}, {'state': u'>0'}, False),
+    ({'state': None}, {'state': [None]}, True),
+    ({'values': [u'a', u'b']}, {'values': u'b'}, True),
+    ({'values': [u'a', u'b']}, {'values': [u'a', u'b']}, True),
+    ({'values': [u'a', u'b']}, {'values': u'c'}, False),
+    ({'locked': False}, {'locked': u'x'}, False),
+    ({'type': u'OpsiClient'}, {'type': u'Host'}, True),
+    ({'type': u'OpsiConfigserver'}, {'type': u'OpsiDepotserver'}, True),
+    ({'type': u'OpsiDepotserver'}, {'type': u'OpsiClient'}, False),
+    ({'type': u'LocalbootProduct'}, {'type': [u'OpsiClient', u'Product']}, True),
+    ({'id': u'a', 'type': u'OpsiClient'}, {'id': u'a', 'type': u'Host'}, True),
+    ({'id': u'a', 'type': u'OpsiClient'}, {'id': u'b', 'type': u'Host'}, False),
+])
+def testCompiledFilter(objHash, filter, expected):
+    assert expected == compileFilter(filter)(objHash)
+    assert expected == objectHashMatches(objHash, **filter)
+
+
+def testCompiledFilterFailsWithBackendError():
+    matches = compileFilter({'type': u'NotAnOpsiClass'})
+
+    with pytest.raises(BackendError):
+        matches({'type': u'OpsiClient'})
+
+
+def testCompiledFilterIsCachedForEqualFilters():
+    assert compileFilter({'id': [u'a', u'b']}) is compileFilter({'id': [u'a', u'b']})
+
+
+def testCompiledFilterDistinguishesEqualValuesOfDifferentTypes():
+    assert compileFilter({'value': 1})({'value': 1})
+    assert not compileFilter({'value': True})({'value': 1})
+
+
+def testBackendUsesCompiledFilter():
+    backend = Backend()
+
+    assert backend._objectHashMatches({'id': u'client.test.invalid'}, id=u'*.invalid')
+    assert not backend._objectHashMatches({'id': u'client.test.invalid'}, id=u'*.local')
+
+
+@pytest.mark.benchmark
+def testBenchmarkingCompiledFilter():
+    rand = random.Random(1)
+    objHashes = [
+        {
+            'id': u'client{0}.test.invalid'.format(index),
+            'productVersion': rand.choice([u'1.0', u'2.0', u'1.0.1']),
+            'packageVersion': rand.choice([u'1', u'2', u'3']),
+            'type': rand.choice(_TYPES),
+            'description': None,
+            'state': rand.randint(0, 1),
+        }
+        for index in range(100000)
+    ]
+    filter = {
+        'id': [u'client1*', u'*7.test.invalid'],
+        'productVersion': u'>=1.0',
+        'type': u'Host',
+        'state': 1,
+    }
+
+    start = time.time()
+    expected = [objHash for objHash in objHashes if legacyObjectHashMatches(objHash, **filter)]
+    legacyDuration = time.time() - start
+
+    start = time.time()
+    matches = compileFilter(filter)
+    result = [objHash for objHash in objHashes if matches(objHash)]
+    compiledDuration = time.time() - start
+
+    print("Filtering 100000 hashes: legacy {0:.3f}s, compiled {1:.3f}s".format(legacyDuration, compiledDuration))
+    assert expected == result